@@ -7,6 +7,7 @@ from app.agent.memory import CallSession, session_store
 from app.agent.prompts import build_system_prompt
 from app.agent.redaction import RedactionResult, redact_pii
 from app.agent.scoring import format_transcript, score_call
+from app.agent.summary import schedule_summary, summarize_evicted
 
 __all__ = [
     "run_turn",
@@ -20,4 +21,6 @@ __all__ = [
     "session_store",
     "CallSession",
     "build_system_prompt",
+    "schedule_summary",
+    "summarize_evicted",
 ]
@@ -9,6 +9,7 @@ from typing import Any
 
 from app.agent.memory import session_store
 from app.agent.redaction import redact_pii
+from app.agent.summary import cancel_summary, schedule_summary
 from app.integrations.mistral import chat_completion, chat_completion_stream
 
 
@@ -94,6 +95,7 @@ async def start_session(call_id: str, script_id: str, system_prompt: str) -> Non
 
 @_op
 async def end_session(call_id: str) -> list[dict]:
+    cancel_summary(call_id)
     session = session_store.get(call_id)
     if session is None:
         return []
@@ -117,7 +119,7 @@ async def run_turn(call_id: str, user_speech: str) -> str:
 
     session_store.add_message(call_id, "user", redaction.redacted_text)
 
-    llm_messages = [dict(message) for message in session.messages]
+    llm_messages = session_store.get_llm_messages(call_id)
     if llm_messages and llm_messages[-1].get("role") == "user":
         llm_messages[-1]["content"] = user_speech
 
@@ -127,6 +129,7 @@ async def run_turn(call_id: str, user_speech: str) -> str:
     session_store.add_message(call_id, "assistant", response)
     session.turn_count += 1
     session_store.trim_messages(call_id)
+    schedule_summary(call_id)
 
     return response
 
@@ -151,7 +154,7 @@ async def run_turn_streaming(
     if not (session.messages and session.messages[-1].get("role") == "user" and session.messages[-1].get("content") == redaction.redacted_text):
         session_store.add_message(call_id, "user", redaction.redacted_text)
 
-    llm_messages = [dict(message) for message in session.messages]
+    llm_messages = session_store.get_llm_messages(call_id)
     if llm_messages and llm_messages[-1].get("role") == "user":
         llm_messages[-1]["content"] = user_speech
 
@@ -205,3 +208,4 @@ async def run_turn_streaming(
         session_store.add_message(call_id, "assistant", full_text.strip())
         session.turn_count += 1
         session_store.trim_messages(call_id)
+        schedule_summary(call_id)
@@ -18,6 +18,14 @@ class CallSession:
     messages: list[dict] = field(default_factory=list)
     turn_count: int = 0
     max_turns: int = 10
+    # Running summary of turns trimmed out of the context window
+    summary: str = ""
+    # Trimmed turns waiting to be folded into the summary
+    pending_evicted: list[dict] = field(default_factory=list)
+
+
+MAX_PENDING_EVICTED = 40
+SUMMARY_HEADER = "## Earlier in this call (summary)"
 
 
 class SessionStore:
@@ -50,6 +58,46 @@ class SessionStore:
         with self._lock:
             self._sessions.pop(call_id, None)
 
+    def get_llm_messages(self, call_id: str) -> list[dict]:
+        """Return a copy of the context with the running summary folded into
+        the system message."""
+        with self._lock:
+            session = self._sessions.get(call_id)
+            if session is None:
+                raise KeyError(f"Session not found: {call_id}")
+            messages = [dict(message) for message in session.messages]
+            if session.summary and messages and messages[0].get("role") == "system":
+                messages[0]["content"] = (
+                    f"{messages[0].get('content', '')}\n\n"
+                    f"{SUMMARY_HEADER}\n{session.summary}"
+                )
+            return messages
+
+    def take_evicted(self, call_id: str) -> tuple[str, list[dict]]:
+        """Pop the turns awaiting summarization along with the current summary."""
+        with self._lock:
+            session = self._sessions.get(call_id)
+            if session is None:
+                return "", []
+            evicted = session.pending_evicted
+            session.pending_evicted = []
+            return session.summary, evicted
+
+    def restore_evicted(self, call_id: str, evicted: list[dict]) -> None:
+        """Put turns back after a failed summarization, keeping the newest."""
+        with self._lock:
+            session = self._sessions.get(call_id)
+            if session is None:
+                return
+            merged = [*evicted, *session.pending_evicted]
+            session.pending_evicted = merged[-MAX_PENDING_EVICTED:]
+
+    def set_summary(self, call_id: str, summary: str) -> None:
+        with self._lock:
+            session = self._sessions.get(call_id)
+            if session is not None:
+                session.summary = summary.strip()
+
     def trim_messages(self, call_id: str, keep: int = 20) -> None:
         with self._lock:
             session = self._sessions.get(call_id)
@@ -63,33 +111,49 @@ class SessionStore:
             from app.config import settings
 
             budget = settings.mistral_max_context_tokens
+            summarize = settings.mistral_summary_enabled
 
             system_message = session.messages[0]
             non_system = session.messages[1:]
 
-            # Calculate total tokens
+            # Calculate total tokens (the running summary rides along with
+            # the system prompt, so it counts against the same budget)
             total = estimate_tokens(system_message.get("content", ""))
+            total += estimate_tokens(session.summary)
             total += sum(estimate_tokens(m.get("content", "")) for m in non_system)
 
             # If within budget, no trimming needed
             if total <= budget:
                 # But still apply the keep limit as a safety net
                 if len(non_system) > keep:
+                    if summarize:
+                        self._queue_evicted(session, non_system[:-keep])
                     session.messages = [system_message, *non_system[-keep:]]
                 return
 
             # Remove oldest non-system messages one at a time until within budget
             # Always preserve last 4 messages (2 exchange pairs)
             MIN_KEEP = 4
+            removed_messages: list[dict] = []
             while len(non_system) > MIN_KEEP:
                 # Remove the oldest (index 0 of non_system)
                 removed = non_system.pop(0)
+                removed_messages.append(removed)
                 total -= estimate_tokens(removed.get("content", ""))
                 if total <= budget:
                     break
 
+            if summarize:
+                self._queue_evicted(session, removed_messages)
             session.messages = [system_message, *non_system]
 
+    @staticmethod
+    def _queue_evicted(session: CallSession, removed: list[dict]) -> None:
+        if not removed:
+            return
+        merged = [*session.pending_evicted, *removed]
+        session.pending_evicted = merged[-MAX_PENDING_EVICTED:]
+
     def get_context_usage(self, call_id: str) -> dict:
         with self._lock:
             session = self._sessions.get(call_id)
@@ -100,7 +164,7 @@ class SessionStore:
             budget = settings.mistral_max_context_tokens
             estimated = sum(
                 estimate_tokens(m.get("content", "")) for m in session.messages
-            )
+            ) + estimate_tokens(session.summary)
             return {
                 "estimated_tokens": estimated,
                 "message_count": len(session.messages),
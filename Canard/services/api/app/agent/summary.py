@@ -0,0 +1,120 @@
+# pyright: basic
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from app.agent.memory import session_store
+from app.config import settings
+from app.integrations.mistral import chat_completion
+
+
+def _noop_op(fn):  # type: ignore[misc]
+    return fn
+
+
+_op: Any = _noop_op
+try:
+    import weave as _weave
+
+    _op = _weave.op
+except ImportError:
+    pass
+
+
+LOGGER = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a phone conversation for the caller "
+    "who is still on the line. Merge the earlier summary with the new turns "
+    "into one compact summary written in the third person. Keep every name, "
+    "number, commitment, objection and detail the other person has already "
+    "shared, and what the caller has already asked for, so nothing gets "
+    "repeated. Drop greetings and small talk. Reply with the summary only."
+)
+
+_summary_tasks: dict[str, asyncio.Task] = {}
+
+
+def _format_turns(turns: list[dict]) -> str:
+    lines: list[str] = []
+    for turn in turns:
+        content = str(turn.get("content", "")).strip()
+        if not content:
+            continue
+        speaker = "Caller" if turn.get("role") == "assistant" else "Target"
+        lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
+
+
+@_op
+async def summarize_evicted(call_id: str) -> str:
+    """Fold trimmed turns into the session's running summary.
+
+    Loops until nothing is pending so turns evicted while a summary request
+    was in flight are picked up by the same task.
+    """
+    while True:
+        previous, evicted = session_store.take_evicted(call_id)
+        if not evicted:
+            return previous
+
+        new_turns = _format_turns(evicted)
+        if not new_turns:
+            continue
+        user_content = (
+            f"Earlier summary:\n{previous or '(none)'}\n\n"
+            f"New turns:\n{new_turns}"
+        )
+        try:
+            summary = await chat_completion(
+                [
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content},
+                ],
+                temperature=0.2,
+                max_tokens=settings.mistral_summary_max_tokens,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            LOGGER.warning(
+                "Rolling summary failed for call %s", call_id, exc_info=True
+            )
+            session_store.restore_evicted(call_id, evicted)
+            return previous
+
+        if summary.strip():
+            session_store.set_summary(call_id, summary)
+
+
+def schedule_summary(call_id: str) -> None:
+    """Start a background summarization for the call if one isn't running.
+
+    Called right after a turn is committed so the LLM request overlaps with
+    TTS playback instead of delaying the next response.
+    """
+    if not settings.mistral_summary_enabled:
+        return
+    session = session_store.get(call_id)
+    if session is None or not session.pending_evicted:
+        return
+    existing = _summary_tasks.get(call_id)
+    if existing is not None and not existing.done():
+        return
+    task = asyncio.create_task(summarize_evicted(call_id))
+    _summary_tasks[call_id] = task
+    task.add_done_callback(lambda t: _forget_task(call_id, t))
+
+
+def _forget_task(call_id: str, task: asyncio.Task) -> None:
+    if _summary_tasks.get(call_id) is task:
+        _summary_tasks.pop(call_id, None)
+
+
+def cancel_summary(call_id: str) -> None:
+    task = _summary_tasks.pop(call_id, None)
+    if task is not None and not task.done():
+        task.cancel()
@@ -5,6 +5,7 @@ from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException, Request
 
+from app.auth.tokens import NoVerificationKey, TokenError, get_token_verifier, get_user_cache
 from app.db.client import get_supabase
 from app.db import queries
 
@@ -16,7 +17,7 @@ async def _extract_token(request: Request) -> str | None:
     return None
 
 
-def _verify_and_resolve(token: str) -> dict[str, Any]:
+def _verify_remote(token: str) -> dict[str, Any]:
     """Verify JWT via Supabase GoTrue and resolve the public.users record."""
     sb = get_supabase()
     try:
@@ -38,6 +39,35 @@ def _verify_and_resolve(token: str) -> dict[str, Any]:
     return user
 
 
+def _verify_and_resolve(token: str) -> dict[str, Any]:
+    """Verify JWT locally and resolve the public.users record (cached by subject)."""
+    verifier = get_token_verifier()
+    if not verifier.enabled:
+        return _verify_remote(token)
+    try:
+        claims = verifier.verify(token)
+    except NoVerificationKey:
+        return _verify_remote(token)
+    except TokenError as exc:
+        raise HTTPException(status_code=401, detail="Invalid or expired token") from exc
+
+    cache = get_user_cache()
+    user = cache.get(claims["sub"])
+    if user is not None:
+        return user
+
+    email = claims.get("email")
+    if not email:
+        raise HTTPException(status_code=401, detail="Auth user has no email")
+
+    user = queries.get_user_by_email(email)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found in application database")
+
+    cache.put(claims["sub"], user)
+    return user
+
+
 async def get_current_user(request: Request) -> dict[str, Any]:
     """Require a valid JWT. Returns the public.users row as a dict."""
     token = await _extract_token(request)
@@ -48,13 +78,19 @@ async def get_current_user(request: Request) -> dict[str, Any]:
 
 async def get_current_user_optional(request: Request) -> dict[str, Any] | None:
     """Return authenticated user if token present, else None (for backward compat)."""
+    # Resolved once per request: response caching looks the user up
+    # before the route's own dependency does
+    if hasattr(request.state, "optional_user"):
+        return request.state.optional_user
     token = await _extract_token(request)
-    if not token:
-        return None
-    try:
-        return _verify_and_resolve(token)
-    except HTTPException:
-        return None
+    user = None
+    if token:
+        try:
+            user = _verify_and_resolve(token)
+        except HTTPException:
+            user = None
+    request.state.optional_user = user
+    return user
 
 
 CurrentUser = Annotated[dict[str, Any], Depends(get_current_user)]
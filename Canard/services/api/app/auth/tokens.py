@@ -0,0 +1,161 @@
+# pyright: basic, reportMissingImports=false
+"""Local verification of Supabase access tokens and a cache of resolved users.
+
+Access tokens are checked in-process instead of with a GoTrue round
+trip: HS256 tokens against ``SUPABASE_JWT_SECRET``, asymmetric ones
+(RS256/ES256) against the project's JWKS, fetched once and refreshed
+after ``AUTH_JWKS_TTL_S`` or when an unknown ``kid`` shows up.
+
+The ``public.users`` row a token resolves to is cached by the token's
+subject for ``AUTH_USER_CACHE_TTL_S``; writes to ``users`` through
+:mod:`app.db.queries` drop the cached row straight away.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+
+import jwt
+
+from app.config import settings
+from app.db import queries
+
+LOGGER = logging.getLogger(__name__)
+
+_ASYMMETRIC_ALGORITHMS = {"RS256", "ES256", "EdDSA"}
+
+
+class TokenError(Exception):
+    """The token is malformed, expired or not signed by the project."""
+
+
+class NoVerificationKey(TokenError):
+    """No local key for the token's algorithm (e.g. HS256 without a secret)."""
+
+
+class TokenVerifier:
+    def __init__(
+        self,
+        secret: str,
+        jwks_url: str,
+        audience: str,
+        jwks_ttl_s: float,
+        leeway_s: float,
+    ):
+        self.secret = secret
+        self.audience = audience
+        self.leeway_s = leeway_s
+        self._jwks = (
+            jwt.PyJWKClient(jwks_url, cache_jwk_set=True, lifespan=max(jwks_ttl_s, 1.0))
+            if jwks_url
+            else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret or self._jwks)
+
+    def _key(self, token: str, alg: str | None) -> Any:
+        if alg == "HS256" and self.secret:
+            return self.secret
+        if alg in _ASYMMETRIC_ALGORITHMS and self._jwks is not None:
+            return self._jwks.get_signing_key_from_jwt(token).key
+        raise NoVerificationKey(f"No verification key for algorithm {alg!r}")
+
+    def verify(self, token: str) -> dict[str, Any]:
+        """Return the claims of a valid token; raise :class:`TokenError` otherwise."""
+        try:
+            alg = jwt.get_unverified_header(token).get("alg")
+            return jwt.decode(
+                token,
+                self._key(token, alg),
+                algorithms=[alg],
+                audience=self.audience or None,
+                leeway=self.leeway_s,
+                options={"require": ["exp", "sub"], "verify_aud": bool(self.audience)},
+            )
+        except jwt.PyJWTError as exc:
+            raise TokenError(str(exc)) from exc
+
+
+class UserCache:
+    """TTL cache of ``public.users`` rows keyed by token subject."""
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, subject: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return user
+
+    def put(self, subject: str, user: dict) -> None:
+        if self.ttl_s <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_s, user)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        """Drop one user's entries (every entry when ``user_id`` is None)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                return
+            for subject in [s for s, (_, u) in self._entries.items() if u.get("id") == user_id]:
+                del self._entries[subject]
+
+    def on_write(self, table: str, _op: str, row: dict) -> None:
+        """:func:`queries.register_write_listener` callback."""
+        if table == "users":
+            self.invalidate(row.get("id") or None)
+
+
+_verifier_instance: TokenVerifier | None = None
+_user_cache_instance: UserCache | None = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    global _verifier_instance
+
+    if _verifier_instance is None:
+        jwks_url = (
+            f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+            if settings.supabase_url and settings.auth_jwks_enabled
+            else ""
+        )
+        _verifier_instance = TokenVerifier(
+            secret=settings.supabase_jwt_secret,
+            jwks_url=jwks_url,
+            audience=settings.auth_jwt_audience,
+            jwks_ttl_s=settings.auth_jwks_ttl_s,
+            leeway_s=settings.auth_jwt_leeway_s,
+        )
+    return _verifier_instance
+
+
+def get_user_cache() -> UserCache:
+    global _user_cache_instance
+
+    if _user_cache_instance is None:
+        _user_cache_instance = UserCache(
+            settings.auth_user_cache_ttl_s, settings.auth_user_cache_max_entries
+        )
+        queries.register_write_listener(_user_cache_instance.on_write)
+    return _user_cache_instance
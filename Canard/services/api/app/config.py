@@ -30,6 +30,23 @@ class Settings(BaseSettings):
     mistral_model: str = "mistral-small-latest"
     mistral_temperature: float = 0.8
     mistral_max_context_tokens: int = 8000
+    # Rolling summary of turns trimmed out of the context window
+    mistral_summary_enabled: bool = True
+    mistral_summary_max_tokens: int = 200
+    # Hedged streaming: fire a second request when the first token is late
+    mistral_hedge_enabled: bool = True
+    mistral_hedge_default_ms: int = 1500
+    mistral_hedge_min_ms: int = 400
+    mistral_hedge_max_ms: int = 4000
+    # Per-model circuit breaker
+    mistral_breaker_failure_threshold: int = 5
+    mistral_breaker_reset_s: float = 30.0
+
+    # Cache for deterministic (evaluation) completions
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = ".data/llm_cache.sqlite3"
+    llm_cache_ttl_s: int = 30 * 24 * 3600
+    llm_cache_max_bytes: int = 64 * 1024 * 1024
 
     # ElevenLabs
     elevenlabs_api_key: str = ""
@@ -39,11 +56,44 @@ class Settings(BaseSettings):
     supabase_url: str = ""
     supabase_service_role_key: str = ""
     supabase_anon_public_key: str = ""
+    # Access tokens are verified locally: HS256 with the project's JWT
+    # secret, asymmetric keys from its JWKS. Tokens with no local key are
+    # checked with GoTrue instead
+    supabase_jwt_secret: str = ""
+    auth_jwks_enabled: bool = True
+    auth_jwks_ttl_s: int = 600
+    auth_jwt_audience: str = "authenticated"
+    auth_jwt_leeway_s: float = 10.0
+    # Resolved public.users rows, keyed by token subject
+    auth_user_cache_ttl_s: int = 60
+    auth_user_cache_max_entries: int = 4096
 
     # Resend (transactional email)
     resend_api_key: str = ""
     resend_from_email: str = "Canard Security <onboarding@resend.dev>"
 
+    # Outbound email: durable outbox drained by a background sender.
+    # Backend is "resend", "smtp" or "file" (.eml files, for dev/tests)
+    email_backend: str = "resend"
+    email_outbox_path: str = ".data/outbox.sqlite3"
+    email_inline_sender: bool = True
+    email_batch_size: int = 50
+    email_send_concurrency: int = 2
+    # Provider requests per second (a batch is one request)
+    email_rate_per_s: float = 2.0
+    email_max_attempts: int = 8
+    email_poll_interval_s: float = 2.0
+    email_file_sink_path: str = ".data/outbox"
+    smtp_host: str = "localhost"
+    smtp_port: int = 25
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_starttls: bool = False
+    # Digest mode: one email per employee and per manager (boss_id) per
+    # window, instead of one full results email per call
+    email_digest_enabled: bool = False
+    email_digest_window_s: int = 3600
+
     # App
     app_url: str = "http://localhost:3000"
 
@@ -53,6 +103,61 @@ class Settings(BaseSettings):
     silence_nudge_ms: int = 4000
     silence_goodbye_ms: int = 20000
 
+    # Campaign dialer: live calls per process and per org, Twilio call
+    # creation rate, and concurrent ElevenLabs realtime STT sessions (one
+    # per live call). Slots of calls whose end was never seen are polled
+    # and reclaimed after the timeout
+    campaign_max_live_calls: int = 10
+    campaign_max_live_calls_per_org: int = 5
+    twilio_calls_per_second: float = 1.0
+    elevenlabs_stt_max_sessions: int = 10
+    campaign_call_slot_timeout_s: int = 1800
+    campaign_slot_poll_s: float = 15.0
+
+    # Campaign scheduler: starts campaigns at scheduled_at and resumes
+    # running ones after a restart; each is driven by one instance at a
+    # time under a lease renewed every third of campaign_lease_s
+    campaign_scheduler_enabled: bool = True
+    campaign_scheduler_poll_s: float = 15.0
+    campaign_lease_s: int = 120
+
+    # Background jobs (post-call processing)
+    job_queue_backend: str = "sqlite"
+    job_queue_path: str = ".data/jobs.sqlite3"
+    jobs_inline_worker: bool = True
+    job_worker_concurrency: int = 4
+    job_poll_interval_s: float = 1.0
+    job_max_attempts: int = 5
+    job_lease_s: int = 300
+    job_retry_base_s: float = 5.0
+    job_retry_max_s: float = 300.0
+
+    # Local recording cache shared by STT, storage upload, evaluation, cloning
+    recording_cache_path: str = ".data/recordings"
+    recording_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    # Stereo (callee/agent) WAV written from the media stream during the call
+    dual_recording_enabled: bool = True
+
+    # CPU-bound work (audio features, PDFs): 0 = one worker per core,
+    # -1 = run in a thread instead of a process pool
+    cpu_pool_workers: int = 0
+
+    # In-memory per-org call facts for dashboard/analytics. Calls written
+    # by other processes (the job worker) are polled for by updated_at at
+    # most this often; a full reload after the TTL also picks up their
+    # employee, campaign and caller writes and deletes
+    analytics_sync_interval_s: float = 5.0
+    analytics_store_ttl_s: int = 300
+    # "memory" aggregates the store above; "sql" calls the Postgres
+    # functions from migrations/013 for the endpoints they cover
+    analytics_source: str = "memory"
+
+    # ETag / 304 caching of dashboard and analytics GETs. Versions roll
+    # over after the TTL so writes from other processes show up
+    response_cache_enabled: bool = True
+    response_cache_ttl_s: int = 60
+    response_cache_max_entries: int = 512
+
     # W&B Weave
     wandb_api_key: str = ""
     wandb_project: str = "canard"
@@ -1,10 +1,23 @@
 # pyright: basic
 from __future__ import annotations
 
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from typing import Any
 
 from app.db.client import get_supabase
 
+LOGGER = logging.getLogger(__name__)
+
+# (table, op, row) — op is "insert", "update" or "delete"; for deletes the
+# row only carries the id
+WriteListener = Callable[[str, str, dict[str, Any]], None]
+
+_write_listeners: list[WriteListener] = []
+
 
 def _first_or_none(data: Any) -> dict[str, Any] | None:
     if isinstance(data, list):
@@ -23,6 +36,137 @@ def _execute(query: Any, context: str) -> Any:
         raise RuntimeError(f"Database query failed during {context}") from exc
 
 
+def register_write_listener(listener: WriteListener) -> None:
+    """Call ``listener`` after every write made through this module."""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def _notify_write(table: str, op: str, rows: Any) -> None:
+    for row in rows if isinstance(rows, list) else [rows]:
+        if isinstance(row, dict) and row.get("id"):
+            _forget(table, row["id"])
+    if not _write_listeners:
+        return
+    for row in rows if isinstance(rows, list) else [rows]:
+        if not isinstance(row, dict):
+            continue
+        for listener in list(_write_listeners):
+            try:
+                listener(table, op, row)
+            except Exception:  # noqa: BLE001
+                LOGGER.warning("Write listener failed for %s %s", op, table, exc_info=True)
+
+
+# ── Identity map & batched lookups ──
+
+# ids per ``in.(...)`` filter; keeps the request URL well under limits
+_IN_CHUNK_SIZE = 100
+
+
+@dataclass
+class _IdentityMap:
+    rows: dict[tuple[str, str], dict | None] = field(default_factory=dict)
+    active: bool = True
+
+
+_identity_map: ContextVar[_IdentityMap | None] = ContextVar("queries_identity_map", default=None)
+
+
+def _current_identity_map() -> _IdentityMap | None:
+    scope = _identity_map.get()
+    return scope if scope is not None and scope.active else None
+
+
+@contextmanager
+def identity_scope() -> Iterator[None]:
+    """Reuse rows fetched by id for the rest of the block.
+
+    Inside the scope ``get_<table>`` / ``get_<tables>`` return the row
+    already fetched for an id instead of querying again (misses are
+    remembered too); writes through this module drop the written row.
+    Nested scopes share the outer map. Tasks and threads started inside
+    the block see the map only until it closes.
+    """
+    if _current_identity_map() is not None:
+        yield
+        return
+    scope = _IdentityMap()
+    token = _identity_map.set(scope)
+    try:
+        yield
+    finally:
+        scope.active = False
+        _identity_map.reset(token)
+
+
+def _forget(table: str, id: str) -> None:
+    scope = _current_identity_map()
+    if scope is not None:
+        scope.rows.pop((table, id), None)
+
+
+def _get_many(table: str, ids: Iterable[str], context: str) -> dict[str, dict]:
+    """Rows of ``table`` by id, in ``ids`` order (unknown ids are left out).
+
+    Ids not already in the identity map are fetched with one
+    ``in.(...)`` filter per :data:`_IN_CHUNK_SIZE` ids.
+    """
+    wanted = list(dict.fromkeys(i for i in ids if i))
+    scope = _current_identity_map()
+    found: dict[str, dict] = {}
+    missing: list[str] = []
+    for id in wanted:
+        if scope is not None and (table, id) in scope.rows:
+            row = scope.rows[(table, id)]
+            if row is not None:
+                found[id] = row
+        else:
+            missing.append(id)
+
+    for start in range(0, len(missing), _IN_CHUNK_SIZE):
+        chunk = missing[start : start + _IN_CHUNK_SIZE]
+        result = _execute(get_supabase().table(table).select("*").in_("id", chunk), context)
+        for row in result if isinstance(result, list) else []:
+            found[row["id"]] = row
+        if scope is not None:
+            for id in chunk:
+                scope.rows[(table, id)] = found.get(id)
+    return {id: found[id] for id in wanted if id in found}
+
+
+def _get_by_id(table: str, id: str, context: str) -> dict | None:
+    if _current_identity_map() is not None:
+        return _get_many(table, [id], context).get(id)
+    result = _execute(
+        get_supabase().table(table).select("*").eq("id", id).limit(1),
+        context,
+    )
+    return _first_or_none(result)
+
+
+# ── Embedded relations ──
+
+# PostgREST resource embedding: related rows come back nested under an
+# alias in the same response. The ``!column`` hint names the foreign key
+# to follow, since calls reaches campaigns both directly and through
+# campaign_assignments.
+CALL_NAME_EMBEDS = (
+    "employee:employees!employee_id(full_name),"
+    "caller:callers!caller_id(persona_name),"
+    "campaign:campaigns!campaign_id(name,attack_vector)"
+)
+SCRIPT_CAMPAIGN_EMBED = "campaign:campaigns!campaign_id(name)"
+
+
+def embedded(row: dict, alias: str) -> dict:
+    """The related row embedded under ``alias`` ({} when the FK is null)."""
+    value = row.get(alias)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value if isinstance(value, dict) else {}
+
+
 # ── Organizations ──
 
 
@@ -35,11 +179,7 @@ def create_organization(data: dict) -> dict:
 
 
 def get_organization(id: str) -> dict | None:
-    result = _execute(
-        get_supabase().table("organizations").select("*").eq("id", id).limit(1),
-        "get_organization",
-    )
-    return _first_or_none(result)
+    return _get_by_id("organizations", id, "get_organization")
 
 
 def get_organization_by_slug(slug: str) -> dict | None:
@@ -63,6 +203,7 @@ def delete_organization(id: str) -> None:
         get_supabase().table("organizations").delete().eq("id", id),
         "delete_organization",
     )
+    _forget("organizations", id)
 
 
 # ── Users ──
@@ -71,6 +212,7 @@ def delete_organization(id: str) -> None:
 def create_user(data: dict) -> dict:
     result = _execute(get_supabase().table("users").insert(data), "create_user")
     row = _first_or_none(result)
+    _notify_write("users", "insert", row)
     return row or {}
 
 
@@ -96,6 +238,7 @@ def update_user(id: str, data: dict) -> dict:
         "update_user",
     )
     row = _first_or_none(result)
+    _notify_write("users", "update", row or {"id": id})
     return row or {}
 
 
@@ -104,6 +247,7 @@ def delete_user(id: str) -> None:
         get_supabase().table("users").delete().eq("id", id),
         "delete_user",
     )
+    _notify_write("users", "delete", {"id": id})
 
 
 def list_users(org_id: str, active_only: bool = True) -> list[dict]:
@@ -128,15 +272,16 @@ def create_employee(data: dict) -> dict:
         get_supabase().table("employees").insert(data), "create_employee"
     )
     row = _first_or_none(result)
+    _notify_write("employees", "insert", row)
     return row or {}
 
 
 def get_employee(id: str) -> dict | None:
-    result = _execute(
-        get_supabase().table("employees").select("*").eq("id", id).limit(1),
-        "get_employee",
-    )
-    return _first_or_none(result)
+    return _get_by_id("employees", id, "get_employee")
+
+
+def get_employees(ids: Iterable[str]) -> dict[str, dict]:
+    return _get_many("employees", ids, "get_employees")
 
 
 def list_employees(org_id: str, active_only: bool = True) -> list[dict]:
@@ -172,6 +317,7 @@ def update_employee(id: str, data: dict) -> dict:
         "update_employee",
     )
     row = _first_or_none(result)
+    _notify_write("employees", "update", row)
     return row or {}
 
 
@@ -196,6 +342,7 @@ def update_employee_voice_id(employee_id: str, voice_id: str) -> dict:
         "update_employee_voice_id",
     )
     row = _first_or_none(result)
+    _notify_write("employees", "update", row)
     return row or {}
 
 
@@ -205,15 +352,16 @@ def update_employee_voice_id(employee_id: str, voice_id: str) -> dict:
 def create_caller(data: dict) -> dict:
     result = _execute(get_supabase().table("callers").insert(data), "create_caller")
     row = _first_or_none(result)
+    _notify_write("callers", "insert", row)
     return row or {}
 
 
 def get_caller(id: str) -> dict | None:
-    result = _execute(
-        get_supabase().table("callers").select("*").eq("id", id).limit(1),
-        "get_caller",
-    )
-    return _first_or_none(result)
+    return _get_by_id("callers", id, "get_caller")
+
+
+def get_callers(ids: Iterable[str]) -> dict[str, dict]:
+    return _get_many("callers", ids, "get_callers")
 
 
 def update_caller(id: str, data: dict) -> dict:
@@ -222,6 +370,7 @@ def update_caller(id: str, data: dict) -> dict:
         "update_caller",
     )
     row = _first_or_none(result)
+    _notify_write("callers", "update", row)
     return row or {}
 
 
@@ -249,18 +398,18 @@ def create_script(data: dict) -> dict:
 
 
 def get_script(id: str) -> dict | None:
-    result = _execute(
-        get_supabase().table("scripts").select("*").eq("id", id).limit(1),
-        "get_script",
-    )
-    return _first_or_none(result)
+    return _get_by_id("scripts", id, "get_script")
 
 
-def list_scripts(org_id: str, active_only: bool = True) -> list[dict]:
+def get_scripts(ids: Iterable[str]) -> dict[str, dict]:
+    return _get_many("scripts", ids, "get_scripts")
+
+
+def list_scripts(org_id: str, active_only: bool = True, columns: str = "*") -> list[dict]:
     query = (
         get_supabase()
         .table("scripts")
-        .select("*")
+        .select(columns)
         .eq("org_id", org_id)
         .order("created_at", desc=True)
     )
@@ -288,6 +437,7 @@ def update_script(id: str, data: dict) -> dict:
         get_supabase().table("scripts").update(data).eq("id", id),
         "update_script",
     )
+    _forget("scripts", id)
     row = _first_or_none(result)
     return row or {}
 
@@ -297,6 +447,7 @@ def delete_script(id: str) -> None:
         get_supabase().table("scripts").delete().eq("id", id),
         "delete_script",
     )
+    _forget("scripts", id)
 
 
 # ── Campaigns ──
@@ -305,15 +456,16 @@ def delete_script(id: str) -> None:
 def create_campaign(data: dict) -> dict:
     result = _execute(get_supabase().table("campaigns").insert(data), "create_campaign")
     row = _first_or_none(result)
+    _notify_write("campaigns", "insert", row)
     return row or {}
 
 
 def get_campaign(id: str) -> dict | None:
-    result = _execute(
-        get_supabase().table("campaigns").select("*").eq("id", id).limit(1),
-        "get_campaign",
-    )
-    return _first_or_none(result)
+    return _get_by_id("campaigns", id, "get_campaign")
+
+
+def get_campaigns(ids: Iterable[str]) -> dict[str, dict]:
+    return _get_many("campaigns", ids, "get_campaigns")
 
 
 def list_campaigns(org_id: str) -> list[dict]:
@@ -333,6 +485,7 @@ def delete_campaign(id: str) -> None:
         get_supabase().table("campaigns").delete().eq("id", id),
         "delete_campaign",
     )
+    _notify_write("campaigns", "delete", {"id": id})
 
 
 def update_campaign(id: str, data: dict) -> dict:
@@ -341,6 +494,7 @@ def update_campaign(id: str, data: dict) -> dict:
         "update_campaign",
     )
     row = _first_or_none(result)
+    _notify_write("campaigns", "update", row)
     return row or {}
 
 
@@ -356,15 +510,17 @@ def create_campaign_assignment(data: dict) -> dict:
     return row or {}
 
 
-def list_campaign_assignments(campaign_id: str) -> list[dict]:
-    result = _execute(
+def list_campaign_assignments(campaign_id: str, status: str | None = None) -> list[dict]:
+    query = (
         get_supabase()
         .table("campaign_assignments")
         .select("*")
         .eq("campaign_id", campaign_id)
-        .order("created_at", desc=True),
-        "list_campaign_assignments",
+        .order("created_at", desc=True)
     )
+    if status:
+        query = query.eq("status", status)
+    result = _execute(query, "list_campaign_assignments")
     return result if isinstance(result, list) else []
 
 
@@ -393,23 +549,48 @@ def bulk_create_campaign_assignments(rows: list[dict]) -> list[dict]:
 def create_call(data: dict) -> dict:
     result = _execute(get_supabase().table("calls").insert(data), "create_call")
     row = _first_or_none(result)
+    _notify_write("calls", "insert", row)
     return row or {}
 
 
-def get_call(id: str) -> dict | None:
+def get_call(id: str, columns: str = "*") -> dict | None:
+    if columns == "*":
+        return _get_by_id("calls", id, "get_call")
     result = _execute(
-        get_supabase().table("calls").select("*").eq("id", id).limit(1),
+        get_supabase().table("calls").select(columns).eq("id", id).limit(1),
         "get_call",
     )
     return _first_or_none(result)
 
 
+def get_calls(ids: Iterable[str]) -> dict[str, dict]:
+    return _get_many("calls", ids, "get_calls")
+
+
+def get_calls_by_assignment(assignment_ids: Iterable[str]) -> dict[str, dict]:
+    """Calls placed for the given assignments, keyed by assignment id."""
+    ids = list(dict.fromkeys(i for i in assignment_ids if i))
+    found: dict[str, dict] = {}
+    for start in range(0, len(ids), _IN_CHUNK_SIZE):
+        result = _execute(
+            get_supabase()
+            .table("calls")
+            .select("id,assignment_id,status")
+            .in_("assignment_id", ids[start : start + _IN_CHUNK_SIZE]),
+            "get_calls_by_assignment",
+        )
+        for row in result if isinstance(result, list) else []:
+            found[row["assignment_id"]] = row
+    return found
+
+
 def update_call(id: str, data: dict) -> dict:
     result = _execute(
         get_supabase().table("calls").update(data).eq("id", id),
         "update_call",
     )
     row = _first_or_none(result)
+    _notify_write("calls", "update", row)
     return row or {}
 
 
@@ -419,11 +600,12 @@ def list_calls(
     campaign_id: str | None = None,
     status: str | None = None,
     limit: int = 50,
+    columns: str = "*",
 ) -> list[dict]:
     query = (
         get_supabase()
         .table("calls")
-        .select("*")
+        .select(columns)
         .eq("org_id", org_id)
         .order("created_at", desc=True)
         .limit(limit)
@@ -438,6 +620,66 @@ def list_calls(
     return result if isinstance(result, list) else []
 
 
+def list_calls_page(
+    *,
+    columns: str = "*",
+    org_id: str | None = None,
+    campaign_id: str | None = None,
+    status: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    after: tuple[str, str] | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """One keyset page of calls ordered by (created_at, id).
+
+    ``after`` is the (created_at, id) of the last row of the previous page.
+    """
+    query = (
+        get_supabase()
+        .table("calls")
+        .select(columns)
+        .order("created_at")
+        .order("id")
+        .limit(limit)
+    )
+    if org_id:
+        query = query.eq("org_id", org_id)
+    if campaign_id:
+        query = query.eq("campaign_id", campaign_id)
+    if status:
+        query = query.eq("status", status)
+    if created_from:
+        query = query.gte("created_at", created_from)
+    if created_to:
+        query = query.lt("created_at", created_to)
+    if after is not None:
+        created_at, call_id = after
+        query = query.or_(
+            f'created_at.gt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.gt.{call_id})'
+        )
+    result = _execute(query, "list_calls_page")
+    return result if isinstance(result, list) else []
+
+
+def list_calls_updated_since(
+    org_id: str, since: str, *, columns: str = "*", limit: int = 1000
+) -> list[dict]:
+    """An org's calls with ``updated_at`` after ``since``, oldest change first."""
+    result = _execute(
+        get_supabase()
+        .table("calls")
+        .select(columns)
+        .eq("org_id", org_id)
+        .gt("updated_at", since)
+        .order("updated_at")
+        .limit(limit),
+        "list_calls_updated_since",
+    )
+    return result if isinstance(result, list) else []
+
+
 def get_subordinates(manager_id: str) -> list[dict]:
     """Return all direct + transitive reports via the recursive RPC."""
     try:
@@ -460,3 +702,95 @@ def get_call_by_sid(twilio_call_sid: str) -> dict | None:
         "get_call_by_sid",
     )
     return _first_or_none(result)
+
+
+# ── Analytics aggregates (migrations/013_analytics_rpcs.sql) ──
+
+
+def _rpc_rows(function: str, params: dict[str, Any]) -> list[dict]:
+    result = _execute(get_supabase().rpc(function, params), function)
+    return result if isinstance(result, list) else []
+
+
+def get_dashboard_stats(org_id: str) -> dict:
+    """Campaign, call and employee counters plus average completed risk."""
+    return _first_or_none(_rpc_rows("analytics_dashboard_stats", {"org_uuid": org_id})) or {}
+
+
+def get_calls_by_day(org_id: str, since: str) -> list[dict]:
+    """Per-day call counts, outcomes and completed risk from ``since`` (YYYY-MM-DD)."""
+    return _rpc_rows("analytics_calls_by_day", {"org_uuid": org_id, "since": since})
+
+
+def get_department_totals(org_id: str) -> list[dict]:
+    """Completed/failed calls per department, most recently active first."""
+    return _rpc_rows("analytics_department_totals", {"org_uuid": org_id})
+
+
+def get_department_trends(org_id: str, since: str) -> list[dict]:
+    """Completed/failed calls per (day, department) from ``since``."""
+    return _rpc_rows("analytics_department_trends", {"org_uuid": org_id, "since": since})
+
+
+def get_attack_heatmap(org_id: str) -> list[dict]:
+    """Completed/failed calls and mean risk per (attack vector, department)."""
+    return _rpc_rows("analytics_attack_heatmap", {"org_uuid": org_id})
+
+
+def get_flag_frequency(org_id: str, campaign_id: str | None = None) -> list[dict]:
+    """Flag counts over completed calls, each row carrying the completed total."""
+    return _rpc_rows(
+        "analytics_flag_frequency", {"org_uuid": org_id, "campaign_uuid": campaign_id}
+    )
+
+
+def get_dept_flag_pivot(org_id: str) -> list[dict]:
+    """Flag counts and affected employees per (department, flag)."""
+    return _rpc_rows("analytics_dept_flag_pivot", {"org_uuid": org_id})
+
+
+# ── Hierarchy rollups (migrations/014_hierarchy_closure_rollups.sql) ──
+
+
+def get_team_rollups(manager_id: str) -> list[dict]:
+    """The manager (depth 0) and every transitive report, shallowest first,
+    each with personal and team call counters from ``employee_risk_rollups``."""
+    return _rpc_rows("get_team_rollups", {"manager_uuid": manager_id})
+
+
+# ── Usage counters (migrations/015_usage_counters.sql) ──
+
+
+def refresh_usage_counters(org_id: str | None = None) -> dict:
+    """Recompute employee and caller call counters from ``calls`` for one
+    org (all orgs when None); returns the number of rows of each refreshed."""
+    return _first_or_none(_rpc_rows("refresh_usage_counters", {"org_uuid": org_id})) or {}
+
+
+# ── Campaign scheduling (migrations/016_campaign_scheduler.sql) ──
+
+
+def list_due_campaigns(owner: str) -> list[dict]:
+    """Running or due scheduled campaigns whose lease ``owner`` can take."""
+    return _rpc_rows("list_due_campaigns", {"owner": owner})
+
+
+def acquire_campaign_lease(campaign_id: str, owner: str, lease_s: int) -> bool:
+    """Take or renew a campaign's lease; False when another owner holds it."""
+    result = _execute(
+        get_supabase().rpc(
+            "acquire_campaign_lease",
+            {"campaign_uuid": campaign_id, "owner": owner, "lease_seconds": lease_s},
+        ),
+        "acquire_campaign_lease",
+    )
+    return result is True
+
+
+def release_campaign_lease(campaign_id: str, owner: str) -> None:
+    _execute(
+        get_supabase().rpc(
+            "release_campaign_lease", {"campaign_uuid": campaign_id, "owner": owner}
+        ),
+        "release_campaign_lease",
+    )
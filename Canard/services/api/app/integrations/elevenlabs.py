@@ -25,7 +25,7 @@ import json
 import logging
 import re
 from collections.abc import AsyncIterator
-from typing import Any, cast
+from typing import Any, BinaryIO, cast
 
 import websockets
 
@@ -221,7 +221,7 @@ async def text_to_speech_streaming(
 
 
 async def speech_to_text(
-    audio_bytes: bytes,
+    audio_bytes: bytes | BinaryIO,
     filename: str = "recording.wav",
     language_code: str | None = None,
 ) -> str:
@@ -233,14 +233,19 @@ async def speech_to_text(
     .text attribute containing the transcript.
 
     Args:
-        audio_bytes: Raw audio file bytes (wav, mp3, ogg, etc.)
+        audio_bytes: Raw audio file bytes (wav, mp3, ogg, etc.), or an
+            open binary file which is streamed into the upload.
         filename: Filename hint for the upload.
         language_code: ISO-639-1 code (e.g. "en"). None = auto-detect.
 
     Returns:
         Transcribed text string.
     """
-    LOGGER.debug("ElevenLabs STT: filename=%s bytes=%d", filename, len(audio_bytes))
+    LOGGER.debug(
+        "ElevenLabs STT: filename=%s bytes=%s",
+        filename,
+        len(audio_bytes) if isinstance(audio_bytes, bytes) else "stream",
+    )
 
     client = _client()
 
@@ -0,0 +1,189 @@
+# pyright: basic
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from app.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Evict down to this fraction of the byte budget so we don't evict on every write
+_EVICT_TARGET_RATIO = 0.9
+
+
+def make_cache_key(
+    model: str,
+    messages: list[dict],
+    params: dict[str, Any],
+    prompt_version: str,
+) -> str:
+    """Content address for a completion request."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "params": params,
+            "prompt_version": prompt_version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """SQLite-backed completion cache with TTL and LRU size eviction."""
+
+    def __init__(self, path: str | Path, ttl_s: int, max_bytes: int):
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists completions (
+                    key text primary key,
+                    value text not null,
+                    size integer not null,
+                    prompt_version text not null default '',
+                    created_at real not null,
+                    accessed_at real not null
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_completions_accessed "
+                "on completions (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "select value, created_at from completions where key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            value, created_at = row
+            if self.ttl_s > 0 and now - created_at > self.ttl_s:
+                conn.execute("delete from completions where key = ?", (key,))
+                self._stats["misses"] += 1
+                return None
+            conn.execute(
+                "update completions set accessed_at = ? where key = ?", (now, key)
+            )
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: str, prompt_version: str = "") -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """
+                insert into completions
+                    (key, value, size, prompt_version, created_at, accessed_at)
+                values (?, ?, ?, ?, ?, ?)
+                on conflict (key) do update set
+                    value = excluded.value,
+                    size = excluded.size,
+                    prompt_version = excluded.prompt_version,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (key, value, size, prompt_version, now, now),
+            )
+            self._stats["stores"] += 1
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_s > 0:
+            expired = conn.execute(
+                "delete from completions where created_at < ?", (now - self.ttl_s,)
+            ).rowcount
+            self._stats["evictions"] += max(expired, 0)
+
+        total = conn.execute(
+            "select coalesce(sum(size), 0) from completions"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        victims: list[str] = []
+        for key, size in conn.execute(
+            "select key, size from completions order by accessed_at asc"
+        ):
+            if total <= target:
+                break
+            victims.append(key)
+            total -= size
+        conn.executemany(
+            "delete from completions where key = ?", [(k,) for k in victims]
+        )
+        self._stats["evictions"] += len(victims)
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("delete from completions")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute(
+                "select count(*), coalesce(sum(size), 0) from completions"
+            ).fetchone()
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": entries,
+                "bytes": total,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache_instance: CompletionCache | None = None
+
+
+def get_completion_cache() -> CompletionCache | None:
+    """Process-wide cache, or None when disabled or the store can't be opened."""
+    global _cache_instance
+
+    if not settings.llm_cache_enabled:
+        return None
+    if _cache_instance is not None:
+        return _cache_instance
+
+    try:
+        _cache_instance = CompletionCache(
+            settings.llm_cache_path,
+            ttl_s=settings.llm_cache_ttl_s,
+            max_bytes=settings.llm_cache_max_bytes,
+        )
+    except (OSError, sqlite3.Error):
+        LOGGER.warning("LLM completion cache unavailable", exc_info=True)
+        return None
+    return _cache_instance
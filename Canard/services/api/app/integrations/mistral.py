@@ -3,13 +3,19 @@ from __future__ import annotations
 
 import asyncio
 import json
+import logging
+import math
 import re
-from collections.abc import AsyncGenerator, Callable
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
 from typing import Any, TypeVar
 
+import httpx
 from mistralai import Mistral, SDKError
 
 from app.config import settings
+from app.integrations.llm_cache import get_completion_cache, make_cache_key
 
 try:
     import weave as _weave
@@ -18,6 +24,8 @@ except ImportError:
     def _op(fn):  # type: ignore[misc]
         return fn
 
+LOGGER = logging.getLogger(__name__)
+
 _client_instance: Mistral | None = None
 
 _RETRYABLE_STATUS_CODES = {429, 500, 503}
@@ -25,9 +33,123 @@ _RETRY_DELAYS = (0.5, 1.0, 2.0)
 _MAX_ATTEMPTS = 3
 _REQUEST_TIMEOUT_MS = 30_000
 
+# First-token latency samples kept per model for the hedge deadline
+_LATENCY_WINDOW = 200
+_MIN_LATENCY_SAMPLES = 20
+
 T = TypeVar("T")
 
 
+class CircuitOpenError(RuntimeError):
+    """Raised when a model's circuit breaker is rejecting requests."""
+
+
+class _CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe.
+
+    closed -> open after ``failure_threshold`` provider failures in a row;
+    open -> half_open once ``reset_s`` has elapsed, letting one request
+    through; the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_s:
+                return False
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def abandon_probe(self) -> None:
+        """The request was cancelled: it proved nothing, so let another probe."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                _metrics["breaker_opened"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+_breakers: dict[str, _CircuitBreaker] = {}
+_first_token_latencies: dict[str, deque[float]] = {}
+_metrics: dict[str, int] = {
+    "hedges_fired": 0,
+    "hedges_won": 0,
+    "breaker_opened": 0,
+    "breaker_rejections": 0,
+}
+
+
+def _breaker_for(model: str) -> _CircuitBreaker:
+    breaker = _breakers.get(model)
+    if breaker is None:
+        breaker = _CircuitBreaker(
+            failure_threshold=settings.mistral_breaker_failure_threshold,
+            reset_s=settings.mistral_breaker_reset_s,
+        )
+        _breakers[model] = breaker
+    return breaker
+
+
+def _record_first_token_latency(model: str, seconds: float) -> None:
+    samples = _first_token_latencies.setdefault(model, deque(maxlen=_LATENCY_WINDOW))
+    samples.append(seconds)
+
+
+def _p95_first_token_s(model: str) -> float | None:
+    samples = _first_token_latencies.get(model)
+    if not samples or len(samples) < _MIN_LATENCY_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    index = max(0, math.ceil(len(ordered) * 0.95) - 1)
+    return ordered[index]
+
+
+def _hedge_deadline_s(model: str) -> float:
+    """p95 first-token latency clamped to the configured window."""
+    p95 = _p95_first_token_s(model)
+    if p95 is None:
+        return settings.mistral_hedge_default_ms / 1000
+    low = settings.mistral_hedge_min_ms / 1000
+    high = settings.mistral_hedge_max_ms / 1000
+    return min(max(p95, low), high)
+
+
+def get_metrics() -> dict[str, Any]:
+    """Snapshot of hedging and circuit-breaker counters."""
+    return {
+        **_metrics,
+        "breakers": {model: b.state for model, b in _breakers.items()},
+        "first_token_p95_ms": {
+            model: round(p95 * 1000, 1)
+            for model in _first_token_latencies
+            if (p95 := _p95_first_token_s(model)) is not None
+        },
+    }
+
+
 def _get_client() -> Mistral:
     global _client_instance
 
@@ -60,16 +182,42 @@ def _extract_status_code(exc: Exception) -> int | None:
     return None
 
 
-async def _with_retry(operation: Callable[[], Any]) -> Any:
+def _is_provider_failure(exc: Exception) -> bool:
+    """Errors that say the provider is unhealthy, as opposed to a bad request."""
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    status_code = _extract_status_code(exc)
+    return status_code is not None and (
+        status_code in _RETRYABLE_STATUS_CODES or status_code >= 500
+    )
+
+
+async def _with_retry(
+    operation: Callable[[], Any], model: str | None = None
+) -> Any:
     last_error: Exception | None = None
+    breaker = _breaker_for(model) if model else None
 
     for attempt in range(1, _MAX_ATTEMPTS + 1):
+        if breaker is not None and not breaker.allow():
+            _metrics["breaker_rejections"] += 1
+            if last_error is not None:
+                raise last_error
+            raise CircuitOpenError(f"Circuit open for Mistral model {model}")
         try:
             result = operation()
             if asyncio.iscoroutine(result):
-                return await result
+                result = await result
+            if breaker is not None:
+                breaker.record_success()
             return result
         except Exception as exc:
+            if breaker is not None:
+                if _is_provider_failure(exc):
+                    breaker.record_failure()
+                else:
+                    # A bad request still proves the provider is answering
+                    breaker.record_success()
             status_code = _extract_status_code(exc)
             retryable = status_code in _RETRYABLE_STATUS_CODES
             if not retryable or attempt >= _MAX_ATTEMPTS:
@@ -77,6 +225,10 @@ async def _with_retry(operation: Callable[[], Any]) -> Any:
 
             last_error = exc
             await asyncio.sleep(_RETRY_DELAYS[attempt - 1])
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon_probe()
+            raise
 
     if last_error is not None:
         raise last_error
@@ -197,7 +349,9 @@ async def chat_completion(
         temperature=temperature,
         max_tokens=max_tokens,
     )
-    response = await _with_retry(lambda: client.chat.complete_async(**kwargs))
+    response = await _with_retry(
+        lambda: client.chat.complete_async(**kwargs), model=kwargs["model"]
+    )
     return _extract_response_text(response)
 
 
@@ -216,49 +370,216 @@ async def chat_completion_stream(
         max_tokens=max_tokens,
     )
 
-    stream = await _with_retry(lambda: client.chat.stream_async(**kwargs))
+    model_name = kwargs["model"]
+    iterator, first_chunk = await _open_hedged_stream(client, kwargs, model_name)
+    try:
+        if first_chunk is None:
+            return
+        yield first_chunk
+        async for chunk in iterator:
+            yield chunk
+    finally:
+        await _close_iterator(iterator)
+
+
+def _event_text(event: Any) -> str:
+    data = getattr(event, "data", None)
+    choices = getattr(data, "choices", None)
+    if not isinstance(choices, list) or not choices:
+        return ""
+
+    delta = getattr(choices[0], "delta", None)
+    content = getattr(delta, "content", "")
+    return _coerce_text_content(content)
 
+
+async def _iter_text(stream: Any) -> AsyncGenerator[str, None]:
     async for event in stream:
-        data = getattr(event, "data", None)
-        choices = getattr(data, "choices", None)
-        if not isinstance(choices, list) or not choices:
-            continue
-
-        delta = getattr(choices[0], "delta", None)
-        content = getattr(delta, "content", "")
-        chunk = _coerce_text_content(content)
+        chunk = _event_text(event)
         if chunk:
             yield chunk
 
 
+async def _close_iterator(iterator: Any) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception:
+        LOGGER.debug("Failed to close Mistral stream", exc_info=True)
+
+
+async def _start_stream(
+    client: Mistral, kwargs: dict[str, Any], model: str
+) -> tuple[AsyncIterator[str], str | None]:
+    """Open a stream and wait for its first text chunk."""
+    started = time.monotonic()
+    stream = await _with_retry(lambda: client.chat.stream_async(**kwargs), model=model)
+    iterator = _iter_text(stream)
+    try:
+        first_chunk = await iterator.__anext__()
+    except StopAsyncIteration:
+        return iterator, None
+    except BaseException:
+        await _close_iterator(iterator)
+        raise
+    _record_first_token_latency(model, time.monotonic() - started)
+    return iterator, first_chunk
+
+
+def _discard_stream(task: asyncio.Task) -> None:
+    """Cancel a losing stream, closing it if it already produced one."""
+
+    def _close(done: asyncio.Task) -> None:
+        if done.cancelled() or done.exception() is not None:
+            return
+        iterator, _ = done.result()
+        asyncio.ensure_future(_close_iterator(iterator))
+
+    task.cancel()
+    task.add_done_callback(_close)
+
+
+async def _open_hedged_stream(
+    client: Mistral, kwargs: dict[str, Any], model: str
+) -> tuple[AsyncIterator[str], str | None]:
+    """Race a hedge request against a primary stream that is slow to start.
+
+    When no first token arrives within the p95-based deadline a second
+    request is fired and whichever produces a token first is used.
+    """
+    primary = asyncio.create_task(_start_stream(client, kwargs, model))
+    if not settings.mistral_hedge_enabled:
+        return await primary
+
+    deadline = _hedge_deadline_s(model)
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=deadline)
+    except BaseException:
+        _discard_stream(primary)
+        raise
+    if done:
+        return primary.result()
+
+    _metrics["hedges_fired"] += 1
+    LOGGER.info(
+        "No first token from %s after %.0f ms, firing hedge request",
+        model,
+        deadline * 1000,
+    )
+    hedge = asyncio.create_task(_start_stream(client, kwargs, model))
+    pending: set[asyncio.Task] = {primary, hedge}
+    winner: asyncio.Task | None = None
+    last_error: BaseException | None = None
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                error = task.exception()
+                if error is not None:
+                    last_error = error
+                elif winner is None:
+                    winner = task
+                else:
+                    _discard_stream(task)
+    finally:
+        for task in pending:
+            _discard_stream(task)
+
+    if winner is None:
+        assert last_error is not None
+        raise last_error
+    if winner is hedge:
+        _metrics["hedges_won"] += 1
+    return winner.result()
+
+
+def _cached_json(key: str | None) -> dict | None:
+    cache = get_completion_cache() if key else None
+    if cache is None or key is None:
+        return None
+    try:
+        raw = cache.get(key)
+        return json.loads(raw) if raw is not None else None
+    except Exception:
+        LOGGER.warning("Completion cache read failed", exc_info=True)
+        return None
+
+
+def _store_json(key: str | None, value: dict, prompt_version: str | None) -> None:
+    cache = get_completion_cache() if key else None
+    if cache is None or key is None:
+        return
+    try:
+        cache.set(key, json.dumps(value), prompt_version=prompt_version or "")
+    except Exception:
+        LOGGER.warning("Completion cache write failed", exc_info=True)
+
+
 @_op
 async def chat_completion_json(
     messages: list[dict],
     model: str | None = None,
     temperature: float = 0.1,
     max_tokens: int | None = None,
+    prompt_version: str | None = None,
+    bypass_cache: bool = False,
 ) -> dict:
-    """Chat completion with JSON mode, falling back to plain completion + extraction."""
+    """Chat completion with JSON mode, falling back to plain completion + extraction.
+
+    Passing ``prompt_version`` opts the request into the completion cache;
+    ``bypass_cache`` skips the lookup but still refreshes the stored result.
+    """
+    kwargs = _chat_kwargs(
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},
+    )
+    cache_key: str | None = None
+    if prompt_version is not None:
+        cache_key = make_cache_key(
+            kwargs["model"],
+            messages,
+            {
+                "temperature": kwargs["temperature"],
+                "max_tokens": max_tokens,
+                "response_format": "json_object",
+            },
+            prompt_version,
+        )
+        if not bypass_cache:
+            cached = _cached_json(cache_key)
+            if cached is not None:
+                return cached
+
     try:
         client = _get_client()
-        kwargs = _chat_kwargs(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            response_format={"type": "json_object"},
+        response = await _with_retry(
+            lambda: client.chat.complete_async(**kwargs), model=kwargs["model"]
         )
-        response = await _with_retry(lambda: client.chat.complete_async(**kwargs))
-        return _extract_json_object(_extract_response_text(response))
+        result = _extract_json_object(_extract_response_text(response))
     except Exception:
         content = await chat_completion(
             messages=messages, model=model, temperature=temperature, max_tokens=max_tokens
         )
-        return _extract_json_object(content)
+        result = _extract_json_object(content)
+
+    _store_json(cache_key, result, prompt_version)
+    return result
+
+
+ANALYSIS_PROMPT_VERSION = "analysis-v1"
 
 
 @_op
-async def analyze_transcript(transcript: str, scenario_description: str) -> dict:
+async def analyze_transcript(
+    transcript: str, scenario_description: str, bypass_cache: bool = False
+) -> dict:
     analysis_prompt = (
         "You are a security-awareness call evaluator. Analyze the transcript and return "
         "JSON only with exact keys: risk_score (0-100 integer), flags (array of strings), "
@@ -276,21 +597,12 @@ async def analyze_transcript(transcript: str, scenario_description: str) -> dict
         },
     ]
 
-    parsed: dict[str, Any]
-    try:
-        client = _get_client()
-        kwargs = _chat_kwargs(
-            messages=messages,
-            model=None,
-            temperature=0.1,
-            max_tokens=None,
-            response_format={"type": "json_object"},
-        )
-        response = await _with_retry(lambda: client.chat.complete_async(**kwargs))
-        parsed = _extract_json_object(_extract_response_text(response))
-    except Exception:
-        content = await chat_completion(messages=messages, temperature=0.1)
-        parsed = _extract_json_object(content)
+    parsed = await chat_completion_json(
+        messages,
+        temperature=0.1,
+        prompt_version=ANALYSIS_PROMPT_VERSION,
+        bypass_cache=bypass_cache,
+    )
 
     risk_score = int(parsed.get("risk_score", 0))
     flags_raw = parsed.get("flags", [])
@@ -0,0 +1,174 @@
+# pyright: basic
+"""Resumable (TUS) uploads to Supabase Storage.
+
+supabase-py only uploads whole ``bytes`` bodies; this client sends an
+object in fixed-size chunks so large recordings never sit in memory.
+
+Refs:
+    https://supabase.com/docs/guides/storage/uploads/resumable-uploads
+    https://tus.io/protocols/resumable-upload
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+from pathlib import Path
+
+import httpx
+
+from app.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Supabase requires every chunk except the last to be exactly 6 MB
+TUS_CHUNK_BYTES = 6 * 1024 * 1024
+
+_TUS_VERSION = "1.0.0"
+_MAX_CHUNK_ATTEMPTS = 3
+
+
+class ResumableUploadError(RuntimeError):
+    pass
+
+
+def _encode_metadata(values: dict[str, str]) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode()).decode()}"
+        for key, value in values.items()
+    )
+
+
+class ResumableUpload:
+    """One TUS upload; feed it chunks of any size with :meth:`write`.
+
+    At most one 6 MB chunk is buffered. A failed PATCH is retried from
+    the offset the server reports, as the TUS protocol intends.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        bucket: str,
+        object_name: str,
+        length: int,
+        content_type: str = "application/octet-stream",
+        upsert: bool = True,
+    ):
+        self._client = client
+        self.bucket = bucket
+        self.object_name = object_name
+        self.length = length
+        self.content_type = content_type
+        self.upsert = upsert
+        self.offset = 0
+        self._location: str | None = None
+        self._buffer = bytearray()
+
+    @property
+    def _headers(self) -> dict[str, str]:
+        key = settings.supabase_service_role_key
+        return {
+            "authorization": f"Bearer {key}",
+            "apikey": key,
+            "tus-resumable": _TUS_VERSION,
+        }
+
+    async def create(self) -> None:
+        response = await self._client.post(
+            f"{settings.supabase_url.rstrip('/')}/storage/v1/upload/resumable",
+            headers={
+                **self._headers,
+                "upload-length": str(self.length),
+                "upload-metadata": _encode_metadata(
+                    {
+                        "bucketName": self.bucket,
+                        "objectName": self.object_name,
+                        "contentType": self.content_type,
+                    }
+                ),
+                "x-upsert": "true" if self.upsert else "false",
+            },
+        )
+        response.raise_for_status()
+        location = response.headers.get("location")
+        if not location:
+            raise ResumableUploadError("Storage did not return an upload location")
+        self._location = location
+
+    async def write(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        while len(self._buffer) >= TUS_CHUNK_BYTES:
+            await self._send(bytes(self._buffer[:TUS_CHUNK_BYTES]))
+            del self._buffer[:TUS_CHUNK_BYTES]
+
+    async def finish(self) -> None:
+        if self._buffer:
+            await self._send(bytes(self._buffer))
+            self._buffer.clear()
+        if self.offset != self.length:
+            raise ResumableUploadError(
+                f"Upload of {self.object_name} ended at {self.offset}/{self.length} bytes"
+            )
+
+    async def _send(self, body: bytes) -> None:
+        if self._location is None:
+            raise ResumableUploadError("create() must be called before writing")
+        start = self.offset
+        for attempt in range(1, _MAX_CHUNK_ATTEMPTS + 1):
+            try:
+                response = await self._client.patch(
+                    self._location,
+                    headers={
+                        **self._headers,
+                        "upload-offset": str(self.offset),
+                        "content-type": "application/offset+octet-stream",
+                    },
+                    content=body[self.offset - start :],
+                )
+                response.raise_for_status()
+                self.offset = int(response.headers.get("upload-offset", start + len(body)))
+                if self.offset >= start + len(body):
+                    return
+            except (httpx.TransportError, httpx.HTTPStatusError):
+                if attempt == _MAX_CHUNK_ATTEMPTS:
+                    raise
+                LOGGER.warning(
+                    "Chunk upload failed for %s at offset %d (attempt %d), resuming",
+                    self.object_name,
+                    self.offset,
+                    attempt,
+                    exc_info=True,
+                )
+                self.offset = await self._server_offset()
+                if not start <= self.offset <= start + len(body):
+                    raise ResumableUploadError(
+                        f"Server offset {self.offset} outside chunk at {start}"
+                    ) from None
+                if self.offset == start + len(body):
+                    return
+        raise ResumableUploadError(f"Chunk at {start} for {self.object_name} incomplete")
+
+    async def _server_offset(self) -> int:
+        assert self._location is not None
+        response = await self._client.head(self._location, headers=self._headers)
+        response.raise_for_status()
+        return int(response.headers["upload-offset"])
+
+
+async def upload_file_resumable(
+    client: httpx.AsyncClient,
+    bucket: str,
+    object_name: str,
+    path: Path,
+    content_type: str = "application/octet-stream",
+) -> None:
+    """Upload a local file in TUS chunks."""
+    upload = ResumableUpload(
+        client, bucket, object_name, path.stat().st_size, content_type=content_type
+    )
+    await upload.create()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(TUS_CHUNK_BYTES):
+            await upload.write(chunk)
+    await upload.finish()
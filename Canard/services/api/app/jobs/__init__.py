@@ -0,0 +1,12 @@
+# pyright: basic
+from __future__ import annotations
+
+from app.jobs.queue import Job, JobStatus, JobType, enqueue_job, get_job_queue
+
+__all__ = [
+    "Job",
+    "JobStatus",
+    "JobType",
+    "enqueue_job",
+    "get_job_queue",
+]
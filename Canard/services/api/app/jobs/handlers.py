@@ -0,0 +1,131 @@
+# pyright: basic
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from app.db import queries
+from app.jobs.queue import Job, JobType, enqueue_job
+
+LOGGER = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+# Higher runs first
+PRIORITY_EVALUATION = 20
+PRIORITY_AUDIT_REPORT = 10
+PRIORITY_RECORDING = 0
+
+
+def job_handler(job_type: JobType) -> Callable[[JobHandler], JobHandler]:
+    def register(fn: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type.value] = fn
+        return fn
+
+    return register
+
+
+@job_handler(JobType.EVALUATE_CALL)
+async def handle_evaluate_call(job: Job) -> None:
+    from app.services.audio_features import AudioFeatures
+    from app.services.evaluation import evaluate_call
+
+    call_id = job.payload["call_id"]
+    kwargs = {}
+    if job.payload.get("audio_features"):
+        kwargs["audio_features"] = AudioFeatures.from_dict(job.payload["audio_features"])
+    # Raises on a Mistral or write failure so the queue retries with backoff
+    result = await evaluate_call(
+        call_id, job.payload.get("recording_transcript"), raise_on_error=True, **kwargs
+    )
+    if not result:
+        LOGGER.info("Nothing to evaluate for call %s", call_id)
+        return
+    LOGGER.info(
+        "Post-call evaluation succeeded for call %s: risk_score=%s",
+        call_id,
+        result.get("risk_score"),
+    )
+    await asyncio.to_thread(
+        enqueue_job,
+        JobType.AUDIT_REPORT,
+        {"call_id": call_id},
+        priority=PRIORITY_AUDIT_REPORT,
+        idempotency_key=f"audit:{call_id}",
+    )
+
+
+@job_handler(JobType.AUDIT_REPORT)
+async def handle_audit_report(job: Job) -> None:
+    from app.services.post_call import deliver_audit_report
+
+    await deliver_audit_report(job.payload["call_id"])
+
+
+@job_handler(JobType.PROCESS_RECORDING)
+async def handle_process_recording(job: Job) -> None:
+    from app.services.post_call import store_recording, transcribe_recording
+    from app.twilio_voice.session import get_session
+
+    payload = job.payload
+    call_id = payload["call_id"]
+    download_url = payload["download_url"]
+    recording_sid = payload.get("recording_sid", "")
+
+    # One streamed pass: Twilio → recording cache + storage upload. Raises
+    # (and retries) on failure.
+    await store_recording(
+        call_id,
+        recording_sid,
+        download_url,
+        employee_id=payload.get("employee_id", ""),
+        recording_duration=payload.get("recording_duration", ""),
+    )
+
+    # Transcription is best-effort and reads the cached copy
+    session = get_session(call_id)
+    try:
+        recording_transcript = await transcribe_recording(download_url, recording_sid)
+    except Exception:
+        LOGGER.warning(
+            "ElevenLabs STT failed for RecordingUrl=%s, skipping",
+            download_url,
+            exc_info=True,
+        )
+        if session:
+            session.add_error(
+                "stt",
+                "recording_transcription_failed",
+                f"RecordingUrl: {download_url}",
+            )
+        return
+    LOGGER.info(
+        "ElevenLabs STT transcribed recording for call %s (%d chars)",
+        call_id,
+        len(recording_transcript),
+    )
+    if not recording_transcript:
+        return
+    # The call's session only exists when this runs in the API process
+    await asyncio.to_thread(
+        queries.update_call, call_id, {"transcript": recording_transcript}
+    )
+    if session:
+        session.recording_transcript = recording_transcript
+
+
+@job_handler(JobType.STORE_DUAL_RECORDING)
+async def handle_store_dual_recording(job: Job) -> None:
+    from app.services.post_call import store_dual_recording
+
+    await store_dual_recording(job.payload["call_id"])
+
+
+@job_handler(JobType.SEND_DIGEST)
+async def handle_send_digest(job: Job) -> None:
+    from app.services.digest import send_digests
+
+    await asyncio.to_thread(send_digests, job.payload["window"])
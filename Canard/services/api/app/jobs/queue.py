@@ -0,0 +1,384 @@
+# pyright: basic
+from __future__ import annotations
+
+import json
+import logging
+import random
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from app.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JobType(str, Enum):
+    EVALUATE_CALL = "evaluate_call"
+    AUDIT_REPORT = "audit_report"
+    PROCESS_RECORDING = "process_recording"
+    STORE_DUAL_RECORDING = "store_dual_recording"
+    SEND_DIGEST = "send_digest"
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    DEAD = "dead"
+
+
+@dataclass
+class Job:
+    id: str
+    type: str
+    payload: dict[str, Any] = field(default_factory=dict)
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 5
+    idempotency_key: str | None = None
+    status: str = JobStatus.QUEUED.value
+    run_at: float = 0.0
+    last_error: str | None = None
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter for the given (1-based) attempt count."""
+    base = settings.job_retry_base_s * (2 ** max(attempts - 1, 0))
+    delay = min(base, settings.job_retry_max_s)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobBackend(ABC):
+    """Storage for the job queue.
+
+    Implementations must make ``claim`` atomic across workers: a job is
+    handed to exactly one worker until its lease expires. ``renew``,
+    ``complete`` and ``fail`` only act on a job still leased to the
+    given worker, so a worker whose lease lapsed can't settle a job
+    another worker has claimed since.
+    """
+
+    lease_s: float
+
+    @abstractmethod
+    def enqueue(
+        self,
+        job_type: str,
+        payload: dict[str, Any],
+        *,
+        priority: int = 0,
+        idempotency_key: str | None = None,
+        max_attempts: int | None = None,
+        delay_s: float = 0.0,
+    ) -> str:
+        """Add a job and return its id; an existing id for a repeated key."""
+
+    @abstractmethod
+    def claim(self, worker_id: str, limit: int = 1) -> list[Job]:
+        """Lease up to ``limit`` due jobs, highest priority first."""
+
+    @abstractmethod
+    def renew(self, job_id: str, worker_id: str) -> bool:
+        """Extend a running job's lease; False once the worker lost it."""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str) -> bool: ...
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a failed attempt, scheduling a retry or marking it dead."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Job | None: ...
+
+    @abstractmethod
+    def counts(self) -> dict[str, int]: ...
+
+
+class SQLiteJobBackend(JobBackend):
+    """Single-host durable queue stored in a local SQLite file."""
+
+    def __init__(self, path: str | Path, lease_s: float = 300.0):
+        self.path = Path(path)
+        self.lease_s = lease_s
+        self._lock = Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists jobs (
+                    id text primary key,
+                    type text not null,
+                    payload text not null,
+                    priority integer not null default 0,
+                    status text not null,
+                    attempts integer not null default 0,
+                    max_attempts integer not null,
+                    idempotency_key text unique,
+                    run_at real not null,
+                    locked_by text,
+                    locked_until real,
+                    last_error text,
+                    created_at real not null,
+                    updated_at real not null
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_jobs_due "
+                "on jobs (status, priority desc, run_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            type=row["type"],
+            payload=json.loads(row["payload"]),
+            priority=row["priority"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            idempotency_key=row["idempotency_key"],
+            status=row["status"],
+            run_at=row["run_at"],
+            last_error=row["last_error"],
+        )
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: dict[str, Any],
+        *,
+        priority: int = 0,
+        idempotency_key: str | None = None,
+        max_attempts: int | None = None,
+        delay_s: float = 0.0,
+    ) -> str:
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        with self._lock, self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                if idempotency_key is not None:
+                    existing = conn.execute(
+                        "select id from jobs where idempotency_key = ?",
+                        (idempotency_key,),
+                    ).fetchone()
+                    if existing is not None:
+                        conn.execute("commit")
+                        return existing["id"]
+                conn.execute(
+                    """
+                    insert into jobs (id, type, payload, priority, status, attempts,
+                        max_attempts, idempotency_key, run_at, created_at, updated_at)
+                    values (?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        job_id,
+                        job_type.value if isinstance(job_type, Enum) else job_type,
+                        json.dumps(payload, default=str),
+                        priority,
+                        JobStatus.QUEUED.value,
+                        max_attempts or settings.job_max_attempts,
+                        idempotency_key,
+                        now + delay_s,
+                        now,
+                        now,
+                    ),
+                )
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+        return job_id
+
+    def claim(self, worker_id: str, limit: int = 1) -> list[Job]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                # Running jobs whose lease expired belong to a dead worker
+                rows = conn.execute(
+                    """
+                    select * from jobs
+                    where (status = ? and run_at <= ?)
+                       or (status = ? and locked_until < ?)
+                    order by priority desc, run_at asc
+                    limit ?
+                    """,
+                    (
+                        JobStatus.QUEUED.value,
+                        now,
+                        JobStatus.RUNNING.value,
+                        now,
+                        limit,
+                    ),
+                ).fetchall()
+                jobs: list[Job] = []
+                for row in rows:
+                    if (
+                        row["status"] == JobStatus.RUNNING.value
+                        and row["attempts"] >= row["max_attempts"]
+                    ):
+                        conn.execute(
+                            "update jobs set status = ?, last_error = ?, "
+                            "updated_at = ? where id = ?",
+                            (JobStatus.DEAD.value, "lease expired", now, row["id"]),
+                        )
+                        continue
+                    conn.execute(
+                        """
+                        update jobs set status = ?, attempts = attempts + 1,
+                            locked_by = ?, locked_until = ?, updated_at = ?
+                        where id = ?
+                        """,
+                        (
+                            JobStatus.RUNNING.value,
+                            worker_id,
+                            now + self.lease_s,
+                            now,
+                            row["id"],
+                        ),
+                    )
+                    job = self._row_to_job(row)
+                    job.attempts += 1
+                    job.status = JobStatus.RUNNING.value
+                    jobs.append(job)
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+        return jobs
+
+    def renew(self, job_id: str, worker_id: str) -> bool:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                """
+                update jobs set locked_until = ?, updated_at = ?
+                where id = ? and status = ? and locked_by = ?
+                """,
+                (now + self.lease_s, now, job_id, JobStatus.RUNNING.value, worker_id),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                """
+                update jobs set status = ?, locked_by = null, locked_until = null,
+                    last_error = null, updated_at = ?
+                where id = ? and status = ? and locked_by = ?
+                """,
+                (
+                    JobStatus.SUCCEEDED.value,
+                    time.time(),
+                    job_id,
+                    JobStatus.RUNNING.value,
+                    worker_id,
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                row = conn.execute(
+                    "select attempts, max_attempts from jobs "
+                    "where id = ? and status = ? and locked_by = ?",
+                    (job_id, JobStatus.RUNNING.value, worker_id),
+                ).fetchone()
+                if row is None:
+                    conn.execute("commit")
+                    return False
+                if row["attempts"] >= row["max_attempts"]:
+                    status, run_at = JobStatus.DEAD.value, now
+                else:
+                    status = JobStatus.QUEUED.value
+                    run_at = now + backoff_seconds(row["attempts"])
+                conn.execute(
+                    """
+                    update jobs set status = ?, run_at = ?, locked_by = null,
+                        locked_until = null, last_error = ?, updated_at = ?
+                    where id = ?
+                    """,
+                    (status, run_at, error[:2000], now, job_id),
+                )
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+        return True
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def counts(self) -> dict[str, int]:
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "select status, count(*) as n from jobs group by status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+_queue_instance: JobBackend | None = None
+
+
+def get_job_queue() -> JobBackend:
+    """Process-wide job queue for the configured backend."""
+    global _queue_instance
+
+    if _queue_instance is not None:
+        return _queue_instance
+
+    backend = settings.job_queue_backend
+    if backend == "sqlite":
+        _queue_instance = SQLiteJobBackend(
+            settings.job_queue_path, lease_s=settings.job_lease_s
+        )
+    else:
+        raise ValueError(f"Unsupported JOB_QUEUE_BACKEND: {backend}")
+    return _queue_instance
+
+
+def enqueue_job(
+    job_type: JobType | str,
+    payload: dict[str, Any],
+    *,
+    priority: int = 0,
+    idempotency_key: str | None = None,
+    delay_s: float = 0.0,
+) -> str:
+    type_name = job_type.value if isinstance(job_type, JobType) else job_type
+    job_id = get_job_queue().enqueue(
+        type_name,
+        payload,
+        priority=priority,
+        idempotency_key=idempotency_key,
+        delay_s=delay_s,
+    )
+    LOGGER.info("Enqueued %s job %s (key=%s)", type_name, job_id, idempotency_key)
+    return job_id
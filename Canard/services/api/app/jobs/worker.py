@@ -0,0 +1,152 @@
+# pyright: basic
+"""Job worker — runs queued post-call work.
+
+Run standalone with ``python -m app.jobs.worker`` (which also runs the
+email outbox sender); the API process also starts one in its lifespan
+when ``JOBS_INLINE_WORKER`` is enabled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+
+from app.config import settings
+from app.db import queries
+from app.jobs.handlers import JOB_HANDLERS
+from app.jobs.queue import Job, JobBackend, get_job_queue
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JobWorker:
+    def __init__(
+        self,
+        queue: JobBackend | None = None,
+        concurrency: int | None = None,
+        poll_interval_s: float | None = None,
+    ):
+        self.queue = queue or get_job_queue()
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.poll_interval_s = (
+            poll_interval_s
+            if poll_interval_s is not None
+            else settings.job_poll_interval_s
+        )
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def _keep_lease(self, job: Job, handler_task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_s / 3)
+            try:
+                held = await asyncio.to_thread(self.queue.renew, job.id, self.worker_id)
+            except Exception:
+                LOGGER.warning("Lease renewal failed for job %s", job.id, exc_info=True)
+                continue
+            if not held:
+                # Another worker reclaimed it; don't run the job twice
+                LOGGER.warning("Lost the lease on job %s (%s), stopping it", job.id, job.type)
+                handler_task.cancel()
+                return
+
+    async def _run_job(self, job: Job) -> None:
+        handler = JOB_HANDLERS.get(job.type)
+        if handler is None:
+            LOGGER.error("No handler for job type %s (job %s)", job.type, job.id)
+            await asyncio.to_thread(
+                self.queue.fail, job.id, self.worker_id, f"unknown job type {job.type}"
+            )
+            return
+        task = asyncio.current_task()
+        assert task is not None
+        heartbeat = asyncio.create_task(self._keep_lease(job, task))
+        try:
+            # Rows fetched by id are reused for the rest of the job
+            with queries.identity_scope():
+                await handler(job)
+        except asyncio.CancelledError:
+            # Leave the lease to expire so another worker picks it up
+            raise
+        except Exception as exc:
+            LOGGER.warning(
+                "Job %s (%s) failed on attempt %d/%d",
+                job.id,
+                job.type,
+                job.attempts,
+                job.max_attempts,
+                exc_info=True,
+            )
+            await asyncio.to_thread(
+                self.queue.fail, job.id, self.worker_id, f"{type(exc).__name__}: {exc}"
+            )
+            return
+        finally:
+            heartbeat.cancel()
+        await asyncio.to_thread(self.queue.complete, job.id, self.worker_id)
+
+    async def run_once(self) -> int:
+        """Claim and start as many jobs as there are free slots."""
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        jobs = await asyncio.to_thread(self.queue.claim, self.worker_id, free)
+        for job in jobs:
+            task = asyncio.create_task(self._run_job(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        return len(jobs)
+
+    async def run(self) -> None:
+        LOGGER.info(
+            "Job worker %s started (concurrency=%d)", self.worker_id, self.concurrency
+        )
+        try:
+            while not self._stop.is_set():
+                try:
+                    claimed = await self.run_once()
+                except Exception:
+                    LOGGER.warning("Job claim failed", exc_info=True)
+                    claimed = 0
+                if claimed:
+                    continue
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+        finally:
+            for task in self._running:
+                task.cancel()
+            LOGGER.info("Job worker %s stopped", self.worker_id)
+
+
+async def _main() -> None:
+    from app.services.outbox import OutboxSender
+
+    worker = JobWorker()
+    # Post-call jobs queue most email, so the worker process drains the outbox too
+    sender = OutboxSender()
+
+    def stop() -> None:
+        worker.stop()
+        sender.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+    await asyncio.gather(worker.run(), sender.run())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -2,11 +2,12 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 try:
@@ -19,6 +20,11 @@ except ImportError:
 LOGGER = logging.getLogger(__name__)
 
 from app.config import settings
+from app.db import queries
+from app.jobs.worker import JobWorker
+from app.services.campaign_scheduler import CampaignScheduler, get_campaign_scheduler
+from app.services.outbox import OutboxSender
+from app.services.process_pool import shutdown_pool
 from app.routes.analytics import router as analytics_router
 from app.routes.callers import router as callers_router
 from app.routes.calls import router as calls_router
@@ -43,7 +49,33 @@ async def lifespan(_app: FastAPI):
             LOGGER.info("W&B Weave initialized for project: %s", settings.wandb_project)
         except Exception as exc:
             LOGGER.warning("W&B Weave init failed (tracing disabled): %s", exc)
+
+    worker: JobWorker | None = None
+    worker_task: asyncio.Task | None = None
+    if settings.jobs_inline_worker:
+        worker = JobWorker()
+        worker_task = asyncio.create_task(worker.run())
+    sender: OutboxSender | None = None
+    sender_task: asyncio.Task | None = None
+    if settings.email_inline_sender:
+        sender = OutboxSender()
+        sender_task = asyncio.create_task(sender.run())
+    scheduler: CampaignScheduler | None = None
+    scheduler_task: asyncio.Task | None = None
+    if settings.campaign_scheduler_enabled:
+        scheduler = get_campaign_scheduler()
+        scheduler_task = asyncio.create_task(scheduler.run())
     yield
+    if scheduler is not None and scheduler_task is not None:
+        scheduler.stop()
+        await scheduler_task
+    if worker is not None and worker_task is not None:
+        worker.stop()
+        await worker_task
+    if sender is not None and sender_task is not None:
+        sender.stop()
+        await sender_task
+    shutdown_pool()
 
 
 app = FastAPI(
@@ -59,8 +91,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+
+@app.middleware("http")
+async def identity_map_per_request(request: Request, call_next):
+    # Rows fetched by id are reused for the rest of the request
+    with queries.identity_scope():
+        return await call_next(request)
+
+
 app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(calls_router)
@@ -48,6 +48,7 @@ class EmployeeListItem(CamelModel):
     last_test_date: str = ""
     is_active: bool = True
     boss_id: str | None = None
+    timezone: str = ""
 
 
 # ── Caller ──
@@ -97,6 +98,10 @@ class CampaignListItem(CamelModel):
     scheduled_at: str | None = None
     started_at: str | None = None
     completed_at: str | None = None
+    timezone: str = "UTC"
+    calling_window_start: str | None = None
+    calling_window_end: str | None = None
+    calling_days: list[int] | None = None
     total_calls: int = 0
     completed_calls: int = 0
     avg_risk_score: int = 0
@@ -121,6 +126,7 @@ class CallEnriched(CamelModel):
     flags: list[str] = Field(default_factory=list)
     ai_summary: str = ""
     recording_url: str = ""
+    dual_recording_url: str = ""
 
 
 # ── Dashboard aggregates ──
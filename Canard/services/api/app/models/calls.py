@@ -22,6 +22,7 @@ class Call(BaseModel):
     phone_from: str | None = None
     phone_to: str | None = None
     recording_url: str | None = None
+    dual_recording_url: str | None = None
     transcript: str | None = None
     transcript_json: list[dict[str, Any]] | None = None
     risk_score: int | None = None
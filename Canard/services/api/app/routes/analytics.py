@@ -4,9 +4,11 @@ from __future__ import annotations
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, Query
 
 from app.auth.middleware import OptionalUser
+from app.config import settings
 from app.db import queries
 from app.models.api import (
     AttackVectorSummary,
@@ -24,33 +26,18 @@ from app.models.api import (
     RepeatOffenderResponse,
     RiskTrendPoint,
 )
+from app.services.aggregation import GroupKey, aggregate
+from app.services.analytics_store import (
+    COMPLIANCE_FAILED,
+    POSITIVE_FLAGS,
+    format_ts,
+    get_analytics_store,
+    group_sum,
+    normalize_flags,
+)
+from app.services.response_cache import CachedRoute
 
-router = APIRouter(prefix="/api/analytics", tags=["analytics"])
-
-# Flags that indicate the employee responded correctly
-POSITIVE_FLAGS = {
-    "Proper Verification",
-    "Asked Questions",
-    "Immediate Rejection",
-    "Proper Protocol",
-    "Requested Verification",
-}
-
-
-def _normalize_flags(flags_raw) -> list[str]:
-    """Normalize flags from DB — handles both string lists and dict lists."""
-    if not flags_raw:
-        return []
-    result = []
-    for f in flags_raw:
-        if isinstance(f, str):
-            result.append(f)
-        elif isinstance(f, dict):
-            result.append(f.get("type", str(f)))
-        else:
-            result.append(str(f))
-    return result
-
+router = APIRouter(prefix="/api/analytics", tags=["analytics"], route_class=CachedRoute)
 
 def _resolve_org(user: dict | None, org_id: str | None) -> str:
     resolved = user["org_id"] if user else org_id
@@ -76,33 +63,30 @@ async def api_risk_trend(
     days: int = Query(30, le=90),
 ) -> list[RiskTrendPoint]:
     org_id = _resolve_org(user, org_id)
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
 
     today = datetime.now(timezone.utc).date()
     date_range = [(today - timedelta(days=i)) for i in range(days - 1, -1, -1)]
 
-    daily: dict[str, list[int]] = {d.isoformat(): [] for d in date_range}
-
-    for c in all_calls:
-        if c.get("status") != "completed":
-            continue
-        started = c.get("started_at") or c.get("created_at") or ""
-        if not started:
-            continue
-        day_key = started[:10]
-        if day_key in daily and c.get("risk_score") is not None:
-            daily[day_key].append(c["risk_score"])
+    if settings.analytics_source == "sql":
+        by_day = {row["day"]: row for row in queries.get_calls_by_day(org_id, date_range[0].isoformat())}
+        counts = [by_day.get(d.isoformat(), {}).get("completed_with_risk", 0) for d in date_range]
+        sums = [
+            float(by_day.get(d.isoformat(), {}).get("avg_risk") or 0) * counts[i]
+            for i, d in enumerate(date_range)
+        ]
+    else:
+        facts = await get_analytics_store().facts_async(org_id)
+        by_day = aggregate(facts, GroupKey.DAY, facts.completed, since=date_range[0], days=days)
+        counts, sums = by_day.scored, by_day.risk_sum
 
     items: list[RiskTrendPoint] = []
-    for d in date_range:
-        key = d.isoformat()
-        scores = daily[key]
-        avg = round(sum(scores) / len(scores), 1) if scores else 0
+    for i, d in enumerate(date_range):
+        avg = round(sums[i] / counts[i], 1) if counts[i] else 0
         items.append(
             RiskTrendPoint(
                 date=d.strftime("%b %d"),
                 avg_risk=avg,
-                call_count=len(scores),
+                call_count=int(counts[i]),
             )
         )
     return items
@@ -118,51 +102,45 @@ async def api_department_trends(
     days: int = Query(30, le=90),
 ) -> list[DepartmentTrendPoint]:
     org_id = _resolve_org(user, org_id)
-    employees = queries.list_employees(org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
-
-    emp_dept: dict[str, str] = {
-        e["id"]: e.get("department", "Other") for e in employees
-    }
 
     today = datetime.now(timezone.utc).date()
     date_range = [(today - timedelta(days=i)) for i in range(days - 1, -1, -1)]
 
-    # {date_iso: {department: {total, failed}}}
-    buckets: dict[str, dict[str, dict[str, int]]] = {
-        d.isoformat(): defaultdict(lambda: {"total": 0, "failed": 0})
-        for d in date_range
-    }
-
-    for c in all_calls:
-        if c.get("status") != "completed":
-            continue
-        started = c.get("started_at") or c.get("created_at") or ""
-        if not started:
-            continue
-        day_key = started[:10]
-        if day_key not in buckets:
-            continue
-        dept = emp_dept.get(c.get("employee_id", ""), "Other")
-        buckets[day_key][dept]["total"] += 1
-        if c.get("employee_compliance") == "failed":
-            buckets[day_key][dept]["failed"] += 1
+    if settings.analytics_source == "sql":
+        labels = {d.isoformat(): d.strftime("%b %d") for d in date_range}
+        return [
+            DepartmentTrendPoint(
+                date=labels[row["day"]],
+                department=row["department"],
+                total_calls=row["total_calls"],
+                failed_calls=row["failed_calls"],
+                failure_rate=round(row["failed_calls"] / row["total_calls"] * 100, 1),
+            )
+            for row in queries.get_department_trends(org_id, date_range[0].isoformat())
+            if row["day"] in labels
+        ]
+
+    facts = await get_analytics_store().facts_async(org_id)
+    cells = aggregate(
+        facts,
+        (GroupKey.DAY, GroupKey.DEPARTMENT),
+        facts.completed,
+        since=date_range[0],
+        days=days,
+    )
 
     items: list[DepartmentTrendPoint] = []
-    for d in date_range:
-        key = d.isoformat()
-        label = d.strftime("%b %d")
-        for dept, stats in buckets[key].items():
-            rate = round(stats["failed"] / stats["total"] * 100, 1) if stats["total"] > 0 else 0
-            items.append(
-                DepartmentTrendPoint(
-                    date=label,
-                    department=dept,
-                    total_calls=stats["total"],
-                    failed_calls=stats["failed"],
-                    failure_rate=rate,
-                )
+    for g in cells.groups():
+        d, dept = cells.label(g)
+        items.append(
+            DepartmentTrendPoint(
+                date=d.strftime("%b %d"),
+                department=dept,
+                total_calls=cells.count(g),
+                failed_calls=int(cells.failed[g]),
+                failure_rate=cells.failure_rate(g),
             )
+        )
     return items
 
 
@@ -176,54 +154,40 @@ async def api_repeat_offenders(
     min_failures: int = Query(2, ge=1),
 ) -> list[RepeatOffenderResponse]:
     org_id = _resolve_org(user, org_id)
-    employees = queries.list_employees(org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
+    org = await get_analytics_store().org_async(org_id)
+    facts = org.snapshot()
 
-    emp_lookup: dict[str, dict] = {e["id"]: e for e in employees}
+    emp_lookup: dict[str, dict] = {e["id"]: e for e in org.employees}
 
-    # Group completed calls by employee
-    by_employee: dict[str, list[dict]] = defaultdict(list)
-    for c in all_calls:
-        if c.get("status") != "completed":
-            continue
-        eid = c.get("employee_id", "")
-        if eid:
-            by_employee[eid].append(c)
+    # Completed calls with an employee, chronological, grouped by employee
+    rows = np.flatnonzero(facts.completed & (facts.employee >= 0))
+    rows = rows[np.argsort(np.nan_to_num(facts.ts[rows], nan=-np.inf), kind="stable")]
+    rows = rows[np.argsort(facts.employee[rows], kind="stable")]
+    by_emp = aggregate(facts, GroupKey.EMPLOYEE, rows)
+    by_employee = np.split(rows, np.cumsum(by_emp.total)[:-1])
+    failed_rows = rows[facts.compliance[rows] == COMPLIANCE_FAILED]
+    failed_flags = aggregate(facts, GroupKey.EMPLOYEE, failed_rows, flags=True)
 
     items: list[RepeatOffenderResponse] = []
-    for eid, calls in by_employee.items():
-        failed = [c for c in calls if c.get("employee_compliance") == "failed"]
-        if len(failed) < min_failures:
-            continue
-
+    for e in np.flatnonzero(by_emp.failed >= min_failures):
+        calls = by_employee[e]
+        failed = calls[facts.compliance[calls] == COMPLIANCE_FAILED]
+        eid = by_emp.label(e)
         emp = emp_lookup.get(eid, {})
-        # Collect all flags across failures
-        all_flags: list[str] = []
-        for c in failed:
-            all_flags.extend(_normalize_flags(c.get("flags")))
-        common = [f for f, _ in Counter(all_flags).most_common(3)]
-
-        # Chronological risk scores for sparkline
-        sorted_calls = sorted(calls, key=lambda x: x.get("started_at") or x.get("created_at") or "")
-        risk_scores = [c.get("risk_score", 0) or 0 for c in sorted_calls]
-
-        most_recent = max(
-            (c.get("started_at") or c.get("created_at") or "" for c in failed),
-            default="",
-        )
 
-        total = len(calls)
+        common = [f for f, _ in failed_flags.flags(e).most_common(3)]
         items.append(
             RepeatOffenderResponse(
                 employee_id=eid,
                 employee_name=emp.get("full_name", "Unknown"),
                 department=emp.get("department", "Unknown"),
-                total_tests=total,
-                failed_tests=len(failed),
-                failure_rate=round(len(failed) / total * 100, 1) if total > 0 else 0,
-                most_recent_failure=most_recent[:10] if most_recent else "",
+                total_tests=by_emp.count(e),
+                failed_tests=int(by_emp.failed[e]),
+                failure_rate=by_emp.failure_rate(e),
+                most_recent_failure=format_ts(float(facts.ts[failed[-1]]))[:10],
                 common_flags=common,
-                risk_scores=risk_scores,
+                # Chronological risk scores for sparkline
+                risk_scores=facts.risk[calls].tolist(),
             )
         )
 
@@ -240,42 +204,30 @@ async def api_campaign_effectiveness(
     org_id: str | None = Query(None),
 ) -> CampaignEffectivenessResponse:
     org_id = _resolve_org(user, org_id)
-    campaigns = queries.list_campaigns(org_id)
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
+    org = await get_analytics_store().org_async(org_id)
+    facts = org.snapshot()
 
-    camp_lookup: dict[str, dict] = {c["id"]: c for c in campaigns}
+    camp_lookup: dict[str, dict] = {c["id"]: c for c in org.campaigns}
 
-    # Group calls by campaign
-    by_campaign: dict[str, list[dict]] = defaultdict(list)
-    for c in all_calls:
-        if c.get("status") != "completed":
-            continue
-        cid = c.get("campaign_id", "")
-        if cid:
-            by_campaign[cid].append(c)
+    by_campaign = aggregate(facts, GroupKey.CAMPAIGN, facts.completed)
 
     campaign_items: list[CampaignEffectivenessItem] = []
-    for cid, calls in by_campaign.items():
-        camp = camp_lookup.get(cid, {})
-        total = len(calls)
-        failed = sum(1 for c in calls if c.get("employee_compliance") == "failed")
-        passed = sum(1 for c in calls if c.get("employee_compliance") == "passed")
-        partial = sum(1 for c in calls if c.get("employee_compliance") == "partial")
-        scores = [c.get("risk_score", 0) or 0 for c in calls]
-        durations = [c.get("duration_seconds", 0) or 0 for c in calls]
-
+    for c in by_campaign.groups():
+        cid = by_campaign.label(c)
+        info = camp_lookup.get(cid, {})
+        total = by_campaign.count(c)
         campaign_items.append(
             CampaignEffectivenessItem(
                 campaign_id=cid,
-                campaign_name=camp.get("name", "Unknown"),
-                attack_vector=camp.get("attack_vector", "Unknown"),
+                campaign_name=info.get("name", "Unknown"),
+                attack_vector=info.get("attack_vector", "Unknown"),
                 total_calls=total,
-                failed_calls=failed,
-                passed_calls=passed,
-                partial_calls=partial,
-                failure_rate=round(failed / total * 100, 1) if total > 0 else 0,
-                avg_risk_score=round(sum(scores) / len(scores), 1) if scores else 0,
-                avg_duration_seconds=round(sum(durations) / len(durations), 1) if durations else 0,
+                failed_calls=int(by_campaign.failed[c]),
+                passed_calls=int(by_campaign.passed[c]),
+                partial_calls=int(by_campaign.partial[c]),
+                failure_rate=by_campaign.failure_rate(c),
+                avg_risk_score=by_campaign.avg_risk(c),
+                avg_duration_seconds=round(by_campaign.duration_sum[c] / total, 1),
             )
         )
 
@@ -322,24 +274,31 @@ async def api_flag_frequency(
     campaign_id: str | None = Query(None),
 ) -> list[FlagFrequencyResponse]:
     org_id = _resolve_org(user, org_id)
-    all_calls = queries.list_calls(
-        org_id=org_id,
-        campaign_id=campaign_id,
-        limit=10000,
-    )
 
-    completed = [c for c in all_calls if c.get("status") == "completed"]
-    total_completed = len(completed)
+    if settings.analytics_source == "sql":
+        return [
+            FlagFrequencyResponse(
+                flag=row["flag"],
+                count=row["call_count"],
+                percentage=round(row["call_count"] / row["completed_calls"] * 100, 1),
+                is_positive=row["flag"] in POSITIVE_FLAGS,
+            )
+            for row in queries.get_flag_frequency(org_id, campaign_id)
+        ]
+
+    facts = await get_analytics_store().facts_async(org_id)
+    completed = facts.completed
+    if campaign_id:
+        if campaign_id not in facts.campaign_ids:
+            return []
+        completed = completed & (facts.campaign == facts.campaign_ids.index(campaign_id))
+    rows = np.flatnonzero(completed)
+    total_completed = rows.size
     if total_completed == 0:
         return []
 
-    flag_counts: Counter[str] = Counter()
-    for c in completed:
-        for flag in _normalize_flags(c.get("flags")):
-            flag_counts[flag] += 1
-
     items: list[FlagFrequencyResponse] = []
-    for flag, count in flag_counts.most_common():
+    for flag, count in facts.flag_counts(rows).most_common():
         items.append(
             FlagFrequencyResponse(
                 flag=flag,
@@ -360,41 +319,39 @@ async def api_attack_heatmap(
     org_id: str | None = Query(None),
 ) -> list[HeatmapCellResponse]:
     org_id = _resolve_org(user, org_id)
-    employees = queries.list_employees(org_id, active_only=False)
-    campaigns = queries.list_campaigns(org_id)
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
 
-    emp_dept: dict[str, str] = {e["id"]: e.get("department", "Other") for e in employees}
-    camp_vector: dict[str, str] = {c["id"]: c.get("attack_vector", "Unknown") for c in campaigns}
+    if settings.analytics_source == "sql":
+        return [
+            HeatmapCellResponse(
+                attack_vector=row["attack_vector"],
+                department=row["department"],
+                total_calls=row["total_calls"],
+                failure_rate=round(row["failed_calls"] / row["total_calls"] * 100, 1),
+                avg_risk_score=round(float(row["avg_risk"] or 0), 1),
+            )
+            for row in queries.get_attack_heatmap(org_id)
+        ]
 
-    # {(vector, dept): {total, failed, scores}}
-    cells: dict[tuple[str, str], dict] = defaultdict(
-        lambda: {"total": 0, "failed": 0, "scores": []}
-    )
+    org = await get_analytics_store().org_async(org_id)
+    facts = org.snapshot()
 
-    for c in all_calls:
-        if c.get("status") != "completed":
-            continue
-        vector = camp_vector.get(c.get("campaign_id", ""), "Unknown")
-        dept = emp_dept.get(c.get("employee_id", ""), "Other")
-        cell = cells[(vector, dept)]
-        cell["total"] += 1
-        if c.get("employee_compliance") == "failed":
-            cell["failed"] += 1
-        cell["scores"].append(c.get("risk_score", 0) or 0)
+    cells = aggregate(
+        facts,
+        (GroupKey.ATTACK_VECTOR, GroupKey.DEPARTMENT),
+        facts.completed,
+        campaigns=org.campaigns,
+    )
 
     items: list[HeatmapCellResponse] = []
-    for (vector, dept), stats in cells.items():
-        total = stats["total"]
+    for g in cells.groups():
+        vector, dept = cells.label(g)
         items.append(
             HeatmapCellResponse(
                 attack_vector=vector,
                 department=dept,
-                total_calls=total,
-                failure_rate=round(stats["failed"] / total * 100, 1) if total > 0 else 0,
-                avg_risk_score=round(sum(stats["scores"]) / len(stats["scores"]), 1)
-                if stats["scores"]
-                else 0,
+                total_calls=cells.count(g),
+                failure_rate=cells.failure_rate(g),
+                avg_risk_score=cells.avg_risk(g),
             )
         )
     return items
@@ -415,12 +372,12 @@ async def api_employee_detail(
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    all_calls = queries.list_calls(org_id=org_id, employee_id=employee_id, limit=10000)
-    campaigns = queries.list_campaigns(org_id)
-    callers = queries.list_callers(org_id, active_only=False)
-
-    camp_lookup: dict[str, dict] = {c["id"]: c for c in campaigns}
-    caller_lookup: dict[str, dict] = {c["id"]: c for c in callers}
+    all_calls = queries.list_calls(
+        org_id=org_id,
+        employee_id=employee_id,
+        limit=10000,
+        columns=f"*,{queries.CALL_NAME_EMBEDS}",
+    )
 
     completed = [c for c in all_calls if c.get("status") == "completed"]
 
@@ -444,7 +401,7 @@ async def api_employee_detail(
     # Flag summary
     flag_counts: Counter[str] = Counter()
     for c in completed:
-        for flag in _normalize_flags(c.get("flags")):
+        for flag in normalize_flags(c.get("flags")):
             flag_counts[flag] += 1
     flag_summary = [
         FlagFrequencyResponse(
@@ -459,8 +416,8 @@ async def api_employee_detail(
     # Enrich call history
     call_items: list[EmployeeCallHistoryItem] = []
     for c in sorted_calls:
-        camp = camp_lookup.get(c.get("campaign_id", ""), {})
-        caller = caller_lookup.get(c.get("caller_id", ""), {})
+        camp = queries.embedded(c, "campaign")
+        caller = queries.embedded(c, "caller")
         dur_s = c.get("duration_seconds")
         call_items.append(
             EmployeeCallHistoryItem(
@@ -512,61 +469,97 @@ async def api_dept_flag_pivot(
     flag_type: str | None = Query(None),
 ) -> DeptFlagPivotResponse:
     org_id = _resolve_org(user, org_id)
-    employees = queries.list_employees(org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
 
-    emp_lookup: dict[str, dict] = {e["id"]: e for e in employees}
-    completed = [c for c in all_calls if c.get("status") == "completed"]
-
-    # Dept call totals
-    dept_call_totals: Counter[str] = Counter()
-    for c in completed:
-        dept = emp_lookup.get(c.get("employee_id", ""), {}).get("department", "Other")
-        dept_call_totals[dept] += 1
+    if settings.analytics_source == "sql":
+        return _dept_flag_pivot_from_sql(org_id, flag_type)
+
+    facts = await get_analytics_store().facts_async(org_id)
+    rows = np.flatnonzero(facts.completed)
+    dept = facts.department[rows]
+    by_dept = aggregate(facts, GroupKey.DEPARTMENT, rows, flags=True)
+    n_dept = by_dept.size
+    dept_totals = by_dept.total
+
+    positive = np.array([f in POSITIVE_FLAGS for f in facts.flag_names], dtype=bool)
+    keep = np.ones(len(facts.flag_names), dtype=bool)
+    if flag_type == "positive":
+        keep = positive
+    elif flag_type == "negative":
+        keep = ~positive
+    counts = by_dept.flag_counts * keep
+    matrix = facts.flag_matrix(rows) & keep
+
+    # Distinct employees per (dept, flag) via (dept, employee) pairs
+    pairs, pair_of_row = np.unique(
+        np.stack([dept, facts.employee[rows]]), axis=1, return_inverse=True
+    )
+    pair_has_flag = group_sum(pair_of_row.ravel(), pairs.shape[1], matrix) > 0
+    affected = group_sum(pairs[0], n_dept, pair_has_flag)
+    flag_totals = counts.sum(axis=0)
 
-    # (dept, flag) -> {count, employees}
-    pivot: dict[tuple[str, str], dict] = defaultdict(lambda: {"count": 0, "employees": set()})
-    flag_totals: Counter[str] = Counter()
+    # Sorted lists for axis labels
+    dept_order = [int(d) for d in np.argsort(-dept_totals, kind="stable") if dept_totals[d]]
+    flag_order = [int(f) for f in np.argsort(-flag_totals, kind="stable") if flag_totals[f]]
 
-    for c in completed:
-        eid = c.get("employee_id", "")
-        dept = emp_lookup.get(eid, {}).get("department", "Other")
-        for flag in _normalize_flags(c.get("flags")):
-            is_pos = flag in POSITIVE_FLAGS
-            if flag_type == "positive" and not is_pos:
-                continue
-            if flag_type == "negative" and is_pos:
+    cells: list[DeptFlagPivotCell] = []
+    for d in dept_order:
+        for f in flag_order:
+            if not counts[d, f]:
                 continue
-            key = (dept, flag)
-            pivot[key]["count"] += 1
-            pivot[key]["employees"].add(eid)
-            flag_totals[flag] += 1
+            cells.append(
+                DeptFlagPivotCell(
+                    department=facts.departments[d],
+                    flag=facts.flag_names[f],
+                    count=int(counts[d, f]),
+                    total_dept_calls=int(dept_totals[d]),
+                    percentage=round(counts[d, f] / dept_totals[d] * 100, 1),
+                    affected_employees=int(affected[d, f]),
+                    is_positive=bool(positive[f]),
+                )
+            )
+
+    flags = [facts.flag_names[f] for f in flag_order]
+    return DeptFlagPivotResponse(
+        cells=cells,
+        departments=[facts.departments[d] for d in dept_order],
+        flags=flags,
+        positive_flags=[f for f in flags if f in POSITIVE_FLAGS],
+        department_totals={facts.departments[d]: int(dept_totals[d]) for d in dept_order},
+        flag_totals={facts.flag_names[f]: int(flag_totals[f]) for f in flag_order},
+    )
+
 
+def _dept_flag_pivot_from_sql(org_id: str, flag_type: str | None) -> DeptFlagPivotResponse:
+    dept_call_totals: Counter[str] = Counter(
+        {row["department"]: row["total_calls"] for row in queries.get_department_totals(org_id)}
+    )
+    flag_totals: Counter[str] = Counter()
     cells: list[DeptFlagPivotCell] = []
-    for (dept, flag), data in pivot.items():
-        dept_total = dept_call_totals.get(dept, 0)
+    for row in queries.get_dept_flag_pivot(org_id):
+        flag = row["flag"]
+        is_pos = flag in POSITIVE_FLAGS
+        if (flag_type == "positive" and not is_pos) or (flag_type == "negative" and is_pos):
+            continue
+        dept_total = dept_call_totals.get(row["department"], 0)
         cells.append(
             DeptFlagPivotCell(
-                department=dept,
+                department=row["department"],
                 flag=flag,
-                count=data["count"],
+                count=row["call_count"],
                 total_dept_calls=dept_total,
-                percentage=round(data["count"] / dept_total * 100, 1) if dept_total > 0 else 0,
-                affected_employees=len(data["employees"]),
-                is_positive=flag in POSITIVE_FLAGS,
+                percentage=round(row["call_count"] / dept_total * 100, 1) if dept_total > 0 else 0,
+                affected_employees=row["affected_employees"],
+                is_positive=is_pos,
             )
         )
+        flag_totals[flag] += row["call_count"]
 
-    # Sorted lists for axis labels
-    departments = [d for d, _ in dept_call_totals.most_common()]
     flags = [f for f, _ in flag_totals.most_common()]
-    pos_flags = [f for f in flags if f in POSITIVE_FLAGS]
-
     return DeptFlagPivotResponse(
         cells=cells,
-        departments=departments,
+        departments=[d for d, _ in dept_call_totals.most_common()],
         flags=flags,
-        positive_flags=pos_flags,
+        positive_flags=[f for f in flags if f in POSITIVE_FLAGS],
         department_totals=dict(dept_call_totals),
         flag_totals=dict(flag_totals),
     )
@@ -581,115 +574,41 @@ async def api_hierarchy_risk(
     user: OptionalUser,
     org_id: str | None = Query(None),
 ) -> HierarchyRiskResponse:
-    org_id = _resolve_org(user, org_id)
+    _resolve_org(user, org_id)
 
-    emp = queries.get_employee(employee_id)
-    if not emp:
+    # One read of the precomputed closure + rollups, shallowest first
+    rows = queries.get_team_rollups(employee_id)
+    if not rows or rows[0].get("depth") != 0:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    subordinates = queries.get_subordinates(employee_id)
-    all_sub_ids = {s["id"] for s in subordinates}
-
-    # Fetch all org calls in one go
-    all_calls = queries.list_calls(org_id=org_id, limit=10000)
-    completed = [c for c in all_calls if c.get("status") == "completed"]
-
-    # Group calls by employee
-    calls_by_emp: dict[str, list[dict]] = defaultdict(list)
-    for c in completed:
-        eid = c.get("employee_id", "")
-        if eid:
-            calls_by_emp[eid].append(c)
-
-    def _personal_metrics(eid: str) -> tuple[float, float, int, int]:
-        calls = calls_by_emp.get(eid, [])
-        total = len(calls)
-        failed = sum(1 for c in calls if c.get("employee_compliance") == "failed")
-        scores = [c.get("risk_score", 0) or 0 for c in calls]
-        avg = round(sum(scores) / len(scores), 1) if scores else 0
-        rate = round(failed / total * 100, 1) if total > 0 else 0
-        return avg, rate, total, failed
-
-    # Build nodes for each subordinate
     nodes: dict[str, OrgTreeNode] = {}
-    for s in subordinates:
-        sid = s["id"]
-        avg, rate, total, failed = _personal_metrics(sid)
-        nodes[sid] = OrgTreeNode(
-            id=sid,
-            full_name=s.get("full_name", ""),
-            department=s.get("department", ""),
-            job_title=s.get("job_title", ""),
-            risk_level=s.get("risk_level", "unknown"),
-            personal_risk_score=avg,
-            personal_failure_rate=rate,
+    for r in rows:
+        total, failed = r.get("personal_total") or 0, r.get("personal_failed") or 0
+        t_total, t_failed = r.get("team_total") or 0, r.get("team_failed") or 0
+        nodes[r["id"]] = OrgTreeNode(
+            id=r["id"],
+            full_name=r.get("full_name") or "",
+            department=r.get("department") or "",
+            job_title=r.get("job_title") or "",
+            risk_level=r.get("risk_level") or "unknown",
+            personal_risk_score=round((r.get("personal_risk_sum") or 0) / total, 1) if total else 0,
+            personal_failure_rate=round(failed / total * 100, 1) if total else 0,
             personal_total_tests=total,
             personal_failed_tests=failed,
-            depth=s.get("depth", 1),
+            team_risk_score=round((r.get("team_risk_sum") or 0) / t_total, 1) if t_total else 0,
+            team_failure_rate=round(t_failed / t_total * 100, 1) if t_total else 0,
+            team_total_tests=t_total,
+            team_failed_tests=t_failed,
+            depth=r.get("depth") or 0,
         )
 
     # Wire children to parents
-    for s in subordinates:
-        sid = s["id"]
-        boss = s.get("boss_id")
-        if boss and boss in nodes:
-            nodes[boss].children.append(nodes[sid])
-        # If boss == employee_id, it's a direct report (handled below)
-
-    # Roll up team metrics bottom-up (process deepest first)
-    max_depth = max((n.depth for n in nodes.values()), default=0)
-    for d in range(max_depth, 0, -1):
-        for node in nodes.values():
-            if node.depth != d:
-                continue
-            # Team = personal + all children's team
-            t_total = node.personal_total_tests
-            t_failed = node.personal_failed_tests
-            t_risk_weighted = node.personal_risk_score * max(node.personal_total_tests, 1)
-            t_weight = max(node.personal_total_tests, 1)
-            for child in node.children:
-                t_total += child.team_total_tests
-                t_failed += child.team_failed_tests
-                t_risk_weighted += child.team_risk_score * max(child.team_total_tests, 1)
-                t_weight += max(child.team_total_tests, 1)
-            node.team_total_tests = t_total
-            node.team_failed_tests = t_failed
-            node.team_risk_score = round(t_risk_weighted / t_weight, 1) if t_weight > 0 else 0
-            node.team_failure_rate = round(t_failed / t_total * 100, 1) if t_total > 0 else 0
-
-    # Build root node for the manager
-    m_avg, m_rate, m_total, m_failed = _personal_metrics(employee_id)
-    direct_reports = [nodes[s["id"]] for s in subordinates if s.get("boss_id") == employee_id]
-    direct_reports.sort(key=lambda n: n.team_risk_score, reverse=True)
-
-    # Roll up team for the root
-    rt_total = m_total
-    rt_failed = m_failed
-    rt_risk_w = m_avg * max(m_total, 1)
-    rt_weight = max(m_total, 1)
-    for child in direct_reports:
-        rt_total += child.team_total_tests
-        rt_failed += child.team_failed_tests
-        rt_risk_w += child.team_risk_score * max(child.team_total_tests, 1)
-        rt_weight += max(child.team_total_tests, 1)
-
-    root = OrgTreeNode(
-        id=employee_id,
-        full_name=emp.get("full_name", ""),
-        department=emp.get("department", ""),
-        job_title=emp.get("job_title", ""),
-        risk_level=emp.get("risk_level", "unknown"),
-        personal_risk_score=m_avg,
-        personal_failure_rate=m_rate,
-        personal_total_tests=m_total,
-        personal_failed_tests=m_failed,
-        team_risk_score=round(rt_risk_w / rt_weight, 1) if rt_weight > 0 else 0,
-        team_failure_rate=round(rt_failed / rt_total * 100, 1) if rt_total > 0 else 0,
-        team_total_tests=rt_total,
-        team_failed_tests=rt_failed,
-        depth=0,
-        children=direct_reports,
-    )
+    root = nodes[rows[0]["id"]]
+    for r in rows[1:]:
+        boss = r.get("boss_id")
+        if boss in nodes:
+            nodes[boss].children.append(nodes[r["id"]])
+    root.children.sort(key=lambda n: n.team_risk_score, reverse=True)
 
     # Highest-risk path: greedy walk to child with highest team_risk_score
     risk_path = [root.id]
@@ -700,13 +619,13 @@ async def api_hierarchy_risk(
         current = worst
 
     # Top 3 risk hotspots (by personal risk, excluding root)
-    all_nodes = list(nodes.values())
+    all_nodes = [nodes[r["id"]] for r in rows[1:]]
     all_nodes.sort(key=lambda n: n.personal_risk_score, reverse=True)
     hotspots = all_nodes[:3]
 
     return HierarchyRiskResponse(
         manager=root,
-        total_downstream_employees=len(all_sub_ids),
+        total_downstream_employees=len(all_nodes),
         highest_risk_path=risk_path,
         risk_hotspots=hotspots,
     )
@@ -74,24 +74,16 @@ async def api_list_callers(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
+    # Counters are kept on the rows by migrations/015_usage_counters.sql
     callers = queries.list_callers(resolved_org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-
-    # Build per-caller aggregates
-    caller_calls: dict[str, list[dict]] = {}
-    for c in all_calls:
-        cid = c.get("caller_id")
-        if cid:
-            caller_calls.setdefault(cid, []).append(c)
 
     items: list[CallerListItem] = []
     for caller in callers:
         cid = caller["id"]
-        calls = caller_calls.get(cid, [])
-        completed = [c for c in calls if c.get("status") == "completed"]
-        failed = [c for c in completed if c.get("employee_compliance") == "failed"]
+        completed = caller.get("completed_calls") or 0
+        failed = caller.get("failed_calls") or 0
         is_active_value = caller.get("is_active")
-        success_rate = round(len(failed) / len(completed) * 100) if completed else 0
+        success_rate = round(failed / completed * 100) if completed else 0
 
         items.append(
             CallerListItem(
@@ -105,7 +97,7 @@ async def api_list_callers(
                 is_active=is_active_value
                 if isinstance(is_active_value, bool)
                 else True,
-                total_calls=len(calls),
+                total_calls=caller.get("total_calls") or 0,
                 avg_success_rate=success_rate,
                 created_at=caller.get("created_at", ""),
             )
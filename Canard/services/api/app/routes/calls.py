@@ -1,16 +1,25 @@
 # pyright: basic, reportMissingImports=false
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Query
 
 from app.auth.middleware import OptionalUser
 from app.db import queries
 from app.models.api import CallEnriched, StartCallRequest, StartCallResponse
 from app.services.calls import start_call as svc_start_call
-from app.services.email import send_test_results_email
+from app.services.email import queue_test_results_email
 
 router = APIRouter(prefix="/api/calls", tags=["calls"])
 
+# What CallEnriched shows, plus the related names in the same request
+_ENRICHED_COLUMNS = (
+    "id,status,started_at,duration_seconds,risk_score,employee_compliance,"
+    "transcript,flags,ai_summary,recording_url,dual_recording_url,"
+    + queries.CALL_NAME_EMBEDS
+)
+
 
 def _format_duration(seconds: int | None) -> str:
     if not seconds:
@@ -59,17 +68,9 @@ async def api_list_calls(
         campaign_id=campaign_id,
         status=status,
         limit=limit,
+        columns=_ENRICHED_COLUMNS,
     )
 
-    # Build lookup dicts for names
-    employees = queries.list_employees(resolved_org_id, active_only=False)
-    callers = queries.list_callers(resolved_org_id, active_only=False)
-    campaigns = queries.list_campaigns(resolved_org_id)
-
-    emp_names = {e["id"]: e.get("full_name", "") for e in employees}
-    caller_names = {c["id"]: c.get("persona_name", "") for c in callers}
-    campaign_names = {c["id"]: c.get("name", "") for c in campaigns}
-
     items: list[CallEnriched] = []
     for c in raw_calls:
         flags_raw = c.get("flags") or []
@@ -81,9 +82,9 @@ async def api_list_calls(
         items.append(
             CallEnriched(
                 id=c["id"],
-                employee_name=emp_names.get(c.get("employee_id", ""), ""),
-                caller_name=caller_names.get(c.get("caller_id", ""), ""),
-                campaign_name=campaign_names.get(c.get("campaign_id", ""), ""),
+                employee_name=queries.embedded(c, "employee").get("full_name") or "",
+                caller_name=queries.embedded(c, "caller").get("persona_name") or "",
+                campaign_name=queries.embedded(c, "campaign").get("name") or "",
                 status=c.get("status") or "pending",
                 started_at=c.get("started_at") or "",
                 duration=_format_duration(c.get("duration_seconds")),
@@ -94,6 +95,7 @@ async def api_list_calls(
                 flags=flags,
                 ai_summary=c.get("ai_summary") or "",
                 recording_url=c.get("recording_url") or "",
+                dual_recording_url=c.get("dual_recording_url") or "",
             )
         )
     return items
@@ -105,7 +107,7 @@ async def api_send_results(
     user: OptionalUser,
     override_email: str | None = Query(None),
 ) -> dict:
-    """Send post-call test results email to the employee."""
+    """Queue the post-call test results email for the employee."""
     call = queries.get_call(call_id)
     if not call:
         raise HTTPException(status_code=404, detail="Call not found")
@@ -126,7 +128,9 @@ async def api_send_results(
     if isinstance(flags, str):
         flags = [flags]
 
-    email_id = send_test_results_email(
+    # Manual resends are deliberate, so no idempotency key
+    email_id = await asyncio.to_thread(
+        queue_test_results_email,
         to_email=to_email,
         employee_name=employee.get("full_name", ""),
         risk_score=call.get("risk_score") or 0,
@@ -137,23 +141,15 @@ async def api_send_results(
         campaign_name=campaign.get("name", "") if campaign else "",
     )
 
-    if not email_id:
-        raise HTTPException(status_code=500, detail="Failed to send email")
-
-    return {"status": "sent", "email_id": email_id, "to": to_email}
+    return {"status": "queued", "email_id": email_id, "to": to_email}
 
 
 @router.get("/{call_id}", response_model=CallEnriched)
 async def api_call_detail(call_id: str) -> CallEnriched:
-    c = queries.get_call(call_id)
+    c = queries.get_call(call_id, columns=_ENRICHED_COLUMNS)
     if not c:
         raise HTTPException(status_code=404, detail="Call not found")
 
-    # Resolve names
-    emp = queries.get_employee(c.get("employee_id", ""))
-    caller = queries.get_caller(c.get("caller_id", "")) if c.get("caller_id") else None
-    campaign = queries.get_campaign(c.get("campaign_id", "")) if c.get("campaign_id") else None
-
     flags_raw = c.get("flags") or []
     if isinstance(flags_raw, str):
         flags_raw = [flags_raw]
@@ -161,9 +157,9 @@ async def api_call_detail(call_id: str) -> CallEnriched:
 
     return CallEnriched(
         id=c["id"],
-        employee_name=emp.get("full_name", "") if emp else "",
-        caller_name=caller.get("persona_name", "") if caller else "",
-        campaign_name=campaign.get("name", "") if campaign else "",
+        employee_name=queries.embedded(c, "employee").get("full_name") or "",
+        caller_name=queries.embedded(c, "caller").get("persona_name") or "",
+        campaign_name=queries.embedded(c, "campaign").get("name") or "",
         status=c.get("status", "pending"),
         started_at=c.get("started_at", "") or "",
         duration=_format_duration(c.get("duration_seconds")),
@@ -174,4 +170,5 @@ async def api_call_detail(call_id: str) -> CallEnriched:
         flags=flags,
         ai_summary=c.get("ai_summary") or "",
         recording_url=c.get("recording_url") or "",
+        dual_recording_url=c.get("dual_recording_url") or "",
     )
@@ -1,12 +1,18 @@
 # pyright: basic, reportMissingImports=false
 from __future__ import annotations
 
+from datetime import time
+
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.auth.middleware import OptionalUser
 from app.db import queries
 from app.models.api import CampaignListItem, ScriptListItem
+from app.services.aggregation import GroupKey, aggregate
+from app.services.analytics_store import CallFacts, get_analytics_store
+from app.services.campaign_scheduler import is_valid_timezone
 
 router = APIRouter(prefix="/api/campaigns", tags=["campaigns"])
 
@@ -18,25 +24,35 @@ class CreateCampaignRequest(BaseModel):
     description: str | None = None
     attack_vector: str | None = None
     scheduled_at: str | None = None
+    # Calling window in the employee's (else the campaign's) local time;
+    # unset parts don't restrict when calls are placed
+    timezone: str | None = None
+    calling_window_start: time | None = None
+    calling_window_end: time | None = None
+    calling_days: list[int] | None = None
+
+
+def _check_calling_window(
+    timezone: str | None, calling_days: list[int] | None
+) -> None:
+    if timezone is not None and not is_valid_timezone(timezone):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {timezone}")
+    if calling_days is not None and any(d < 1 or d > 7 for d in calling_days):
+        raise HTTPException(
+            status_code=400, detail="calling_days are ISO weekdays (1 = Monday, 7 = Sunday)"
+        )
 
 
-def _enrich_campaigns(
-    campaigns: list[dict], all_calls: list[dict]
-) -> list[CampaignListItem]:
+def _enrich_campaigns(campaigns: list[dict], facts: CallFacts) -> list[CampaignListItem]:
     """Add computed totalCalls, completedCalls, avgRiskScore from calls data."""
-    camp_calls: dict[str, list[dict]] = {}
-    for c in all_calls:
-        cid = c.get("campaign_id")
-        if cid:
-            camp_calls.setdefault(cid, []).append(c)
+    all_calls = aggregate(facts, GroupKey.CAMPAIGN)
+    completed = aggregate(facts, GroupKey.CAMPAIGN, facts.completed)
 
     items: list[CampaignListItem] = []
     for camp in campaigns:
         cid = camp["id"]
-        calls = camp_calls.get(cid, [])
-        completed = [c for c in calls if c.get("status") == "completed"]
-        scores = [c.get("risk_score", 0) or 0 for c in completed]
-        avg_risk = round(sum(scores) / len(scores)) if scores else 0
+        code = completed.code(cid)
+        avg_risk = completed.avg_risk(code, None) if code is not None else 0
 
         items.append(
             CampaignListItem(
@@ -48,9 +64,13 @@ def _enrich_campaigns(
                 scheduled_at=camp.get("scheduled_at"),
                 started_at=camp.get("started_at"),
                 completed_at=camp.get("completed_at"),
-                total_calls=len(calls),
-                completed_calls=len(completed),
-                avg_risk_score=avg_risk,
+                timezone=camp.get("timezone") or "UTC",
+                calling_window_start=camp.get("calling_window_start"),
+                calling_window_end=camp.get("calling_window_end"),
+                calling_days=camp.get("calling_days"),
+                total_calls=all_calls.count(all_calls.code(cid)),
+                completed_calls=completed.count(code),
+                avg_risk_score=round(avg_risk),
                 created_at=camp.get("created_at", ""),
             )
         )
@@ -64,6 +84,7 @@ async def api_create_campaign(req: CreateCampaignRequest, user: OptionalUser) ->
     resolved_org_id = user["org_id"] if user else req.org_id
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
+    _check_calling_window(req.timezone, req.calling_days)
 
     return create_campaign(
         name=req.name,
@@ -72,6 +93,10 @@ async def api_create_campaign(req: CreateCampaignRequest, user: OptionalUser) ->
         description=req.description,
         attack_vector=req.attack_vector,
         scheduled_at=req.scheduled_at,
+        timezone=req.timezone,
+        calling_window_start=req.calling_window_start,
+        calling_window_end=req.calling_window_end,
+        calling_days=req.calling_days,
     )
 
 
@@ -84,9 +109,8 @@ async def api_list_campaigns(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    campaigns = queries.list_campaigns(resolved_org_id)
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-    return _enrich_campaigns(campaigns, all_calls)
+    org = await get_analytics_store().org_async(resolved_org_id)
+    return _enrich_campaigns(org.campaigns, org.snapshot())
 
 
 class UpdateCampaignRequest(BaseModel):
@@ -95,6 +119,10 @@ class UpdateCampaignRequest(BaseModel):
     attack_vector: str | None = None
     status: str | None = None
     scheduled_at: str | None = None
+    timezone: str | None = None
+    calling_window_start: time | None = None
+    calling_window_end: time | None = None
+    calling_days: list[int] | None = None
 
 
 @router.patch("/{campaign_id}")
@@ -105,7 +133,8 @@ async def api_update_campaign(
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
-    updates = req.model_dump(exclude_none=True)
+    _check_calling_window(req.timezone, req.calling_days)
+    updates = req.model_dump(mode="json", exclude_none=True)
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
 
@@ -171,13 +200,32 @@ async def api_launch_campaign(
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@router.get("/{campaign_id}/audit-bundle")
+async def api_campaign_audit_bundle(
+    campaign_id: str, user: OptionalUser
+) -> StreamingResponse:
+    """ZIP of every call's audit PDF plus a campaign summary, streamed."""
+    from app.services.audit_bundle import stream_campaign_audit_bundle
+
+    campaign = queries.get_campaign(campaign_id)
+    if not campaign or (user and campaign.get("org_id") != user["org_id"]):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    return StreamingResponse(
+        stream_campaign_audit_bundle(campaign),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="campaign-{campaign_id}-audits.zip"'
+        },
+    )
+
+
 @router.get("/{campaign_id}", response_model=CampaignListItem)
 async def api_get_campaign(campaign_id: str) -> CampaignListItem:
     campaign = queries.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
-    org_id = campaign.get("org_id", "")
-    all_calls = queries.list_calls(org_id=org_id, campaign_id=campaign_id, limit=500)
-    enriched = _enrich_campaigns([campaign], all_calls)
+    facts = await get_analytics_store().facts_async(campaign.get("org_id", ""))
+    enriched = _enrich_campaigns([campaign], facts)
     return enriched[0]
@@ -4,9 +4,11 @@ from __future__ import annotations
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, Query
 
 from app.auth.middleware import OptionalUser
+from app.config import settings
 from app.db import queries
 from app.models.api import (
     CallsOverTimeResponse,
@@ -21,8 +23,18 @@ from app.models.api import (
     WidgetEmployee,
     WidgetRecentFailure,
 )
+from app.services.aggregation import GroupKey, aggregate
+from app.services.analytics_store import (
+    COMPLIANCE_FAILED,
+    DAY_S,
+    POSITIVE_FLAGS,
+    format_ts,
+    get_analytics_store,
+    recent_first,
+)
+from app.services.response_cache import CachedRoute
 
-router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"], route_class=CachedRoute)
 
 RISK_COLORS = {"high": "#ef4444", "medium": "#f59e0b", "low": "#22c55e", "unknown": "#94a3b8"}
 DEPT_COLORS = ["#ef4444", "#f59e0b", "#22c55e", "#3b82f6", "#8b5cf6", "#ec4899", "#14b8a6", "#f97316"]
@@ -37,24 +49,35 @@ async def api_dashboard_stats(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    campaigns = queries.list_campaigns(resolved_org_id)
-    employees = queries.list_employees(resolved_org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-
-    active_campaigns = sum(1 for c in campaigns if c.get("status") in ("in_progress", "active"))
-    total_calls = len(all_calls)
-    completed = [c for c in all_calls if c.get("status") == "completed"]
-    tested_employee_ids = {c["employee_id"] for c in completed if c.get("employee_id")}
-
-    avg_risk = 0
-    if completed:
-        scores = [c.get("risk_score", 0) or 0 for c in completed]
-        avg_risk = round(sum(scores) / len(scores))
+    if settings.analytics_source == "sql":
+        row = queries.get_dashboard_stats(resolved_org_id)
+        active_campaigns = row.get("active_campaigns") or 0
+        total_campaigns = row.get("total_campaigns") or 0
+        total_calls = row.get("total_calls") or 0
+        n_completed = row.get("completed_calls") or 0
+        tested_employees = row.get("tested_employees") or 0
+        total_employees = row.get("total_employees") or 0
+        avg_risk = round(float(row.get("avg_risk") or 0))
+    else:
+        org = await get_analytics_store().org_async(resolved_org_id)
+        facts = org.snapshot()
+        campaigns = org.campaigns
+
+        active_campaigns = sum(1 for c in campaigns if c.get("status") in ("in_progress", "active"))
+        total_campaigns = len(campaigns)
+        total_calls = facts.size
+        completed = facts.completed
+        n_completed = int(completed.sum())
+        tested = facts.employee[completed]
+        tested_employees = np.unique(tested[tested >= 0]).size
+        total_employees = len(org.employees)
+
+        avg_risk = round(float(facts.risk[completed].mean())) if n_completed else 0
 
     return [
-        DashboardStatResponse(label="Active Campaigns", value=str(active_campaigns), change=f"{len(campaigns)} total", trend="neutral"),
-        DashboardStatResponse(label="Total Calls", value=str(total_calls), change=f"{len(completed)} completed", trend="up"),
-        DashboardStatResponse(label="Employees Tested", value=str(len(tested_employee_ids)), change=f"of {len(employees)} total", trend="neutral"),
+        DashboardStatResponse(label="Active Campaigns", value=str(active_campaigns), change=f"{total_campaigns} total", trend="neutral"),
+        DashboardStatResponse(label="Total Calls", value=str(total_calls), change=f"{n_completed} completed", trend="up"),
+        DashboardStatResponse(label="Employees Tested", value=str(tested_employees), change=f"of {total_employees} total", trend="neutral"),
         DashboardStatResponse(label="Avg Risk Score", value=f"{avg_risk}%", change="across all calls", trend="down" if avg_risk > 60 else "up"),
     ]
 
@@ -68,7 +91,7 @@ async def api_risk_distribution(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    employees = queries.list_employees(resolved_org_id, active_only=False)
+    employees = (await get_analytics_store().org_async(resolved_org_id)).employees
     counts: dict[str, int] = defaultdict(int)
     for emp in employees:
         level = emp.get("risk_level", "unknown") or "unknown"
@@ -89,25 +112,25 @@ async def api_risk_by_department(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    employees = queries.list_employees(resolved_org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-
-    emp_dept: dict[str, str] = {e["id"]: e.get("department", "Other") for e in employees}
+    if settings.analytics_source == "sql":
+        rows = queries.get_department_totals(resolved_org_id)
+        return [
+            RiskDistributionResponse(
+                name=row["department"],
+                value=round(row["failed_calls"] / row["total_calls"] * 100),
+                fill=DEPT_COLORS[i % len(DEPT_COLORS)],
+            )
+            for i, row in enumerate(rows)
+        ]
 
-    dept_stats: dict[str, dict[str, int]] = {}
-    for c in all_calls:
-        if c.get("status") != "completed":
-            continue
-        dept = emp_dept.get(c.get("employee_id", ""), "Other")
-        stats = dept_stats.setdefault(dept, {"failed": 0, "total": 0})
-        stats["total"] += 1
-        if c.get("employee_compliance") == "failed":
-            stats["failed"] += 1
+    facts = await get_analytics_store().facts_async(resolved_org_id)
+    completed = facts.completed
+    by_dept = aggregate(facts, GroupKey.DEPARTMENT, completed)
 
     items: list[RiskDistributionResponse] = []
-    for i, (dept, stats) in enumerate(dept_stats.items()):
-        fail_rate = round(stats["failed"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        items.append(RiskDistributionResponse(name=dept, value=fail_rate, fill=DEPT_COLORS[i % len(DEPT_COLORS)]))
+    for i, code in enumerate(recent_first(facts.department[completed], facts.ts[completed])):
+        fail_rate = round(by_dept.failed[code] / by_dept.total[code] * 100)
+        items.append(RiskDistributionResponse(name=by_dept.label(code), value=fail_rate, fill=DEPT_COLORS[i % len(DEPT_COLORS)]))
     return items
 
 
@@ -121,62 +144,28 @@ async def api_calls_over_time(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-
     today = datetime.now(timezone.utc).date()
     date_range = [(today - timedelta(days=i)) for i in range(days - 1, -1, -1)]
 
-    daily: dict[str, dict[str, int]] = {
-        d.isoformat(): {"calls": 0, "passed": 0, "failed": 0} for d in date_range
-    }
-
-    for c in all_calls:
-        started = c.get("started_at") or c.get("created_at") or ""
-        if not started:
-            continue
-        day_key = started[:10]  # YYYY-MM-DD
-        if day_key in daily:
-            daily[day_key]["calls"] += 1
-            compliance = c.get("employee_compliance", "")
-            if compliance == "passed":
-                daily[day_key]["passed"] += 1
-            elif compliance == "failed":
-                daily[day_key]["failed"] += 1
+    if settings.analytics_source == "sql":
+        by_day = {
+            row["day"]: row for row in queries.get_calls_by_day(resolved_org_id, date_range[0].isoformat())
+        }
+        calls = [by_day.get(d.isoformat(), {}).get("calls", 0) for d in date_range]
+        passed = [by_day.get(d.isoformat(), {}).get("passed", 0) for d in date_range]
+        failed = [by_day.get(d.isoformat(), {}).get("failed", 0) for d in date_range]
+    else:
+        facts = await get_analytics_store().facts_async(resolved_org_id)
+        by_day = aggregate(facts, GroupKey.DAY, since=date_range[0], days=days)
+        calls, passed, failed = by_day.total, by_day.passed, by_day.failed
 
     items: list[CallsOverTimeResponse] = []
-    for d in date_range:
-        key = d.isoformat()
-        stats = daily[key]
+    for i, d in enumerate(date_range):
         label = d.strftime("%b %d")
-        items.append(CallsOverTimeResponse(date=label, calls=stats["calls"], passed=stats["passed"], failed=stats["failed"]))
+        items.append(CallsOverTimeResponse(date=label, calls=int(calls[i]), passed=int(passed[i]), failed=int(failed[i])))
     return items
 
 
-# Flags that indicate the employee responded correctly
-_POSITIVE_FLAGS = {
-    "Proper Verification",
-    "Asked Questions",
-    "Immediate Rejection",
-    "Proper Protocol",
-    "Requested Verification",
-}
-
-
-def _normalize_flags(flags_raw) -> list[str]:
-    """Normalize flags from DB — handles both string lists and dict lists."""
-    if not flags_raw:
-        return []
-    result = []
-    for f in flags_raw:
-        if isinstance(f, str):
-            result.append(f)
-        elif isinstance(f, dict):
-            result.append(f.get("type", str(f)))
-        else:
-            result.append(str(f))
-    return result
-
-
 @router.get("/smart-widgets", response_model=SmartWidgetsResponse)
 async def api_smart_widgets(
     user: OptionalUser,
@@ -185,108 +174,89 @@ async def api_smart_widgets(
     resolved_org_id = user["org_id"] if user else org_id
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
-    employees = queries.list_employees(resolved_org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-    campaigns = queries.list_campaigns(resolved_org_id)
+    org = await get_analytics_store().org_async(resolved_org_id)
+    facts = org.snapshot()
+    campaigns = org.campaigns
 
-    emp_lookup: dict[str, dict] = {e["id"]: e for e in employees}
+    emp_lookup: dict[str, dict] = {e["id"]: e for e in org.employees}
     camp_lookup: dict[str, dict] = {c["id"]: c for c in campaigns}
 
-    completed = [c for c in all_calls if c.get("status") == "completed"]
-    now = datetime.now(timezone.utc)
-    cutoff_7d = (now - timedelta(days=7)).isoformat()
-    cutoff_14d = (now - timedelta(days=14)).isoformat()
-    cutoff_30d = (now - timedelta(days=30)).isoformat()
+    completed = np.flatnonzero(facts.completed)
+    with_employee = completed[facts.employee[completed] >= 0]
+    now = datetime.now(timezone.utc).timestamp()
+    cutoff_7d = now - 7 * DAY_S
+    cutoff_14d = now - 14 * DAY_S
+    cutoff_30d = now - 30 * DAY_S
+    started = facts.started_ts[completed]
+    in_7d = started >= cutoff_7d
+    in_prior_7d = (started >= cutoff_14d) & (started < cutoff_7d)
 
     # ── Risk Hotspot Widget ──
 
-    # Per-employee aggregates
-    emp_stats: dict[str, dict] = defaultdict(lambda: {"scores": [], "total": 0, "failed": 0, "flags": []})
-    for c in completed:
-        eid = c.get("employee_id", "")
-        if not eid:
-            continue
-        es = emp_stats[eid]
-        es["scores"].append(c.get("risk_score", 0) or 0)
-        es["total"] += 1
-        if c.get("employee_compliance") == "failed":
-            es["failed"] += 1
-        for flag in _normalize_flags(c.get("flags")):
-            if flag not in _POSITIVE_FLAGS:
-                es["flags"].append(flag)
-
-    # Department aggregates
-    dept_agg: dict[str, dict] = defaultdict(lambda: {"scores": [], "total": 0, "failed": 0, "emps": set()})
-    for eid, stats in emp_stats.items():
-        emp = emp_lookup.get(eid, {})
-        dept = emp.get("department", "Other")
-        da = dept_agg[dept]
-        da["scores"].extend(stats["scores"])
-        da["total"] += stats["total"]
-        da["failed"] += stats["failed"]
-        da["emps"].add(eid)
+    by_emp = aggregate(facts, GroupKey.EMPLOYEE, completed)
+    by_dept = aggregate(facts, GroupKey.DEPARTMENT, with_employee)
+    by_dept_emp = aggregate(facts, (GroupKey.DEPARTMENT, GroupKey.EMPLOYEE), with_employee)
+    dept_emps = np.count_nonzero(by_dept_emp.total.reshape(by_dept.size, -1), axis=1)
 
     dept_breakdown = [
         WidgetDeptRisk(
-            department=dept,
-            avg_risk=round(sum(da["scores"]) / len(da["scores"]), 1) if da["scores"] else 0,
-            failure_rate=round(da["failed"] / da["total"] * 100, 1) if da["total"] > 0 else 0,
-            employee_count=len(da["emps"]),
-            total_tests=da["total"],
-            failed_tests=da["failed"],
+            department=by_dept.label(d),
+            avg_risk=by_dept.avg_risk(d),
+            failure_rate=by_dept.failure_rate(d),
+            employee_count=int(dept_emps[d]),
+            total_tests=by_dept.count(d),
+            failed_tests=int(by_dept.failed[d]),
         )
-        for dept, da in dept_agg.items()
+        for d in by_dept.groups()
     ]
     dept_breakdown.sort(key=lambda d: d.avg_risk, reverse=True)
 
     worst_dept = dept_breakdown[0].department if dept_breakdown else ""
 
     # Worst attack vector
-    vector_fails: Counter[str] = Counter()
-    vector_total: Counter[str] = Counter()
-    for c in completed:
-        camp = camp_lookup.get(c.get("campaign_id", ""), {})
-        v = camp.get("attack_vector", "Unknown")
-        vector_total[v] += 1
-        if c.get("employee_compliance") == "failed":
-            vector_fails[v] += 1
+    by_vector = aggregate(facts, GroupKey.ATTACK_VECTOR, completed, campaigns=campaigns)
     worst_vector = ""
     worst_rate = 0.0
-    for v, total in vector_total.items():
-        rate = vector_fails[v] / total * 100 if total > 0 else 0
+    for v in by_vector.groups():
+        rate = by_vector.failure_rate(v, None)
         if rate > worst_rate:
             worst_rate = rate
-            worst_vector = v
+            worst_vector = by_vector.label(v)
 
     # Top risk employees
     top_emps: list[WidgetEmployee] = []
-    for eid, stats in emp_stats.items():
-        emp = emp_lookup.get(eid, {})
-        avg_r = round(sum(stats["scores"]) / len(stats["scores"]), 1) if stats["scores"] else 0
+    for e in by_emp.groups():
+        eid = by_emp.label(e)
+        employee = emp_lookup.get(eid, {})
         top_emps.append(
             WidgetEmployee(
                 id=eid,
-                full_name=emp.get("full_name", "Unknown"),
-                department=emp.get("department", ""),
-                risk_score=avg_r,
-                failure_rate=round(stats["failed"] / stats["total"] * 100, 1) if stats["total"] > 0 else 0,
-                total_tests=stats["total"],
-                recent_flags=list(dict.fromkeys(stats["flags"]))[:3],
+                full_name=employee.get("full_name", "Unknown"),
+                department=employee.get("department", ""),
+                risk_score=by_emp.avg_risk(e),
+                failure_rate=by_emp.failure_rate(e),
+                total_tests=by_emp.count(e),
             )
         )
     top_emps.sort(key=lambda e: e.risk_score, reverse=True)
+    top_emps = top_emps[:5]
+
+    # Most recent negative flags, only needed for the employees shown
+    newest_first = completed[np.argsort(-np.nan_to_num(facts.ts[completed], nan=-np.inf), kind="stable")]
+    for item in top_emps:
+        code = facts.employee_ids.index(item.id)
+        recent: list[str] = []
+        for row in newest_first[facts.employee[newest_first] == code]:
+            recent.extend(f for f in facts.row_flags(row) if f not in POSITIVE_FLAGS)
+            if len(dict.fromkeys(recent)) >= 3:
+                break
+        item.recent_flags = list(dict.fromkeys(recent))[:3]
 
     # 7d vs prior-7d trend
-    scores_7d = [c.get("risk_score", 0) or 0 for c in completed if (c.get("started_at") or "") >= cutoff_7d]
-    scores_prior = [
-        c.get("risk_score", 0) or 0
-        for c in completed
-        if cutoff_14d <= (c.get("started_at") or "") < cutoff_7d
-    ]
-    avg_7d = sum(scores_7d) / len(scores_7d) if scores_7d else 0
-    avg_prior = sum(scores_prior) / len(scores_prior) if scores_prior else 0
-    overall_scores = [c.get("risk_score", 0) or 0 for c in completed]
-    overall_risk = round(sum(overall_scores) / len(overall_scores), 1) if overall_scores else 0
+    risk = facts.risk[completed]
+    avg_7d = float(risk[in_7d].mean()) if in_7d.any() else 0
+    avg_prior = float(risk[in_prior_7d].mean()) if in_prior_7d.any() else 0
+    overall_risk = round(float(risk.mean()), 1) if completed.size else 0
     trend = "up" if avg_7d > avg_prior + 2 else ("down" if avg_7d < avg_prior - 2 else "neutral")
 
     risk_hotspot = RiskHotspotWidgetResponse(
@@ -294,46 +264,48 @@ async def api_smart_widgets(
         risk_trend=trend,
         worst_department=worst_dept,
         worst_attack_vector=worst_vector,
-        top_risk_employees=top_emps[:5],
+        top_risk_employees=top_emps,
         dept_breakdown=dept_breakdown,
     )
 
     # ── Recent Failures Widget ──
 
-    failed_calls = [c for c in completed if c.get("employee_compliance") == "failed"]
-    failures_7d = [c for c in failed_calls if (c.get("started_at") or "") >= cutoff_7d]
-    failures_30d = [c for c in failed_calls if (c.get("started_at") or "") >= cutoff_30d]
-    failures_prior_7d = [
-        c for c in failed_calls
-        if cutoff_14d <= (c.get("started_at") or "") < cutoff_7d
-    ]
-    f_trend = "up" if len(failures_7d) > len(failures_prior_7d) else ("down" if len(failures_7d) < len(failures_prior_7d) else "neutral")
+    failed = facts.compliance[completed] == COMPLIANCE_FAILED
+    failures_7d = int((failed & in_7d).sum())
+    failures_prior_7d = int((failed & in_prior_7d).sum())
+    failures_30d = completed[failed & (started >= cutoff_30d)]
+    f_trend = "up" if failures_7d > failures_prior_7d else ("down" if failures_7d < failures_prior_7d else "neutral")
 
-    neg_flags: Counter[str] = Counter()
-    for c in failures_30d:
-        for flag in _normalize_flags(c.get("flags")):
-            if flag not in _POSITIVE_FLAGS:
-                neg_flags[flag] += 1
+    neg_flags = Counter(
+        {f: n for f, n in facts.flag_counts(failures_30d).items() if f not in POSITIVE_FLAGS}
+    )
     most_common_flag = neg_flags.most_common(1)[0][0] if neg_flags else ""
 
-    sorted_failures = sorted(failed_calls, key=lambda x: x.get("started_at") or "", reverse=True)[:10]
-    recent_list = [
-        WidgetRecentFailure(
-            call_id=c["id"],
-            employee_id=c.get("employee_id", ""),
-            employee_name=emp_lookup.get(c.get("employee_id", ""), {}).get("full_name", "Unknown"),
-            department=emp_lookup.get(c.get("employee_id", ""), {}).get("department", ""),
-            attack_vector=camp_lookup.get(c.get("campaign_id", ""), {}).get("attack_vector", "Unknown"),
-            risk_score=c.get("risk_score", 0) or 0,
-            flags=[f for f in _normalize_flags(c.get("flags")) if f not in _POSITIVE_FLAGS],
-            occurred_at=c.get("started_at") or c.get("created_at") or "",
+    failed_rows = completed[failed]
+    by_started = np.argsort(-np.nan_to_num(facts.started_ts[failed_rows], nan=-np.inf), kind="stable")
+    recent_list: list[WidgetRecentFailure] = []
+    for row in failed_rows[by_started[:10]]:
+        e = facts.employee[row]
+        eid = facts.employee_ids[e] if e >= 0 else ""
+        c = facts.campaign[row]
+        recent_list.append(
+            WidgetRecentFailure(
+                call_id=facts.call_ids[row],
+                employee_id=eid,
+                employee_name=emp_lookup.get(eid, {}).get("full_name", "Unknown"),
+                department=emp_lookup.get(eid, {}).get("department", ""),
+                attack_vector=camp_lookup.get(
+                    facts.campaign_ids[c] if c >= 0 else "", {}
+                ).get("attack_vector", "Unknown"),
+                risk_score=int(facts.risk[row]),
+                flags=[f for f in facts.row_flags(row) if f not in POSITIVE_FLAGS],
+                occurred_at=format_ts(float(facts.ts[row])),
+            )
         )
-        for c in sorted_failures
-    ]
 
     recent_failures = RecentFailuresWidgetResponse(
-        failures_7d=len(failures_7d),
-        failures_30d=len(failures_30d),
+        failures_7d=failures_7d,
+        failures_30d=int(failures_30d.size),
         trend=f_trend,
         most_common_flag=most_common_flag,
         recent_failures=recent_list,
@@ -343,22 +315,20 @@ async def api_smart_widgets(
 
     active_campaigns = [c for c in campaigns if c.get("status") in ("in_progress", "active")]
 
+    by_campaign = aggregate(facts, GroupKey.CAMPAIGN, completed)
     camp_details: list[WidgetCampaignDetail] = []
-    for camp in campaigns:
-        cid = camp["id"]
-        camp_calls = [c for c in completed if c.get("campaign_id") == cid]
-        total = len(camp_calls)
-        c_failed = sum(1 for c in camp_calls if c.get("employee_compliance") == "failed")
-        c_scores = [c.get("risk_score", 0) or 0 for c in camp_calls]
+    for campaign in campaigns:
+        code = by_campaign.code(campaign["id"])
+        total = by_campaign.count(code)
         camp_details.append(
             WidgetCampaignDetail(
-                id=cid,
-                name=camp.get("name", ""),
-                attack_vector=camp.get("attack_vector", ""),
+                id=campaign["id"],
+                name=campaign.get("name", ""),
+                attack_vector=campaign.get("attack_vector", ""),
                 total_calls=total,
                 completed_calls=total,
-                failure_rate=round(c_failed / total * 100, 1) if total > 0 else 0,
-                avg_risk=round(sum(c_scores) / len(c_scores), 1) if c_scores else 0,
+                failure_rate=by_campaign.failure_rate(code) if code is not None else 0,
+                avg_risk=by_campaign.avg_risk(code) if code is not None else 0,
             )
         )
 
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 from app.auth.middleware import CurrentUser, OptionalUser
 from app.db import queries
 from app.models.api import EmployeeListItem
+from app.services.campaign_scheduler import is_valid_timezone
 
 router = APIRouter(prefix="/api/employees", tags=["employees"])
 
@@ -30,6 +31,7 @@ COLUMN_MAP: dict[str, list[str]] = {
         "manager",
     ],
     "employee_id": ["employee_id", "employee id", "emp_id", "id", "external_id"],
+    "timezone": ["timezone", "time zone", "tz"],
 }
 
 
@@ -55,6 +57,8 @@ class CreateEmployeeRequest(BaseModel):
     phone: str
     department: str | None = None
     job_title: str | None = None
+    # IANA name; campaign calling windows are applied in this timezone
+    timezone: str | None = None
 
 
 class ImportResult(BaseModel):
@@ -75,28 +79,12 @@ async def api_list_employees(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
+    # Counters are kept on the rows by migrations/015_usage_counters.sql
     employees = queries.list_employees(resolved_org_id, active_only=False)
-    all_calls = queries.list_calls(org_id=resolved_org_id, limit=10000)
-
-    # Build per-employee aggregates
-    emp_calls: dict[str, list[dict]] = {}
-    for c in all_calls:
-        eid = c.get("employee_id")
-        if eid:
-            emp_calls.setdefault(eid, []).append(c)
 
     items: list[EmployeeListItem] = []
     for emp in employees:
         eid = emp["id"]
-        calls = emp_calls.get(eid, [])
-        completed = [c for c in calls if c.get("status") == "completed"]
-        failed = [c for c in completed if c.get("employee_compliance") == "failed"]
-        last_date = ""
-        if completed:
-            dates = [c.get("started_at", "") for c in completed if c.get("started_at")]
-            if dates:
-                last_date = max(dates)[:10]  # YYYY-MM-DD
-
         items.append(
             EmployeeListItem(
                 id=eid,
@@ -106,11 +94,12 @@ async def api_list_employees(
                 department=emp.get("department", ""),
                 job_title=emp.get("job_title", ""),
                 risk_level=emp.get("risk_level", "unknown"),
-                total_tests=len(completed),
-                failed_tests=len(failed),
-                last_test_date=last_date,
+                total_tests=emp.get("total_tests") or 0,
+                failed_tests=emp.get("failed_tests") or 0,
+                last_test_date=(emp.get("last_test_at") or "")[:10],
                 is_active=emp.get("is_active", True),
                 boss_id=emp.get("boss_id"),
+                timezone=emp.get("timezone") or "",
             )
         )
     return items
@@ -122,6 +111,8 @@ async def api_list_employees(
 @router.post("/")
 async def api_create_employee(body: CreateEmployeeRequest, user: CurrentUser) -> dict:
     org_id = user["org_id"]
+    if body.timezone and not is_valid_timezone(body.timezone):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {body.timezone}")
     data = {
         "org_id": org_id,
         "full_name": body.full_name,
@@ -130,6 +121,8 @@ async def api_create_employee(body: CreateEmployeeRequest, user: CurrentUser) ->
         "department": body.department or "",
         "job_title": body.job_title or "",
     }
+    if body.timezone:
+        data["timezone"] = body.timezone
     existing = queries.get_employee_by_email(body.email, org_id)
     if existing:
         raise HTTPException(
@@ -194,6 +187,10 @@ async def api_import_csv(user: CurrentUser, file: UploadFile = File(...)) -> Imp
             phone = row.get(col_map.get("phone", ""), "").strip() if "phone" in col_map else ""
             department = row.get(col_map.get("department", ""), "").strip() if "department" in col_map else ""
             job_title = row.get(col_map.get("job_title", ""), "").strip() if "job_title" in col_map else ""
+            tz = row.get(col_map.get("timezone", ""), "").strip() if "timezone" in col_map else ""
+            if tz and not is_valid_timezone(tz):
+                errors.append(f"Row {i}: unknown timezone '{tz}', left unset")
+                tz = ""
 
             data = {
                 "org_id": org_id,
@@ -203,15 +200,20 @@ async def api_import_csv(user: CurrentUser, file: UploadFile = File(...)) -> Imp
                 "department": department,
                 "job_title": job_title,
             }
+            if tz:
+                data["timezone"] = tz
 
             existing = queries.get_employee_by_email(email, org_id)
             if existing:
-                queries.update_employee(existing["id"], {
+                changes = {
                     "full_name": full_name,
                     "phone": phone,
                     "department": department,
                     "job_title": job_title,
-                })
+                }
+                if tz:
+                    changes["timezone"] = tz
+                queries.update_employee(existing["id"], changes)
                 email_to_id[email.lower()] = existing["id"]
                 row_results.append((email.lower(), existing["id"]))
                 updated += 1
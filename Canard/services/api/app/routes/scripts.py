@@ -56,14 +56,13 @@ async def api_list_scripts(
     if not resolved_org_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    rows = queries.list_scripts(resolved_org_id, active_only=False)
-
-    # Build campaign name lookup
-    campaigns = queries.list_campaigns(resolved_org_id)
-    camp_names: dict[str, str] = {c["id"]: c.get("name", "") for c in campaigns}
+    # Campaign names come embedded in the same request
+    rows = queries.list_scripts(
+        resolved_org_id, active_only=False, columns=f"*,{queries.SCRIPT_CAMPAIGN_EMBED}"
+    )
 
     return [
-        ScriptListItem(**r, campaign_name=camp_names.get(r.get("campaign_id", ""), None))
+        ScriptListItem(**r, campaign_name=queries.embedded(r, "campaign").get("name"))
         for r in rows
     ]
 
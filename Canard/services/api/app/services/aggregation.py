@@ -0,0 +1,205 @@
+# pyright: basic
+"""Single-pass group-by over :class:`CallFacts` for the analytics routes.
+
+``aggregate(facts, by=...)`` buckets the selected calls by one or more
+keys (employee, department, campaign, caller, attack vector, day) and
+computes every per-group metric the routes need — call count,
+pass/fail/partial tallies, risk sum and scored count, duration sum,
+latest start time and, optionally, a flag histogram — with one
+vectorised pass per metric over the same group codes. Routes then only
+format the groups they show.
+
+Composite keys (e.g. ``(ATTACK_VECTOR, DEPARTMENT)``) are packed into a
+single code, so a heatmap costs the same as a one-key group-by.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date, timedelta
+from enum import Enum
+from typing import Any
+
+import numpy as np
+
+from app.services.analytics_store import (
+    COMPLIANCE_FAILED,
+    COMPLIANCE_PARTIAL,
+    COMPLIANCE_PASSED,
+    NO_DAY,
+    CallFacts,
+    day_index,
+    group_count,
+    group_sum,
+    relabel,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class GroupKey(str, Enum):
+    EMPLOYEE = "employee"
+    DEPARTMENT = "department"
+    CAMPAIGN = "campaign"
+    CALLER = "caller"
+    ATTACK_VECTOR = "attack_vector"
+    DAY = "day"
+
+
+def _round(value: float, ndigits: int | None) -> float:
+    return float(value) if ndigits is None else round(float(value), ndigits)
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """Per-group metrics; index ``g`` is a group code (see :meth:`label`)."""
+
+    keys: tuple[GroupKey, ...]
+    dims: list[list[Any]]  # labels per key; group code packs them row-major
+    total: np.ndarray
+    passed: np.ndarray
+    failed: np.ndarray
+    partial: np.ndarray
+    scored: np.ndarray  # calls with a risk score
+    risk_sum: np.ndarray
+    duration_sum: np.ndarray
+    last_started: np.ndarray  # max started_at epoch (nan if none)
+    flag_counts: np.ndarray | None  # (groups, flags) when requested
+    flag_names: list[str]
+
+    @property
+    def size(self) -> int:
+        return self.total.size
+
+    def groups(self) -> list[int]:
+        """Group codes with at least one call, in code order."""
+        return [int(g) for g in np.flatnonzero(self.total)]
+
+    def label(self, group: int) -> Any:
+        """The key value(s) of a group: a label, or a tuple for composite keys."""
+        parts = []
+        for labels in reversed(self.dims):
+            group, i = divmod(group, len(labels))
+            parts.append(labels[i])
+        return parts[0] if len(parts) == 1 else tuple(reversed(parts))
+
+    def code(self, label: Any) -> int | None:
+        """Group code of a single-key label, or None if it has no calls."""
+        try:
+            g = self.dims[0].index(label)
+        except ValueError:
+            return None
+        return g if self.total[g] else None
+
+    def count(self, group: int | None) -> int:
+        return int(self.total[group]) if group is not None else 0
+
+    def avg_risk(self, group: int, ndigits: int | None = 1) -> float:
+        """Mean risk over all calls in the group (unscored count as 0)."""
+        if not self.total[group]:
+            return 0
+        return _round(self.risk_sum[group] / self.total[group], ndigits)
+
+    def avg_scored_risk(self, group: int, ndigits: int | None = 1) -> float:
+        """Mean risk over the group's scored calls only."""
+        if not self.scored[group]:
+            return 0
+        return _round(self.risk_sum[group] / self.scored[group], ndigits)
+
+    def failure_rate(self, group: int, ndigits: int | None = 1) -> float:
+        if not self.total[group]:
+            return 0
+        return _round(self.failed[group] / self.total[group] * 100, ndigits)
+
+    def flags(self, group: int) -> Counter[str]:
+        """Flag histogram of one group (requires ``flags=True``)."""
+        if self.flag_counts is None:
+            raise ValueError("aggregate() was called without flags=True")
+        row = self.flag_counts[group]
+        return Counter({self.flag_names[i]: int(row[i]) for i in np.flatnonzero(row)})
+
+
+def _key_codes(
+    facts: CallFacts,
+    key: GroupKey,
+    rows: np.ndarray,
+    campaigns: Sequence[dict] | None,
+    since: date | None,
+    days: int | None,
+) -> tuple[np.ndarray, list[Any]]:
+    if key is GroupKey.EMPLOYEE:
+        return facts.employee[rows], facts.employee_ids
+    if key is GroupKey.DEPARTMENT:
+        return facts.department[rows], facts.departments
+    if key is GroupKey.CAMPAIGN:
+        return facts.campaign[rows], facts.campaign_ids
+    if key is GroupKey.CALLER:
+        return facts.caller[rows], facts.caller_ids
+    if key is GroupKey.ATTACK_VECTOR:
+        vectors = {c["id"]: c.get("attack_vector") for c in campaigns or ()}
+        codes, labels = relabel(facts.campaign[rows], facts.campaign_ids, vectors, "Unknown")
+        return codes, labels
+    if key is GroupKey.DAY:
+        if since is None or days is None:
+            raise ValueError("grouping by day needs since= and days=")
+        day = facts.day[rows]
+        offset = day - day_index(since)
+        codes = np.where((day != NO_DAY) & (offset >= 0) & (offset < days), offset, -1)
+        return codes.astype(np.int64), [since + timedelta(days=i) for i in range(days)]
+    raise ValueError(f"Unknown group key: {key}")
+
+
+def aggregate(
+    facts: CallFacts,
+    by: GroupKey | Sequence[GroupKey],
+    rows: np.ndarray | None = None,
+    *,
+    campaigns: Sequence[dict] | None = None,
+    since: date | None = None,
+    days: int | None = None,
+    flags: bool = False,
+) -> Aggregate:
+    """Group ``rows`` (default: all calls) of ``facts`` by ``by``.
+
+    ``campaigns`` is needed for ``ATTACK_VECTOR``; ``since``/``days``
+    bound ``DAY`` (calls outside the window are dropped). Rows whose key
+    is missing (no employee, no campaign, ...) are skipped.
+    """
+    keys = (by,) if isinstance(by, GroupKey) else tuple(by)
+    if rows is None:
+        rows = np.arange(facts.size)
+    elif rows.dtype == bool:
+        rows = np.flatnonzero(rows)
+
+    codes = np.zeros(rows.size, dtype=np.int64)
+    dims: list[list[Any]] = []
+    for key in keys:
+        key_codes, labels = _key_codes(facts, key, rows, campaigns, since, days)
+        width = max(len(labels), 1)
+        codes = np.where((codes >= 0) & (key_codes >= 0), codes * width + key_codes, -1)
+        dims.append(list(labels) or [None])
+    size = int(np.prod([len(d) for d in dims]))
+
+    compliance = facts.compliance[rows]
+    started = facts.started_ts[rows]
+    last_started = np.full(size, np.nan)
+    keep = codes >= 0
+    np.fmax.at(last_started, codes[keep], started[keep])
+
+    return Aggregate(
+        keys=keys,
+        dims=dims,
+        total=group_count(codes, size).astype(np.int64),
+        passed=group_count(codes, size, compliance == COMPLIANCE_PASSED).astype(np.int64),
+        failed=group_count(codes, size, compliance == COMPLIANCE_FAILED).astype(np.int64),
+        partial=group_count(codes, size, compliance == COMPLIANCE_PARTIAL).astype(np.int64),
+        scored=group_count(codes, size, facts.has_risk[rows]).astype(np.int64),
+        risk_sum=group_count(codes, size, facts.risk[rows]),
+        duration_sum=group_count(codes, size, facts.duration[rows]),
+        last_started=last_started,
+        flag_counts=group_sum(codes, size, facts.flag_matrix(rows)) if flags else None,
+        flag_names=facts.flag_names,
+    )
@@ -0,0 +1,606 @@
+# pyright: basic
+"""Per-org columnar call facts shared by the dashboard and analytics routes.
+
+Each org's calls are loaded once (keyset pages, no transcripts) into
+NumPy columns: status and compliance codes, risk score, employee /
+department / campaign / caller ids, timestamps, day index, duration and
+a flag bitset. The org's employees, campaigns and callers are cached
+alongside. Writes made through :mod:`app.db.queries` are applied as they
+happen via a write listener, so routes answer from memory. Calls written
+by other processes (e.g. a standalone job worker evaluating them) are
+polled for by ``updated_at`` every few seconds and upserted; a TTL
+reload picks up their other writes (employees, campaigns, callers,
+deletes).
+
+Routes take an immutable :class:`CallFacts` snapshot and aggregate it
+with vectorised operations.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock, RLock
+from typing import Any
+
+import numpy as np
+
+from app.config import settings
+from app.db import queries
+
+LOGGER = logging.getLogger(__name__)
+
+# Flags that indicate the employee responded correctly
+POSITIVE_FLAGS = {
+    "Proper Verification",
+    "Asked Questions",
+    "Immediate Rejection",
+    "Proper Protocol",
+    "Requested Verification",
+}
+
+COMPLIANCE_NONE = 0
+COMPLIANCE_PASSED = 1
+COMPLIANCE_FAILED = 2
+COMPLIANCE_PARTIAL = 3
+_COMPLIANCE_CODES = {
+    "passed": COMPLIANCE_PASSED,
+    "failed": COMPLIANCE_FAILED,
+    "partial": COMPLIANCE_PARTIAL,
+}
+
+DAY_S = 86400
+NO_DAY = -1
+
+FACT_COLUMNS = (
+    "id,org_id,status,employee_id,campaign_id,caller_id,risk_score,"
+    "employee_compliance,flags,started_at,created_at,duration_seconds"
+)
+_LOAD_PAGE = 1000
+# Calls changed by other processes are fetched in one page; more than this
+# since the last poll and the org is reloaded instead
+_SYNC_PAGE = 1000
+# Re-read changes this far behind the watermark: updated_at is stamped at
+# transaction start, so a slow transaction can commit an older timestamp
+# after a newer one was seen (and clocks may differ)
+_SYNC_OVERLAP_S = 30.0
+_INITIAL_CAPACITY = 256
+
+
+def normalize_flags(flags_raw: Any) -> list[str]:
+    """Normalize flags from DB — handles both string lists and dict lists."""
+    if isinstance(flags_raw, str):
+        try:
+            flags_raw = json.loads(flags_raw)
+        except ValueError:
+            flags_raw = [flags_raw]
+    if not flags_raw:
+        return []
+    result = []
+    for f in flags_raw:
+        if isinstance(f, str):
+            result.append(f)
+        elif isinstance(f, dict):
+            result.append(f.get("type", str(f)))
+        else:
+            result.append(str(f))
+    return result
+
+
+def _parse_ts(value: Any) -> float:
+    if not value:
+        return math.nan
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return math.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def day_index(day) -> int:
+    """Days since the epoch for a ``date``."""
+    return (day - datetime(1970, 1, 1, tzinfo=timezone.utc).date()).days
+
+
+def format_ts(ts: float) -> str:
+    if math.isnan(ts):
+        return ""
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def group_count(codes: np.ndarray, size: int, weights: np.ndarray | None = None) -> np.ndarray:
+    """Per-code count (or weight sum); rows with code -1 are skipped."""
+    keep = codes >= 0
+    return np.bincount(
+        codes[keep],
+        weights=None if weights is None else weights[keep],
+        minlength=size,
+    )[:size]
+
+
+def group_sum(codes: np.ndarray, size: int, matrix: np.ndarray) -> np.ndarray:
+    """Per-code column sums of ``matrix`` (rows × cols) → (size × cols)."""
+    out = np.zeros((size, matrix.shape[1]), dtype=np.int64)
+    keep = codes >= 0
+    codes, matrix = codes[keep], matrix[keep]
+    if codes.size == 0 or matrix.shape[1] == 0:
+        return out
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    out[codes[starts]] = np.add.reduceat(matrix[order].astype(np.int64), starts, axis=0)
+    return out
+
+
+def recent_first(codes: np.ndarray, ts: np.ndarray) -> list[int]:
+    """Distinct codes, ordered by their most recent row (newest first)."""
+    order = np.argsort(-np.nan_to_num(ts, nan=-np.inf), kind="stable")
+    ordered = codes[order]
+    ordered = ordered[ordered >= 0]
+    distinct, first = np.unique(ordered, return_index=True)
+    return [int(c) for c in distinct[np.argsort(first)]]
+
+
+def relabel(
+    codes: np.ndarray, names: list[str], labels: dict[str, Any], default: str
+) -> tuple[np.ndarray, list[str]]:
+    """Map codes over ``names`` to codes over ``labels[name]``.
+
+    Used to turn e.g. campaign codes into attack-vector codes; unknown
+    names and missing rows (-1) get ``default``.
+    """
+    vocab = _Vocab()
+    mapping = np.array(
+        [vocab.code(labels.get(name) or default) for name in names] + [vocab.code(default)],
+        dtype=np.int32,
+    )
+    return mapping[codes], vocab.names
+
+
+class _Vocab:
+    """Interns strings to dense int codes (-1 for missing)."""
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def code(self, name: str | None) -> int:
+        if not name:
+            return -1
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self._codes[name] = code
+            self.names.append(name)
+        return code
+
+    def get(self, name: str | None) -> int:
+        return self._codes.get(name, -1) if name else -1
+
+
+@dataclass(frozen=True)
+class CallFacts:
+    """Immutable columnar snapshot of one org's calls (row i = one call)."""
+
+    call_ids: list[str]
+    status: np.ndarray  # int16 code into ``statuses``
+    compliance: np.ndarray  # int8 COMPLIANCE_*
+    risk: np.ndarray  # int16, 0 where unset
+    has_risk: np.ndarray  # bool
+    employee: np.ndarray  # int32 code into ``employee_ids``
+    department: np.ndarray  # int32 code into ``departments``
+    campaign: np.ndarray  # int32 code into ``campaign_ids``
+    caller: np.ndarray  # int32 code into ``caller_ids``
+    ts: np.ndarray  # float64 epoch of started_at or created_at (nan if neither)
+    started_ts: np.ndarray  # float64 epoch of started_at (nan if unset)
+    day: np.ndarray  # int32 days since epoch of ``ts`` (NO_DAY if unknown)
+    duration: np.ndarray  # int32 seconds
+    flags: np.ndarray  # uint64 (rows, words) bitset over ``flag_names``
+    statuses: list[str]
+    employee_ids: list[str]
+    departments: list[str]
+    campaign_ids: list[str]
+    caller_ids: list[str]
+    flag_names: list[str]
+
+    @property
+    def size(self) -> int:
+        return len(self.call_ids)
+
+    @property
+    def completed(self) -> np.ndarray:
+        try:
+            code = self.statuses.index("completed")
+        except ValueError:
+            return np.zeros(self.size, dtype=bool)
+        return self.status == code
+
+    def flag_matrix(self, rows: np.ndarray | None = None) -> np.ndarray:
+        """Bool matrix (rows × flags) of which calls carry which flag."""
+        words = self.flags if rows is None else self.flags[rows]
+        if words.shape[1] == 0:
+            return np.zeros((words.shape[0], 0), dtype=bool)
+        bits = np.unpackbits(
+            np.ascontiguousarray(words).view(np.uint8), axis=1, bitorder="little"
+        )
+        return bits[:, : len(self.flag_names)].astype(bool)
+
+    def flag_counts(self, rows: np.ndarray | None = None) -> Counter[str]:
+        """How many of the selected calls carry each flag."""
+        counts = self.flag_matrix(rows).sum(axis=0)
+        return Counter({self.flag_names[i]: int(counts[i]) for i in np.flatnonzero(counts)})
+
+    def row_flags(self, row: int) -> list[str]:
+        return [self.flag_names[i] for i in np.flatnonzero(self.flag_matrix(np.array([row]))[0])]
+
+
+class OrgAnalytics:
+    """Mutable store for one org; all access under ``lock``."""
+
+    def __init__(self, org_id: str):
+        self.org_id = org_id
+        self.lock = RLock()
+        self.loaded_at = 0.0
+        # Epoch up to which other processes' call writes have been applied
+        self.synced_to = 0.0
+        self.synced_at = 0.0
+        # Bumped on every change, for response cache versions
+        self.version = 0
+        self.employees: list[dict] = []
+        self.campaigns: list[dict] = []
+        self.callers: list[dict] = []
+        self._index: dict[str, int] = {}
+        self._call_ids: list[str] = []
+        self._statuses = _Vocab()
+        self._employee_ids = _Vocab()
+        self._departments = _Vocab()
+        self._campaign_ids = _Vocab()
+        self._caller_ids = _Vocab()
+        self._flag_names = _Vocab()
+        self._emp_dept: dict[str, str] = {}
+        self._updated_at: dict[str, str] = {}
+        self._allocate(_INITIAL_CAPACITY, words=1)
+
+    # ── Storage ──
+
+    def _allocate(self, capacity: int, words: int) -> None:
+        self._cols = {
+            "status": np.zeros(capacity, dtype=np.int16),
+            "compliance": np.zeros(capacity, dtype=np.int8),
+            "risk": np.zeros(capacity, dtype=np.int16),
+            "has_risk": np.zeros(capacity, dtype=bool),
+            "employee": np.full(capacity, -1, dtype=np.int32),
+            "department": np.full(capacity, -1, dtype=np.int32),
+            "campaign": np.full(capacity, -1, dtype=np.int32),
+            "caller": np.full(capacity, -1, dtype=np.int32),
+            "ts": np.full(capacity, np.nan, dtype=np.float64),
+            "started_ts": np.full(capacity, np.nan, dtype=np.float64),
+            "day": np.full(capacity, NO_DAY, dtype=np.int32),
+            "duration": np.zeros(capacity, dtype=np.int32),
+        }
+        self._flags = np.zeros((capacity, words), dtype=np.uint64)
+
+    def _grow(self, rows: int, words: int) -> None:
+        capacity = self._flags.shape[0]
+        if rows <= capacity and words <= self._flags.shape[1]:
+            return
+        n = len(self._call_ids)
+        old_cols, old_flags = self._cols, self._flags
+        new_capacity = capacity
+        while new_capacity < rows:
+            new_capacity *= 2
+        self._allocate(new_capacity, max(words, old_flags.shape[1]))
+        for name, column in old_cols.items():
+            self._cols[name][:n] = column[:n]
+        self._flags[:n, : old_flags.shape[1]] = old_flags[:n]
+
+    def _department_code(self, employee_id: str | None) -> int:
+        return self._departments.code(self._emp_dept.get(employee_id or "", "Other"))
+
+    def _write_row(self, i: int, row: dict) -> None:
+        cols = self._cols
+        cols["status"][i] = max(self._statuses.code(row.get("status") or "unknown"), 0)
+        cols["compliance"][i] = _COMPLIANCE_CODES.get(
+            row.get("employee_compliance") or "", COMPLIANCE_NONE
+        )
+        risk = row.get("risk_score")
+        cols["has_risk"][i] = risk is not None
+        cols["risk"][i] = int(risk or 0)
+        cols["employee"][i] = self._employee_ids.code(row.get("employee_id"))
+        cols["department"][i] = self._department_code(row.get("employee_id"))
+        cols["campaign"][i] = self._campaign_ids.code(row.get("campaign_id"))
+        cols["caller"][i] = self._caller_ids.code(row.get("caller_id"))
+        ts = _parse_ts(row.get("started_at") or row.get("created_at"))
+        cols["ts"][i] = ts
+        cols["started_ts"][i] = _parse_ts(row.get("started_at"))
+        cols["day"][i] = NO_DAY if math.isnan(ts) else int(ts // DAY_S)
+        cols["duration"][i] = int(row.get("duration_seconds") or 0)
+
+        codes = [self._flag_names.code(f) for f in normalize_flags(row.get("flags"))]
+        self._grow(len(self._call_ids), len(self._flag_names.names) // 64 + 1)
+        self._flags[i] = 0
+        for code in codes:
+            if code >= 0:
+                self._flags[i, code // 64] |= np.uint64(1) << np.uint64(code % 64)
+
+    def upsert(self, row: dict) -> None:
+        call_id = row.get("id")
+        if not call_id:
+            return
+        updated_at = row.get("updated_at")
+        with self.lock:
+            i = self._index.get(call_id)
+            if i is None:
+                i = len(self._call_ids)
+                self._grow(i + 1, self._flags.shape[1])
+                self._index[call_id] = i
+                self._call_ids.append(call_id)
+            elif updated_at and self._updated_at.get(call_id) == updated_at:
+                return  # already applied (a re-polled row)
+            if updated_at:
+                self._updated_at[call_id] = updated_at
+            self._write_row(i, row)
+            self.version += 1
+
+    def set_dimensions(
+        self, employees: list[dict], campaigns: list[dict], callers: list[dict]
+    ) -> None:
+        with self.lock:
+            self.employees = employees
+            self.campaigns = campaigns
+            self.callers = callers
+            self.version += 1
+            self._emp_dept = {e["id"]: e.get("department") or "Other" for e in employees}
+            # Departments come from the employee, so re-derive the column
+            n = len(self._call_ids)
+            dept_of_employee = np.array(
+                [self._department_code(eid) for eid in self._employee_ids.names] + [0],
+                dtype=np.int32,
+            )
+            other = self._departments.code("Other")
+            employee = self._cols["employee"][:n]
+            self._cols["department"][:n] = np.where(
+                employee >= 0, dept_of_employee[employee], other
+            )
+
+    def apply_dimension(self, table: str, op: str, row: dict) -> None:
+        """Apply one employee, campaign or caller write to the cached list."""
+        row_id = row.get("id")
+        if not row_id:
+            return
+        with self.lock:
+            # A new list each time, so lists already handed out don't change
+            current: list[dict] = getattr(self, table)
+            rows = [r for r in current if r.get("id") != row_id]
+            if op != "delete":
+                previous = next((r for r in current if r.get("id") == row_id), None)
+                if previous is None:
+                    rows.insert(0, row)  # newest first, like the list queries
+                else:
+                    rows.insert(current.index(previous), {**previous, **row})
+            setattr(self, table, rows)
+            self.version += 1
+            if table != "employees":
+                return
+            if op == "delete":
+                self._emp_dept.pop(row_id, None)
+            elif op == "insert" or "department" in row:
+                self._emp_dept[row_id] = row.get("department") or "Other"
+            code = self._employee_ids.get(row_id)
+            if code >= 0:
+                n = len(self._call_ids)
+                department = self._cols["department"][:n]
+                department[self._cols["employee"][:n] == code] = self._department_code(row_id)
+
+    def snapshot(self) -> CallFacts:
+        with self.lock:
+            n = len(self._call_ids)
+            cols = {name: column[:n].copy() for name, column in self._cols.items()}
+            return CallFacts(
+                call_ids=list(self._call_ids),
+                flags=self._flags[:n].copy(),
+                statuses=list(self._statuses.names),
+                employee_ids=list(self._employee_ids.names),
+                departments=list(self._departments.names),
+                campaign_ids=list(self._campaign_ids.names),
+                caller_ids=list(self._caller_ids.names),
+                flag_names=list(self._flag_names.names),
+                **cols,
+            )
+
+
+class AnalyticsStore:
+    """Process-wide map of org → :class:`OrgAnalytics`, loaded lazily."""
+
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+        self._orgs: dict[str, OrgAnalytics] = {}
+        self._lock = RLock()
+        # One loader per org; writes that arrive meanwhile are replayed after
+        self._load_locks: dict[str, Lock] = {}
+        self._pending: dict[str, list[tuple[str, str, dict]]] = {}
+
+    def _load(self, org_id: str) -> OrgAnalytics:
+        started = time.monotonic()
+        org = OrgAnalytics(org_id)
+        # Changes made from here on may be missed by the pages below
+        org.synced_to = time.time()
+        org.set_dimensions(
+            queries.list_employees(org_id, active_only=False),
+            queries.list_campaigns(org_id),
+            queries.list_callers(org_id, active_only=False),
+        )
+        after: tuple[str, str] | None = None
+        while True:
+            page = queries.list_calls_page(
+                columns=FACT_COLUMNS, org_id=org_id, after=after, limit=_LOAD_PAGE
+            )
+            for row in page:
+                org.upsert(row)
+            if len(page) < _LOAD_PAGE:
+                break
+            after = (page[-1]["created_at"], page[-1]["id"])
+        org.loaded_at = org.synced_at = time.monotonic()
+        LOGGER.info(
+            "Loaded analytics for org %s: %d calls in %.0f ms",
+            org_id,
+            len(org._call_ids),
+            (org.loaded_at - started) * 1000,
+        )
+        return org
+
+    def _current(self, org_id: str) -> OrgAnalytics | None:
+        """The org's store if it needs neither a reload nor a sync."""
+        org = self._orgs.get(org_id)
+        now = time.monotonic()
+        if (
+            org is None
+            or now - org.loaded_at > self.ttl_s
+            or now - org.synced_at > settings.analytics_sync_interval_s
+        ):
+            return None
+        return org
+
+    def _sync(self, org: OrgAnalytics) -> bool:
+        """Apply calls other processes changed since the last load or sync;
+        False when too many changed and the org should be reloaded."""
+        since = datetime.fromtimestamp(org.synced_to - _SYNC_OVERLAP_S, timezone.utc)
+        rows = queries.list_calls_updated_since(
+            org.org_id,
+            since.isoformat(),
+            columns=f"{FACT_COLUMNS},updated_at",
+            limit=_SYNC_PAGE,
+        )
+        if len(rows) >= _SYNC_PAGE:
+            return False
+        for row in rows:
+            org.upsert(row)
+            updated = _parse_ts(row.get("updated_at"))
+            if updated > org.synced_to:
+                org.synced_to = updated
+        org.synced_at = time.monotonic()
+        return True
+
+    def org(self, org_id: str) -> OrgAnalytics:
+        """The org's store: loaded (blocking) when missing or past the TTL,
+        otherwise brought up to date with other processes' call writes at
+        most every ``analytics_sync_interval_s``.
+
+        Loads of different orgs run in parallel; async callers should use
+        :meth:`org_async`.
+        """
+        with self._lock:
+            org = self._current(org_id)
+            if org is not None:
+                return org
+            load_lock = self._load_locks.setdefault(org_id, Lock())
+        with load_lock:
+            with self._lock:
+                org = self._current(org_id)
+                if org is not None:
+                    return org  # loaded or synced while we waited
+                org = self._orgs.get(org_id)
+                if org is not None and time.monotonic() - org.loaded_at > self.ttl_s:
+                    org = None
+            if org is not None:
+                try:
+                    if self._sync(org):
+                        return org
+                except Exception:
+                    LOGGER.warning("Analytics sync failed for org %s", org_id, exc_info=True)
+                    return org
+            with self._lock:
+                self._pending[org_id] = []
+            try:
+                org = self._load(org_id)
+            except BaseException:
+                with self._lock:
+                    self._pending.pop(org_id, None)
+                raise
+            with self._lock:
+                for table, op, row in self._pending.pop(org_id, []):
+                    self._apply(org, table, op, row)
+                self._orgs[org_id] = org
+            return org
+
+    def facts(self, org_id: str) -> CallFacts:
+        return self.org(org_id).snapshot()
+
+    async def org_async(self, org_id: str) -> OrgAnalytics:
+        """:meth:`org` without blocking the event loop on a load."""
+        with self._lock:
+            org = self._current(org_id)
+        return org if org is not None else await asyncio.to_thread(self.org, org_id)
+
+    async def facts_async(self, org_id: str) -> CallFacts:
+        return (await self.org_async(org_id)).snapshot()
+
+    async def version_async(self, org_id: str) -> str | None:
+        """A token that changes whenever the org's facts do, after bringing
+        them up to date; None when the org isn't loaded."""
+        with self._lock:
+            if org_id not in self._orgs:
+                return None
+        org = await self.org_async(org_id)
+        with org.lock:
+            return f"{org.loaded_at:.6f}.{org.version}"
+
+    def invalidate(self, org_id: str | None = None) -> None:
+        with self._lock:
+            if org_id is None:
+                self._orgs.clear()
+            else:
+                self._orgs.pop(org_id, None)
+
+    @staticmethod
+    def _apply(org: OrgAnalytics, table: str, op: str, row: dict) -> None:
+        if table == "calls":
+            if op != "delete":
+                org.upsert(row)
+        else:
+            org.apply_dimension(table, op, row)
+
+    def on_write(self, table: str, op: str, row: dict) -> None:
+        """:func:`queries.register_write_listener` callback."""
+        if table not in ("calls", "employees", "campaigns", "callers"):
+            return
+        org_id = row.get("org_id")
+        with self._lock:
+            if org_id in self._pending:
+                self._pending[org_id].append((table, op, row))
+                return
+            if org_id:
+                targets = [self._orgs[org_id]] if org_id in self._orgs else []
+            elif table != "calls" and op == "delete":
+                # Deletes carry only the id; removing it is a no-op elsewhere
+                targets = list(self._orgs.values())
+                for pending in self._pending.values():
+                    pending.append((table, op, row))
+            else:
+                targets = None
+        if targets is None:
+            # Can't tell which org changed
+            self.invalidate()
+            return
+        for org in targets:
+            self._apply(org, table, op, row)
+
+
+_store_instance: AnalyticsStore | None = None
+
+
+def get_analytics_store() -> AnalyticsStore:
+    global _store_instance
+
+    if _store_instance is None:
+        _store_instance = AnalyticsStore(settings.analytics_store_ttl_s)
+        queries.register_write_listener(_store_instance.on_write)
+    return _store_instance
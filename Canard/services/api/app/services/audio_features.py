@@ -1,15 +1,21 @@
 # pyright: basic
 from __future__ import annotations
 
+import asyncio
 import io
 import logging
+import math
+import os
 import re
 import statistics
-from dataclasses import dataclass, field
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
 
-import httpx
+import numpy as np
 
-from app.config import settings
+from app.services.process_pool import run_in_process
+from app.services.recording_cache import fetch_recording
 
 LOGGER = logging.getLogger(__name__)
 
@@ -109,6 +115,22 @@ class AudioFeatures:
 
         return "\n".join(lines)
 
+    def add_transcript_features(self, transcript: str) -> None:
+        """Fill the disfluency and tone-marker fields from transcript text."""
+        _transcript_features(self, transcript)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> AudioFeatures:
+        known = {f.name for f in fields(cls)}
+        features = cls(**{k: v for k, v in data.items() if k in known})
+        features.silence_segments = [
+            (int(start), int(end)) for start, end in features.silence_segments
+        ]
+        return features
+
 
 def _categorize_marker(marker: str) -> str:
     """Return the category for a tone marker, or 'other'.
@@ -162,41 +184,519 @@ def extract_tone_markers(transcript: str) -> dict[str, list[str]]:
 
 
 async def download_recording(url: str) -> bytes:
-    """Download a Twilio recording using basic auth."""
-    # Twilio recordings require AccountSid:AuthToken basic auth
-    auth = (settings.twilio_account_sid, settings.twilio_auth_token)
+    """Download a Twilio recording (basic auth) through the recording cache."""
+    path = await fetch_recording(url)
+    return await asyncio.to_thread(path.read_bytes)
+
+
+def _transcript_features(features: AudioFeatures, transcript: str) -> None:
+    if not transcript:
+        return
+
+    # ── Disfluency detection (from transcript) ──
+    matches = _DISFLUENCY_PATTERN.findall(transcript)
+    features.disfluency_count = len(matches)
+    features.disfluency_words = [m.lower().rstrip(",") for m in matches]
+
+    # ── Behavioral / tone marker extraction (from transcript annotations) ──
+    markers = extract_tone_markers(transcript)
+    features.tone_markers = markers["tone_markers"]
+    features.stress_indicators = markers["stress"]
+    features.compliance_signals = markers["compliance"]
+    features.resistance_signals = markers["resistance"]
+    features.pause_markers = markers["pause"]
+    features.emotion_markers = markers["emotion"]
+
+
+def _response_latencies(
+    features: AudioFeatures, turn_timestamps: list[dict] | None
+) -> None:
+    if not turn_timestamps or len(turn_timestamps) < 2:
+        return
+    latencies: list[float] = []
+    for i in range(1, len(turn_timestamps)):
+        prev = turn_timestamps[i - 1]
+        curr = turn_timestamps[i]
+        prev_end = prev.get("ended_at_ms")
+        curr_start = curr.get("started_at_ms")
+        if prev_end is not None and curr_start is not None:
+            latency = curr_start - prev_end
+            if latency >= 0:
+                latencies.append(latency)
+    features.response_latencies_ms = latencies
+    features.avg_response_latency_ms = (
+        statistics.mean(latencies) if latencies else 0.0
+    )
+
+
+def _silence_summary(
+    features: AudioFeatures, silence_ranges: list[list[int]]
+) -> None:
+    features.silence_segments = silence_ranges
+    total_silence_ms = sum(end - start for start, end in silence_ranges)
+    features.total_silence_seconds = total_silence_ms / 1000.0
+    features.silence_ratio = (
+        features.total_silence_seconds / features.duration_seconds
+        if features.duration_seconds > 0
+        else 0.0
+    )
+    features.long_pauses_count = sum(
+        1 for start, end in silence_ranges if (end - start) >= _LONG_PAUSE_THRESHOLD_MS
+    )
+    features.avg_silence_duration_ms = (
+        total_silence_ms / len(silence_ranges) if silence_ranges else 0.0
+    )
+
+
+def _loudness_summary(features: AudioFeatures, loudness_values: list[float]) -> None:
+    # Digitally silent chunks are -inf dBFS and would poison mean/stdev
+    loudness_values = [v for v in loudness_values if math.isfinite(v)]
+    if loudness_values:
+        features.loudness_mean_dbfs = statistics.mean(loudness_values)
+        features.loudness_std_dbfs = (
+            statistics.stdev(loudness_values) if len(loudness_values) > 1 else 0.0
+        )
+
+
+# ---------------------------------------------------------------------------
+# Vectorized PCM path
+# ---------------------------------------------------------------------------
+
+# Frames processed per block when summing energy, bounds peak memory
+_ENERGY_BLOCK_MS = 10_000
+
+
+@dataclass
+class _PcmLayout:
+    channels: int
+    sample_width: int
+    frame_rate: int
+    data_offset: int
+    data_length: int
+
+
+def _parse_wav_layout(
+    header: bytes | memoryview, total_size: int | None = None
+) -> _PcmLayout | None:
+    """Locate the PCM data chunk of a RIFF/WAVE file.
+
+    ``header`` may be just the start of the file when ``total_size`` gives
+    the full length.
+
+    Returns None for anything the vectorized path can't read directly
+    (compressed formats, 24-bit samples, truncated headers).
+    """
+    view = memoryview(header)
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        return None
+
+    fmt: tuple[int, int, int, int] | None = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos : pos + 4])
+        chunk_size = int.from_bytes(view[pos + 4 : pos + 8], "little")
+        body = pos + 8
+        if chunk_id == b"fmt " and body + 16 <= len(view):
+            fmt = (
+                int.from_bytes(view[body : body + 2], "little"),  # format tag
+                int.from_bytes(view[body + 2 : body + 4], "little"),  # channels
+                int.from_bytes(view[body + 4 : body + 8], "little"),  # frame rate
+                int.from_bytes(view[body + 14 : body + 16], "little"),  # bits
+            )
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, frame_rate, bits = fmt
+            # 1 = PCM, 0xFFFE = WAVE_FORMAT_EXTENSIBLE (PCM subformat in practice)
+            if format_tag not in (1, 0xFFFE) or bits not in (8, 16, 32):
+                return None
+            if channels < 1 or frame_rate < 1:
+                return None
+            sample_width = bits // 8
+            frame_width = channels * sample_width
+            available = (total_size if total_size is not None else len(view)) - body
+            # Streamed WAVs sometimes carry a 0/0xFFFFFFFF placeholder size
+            length = chunk_size if 0 < chunk_size <= available else available
+            length -= length % frame_width
+            return _PcmLayout(channels, sample_width, frame_rate, body, length)
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _pcm_frames(source: bytes | str | Path) -> tuple[np.ndarray, _PcmLayout] | None:
+    """Return a (frames, channels) int view of the PCM samples without copying.
+
+    File paths are memory-mapped so long recordings are paged in lazily.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as fh:
+            layout = _parse_wav_layout(fh.read(64 * 1024), os.fstat(fh.fileno()).st_size)
+        if layout is None:
+            return None
+        raw = np.memmap(
+            source,
+            dtype=np.uint8,
+            mode="r",
+            offset=layout.data_offset,
+            shape=(layout.data_length,),
+        )
+    else:
+        layout = _parse_wav_layout(source)
+        if layout is None:
+            return None
+        raw = np.frombuffer(
+            source, dtype=np.uint8, count=layout.data_length, offset=layout.data_offset
+        )
+
+    dtype = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}[layout.sample_width]
+    samples = raw.view(dtype).reshape(-1, layout.channels)
+    return samples, layout
 
-    # Ensure we request the audio file (append .wav if no extension)
-    download_url = url
-    if not url.endswith((".wav", ".mp3")):
-        download_url = f"{url}.wav"
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.get(download_url, auth=auth, follow_redirects=True)
-        response.raise_for_status()
-        return response.content
+def _cumulative_ms_energy(
+    samples: np.ndarray, layout: _PcmLayout, bounds: np.ndarray
+) -> np.ndarray:
+    """Sum of squared samples before each millisecond boundary.
+
+    ``bounds[k]`` is the frame index of millisecond ``k`` (pydub's
+    ``int(k * frame_rate / 1000)``), clipped to the available frames.
+    Integer accumulation keeps the sums exact.
+    """
+    n_frames = samples.shape[0]
+    clipped = np.minimum(bounds, n_frames)
+    ms_energy = np.zeros(len(bounds) - 1, dtype=np.int64)
+    for k0 in range(0, len(bounds) - 1, _ENERGY_BLOCK_MS):
+        k1 = min(k0 + _ENERGY_BLOCK_MS, len(bounds) - 1)
+        f0, f1 = int(clipped[k0]), int(clipped[k1])
+        block = samples[f0:f1].astype(np.int64)
+        if layout.sample_width == 1:
+            block -= 128  # 8-bit WAV is unsigned; pydub re-biases it to signed
+        energy = np.square(block).sum(axis=1)
+        cumulative = np.concatenate(([0], np.cumsum(energy)))
+        local = clipped[k0 : k1 + 1] - f0
+        ms_energy[k0:k1] = cumulative[local[1:]] - cumulative[local[:-1]]
+    return np.concatenate(([0], np.cumsum(ms_energy)))
+
+
+def _window_rms(
+    cumulative: np.ndarray, bounds: np.ndarray, starts: np.ndarray, ends: np.ndarray, channels: int
+) -> np.ndarray:
+    """Integer RMS over [start_ms, end_ms) windows, matching ``audioop.rms``.
+
+    Frames past the end of the data count as zero-padding, as pydub pads
+    slices that run a frame or two over.
+    """
+    totals = (cumulative[ends] - cumulative[starts]).astype(np.float64)
+    counts = ((bounds[ends] - bounds[starts]) * channels).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rms = np.floor(np.sqrt(totals / counts))
+    return np.where(counts > 0, rms, 0.0)
+
+
+def _detect_silence_vectorized(
+    cumulative: np.ndarray, bounds: np.ndarray, len_ms: int, layout: _PcmLayout
+) -> list[list[int]]:
+    """pydub ``detect_silence`` (seek_step=1) over precomputed energy sums."""
+    if len_ms < _MIN_SILENCE_MS:
+        return []
+    starts = np.arange(0, len_ms - _MIN_SILENCE_MS + 1)
+    rms = _window_rms(cumulative, bounds, starts, starts + _MIN_SILENCE_MS, layout.channels)
+    max_amplitude = (2 ** (layout.sample_width * 8)) / 2
+    threshold = (10 ** (_SILENCE_THRESH_DBFS / 20)) * max_amplitude
+    silent = np.flatnonzero(rms <= threshold)
+    if silent.size == 0:
+        return []
+
+    # A new range starts only where the next silent window begins beyond
+    # the end of the previous one; overlapping windows merge.
+    breaks = np.flatnonzero(np.diff(silent) > _MIN_SILENCE_MS)
+    range_starts = np.concatenate(([silent[0]], silent[breaks + 1]))
+    range_ends = np.concatenate((silent[breaks], [silent[-1]])) + _MIN_SILENCE_MS
+    return [[int(a), int(b)] for a, b in zip(range_starts, range_ends)]
+
+
+def _loudness_vectorized(
+    cumulative: np.ndarray, bounds: np.ndarray, len_ms: int, layout: _PcmLayout
+) -> list[float]:
+    """Per-second dBFS, skipping trailing chunks of 100 ms or less."""
+    starts = np.arange(0, len_ms, 1000)
+    if starts.size == 0:
+        return []
+    ends = np.minimum(starts + 1000, len_ms)
+    frames = bounds[ends] - bounds[starts]
+    chunk_ms = [round(1000 * (int(f) / layout.frame_rate)) for f in frames]
+    rms = _window_rms(cumulative, bounds, starts, ends, layout.channels)
+    max_amplitude = (2 ** (layout.sample_width * 8)) / 2
+    values: list[float] = []
+    for length, value in zip(chunk_ms, rms):
+        if length <= 100:
+            continue
+        # Same arithmetic as pydub's ratio_to_db so results match exactly
+        values.append(
+            20 * math.log(int(value) / max_amplitude, 10) if value else -float("inf")
+        )
+    return values
 
 
 def extract_audio_features(
-    audio_bytes: bytes,
+    audio: bytes | str | Path,
     transcript: str = "",
     turn_timestamps: list[dict] | None = None,
 ) -> AudioFeatures:
-    """Extract audio features from raw audio bytes + transcript text.
+    """Extract audio features from a recording + transcript text.
+
+    PCM WAV input (bytes, or a file path which is memory-mapped) is
+    analysed with vectorized NumPy passes that reproduce pydub's silence
+    and dBFS results exactly. Other formats fall back to pydub.
 
     Args:
-        audio_bytes: WAV or MP3 audio data.
+        audio: WAV or MP3 audio data, or a path to a recording on disk.
         transcript: Full transcript text for disfluency analysis.
         turn_timestamps: List of dicts with ``started_at_ms`` and ``ended_at_ms``
             for response latency calculation.
     """
+    pcm = _pcm_frames(audio)
+    if pcm is None:
+        audio_bytes = audio if isinstance(audio, bytes) else Path(audio).read_bytes()
+        return extract_audio_features_pydub(audio_bytes, transcript, turn_timestamps)
+
+    samples, layout = pcm
+    features = AudioFeatures()
+    n_frames = samples.shape[0]
+    len_ms = round(1000 * (n_frames / layout.frame_rate))
+    features.duration_seconds = len_ms / 1000.0
+
+    bounds = (np.arange(len_ms + 1) * (layout.frame_rate / 1000.0)).astype(np.int64)
+    cumulative = _cumulative_ms_energy(samples, layout, bounds)
+
+    _silence_summary(features, _detect_silence_vectorized(cumulative, bounds, len_ms, layout))
+    _loudness_summary(features, _loudness_vectorized(cumulative, bounds, len_ms, layout))
+    _transcript_features(features, transcript)
+    _response_latencies(features, turn_timestamps)
+    return features
+
+
+async def extract_audio_features_async(
+    audio: bytes | str | Path,
+    transcript: str = "",
+    turn_timestamps: list[dict] | None = None,
+) -> AudioFeatures:
+    """Run :func:`extract_audio_features` in the shared process pool."""
+    return await run_in_process(extract_audio_features, audio, transcript, turn_timestamps)
+
+
+# ---------------------------------------------------------------------------
+# Live accumulator (Twilio media stream)
+# ---------------------------------------------------------------------------
+
+_LIVE_SAMPLE_RATE = 8000
+# Voiced inbound audio needed before it counts as the callee responding;
+# shorter blips are usually line clicks or breathing
+_ONSET_MIN_MS = 60
+
+
+def _ulaw_decode_table() -> np.ndarray:
+    """G.711 µ-law → linear PCM16 lookup, identical to ``audioop.ulaw2lin``."""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return np.where(u & 0x80, -magnitude, magnitude).astype(np.int64)
+
+
+_ULAW_TO_PCM16 = _ulaw_decode_table()
+
+
+def decode_ulaw(payload: bytes) -> np.ndarray:
+    """Decode 8-bit µ-law samples to linear PCM16 values (as int64)."""
+    return _ULAW_TO_PCM16[np.frombuffer(payload, dtype=np.uint8)]
+
+
+@dataclass
+class _LiveFrame:
+    start_ms: int
+    end_ms: int
+    energy: int
+    samples: int
+    agent_speaking: bool
+
+
+class LiveAudioFeatureAccumulator:
+    """Incremental :class:`AudioFeatures` built from inbound µ-law frames.
+
+    Fed frame by frame from the Twilio media stream so evaluation doesn't
+    have to download the recording after hangup. Silence and loudness use
+    the same thresholds as the recording-based extractor, evaluated per
+    frame rather than per millisecond. Spans where the agent is playing
+    back audio count as speech, as they would in the mixed recording.
+
+    Response latency for each agent turn runs from the playback ``mark``
+    to the first voiced inbound frame, falling back to the STT commit
+    when the callee never rose above the silence threshold.
+
+    Timestamps are positions in the inbound audio (8 kHz), not wall clock.
+    Accessed only from the event loop — no locking.
+    """
+
+    def __init__(self) -> None:
+        self._samples_total = 0
+        self._window: deque[_LiveFrame] = deque()
+        self._window_energy = 0
+        self._window_samples = 0
+        self._window_agent_frames = 0
+        self._silence_ranges: list[list[int]] = []
+        self._second_energy = 0
+        self._second_samples = 0
+        self._loudness_values: list[float] = []
+        self._agent_was_speaking = False
+        self._awaiting_response_since: int | None = None
+        self._voiced_run_start: int | None = None
+        self._latencies: list[float] = []
+        self._max_amplitude = 2**15
+        self._silence_rms = (10 ** (_SILENCE_THRESH_DBFS / 20)) * self._max_amplitude
+
+    @property
+    def position_ms(self) -> int:
+        return self._samples_total * 1000 // _LIVE_SAMPLE_RATE
+
+    def add_frame(self, payload: bytes, agent_speaking: bool = False) -> None:
+        """Account for one inbound µ-law media payload."""
+        if not payload:
+            return
+        pcm = decode_ulaw(payload)
+        start_ms = self.position_ms
+        self._add_loudness(pcm)
+        self._samples_total += pcm.size
+        end_ms = self.position_ms
+        energy = int(np.dot(pcm, pcm))
+
+        # A new playback started before the callee answered the last one
+        if agent_speaking and not self._agent_was_speaking:
+            self._awaiting_response_since = None
+        self._agent_was_speaking = agent_speaking
+
+        self._track_onset(start_ms, end_ms, energy, pcm.size, agent_speaking)
+        self._track_silence(_LiveFrame(start_ms, end_ms, energy, pcm.size, agent_speaking))
+
+    def mark_agent_finished(self) -> None:
+        """The agent's playback finished (Twilio echoed our ``mark``)."""
+        self._awaiting_response_since = self.position_ms
+        self._voiced_run_start = None
+
+    def note_commit(self) -> None:
+        """STT committed callee speech; closes a turn no voiced frame did."""
+        if self._awaiting_response_since is not None:
+            self._latencies.append(float(self.position_ms - self._awaiting_response_since))
+            self._awaiting_response_since = None
+
+    def _rms(self, energy: int, samples: int) -> float:
+        return math.sqrt(energy / samples) if samples else 0.0
+
+    def _track_onset(
+        self, start_ms: int, end_ms: int, energy: int, samples: int, agent_speaking: bool
+    ) -> None:
+        if self._awaiting_response_since is None:
+            return
+        if agent_speaking or self._rms(energy, samples) <= self._silence_rms:
+            self._voiced_run_start = None
+            return
+        if self._voiced_run_start is None:
+            self._voiced_run_start = start_ms
+        if end_ms - self._voiced_run_start >= _ONSET_MIN_MS:
+            onset = max(self._voiced_run_start, self._awaiting_response_since)
+            self._latencies.append(float(onset - self._awaiting_response_since))
+            self._awaiting_response_since = None
+            self._voiced_run_start = None
+
+    def _track_silence(self, frame: _LiveFrame) -> None:
+        self._window.append(frame)
+        self._window_energy += frame.energy
+        self._window_samples += frame.samples
+        self._window_agent_frames += frame.agent_speaking
+
+        # Keep the shortest run of frames spanning the minimum silence length
+        while (
+            len(self._window) > 1
+            and frame.end_ms - self._window[1].start_ms >= _MIN_SILENCE_MS
+        ):
+            dropped = self._window.popleft()
+            self._window_energy -= dropped.energy
+            self._window_samples -= dropped.samples
+            self._window_agent_frames -= dropped.agent_speaking
+
+        window_start = self._window[0].start_ms
+        if frame.end_ms - window_start < _MIN_SILENCE_MS or self._window_agent_frames:
+            return
+        if self._rms(self._window_energy, self._window_samples) > self._silence_rms:
+            return
+        # Overlapping silent windows merge into one range, as in detect_silence
+        if self._silence_ranges and window_start <= self._silence_ranges[-1][1]:
+            self._silence_ranges[-1][1] = frame.end_ms
+        else:
+            self._silence_ranges.append([window_start, frame.end_ms])
+
+    def _add_loudness(self, pcm: np.ndarray) -> None:
+        offset = 0
+        while offset < pcm.size:
+            room = _LIVE_SAMPLE_RATE - self._second_samples
+            chunk = pcm[offset : offset + room]
+            self._second_energy += int(np.dot(chunk, chunk))
+            self._second_samples += chunk.size
+            offset += chunk.size
+            if self._second_samples == _LIVE_SAMPLE_RATE:
+                self._flush_second()
+
+    def _flush_second(self) -> None:
+        value = self._current_second_dbfs()
+        if value is not None:
+            self._loudness_values.append(value)
+        self._second_energy = 0
+        self._second_samples = 0
+
+    def _current_second_dbfs(self) -> float | None:
+        # Skip very short trailing chunks, as the recording-based path does
+        if self._second_samples * 1000 // _LIVE_SAMPLE_RATE <= 100:
+            return None
+        rms = int(self._rms(self._second_energy, self._second_samples))
+        return 20 * math.log(rms / self._max_amplitude, 10) if rms else -float("inf")
+
+    def finish(self, transcript: str = "") -> AudioFeatures:
+        """Snapshot the features accumulated so far."""
+        features = AudioFeatures()
+        features.duration_seconds = self.position_ms / 1000.0
+        _silence_summary(features, [list(r) for r in self._silence_ranges])
+
+        loudness = list(self._loudness_values)
+        trailing = self._current_second_dbfs()
+        if trailing is not None:
+            loudness.append(trailing)
+        _loudness_summary(features, loudness)
+
+        features.response_latencies_ms = list(self._latencies)
+        features.avg_response_latency_ms = (
+            statistics.mean(self._latencies) if self._latencies else 0.0
+        )
+        _transcript_features(features, transcript)
+        return features
+
+
+def extract_audio_features_pydub(
+    audio_bytes: bytes,
+    transcript: str = "",
+    turn_timestamps: list[dict] | None = None,
+) -> AudioFeatures:
+    """Reference pydub implementation, kept for non-PCM input and benchmarks."""
     from pydub import AudioSegment
     from pydub.silence import detect_silence
 
     features = AudioFeatures()
 
     # ── Load audio ──
-    audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
+    if audio_bytes[:4] == b"RIFF":
+        # pydub parses WAV itself; from_file would shell out to ffmpeg
+        audio = AudioSegment(data=audio_bytes)
+    else:
+        audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
     features.duration_seconds = len(audio) / 1000.0
 
     # ── Silence detection ──
@@ -205,20 +705,7 @@ def extract_audio_features(
         min_silence_len=_MIN_SILENCE_MS,
         silence_thresh=_SILENCE_THRESH_DBFS,
     )
-    features.silence_segments = silence_ranges
-    total_silence_ms = sum(end - start for start, end in silence_ranges)
-    features.total_silence_seconds = total_silence_ms / 1000.0
-    features.silence_ratio = (
-        features.total_silence_seconds / features.duration_seconds
-        if features.duration_seconds > 0
-        else 0.0
-    )
-    features.long_pauses_count = sum(
-        1 for start, end in silence_ranges if (end - start) >= _LONG_PAUSE_THRESHOLD_MS
-    )
-    features.avg_silence_duration_ms = (
-        total_silence_ms / len(silence_ranges) if silence_ranges else 0.0
-    )
+    _silence_summary(features, silence_ranges)
 
     # ── Loudness (per-second chunks) ──
     chunk_ms = 1000
@@ -227,44 +714,8 @@ def extract_audio_features(
         chunk = audio[i : i + chunk_ms]
         if len(chunk) > 100:  # skip very short trailing chunks
             loudness_values.append(chunk.dBFS)
+    _loudness_summary(features, loudness_values)
 
-    if loudness_values:
-        features.loudness_mean_dbfs = statistics.mean(loudness_values)
-        features.loudness_std_dbfs = (
-            statistics.stdev(loudness_values) if len(loudness_values) > 1 else 0.0
-        )
-
-    # ── Disfluency detection (from transcript) ──
-    if transcript:
-        matches = _DISFLUENCY_PATTERN.findall(transcript)
-        features.disfluency_count = len(matches)
-        features.disfluency_words = [m.lower().rstrip(",") for m in matches]
-
-    # ── Behavioral / tone marker extraction (from transcript annotations) ──
-    if transcript:
-        markers = extract_tone_markers(transcript)
-        features.tone_markers = markers["tone_markers"]
-        features.stress_indicators = markers["stress"]
-        features.compliance_signals = markers["compliance"]
-        features.resistance_signals = markers["resistance"]
-        features.pause_markers = markers["pause"]
-        features.emotion_markers = markers["emotion"]
-
-    # ── Response latencies (from turn timestamps) ──
-    if turn_timestamps and len(turn_timestamps) >= 2:
-        latencies: list[float] = []
-        for i in range(1, len(turn_timestamps)):
-            prev = turn_timestamps[i - 1]
-            curr = turn_timestamps[i]
-            prev_end = prev.get("ended_at_ms")
-            curr_start = curr.get("started_at_ms")
-            if prev_end is not None and curr_start is not None:
-                latency = curr_start - prev_end
-                if latency >= 0:
-                    latencies.append(latency)
-        features.response_latencies_ms = latencies
-        features.avg_response_latency_ms = (
-            statistics.mean(latencies) if latencies else 0.0
-        )
-
+    _transcript_features(features, transcript)
+    _response_latencies(features, turn_timestamps)
     return features
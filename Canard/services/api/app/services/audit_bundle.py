@@ -0,0 +1,245 @@
+# pyright: basic, reportMissingImports=false
+"""Stream a campaign's audit reports as one ZIP archive.
+
+Calls are read in keyset pages. For each page, PDFs that were already
+uploaded are downloaded and the rest are rendered in the process pool,
+while the previous page is being written to the client. Entries are
+written with data descriptors (``zipfile`` does this on an unseekable
+sink), so every chunk can be sent as soon as it is produced: memory
+holds at most two pages of PDFs no matter how many calls the campaign
+has. A campaign summary PDF is appended last, built from running
+aggregates collected along the way.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import re
+import zipfile
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+import httpx
+
+from app.config import settings
+from app.db import queries
+from app.services.audit_pdf import (
+    AuditReport,
+    CampaignSummary,
+    _compliance_label,
+    render_audit_pdfs,
+    render_campaign_summary_pdf,
+)
+from app.services.process_pool import run_in_process
+
+LOGGER = logging.getLogger(__name__)
+
+# Calls fetched (and PDFs held) per page
+_PAGE_SIZE = 50
+_DOWNLOAD_CONCURRENCY = 8
+_HIGHEST_RISK_LIMIT = 10
+
+_CALL_COLUMNS = (
+    "id,created_at,started_at,employee_id,risk_score,employee_compliance,"
+    "ai_summary,flags,transcript_json,audit_report_url"
+)
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that hands back what was written."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+@dataclass
+class _SummaryAccumulator:
+    """Running campaign aggregates; O(departments) memory."""
+
+    total: int = 0
+    risk_sum: int = 0
+    compliance: dict[str, int] = field(default_factory=dict)
+    # department → [calls, risk sum]
+    departments: dict[str, list[int]] = field(default_factory=dict)
+    # min-heap of (risk, call id, employee, date) holding the top N
+    highest: list[tuple[int, str, str, str]] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+
+    def add(self, report: AuditReport) -> None:
+        self.total += 1
+        self.risk_sum += report.risk_score
+        label = _compliance_label(report.compliance)
+        self.compliance[label] = self.compliance.get(label, 0) + 1
+        dept = self.departments.setdefault(report.department, [0, 0])
+        dept[0] += 1
+        dept[1] += report.risk_score
+        entry = (report.risk_score, report.call_id, report.employee_name, report.call_date)
+        if len(self.highest) < _HIGHEST_RISK_LIMIT:
+            heapq.heappush(self.highest, entry)
+        else:
+            heapq.heappushpop(self.highest, entry)
+
+    def build(self, campaign: dict) -> CampaignSummary:
+        departments = sorted(
+            (
+                (name, calls, round(risk_sum / calls))
+                for name, (calls, risk_sum) in self.departments.items()
+            ),
+            key=lambda row: (-row[2], row[0]),
+        )
+        return CampaignSummary(
+            campaign_id=campaign["id"],
+            campaign_name=campaign.get("name") or "",
+            attack_vector=campaign.get("attack_vector") or "",
+            started_at=campaign.get("started_at") or "",
+            completed_at=campaign.get("completed_at") or "",
+            total_calls=self.total,
+            avg_risk_score=round(self.risk_sum / self.total) if self.total else 0,
+            compliance_counts=dict(self.compliance),
+            departments=departments,
+            highest_risk=[
+                (employee, risk, date)
+                for risk, _, employee, date in sorted(self.highest, reverse=True)
+            ],
+            missing_reports=list(self.missing),
+        )
+
+
+def _entry_name(report: AuditReport) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", report.employee_name.lower()).strip("-")
+    return f"reports/{slug or 'unknown'}-{report.call_id}.pdf"
+
+
+def _download_url(audit_report_url: str) -> str:
+    # Older storage clients return the signed URL relative to /storage/v1
+    if audit_report_url.startswith("/"):
+        return f"{settings.supabase_url.rstrip('/')}/storage/v1{audit_report_url}"
+    return audit_report_url
+
+
+async def _download_pdf(
+    client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str
+) -> bytes | None:
+    async with semaphore:
+        try:
+            response = await client.get(_download_url(url))
+            response.raise_for_status()
+        except httpx.HTTPError:
+            LOGGER.warning("Could not fetch stored audit PDF %s, re-rendering", url, exc_info=True)
+            return None
+    body = response.content
+    return body if body.startswith(b"%PDF") else None
+
+
+async def _prepare_page(
+    calls: list[dict],
+    employees: dict[str, dict],
+    campaign: dict,
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+) -> list[tuple[AuditReport, bytes | BaseException]]:
+    """Fetch or render the PDFs for one page of calls, in call order."""
+    reports = [
+        AuditReport.from_records(call, employees.get(call.get("employee_id") or ""), campaign)
+        for call in calls
+    ]
+    stored = await asyncio.gather(
+        *(
+            _download_pdf(client, semaphore, call["audit_report_url"])
+            if call.get("audit_report_url")
+            else asyncio.sleep(0, result=None)
+            for call in calls
+        )
+    )
+    to_render = [i for i, pdf in enumerate(stored) if pdf is None]
+    rendered = await render_audit_pdfs([reports[i] for i in to_render])
+
+    results: list[bytes | BaseException] = list(stored)  # type: ignore[arg-type]
+    for i, pdf in zip(to_render, rendered):
+        results[i] = pdf
+    return list(zip(reports, results))
+
+
+async def stream_campaign_audit_bundle(campaign: dict) -> AsyncIterator[bytes]:
+    """Yield the ZIP archive for *campaign* chunk by chunk.
+
+    Only evaluated (``completed``) calls get a report. A report that
+    cannot be fetched or rendered is left out and listed in the summary.
+    """
+    campaign_id = campaign["id"]
+    org_id = campaign.get("org_id") or ""
+    employees = {
+        e["id"]: e
+        for e in await asyncio.to_thread(queries.list_employees, org_id, False)
+    }
+
+    async def fetch_page(after: tuple[str, str] | None) -> list[dict]:
+        return await asyncio.to_thread(
+            queries.list_calls_page,
+            columns=_CALL_COLUMNS,
+            campaign_id=campaign_id,
+            status="completed",
+            after=after,
+            limit=_PAGE_SIZE,
+        )
+
+    sink = _ZipSink()
+    summary = _SummaryAccumulator()
+    semaphore = asyncio.Semaphore(_DOWNLOAD_CONCURRENCY)
+    pending: asyncio.Task | None = None
+
+    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        try:
+            # PDFs are already compressed; deflating them again buys nothing
+            with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+                page = await fetch_page(None)
+                if page:
+                    pending = asyncio.create_task(
+                        _prepare_page(page, employees, campaign, client, semaphore)
+                    )
+                while pending is not None:
+                    entries = await pending
+                    pending = None
+                    # Start on the next page while this one goes out
+                    if len(page) == _PAGE_SIZE:
+                        last = page[-1]
+                        page = await fetch_page((last["created_at"], last["id"]))
+                        if page:
+                            pending = asyncio.create_task(
+                                _prepare_page(page, employees, campaign, client, semaphore)
+                            )
+
+                    for report, pdf in entries:
+                        summary.add(report)
+                        if isinstance(pdf, BaseException):
+                            LOGGER.warning(
+                                "Audit PDF for call %s failed to render: %s",
+                                report.call_id,
+                                pdf,
+                            )
+                            summary.missing.append(report.call_id)
+                            continue
+                        archive.writestr(_entry_name(report), pdf)
+                        yield sink.drain()
+
+                summary_pdf = await run_in_process(
+                    render_campaign_summary_pdf, summary.build(campaign)
+                )
+                archive.writestr("summary.pdf", summary_pdf)
+            yield sink.drain()
+        finally:
+            if pending is not None:
+                pending.cancel()
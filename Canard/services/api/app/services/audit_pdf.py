@@ -1,23 +1,40 @@
 # pyright: basic, reportMissingImports=false
-"""Generate a PDF audit report and upload it to Supabase storage."""
+"""Generate a PDF audit report and upload it to Supabase storage.
+
+Rendering is CPU-bound, so the async API runs it in the shared process
+pool; the event loop only awaits the finished bytes.
+"""
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, cast
 
 from fpdf import FPDF
 
+from app.config import settings
 from app.db.client import get_supabase
+from app.services.process_pool import run_in_process
 
 LOGGER = logging.getLogger(__name__)
 
 _AUDITS_BUCKET = "audits"
 
 
+_bucket_ready = False
+
+
 def _ensure_audits_bucket() -> None:
-    """Create the audits bucket if it doesn't exist."""
+    """Create the audits bucket if it doesn't exist (once per process)."""
+    global _bucket_ready
+
+    if _bucket_ready:
+        return
     try:
         get_supabase().storage.create_bucket(
             _AUDITS_BUCKET,
@@ -27,6 +44,7 @@ def _ensure_audits_bucket() -> None:
     except Exception:
         # Bucket likely already exists — ignore
         pass
+    _bucket_ready = True
 
 
 def _risk_color(score: int) -> tuple[int, int, int]:
@@ -52,6 +70,82 @@ def _safe_text(text: str) -> str:
     return text.encode("latin-1", errors="replace").decode("latin-1")
 
 
+def parse_flags(raw: Any) -> list:
+    flags = raw or []
+    if isinstance(flags, str):
+        try:
+            flags = json.loads(flags)
+            if not isinstance(flags, list):
+                flags = [flags]
+        except (json.JSONDecodeError, ValueError):
+            flags = [flags]
+    return flags
+
+
+def parse_transcript_json(raw: Any) -> list[dict]:
+    # May be stored as a JSON string
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except (json.JSONDecodeError, ValueError):
+            raw = []
+    return raw if isinstance(raw, list) else []
+
+
+@dataclass
+class AuditReport:
+    """Everything that goes into one call's audit PDF (picklable)."""
+
+    call_id: str
+    call_date: str = ""
+    campaign_name: str = ""
+    employee_name: str = ""
+    department: str = ""
+    job_title: str = ""
+    risk_score: int = 0
+    compliance: str = ""
+    ai_summary: str = ""
+    flags: list[str] = field(default_factory=list)
+    transcript_json: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def from_records(
+        cls, call: dict, employee: dict | None, campaign: dict | None
+    ) -> AuditReport:
+        employee = employee or {}
+        return cls(
+            call_id=call["id"],
+            call_date=call.get("created_at") or call.get("started_at") or "",
+            campaign_name=campaign.get("name", "") if campaign else "",
+            employee_name=employee.get("full_name", ""),
+            department=employee.get("department") or "",
+            job_title=employee.get("job_title") or "",
+            risk_score=call.get("risk_score") or 0,
+            compliance=call.get("employee_compliance") or "",
+            ai_summary=call.get("ai_summary") or "",
+            flags=parse_flags(call.get("flags")),
+            transcript_json=parse_transcript_json(call.get("transcript_json")),
+        )
+
+
+_HEADING_COLOR = (37, 42, 57)
+_META_COLOR = (80, 80, 80)
+_BODY_COLOR = (55, 65, 81)
+_FOOTER_COLOR = (113, 113, 130)
+
+
+class _AuditPDF(FPDF):
+    """FPDF with the report's recurring text styles."""
+
+    def heading(self, text: str) -> None:
+        self.set_font("Helvetica", "B", 12)
+        self.set_text_color(*_HEADING_COLOR)
+        self.cell(0, 8, text, new_x="LMARGIN", new_y="NEXT")
+
+    def meta_line(self, text: str) -> None:
+        self.cell(0, 6, _safe_text(text), new_x="LMARGIN", new_y="NEXT")
+
+
 def generate_audit_pdf(
     *,
     call_id: str,
@@ -67,56 +161,73 @@ def generate_audit_pdf(
     transcript_json: list[dict],
 ) -> bytes:
     """Build a PDF audit report and return the raw bytes."""
-    pdf = FPDF()
+    return render_audit_pdf(
+        AuditReport(
+            call_id=call_id,
+            call_date=call_date,
+            campaign_name=campaign_name,
+            employee_name=employee_name,
+            department=department,
+            job_title=job_title,
+            risk_score=risk_score,
+            compliance=compliance,
+            ai_summary=ai_summary,
+            flags=flags,
+            transcript_json=transcript_json,
+        )
+    )
+
+
+def render_audit_pdf(report: AuditReport) -> bytes:
+    """Render one report synchronously. Prefer :func:`render_audit_pdf_async`
+    from async code."""
+    pdf = _AuditPDF()
     pdf.set_auto_page_break(auto=True, margin=20)
     pdf.add_page()
 
     # ── Header ──
     pdf.set_font("Helvetica", "B", 18)
-    pdf.set_text_color(37, 42, 57)
+    pdf.set_text_color(*_HEADING_COLOR)
     pdf.cell(0, 12, _safe_text("Canard Security — Audit Report"), new_x="LMARGIN", new_y="NEXT")
     pdf.ln(4)
 
     # ── Call metadata ──
     pdf.set_font("Helvetica", "", 10)
-    pdf.set_text_color(80, 80, 80)
-    pdf.cell(0, 6, f"Call ID: {call_id}", new_x="LMARGIN", new_y="NEXT")
-    pdf.cell(0, 6, f"Date: {call_date}", new_x="LMARGIN", new_y="NEXT")
-    if campaign_name:
-        pdf.cell(0, 6, f"Campaign: {_safe_text(campaign_name)}", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_text_color(*_META_COLOR)
+    pdf.meta_line(f"Call ID: {report.call_id}")
+    pdf.meta_line(f"Date: {report.call_date}")
+    if report.campaign_name:
+        pdf.meta_line(f"Campaign: {report.campaign_name}")
     pdf.ln(4)
 
     # ── Employee info ──
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.set_text_color(37, 42, 57)
-    pdf.cell(0, 8, "Employee", new_x="LMARGIN", new_y="NEXT")
+    pdf.heading("Employee")
     pdf.set_font("Helvetica", "", 10)
-    pdf.set_text_color(80, 80, 80)
-    pdf.cell(0, 6, f"Name: {_safe_text(employee_name)}", new_x="LMARGIN", new_y="NEXT")
-    if department:
-        pdf.cell(0, 6, f"Department: {_safe_text(department)}", new_x="LMARGIN", new_y="NEXT")
-    if job_title:
-        pdf.cell(0, 6, f"Job Title: {_safe_text(job_title)}", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_text_color(*_META_COLOR)
+    pdf.meta_line(f"Name: {report.employee_name}")
+    if report.department:
+        pdf.meta_line(f"Department: {report.department}")
+    if report.job_title:
+        pdf.meta_line(f"Job Title: {report.job_title}")
     pdf.ln(4)
 
     # ── Risk score ──
     pdf.set_font("Helvetica", "B", 12)
-    pdf.set_text_color(37, 42, 57)
+    pdf.set_text_color(*_HEADING_COLOR)
     pdf.cell(40, 8, "Risk Score: ")
-    r, g, b = _risk_color(risk_score)
-    pdf.set_text_color(r, g, b)
+    pdf.set_text_color(*_risk_color(report.risk_score))
     pdf.set_font("Helvetica", "B", 14)
-    pdf.cell(0, 8, f"{risk_score}/100", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, f"{report.risk_score}/100", new_x="LMARGIN", new_y="NEXT")
 
     # ── Compliance ──
     pdf.set_font("Helvetica", "B", 12)
-    pdf.set_text_color(37, 42, 57)
+    pdf.set_text_color(*_HEADING_COLOR)
     pdf.cell(40, 8, "Compliance: ")
     pdf.set_font("Helvetica", "", 12)
-    label = _compliance_label(compliance)
-    if compliance == "failed":
+    label = _compliance_label(report.compliance)
+    if report.compliance == "failed":
         pdf.set_text_color(239, 68, 68)
-    elif compliance == "partial":
+    elif report.compliance == "partial":
         pdf.set_text_color(245, 158, 11)
     else:
         pdf.set_text_color(34, 197, 94)
@@ -124,42 +235,33 @@ def generate_audit_pdf(
     pdf.ln(4)
 
     # ── AI Summary ──
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.set_text_color(37, 42, 57)
-    pdf.cell(0, 8, "AI Summary", new_x="LMARGIN", new_y="NEXT")
+    pdf.heading("AI Summary")
     pdf.set_font("Helvetica", "", 10)
-    pdf.set_text_color(55, 65, 81)
-    pdf.multi_cell(0, 5, _safe_text(ai_summary or "No summary available."))
+    pdf.set_text_color(*_BODY_COLOR)
+    pdf.multi_cell(0, 5, _safe_text(report.ai_summary or "No summary available."))
     pdf.ln(4)
 
     # ── Flags ──
-    if flags:
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.set_text_color(37, 42, 57)
-        pdf.cell(0, 8, "Flags", new_x="LMARGIN", new_y="NEXT")
+    if report.flags:
+        pdf.heading("Flags")
         pdf.set_font("Helvetica", "", 10)
-        pdf.set_text_color(55, 65, 81)
-        for flag in flags:
-            pdf.cell(0, 6, f"  - {_safe_text(flag)}", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_text_color(*_BODY_COLOR)
+        for flag in report.flags:
+            pdf.meta_line(f"  - {flag}")
         pdf.ln(4)
 
     # ── Transcript ──
-    if transcript_json:
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.set_text_color(37, 42, 57)
-        pdf.cell(0, 8, "Full Transcript", new_x="LMARGIN", new_y="NEXT")
+    if report.transcript_json:
+        pdf.heading("Full Transcript")
 
-        for turn in transcript_json:
+        for turn in report.transcript_json:
             role = (turn.get("role") or "").upper()
             text = turn.get("redacted_text") or turn.get("text") or ""
             timestamp = turn.get("timestamp_utc") or ""
 
             # Role label (bold)
             pdf.set_font("Helvetica", "B", 9)
-            if role == "AGENT":
-                pdf.set_text_color(37, 42, 57)
-            else:
-                pdf.set_text_color(80, 80, 80)
+            pdf.set_text_color(*(_HEADING_COLOR if role == "AGENT" else _META_COLOR))
             label = f"[{role}]"
             if timestamp:
                 label += f"  {timestamp}"
@@ -167,18 +269,144 @@ def generate_audit_pdf(
 
             # Turn text
             pdf.set_font("Helvetica", "", 9)
-            pdf.set_text_color(55, 65, 81)
+            pdf.set_text_color(*_BODY_COLOR)
             pdf.multi_cell(0, 4.5, _safe_text(text))
             pdf.ln(2)
 
     # ── Footer line ──
     pdf.ln(8)
     pdf.set_font("Helvetica", "I", 8)
-    pdf.set_text_color(113, 113, 130)
+    pdf.set_text_color(*_FOOTER_COLOR)
+    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    pdf.cell(0, 5, f"Generated by Canard Security on {now_str}", new_x="LMARGIN", new_y="NEXT")
+
+    return bytes(pdf.output())
+
+
+@dataclass
+class CampaignSummary:
+    """Aggregates for a campaign's cover report (picklable)."""
+
+    campaign_id: str
+    campaign_name: str = ""
+    attack_vector: str = ""
+    started_at: str = ""
+    completed_at: str = ""
+    total_calls: int = 0
+    avg_risk_score: int = 0
+    # Compliance label ("Failed" / "Partial" / "Passed") → count
+    compliance_counts: dict[str, int] = field(default_factory=dict)
+    # (department, calls, avg risk), highest risk first
+    departments: list[tuple[str, int, int]] = field(default_factory=list)
+    # (employee, risk score, call date), highest risk first
+    highest_risk: list[tuple[str, int, str]] = field(default_factory=list)
+    missing_reports: list[str] = field(default_factory=list)
+
+
+def render_campaign_summary_pdf(summary: CampaignSummary) -> bytes:
+    """Render the campaign cover report synchronously."""
+    pdf = _AuditPDF()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    pdf.add_page()
+
+    # ── Header ──
+    pdf.set_font("Helvetica", "B", 18)
+    pdf.set_text_color(*_HEADING_COLOR)
+    pdf.cell(0, 12, _safe_text("Canard Security — Campaign Summary"), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(4)
+
+    # ── Campaign metadata ──
+    pdf.set_font("Helvetica", "", 10)
+    pdf.set_text_color(*_META_COLOR)
+    pdf.meta_line(f"Campaign: {summary.campaign_name or summary.campaign_id}")
+    if summary.attack_vector:
+        pdf.meta_line(f"Attack vector: {summary.attack_vector}")
+    if summary.started_at:
+        pdf.meta_line(f"Started: {summary.started_at}")
+    if summary.completed_at:
+        pdf.meta_line(f"Completed: {summary.completed_at}")
+    pdf.ln(4)
+
+    # ── Results ──
+    pdf.heading("Results")
+    pdf.set_font("Helvetica", "", 10)
+    pdf.set_text_color(*_META_COLOR)
+    pdf.meta_line(f"Evaluated calls: {summary.total_calls}")
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.set_text_color(*_HEADING_COLOR)
+    pdf.cell(50, 8, "Average Risk Score: ")
+    pdf.set_text_color(*_risk_color(summary.avg_risk_score))
+    pdf.cell(0, 8, f"{summary.avg_risk_score}/100", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 10)
+    pdf.set_text_color(*_META_COLOR)
+    for label in ("Failed", "Partial", "Passed"):
+        pdf.meta_line(f"{label}: {summary.compliance_counts.get(label, 0)}")
+    pdf.ln(4)
+
+    # ── Departments ──
+    if summary.departments:
+        pdf.heading("By Department")
+        pdf.set_font("Helvetica", "", 10)
+        pdf.set_text_color(*_BODY_COLOR)
+        for department, calls, avg_risk in summary.departments:
+            pdf.meta_line(f"  - {department or 'Unassigned'}: {calls} calls, avg risk {avg_risk}")
+        pdf.ln(4)
+
+    # ── Highest risk ──
+    if summary.highest_risk:
+        pdf.heading("Highest Risk Calls")
+        pdf.set_font("Helvetica", "", 10)
+        pdf.set_text_color(*_BODY_COLOR)
+        for employee_name, risk_score, call_date in summary.highest_risk:
+            pdf.meta_line(f"  - {risk_score}/100  {employee_name or 'Unknown'}  {call_date}")
+        pdf.ln(4)
+
+    # ── Missing reports ──
+    if summary.missing_reports:
+        pdf.heading("Reports Not Included")
+        pdf.set_font("Helvetica", "", 9)
+        pdf.set_text_color(*_BODY_COLOR)
+        pdf.multi_cell(0, 4.5, _safe_text(", ".join(summary.missing_reports)))
+        pdf.ln(4)
+
+    # ── Footer line ──
+    pdf.ln(8)
+    pdf.set_font("Helvetica", "I", 8)
+    pdf.set_text_color(*_FOOTER_COLOR)
     now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     pdf.cell(0, 5, f"Generated by Canard Security on {now_str}", new_x="LMARGIN", new_y="NEXT")
 
-    return pdf.output()
+    return bytes(pdf.output())
+
+
+async def render_audit_pdf_async(report: AuditReport) -> bytes:
+    """Render a report in the process pool, off the event loop."""
+    return await run_in_process(render_audit_pdf, report)
+
+
+def _batch_concurrency() -> int:
+    if settings.cpu_pool_workers > 0:
+        return settings.cpu_pool_workers
+    return os.cpu_count() or 1
+
+
+async def render_audit_pdfs(
+    reports: Sequence[AuditReport], concurrency: int | None = None
+) -> list[bytes | BaseException]:
+    """Render many reports in parallel, one per pool worker at a time.
+
+    Results are in input order; a report that failed to render is
+    returned as its exception so one bad call doesn't sink the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency or _batch_concurrency())
+
+    async def render(report: AuditReport) -> bytes:
+        async with semaphore:
+            return await render_audit_pdf_async(report)
+
+    return await asyncio.gather(
+        *(render(report) for report in reports), return_exceptions=True
+    )
 
 
 def upload_audit_pdf(call_id: str, pdf_bytes: bytes) -> str | None:
@@ -204,3 +432,45 @@ def upload_audit_pdf(call_id: str, pdf_bytes: bytes) -> str | None:
     except Exception:
         LOGGER.warning("Failed to upload audit PDF for call %s", call_id, exc_info=True)
         return None
+
+
+async def upload_audit_pdf_async(call_id: str, pdf_bytes: bytes) -> str | None:
+    """Upload in resumable chunks without blocking the event loop.
+
+    Returns a signed URL, or None on failure (same contract as
+    :func:`upload_audit_pdf`).
+    """
+    import httpx
+
+    from app.integrations.supabase_storage import TUS_CHUNK_BYTES, ResumableUpload
+
+    path = f"{call_id}/report.pdf"
+    try:
+        await asyncio.to_thread(_ensure_audits_bucket)
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            upload = ResumableUpload(
+                client,
+                _AUDITS_BUCKET,
+                path,
+                len(pdf_bytes),
+                content_type="application/pdf",
+            )
+            await upload.create()
+            view = memoryview(pdf_bytes)
+            for offset in range(0, len(pdf_bytes), TUS_CHUNK_BYTES):
+                await upload.write(bytes(view[offset : offset + TUS_CHUNK_BYTES]))
+            await upload.finish()
+        signed = await asyncio.to_thread(
+            get_supabase().storage.from_(_AUDITS_BUCKET).create_signed_url,
+            path,
+            60 * 60 * 24 * 365 * 10,
+        )
+        url = signed.get("signedURL") if isinstance(signed, dict) else None
+        if url:
+            LOGGER.info("Uploaded audit PDF for call %s: %s", call_id, url)
+        else:
+            LOGGER.warning("Audit PDF uploaded but no signed URL returned for call %s", call_id)
+        return url
+    except Exception:
+        LOGGER.warning("Failed to upload audit PDF for call %s", call_id, exc_info=True)
+        return None
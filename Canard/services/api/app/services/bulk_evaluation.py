@@ -0,0 +1,174 @@
+# pyright: basic
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.db import queries
+from app.services.evaluation import evaluate_call
+from app.services.rate_limit import TokenBucket
+
+LOGGER = logging.getLogger(__name__)
+
+_PAGE_COLUMNS = (
+    "id,created_at,status,transcript,risk_score,employee_compliance,evaluation_version"
+)
+# Keep the last N failed call ids in the state file for follow-up
+_MAX_FAILED_IDS = 500
+
+
+@dataclass
+class BulkEvaluationFilters:
+    org_id: str | None = None
+    campaign_id: str | None = None
+    created_from: str | None = None
+    created_to: str | None = None
+    # Re-evaluate calls whose scores came from a different prompt version
+    prompt_version: str | None = None
+    # Only calls that were never scored (ignored when prompt_version is set)
+    missing_only: bool = True
+    min_transcript_chars: int = 50
+
+    def fingerprint(self) -> str:
+        encoded = json.dumps(asdict(self), sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def selects(self, call: dict) -> bool:
+        transcript = call.get("transcript") or ""
+        if len(transcript) <= self.min_transcript_chars:
+            return False
+        if self.prompt_version is not None:
+            return call.get("evaluation_version") != self.prompt_version
+        if self.missing_only:
+            return (
+                call.get("risk_score") is None
+                or call.get("employee_compliance") is None
+            )
+        return True
+
+
+@dataclass
+class BulkEvaluationState:
+    filters_fingerprint: str
+    cursor: list[str] | None = None  # [created_at, id] of last checkpointed row
+    scanned: int = 0
+    selected: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    failed_ids: list[str] = field(default_factory=list)
+    done: bool = False
+
+    @classmethod
+    def load(cls, path: Path) -> BulkEvaluationState | None:
+        try:
+            data = json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        return cls(**data)
+
+    def save(self, path: Path) -> None:
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2))
+        os.replace(tmp, path)
+
+
+async def run_bulk_evaluation(
+    filters: BulkEvaluationFilters,
+    *,
+    state_path: Path,
+    concurrency: int = 4,
+    requests_per_second: float = 1.0,
+    page_size: int = 100,
+    dry_run: bool = False,
+    bypass_cache: bool = False,
+    restart: bool = False,
+    on_result: Callable[[str, dict[str, Any] | None, Exception | None], None]
+    | None = None,
+) -> BulkEvaluationState:
+    """Page through completed calls by keyset and re-evaluate the selected ones.
+
+    Evaluations run with bounded concurrency behind a token bucket. The
+    cursor is checkpointed after each page, so a crash repeats at most one
+    page; repeats are cheap because evaluations hit the completion cache.
+    Dry runs never write the state file.
+    """
+    fingerprint = filters.fingerprint()
+    state = None if restart or dry_run else BulkEvaluationState.load(state_path)
+    if state is not None and state.filters_fingerprint != fingerprint:
+        raise ValueError(
+            f"State file {state_path} was written for different filters; "
+            "pass restart=True to start over"
+        )
+    if state is None:
+        state = BulkEvaluationState(filters_fingerprint=fingerprint)
+    if state.done:
+        LOGGER.info("Bulk evaluation already complete per %s", state_path)
+        return state
+
+    bucket = TokenBucket(requests_per_second, capacity=max(1.0, concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _evaluate(call_id: str) -> None:
+        async with semaphore:
+            await bucket.acquire()
+            error: Exception | None = None
+            result: dict[str, Any] | None = None
+            try:
+                result = await evaluate_call(call_id, bypass_cache=bypass_cache)
+            except Exception as exc:  # noqa: BLE001
+                error = exc
+                LOGGER.warning("Bulk evaluation failed for call %s", call_id, exc_info=True)
+            if result is not None:
+                state.succeeded += 1
+            else:
+                state.failed += 1
+                state.failed_ids = [*state.failed_ids, call_id][-_MAX_FAILED_IDS:]
+            if on_result is not None:
+                on_result(call_id, result, error)
+
+    while True:
+        after = (state.cursor[0], state.cursor[1]) if state.cursor else None
+        page = await asyncio.to_thread(
+            queries.list_calls_page,
+            columns=_PAGE_COLUMNS,
+            org_id=filters.org_id,
+            campaign_id=filters.campaign_id,
+            status="completed",
+            created_from=filters.created_from,
+            created_to=filters.created_to,
+            after=after,
+            limit=page_size,
+        )
+        if not page:
+            break
+
+        selected = [call["id"] for call in page if filters.selects(call)]
+        state.scanned += len(page)
+        state.selected += len(selected)
+        if dry_run:
+            for call_id in selected:
+                if on_result is not None:
+                    on_result(call_id, None, None)
+        else:
+            await asyncio.gather(*(_evaluate(call_id) for call_id in selected))
+
+        last = page[-1]
+        state.cursor = [str(last["created_at"]), str(last["id"])]
+        if not dry_run:
+            state.save(state_path)
+        if len(page) < page_size:
+            break
+
+    state.done = True
+    if not dry_run:
+        state.save(state_path)
+    return state
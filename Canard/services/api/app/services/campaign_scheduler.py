@@ -0,0 +1,344 @@
+# pyright: basic
+"""Durable campaign scheduler.
+
+Launching a campaign only creates its assignments and marks it
+``scheduled`` (``scheduled_at`` in the future) or ``running``; the
+dialing is done here. Every ``CAMPAIGN_SCHEDULER_POLL_S`` the scheduler
+lists campaigns that are running or due, takes a lease on each one it
+can (``CAMPAIGN_LEASE_S``, renewed while it drives the campaign, so with
+several instances only one dials a campaign) and dials the pending
+assignments through the :class:`CampaignDialer` — only while the
+employee's local time is inside the campaign's calling window, when one
+is configured.
+
+Progress lives in ``campaign_assignments``. After a restart, or when an
+instance dies and its lease lapses, the campaign is picked up where it
+stopped; ``dialing`` rows left behind are first settled against the
+calls table.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.config import settings
+from app.db import queries
+from app.services.dialer import CallSlot, CampaignDialer, get_campaign_dialer
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _parse_time(value: object) -> time | None:
+    if value is None or isinstance(value, time):
+        return value
+    try:
+        return time.fromisoformat(str(value))
+    except ValueError:
+        LOGGER.warning("Invalid calling window time %r, ignoring", value)
+        return None
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def _zone(name: str | None) -> ZoneInfo | None:
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        LOGGER.warning("Unknown timezone %r, using the campaign's", name)
+        return None
+
+
+@dataclass(frozen=True)
+class CallingWindow:
+    """Local times and weekdays calls may be placed; unset parts don't restrict."""
+
+    start: time | None
+    end: time | None
+    days: frozenset[int] | None  # ISO weekdays, 1 = Monday
+    timezone: str
+
+    @classmethod
+    def from_campaign(cls, campaign: dict) -> CallingWindow:
+        days = campaign.get("calling_days")
+        return cls(
+            start=_parse_time(campaign.get("calling_window_start")),
+            end=_parse_time(campaign.get("calling_window_end")),
+            days=frozenset(days) if days else None,
+            timezone=campaign.get("timezone") or "UTC",
+        )
+
+    def allows(self, now: datetime, tz_name: str | None = None) -> bool:
+        """Whether ``now`` is inside the window in ``tz_name`` (default: the campaign's)."""
+        if self.days is None and (self.start is None or self.end is None):
+            return True
+        local = now.astimezone(_zone(tz_name) or _zone(self.timezone) or timezone.utc)
+        if self.days is not None and local.isoweekday() not in self.days:
+            return False
+        if self.start is None or self.end is None:
+            return True
+        t = local.time()
+        if self.start <= self.end:
+            return self.start <= t < self.end
+        return t >= self.start or t < self.end  # window crosses midnight
+
+
+async def _dial_assignment(
+    dialer: CampaignDialer,
+    slot: CallSlot,
+    campaign_id: str,
+    assignment: dict,
+) -> None:
+    """Start one assignment's call; the slot stays held until the call ends."""
+    from app.services.calls import start_call
+
+    assignment_id = assignment["id"]
+    employee_id = assignment["employee_id"]
+    try:
+        call = await start_call(
+            employee_id=employee_id,
+            script_id=assignment["script_id"],
+            caller_id=assignment["caller_id"],
+            campaign_id=campaign_id,
+            assignment_id=assignment_id,
+        )
+        dialer.bind(slot, call["id"])
+        queries.update_campaign_assignment(assignment_id, {"status": "completed"})
+    except Exception:
+        LOGGER.exception(
+            "Campaign %s: call failed for employee %s",
+            campaign_id,
+            employee_id,
+        )
+        dialer.cancel(slot)
+        queries.update_campaign_assignment(assignment_id, {"status": "failed"})
+
+
+class CampaignScheduler:
+    def __init__(
+        self,
+        dialer: CampaignDialer | None = None,
+        poll_interval_s: float | None = None,
+        lease_s: int | None = None,
+    ):
+        self.dialer = dialer or get_campaign_dialer()
+        self.poll_interval_s = (
+            poll_interval_s
+            if poll_interval_s is not None
+            else settings.campaign_scheduler_poll_s
+        )
+        self.lease_s = lease_s or settings.campaign_lease_s
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._driving: dict[str, asyncio.Task] = {}
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        """Look for due campaigns now instead of at the next poll."""
+        self._wake.set()
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    # ── Leasing ──
+
+    async def run_once(self) -> int:
+        """Lease and start driving every due campaign not already driven here."""
+        campaigns = await asyncio.to_thread(queries.list_due_campaigns, self.owner_id)
+        started = 0
+        for campaign in campaigns:
+            campaign_id = campaign["id"]
+            if campaign_id in self._driving:
+                continue
+            requested_at = asyncio.get_running_loop().time()
+            leased = await asyncio.to_thread(
+                queries.acquire_campaign_lease, campaign_id, self.owner_id, self.lease_s
+            )
+            if not leased:
+                continue
+            task = asyncio.create_task(self._drive(campaign, requested_at))
+            self._driving[campaign_id] = task
+            task.add_done_callback(lambda _t, cid=campaign_id: self._driving.pop(cid, None))
+            started += 1
+        return started
+
+    async def run(self) -> None:
+        LOGGER.info("Campaign scheduler %s started", self.owner_id)
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    await self.run_once()
+                except Exception:
+                    LOGGER.warning("Campaign scheduling pass failed", exc_info=True)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Leases are released as the drivers unwind; the campaigns'
+            # remaining assignments are resumed by the next lease holder
+            drivers = list(self._driving.values())
+            for task in drivers:
+                task.cancel()
+            await asyncio.gather(*drivers, return_exceptions=True)
+            LOGGER.info("Campaign scheduler %s stopped", self.owner_id)
+
+    async def _keep_lease(
+        self, campaign_id: str, driver: asyncio.Task, renewed_at: float
+    ) -> None:
+        """Renew the lease every third of ``lease_s``; stop the driver once
+        it can no longer be sure it holds it."""
+        loop = asyncio.get_running_loop()
+        interval = self.lease_s / 3
+        while True:
+            await asyncio.sleep(interval)
+            # Timed before the request, so never later than the database's
+            requested_at = loop.time()
+            try:
+                held = await asyncio.to_thread(
+                    queries.acquire_campaign_lease, campaign_id, self.owner_id, self.lease_s
+                )
+            except Exception:
+                LOGGER.warning("Campaign %s: lease renewal failed", campaign_id, exc_info=True)
+                held = None
+            if held:
+                renewed_at = requested_at
+                continue
+            if held is None and loop.time() + interval < renewed_at + self.lease_s:
+                continue  # still leased through the next attempt
+            # Another instance may take (or has taken) the campaign over
+            LOGGER.warning("Campaign %s: lease lost, stopping", campaign_id)
+            driver.cancel()
+            return
+
+    async def _drive(self, campaign: dict, leased_at: float) -> None:
+        campaign_id = campaign["id"]
+        driver = asyncio.current_task()
+        assert driver is not None
+        heartbeat = asyncio.create_task(self._keep_lease(campaign_id, driver, leased_at))
+        try:
+            await self._run_campaign(campaign)
+        except Exception:
+            LOGGER.exception("Campaign %s: scheduler run failed", campaign_id)
+        finally:
+            heartbeat.cancel()
+            try:
+                await asyncio.to_thread(queries.release_campaign_lease, campaign_id, self.owner_id)
+            except Exception:
+                LOGGER.warning("Campaign %s: lease release failed", campaign_id, exc_info=True)
+
+    # ── Dialing ──
+
+    def _settle_dialing(self, campaign_id: str) -> None:
+        """Resolve assignments a previous run left mid-dial."""
+        stranded = queries.list_campaign_assignments(campaign_id, status="dialing")
+        if not stranded:
+            return
+        calls = queries.get_calls_by_assignment(a["id"] for a in stranded)
+        for assignment in stranded:
+            call = calls.get(assignment["id"])
+            # A call row means the dial went out; otherwise dial again
+            if call is None:
+                status = "pending"
+            else:
+                status = "failed" if call.get("status") == "failed" else "completed"
+            queries.update_campaign_assignment(assignment["id"], {"status": status})
+        LOGGER.info("Campaign %s: settled %d interrupted dials", campaign_id, len(stranded))
+
+    async def _run_campaign(self, campaign: dict) -> None:
+        campaign_id = campaign["id"]
+        org_id = campaign["org_id"]
+        window = CallingWindow.from_campaign(campaign)
+
+        if campaign.get("status") == "scheduled":
+            now = datetime.now(timezone.utc).isoformat()
+            queries.update_campaign(campaign_id, {"status": "running", "started_at": now})
+            LOGGER.info("Campaign %s: scheduled start reached", campaign_id)
+        self._settle_dialing(campaign_id)
+
+        slots: list[CallSlot] = []
+        dials: set[asyncio.Task] = set()
+        while not self._stop.is_set():
+            # Re-read so a pause (status change) stops the dialing
+            current = queries.get_campaign(campaign_id)
+            if not current or current.get("status") != "running":
+                LOGGER.info("Campaign %s: no longer running, stopping", campaign_id)
+                return
+
+            pending = queries.list_campaign_assignments(campaign_id, status="pending")
+            if not pending:
+                if dials:
+                    await asyncio.gather(*dials)
+                    continue
+                await self.dialer.wait_ended(slots)
+                now = datetime.now(timezone.utc).isoformat()
+                queries.update_campaign(campaign_id, {"status": "completed", "completed_at": now})
+                LOGGER.info("Campaign %s: completed all calls", campaign_id)
+                return
+
+            employees = queries.get_employees(a["employee_id"] for a in pending)
+
+            def _in_window(assignment: dict) -> bool:
+                employee = employees.get(assignment["employee_id"]) or {}
+                return window.allows(datetime.now(timezone.utc), employee.get("timezone"))
+
+            # Oldest first, a batch at a time so a pause is noticed promptly
+            due = [a for a in reversed(pending) if _in_window(a)][: self.dialer.max_live_calls]
+            if not due:
+                await self._sleep(self.poll_interval_s)
+                continue
+
+            for assignment in due:
+                if self._stop.is_set():
+                    break
+                slot = await self.dialer.admit(org_id, campaign_id)
+                # Admission may have waited past the end of the window
+                if not _in_window(assignment):
+                    self.dialer.cancel(slot)
+                    continue
+                queries.update_campaign_assignment(assignment["id"], {"status": "dialing"})
+                slots.append(slot)
+                task = asyncio.create_task(
+                    _dial_assignment(self.dialer, slot, campaign_id, assignment)
+                )
+                dials.add(task)
+                task.add_done_callback(dials.discard)
+
+
+_scheduler_instance: CampaignScheduler | None = None
+
+
+def get_campaign_scheduler() -> CampaignScheduler:
+    global _scheduler_instance
+
+    if _scheduler_instance is None:
+        _scheduler_instance = CampaignScheduler()
+    return _scheduler_instance
+
+
+def wake_scheduler() -> None:
+    """Nudge this process's scheduler, if it runs one (others poll)."""
+    if _scheduler_instance is not None:
+        _scheduler_instance.wake()
@@ -1,12 +1,12 @@
 # pyright: basic
 from __future__ import annotations
 
-import asyncio
 import logging
 import random
-from datetime import datetime, timezone
+from datetime import datetime, time, timezone
 
 from app.db import queries
+from app.services.campaign_scheduler import wake_scheduler
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,8 +18,12 @@ def create_campaign(
     description: str | None = None,
     attack_vector: str | None = None,
     scheduled_at: str | None = None,
+    timezone: str | None = None,
+    calling_window_start: time | None = None,
+    calling_window_end: time | None = None,
+    calling_days: list[int] | None = None,
 ) -> dict:
-    data: dict[str, str] = {"name": name, "org_id": org_id}
+    data: dict[str, object] = {"name": name, "org_id": org_id}
     if created_by:
         data["created_by"] = created_by
     if description:
@@ -28,6 +32,14 @@ def create_campaign(
         data["attack_vector"] = attack_vector
     if scheduled_at:
         data["scheduled_at"] = scheduled_at
+    if timezone:
+        data["timezone"] = timezone
+    if calling_window_start is not None:
+        data["calling_window_start"] = calling_window_start.isoformat()
+    if calling_window_end is not None:
+        data["calling_window_end"] = calling_window_end.isoformat()
+    if calling_days:
+        data["calling_days"] = calling_days
     return queries.create_campaign(data)
 
 
@@ -39,6 +51,13 @@ def list_campaigns(org_id: str) -> list[dict]:
     return queries.list_campaigns(org_id)
 
 
+def _parse_timestamp(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
 async def launch_campaign(
     campaign_id: str,
     script_id: str | None = None,
@@ -46,7 +65,7 @@ async def launch_campaign(
     department: str | None = None,
     employee_ids: list[str] | None = None,
 ) -> dict:
-    """Validate inputs, create assignments, kick off background execution.
+    """Validate inputs, create assignments and hand them to the scheduler.
 
     When script_id is provided, every employee gets that single script
     (caller_id is also required in this mode).
@@ -96,8 +115,8 @@ async def launch_campaign(
 
     # ── Resolve target employees ───────────────────────────────────────
     if employee_ids:
-        employees = [queries.get_employee(eid) for eid in employee_ids]
-        employees = [e for e in employees if e and e.get("is_active")]
+        found = queries.get_employees(employee_ids)
+        employees = [e for e in found.values() if e.get("is_active")]
     elif department:
         employees = queries.list_employees_by_department(org_id, department)
     else:
@@ -127,66 +146,20 @@ async def launch_campaign(
 
     assignments = queries.bulk_create_campaign_assignments(assignment_rows)
 
-    # Update campaign to running
-    now = datetime.now(timezone.utc).isoformat()
-    queries.update_campaign(campaign_id, {"status": "running", "started_at": now})
-
-    # Fire background execution — returns immediately
-    asyncio.create_task(
-        _execute_campaign_calls(campaign_id=campaign_id, assignments=assignments)
-    )
+    # The scheduler dials the assignments: now, or once scheduled_at passes
+    now = datetime.now(timezone.utc)
+    scheduled_at = _parse_timestamp(campaign.get("scheduled_at"))
+    if scheduled_at and scheduled_at > now:
+        status = "scheduled"
+        queries.update_campaign(campaign_id, {"status": status})
+    else:
+        status = "running"
+        queries.update_campaign(campaign_id, {"status": status, "started_at": now.isoformat()})
+    wake_scheduler()
 
     return {
         "campaign_id": campaign_id,
-        "status": "running",
+        "status": status,
         "assignment_count": len(assignments),
     }
 
-
-async def _execute_campaign_calls(
-    campaign_id: str,
-    assignments: list[dict],
-) -> None:
-    """Iterate assignments sequentially, calling each employee.
-
-    script_id and caller_id are read from each assignment row so this
-    works for both single-script and random-script modes.
-    """
-    from app.services.calls import start_call
-
-    LOGGER.info(
-        "Campaign %s: starting %d calls", campaign_id, len(assignments)
-    )
-
-    for i, assignment in enumerate(assignments):
-        assignment_id = assignment["id"]
-        employee_id = assignment["employee_id"]
-        a_script_id = assignment["script_id"]
-        a_caller_id = assignment["caller_id"]
-
-
-        try:
-            await start_call(
-                employee_id=employee_id,
-                script_id=a_script_id,
-                caller_id=a_caller_id,
-                campaign_id=campaign_id,
-                assignment_id=assignment_id,
-            )
-            queries.update_campaign_assignment(assignment_id, {"status": "completed"})
-        except Exception:
-            LOGGER.exception(
-                "Campaign %s: call failed for employee %s",
-                campaign_id,
-                employee_id,
-            )
-            queries.update_campaign_assignment(assignment_id, {"status": "failed"})
-
-        # Rate-limit delay between calls (skip after last)
-        if i < len(assignments) - 1:
-            await asyncio.sleep(5)
-
-    # Mark campaign completed
-    now = datetime.now(timezone.utc).isoformat()
-    queries.update_campaign(campaign_id, {"status": "completed", "completed_at": now})
-    LOGGER.info("Campaign %s: completed all calls", campaign_id)
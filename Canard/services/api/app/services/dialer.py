@@ -0,0 +1,189 @@
+# pyright: basic
+"""Admission control for outbound campaign calls.
+
+A campaign call takes a :class:`CallSlot` before it is dialled and
+keeps it until the call actually ends, so the number of live calls is
+bounded by:
+
+* ``CAMPAIGN_MAX_LIVE_CALLS`` per process and
+  ``CAMPAIGN_MAX_LIVE_CALLS_PER_ORG`` per org (within this process);
+* ``ELEVENLABS_STT_MAX_SESSIONS`` — every live call opens a realtime STT
+  session once its media stream connects, and open streams of calls not
+  dialled here (ad-hoc calls) count against the same limit;
+
+and new calls are started at no more than ``TWILIO_CALLS_PER_SECOND``.
+
+Slots are released by the Twilio status webhook (terminal status) and by
+the media stream closing. Webhooks may land on another process, so
+waiters also poll the held calls' statuses every
+``CAMPAIGN_SLOT_POLL_S`` and reclaim any slot older than
+``CAMPAIGN_CALL_SLOT_TIMEOUT_S``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.db import queries
+from app.services.rate_limit import TokenBucket
+
+LOGGER = logging.getLogger(__name__)
+
+TERMINAL_CALL_STATUSES = frozenset({"completed", "failed", "busy", "no-answer", "canceled"})
+
+
+@dataclass(eq=False)
+class CallSlot:
+    org_id: str
+    campaign_id: str | None
+    admitted_at: float
+    call_id: str | None = None
+    ended: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class CampaignDialer:
+    def __init__(
+        self,
+        max_live_calls: int,
+        max_live_calls_per_org: int,
+        calls_per_second: float,
+        stt_sessions: int,
+        slot_timeout_s: float,
+        poll_s: float,
+    ):
+        self.max_live_calls = max(max_live_calls, 1)
+        self.max_live_calls_per_org = max(max_live_calls_per_org, 1)
+        self.stt_sessions = max(stt_sessions, 1)
+        self.slot_timeout_s = slot_timeout_s
+        self.poll_s = poll_s
+        self._cps = TokenBucket(calls_per_second)
+        self._slots: set[CallSlot] = set()
+        self._by_call: dict[str, CallSlot] = {}
+        self._streams: set[str] = set()  # call ids with an open media stream
+        self._changed = asyncio.Event()
+
+    # ── Capacity ──
+
+    @property
+    def live_calls(self) -> int:
+        return len(self._slots)
+
+    def org_live_calls(self, org_id: str) -> int:
+        return sum(1 for s in self._slots if s.org_id == org_id)
+
+    def stt_sessions_in_use(self) -> int:
+        # A slot holds its STT session from admission, before its stream opens
+        return len(self._slots) + len(self._streams - self._by_call.keys())
+
+    def _has_room(self, org_id: str) -> bool:
+        return (
+            self.live_calls < self.max_live_calls
+            and self.org_live_calls(org_id) < self.max_live_calls_per_org
+            and self.stt_sessions_in_use() < self.stt_sessions
+        )
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+    async def _wait_for_change(self) -> None:
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), self.poll_s)
+        except TimeoutError:
+            await self.reclaim()
+
+    # ── Slots ──
+
+    async def admit(self, org_id: str, campaign_id: str | None = None) -> CallSlot:
+        """Wait for a live-call slot for ``org_id``, then for the dial rate."""
+        while not self._has_room(org_id):
+            await self._wait_for_change()
+        slot = CallSlot(org_id=org_id, campaign_id=campaign_id, admitted_at=time.monotonic())
+        self._slots.add(slot)
+        await self._cps.acquire()
+        return slot
+
+    def bind(self, slot: CallSlot, call_id: str) -> None:
+        """Attach the started call, so its end releases the slot."""
+        slot.call_id = call_id
+        if slot in self._slots:
+            self._by_call[call_id] = slot
+
+    def cancel(self, slot: CallSlot) -> None:
+        """Give back a slot whose call never started."""
+        self._drop(slot)
+
+    def release(self, call_id: str) -> None:
+        """The call ended (terminal status or stream closed); no-op if unknown."""
+        slot = self._by_call.get(call_id)
+        if slot is not None:
+            self._drop(slot)
+
+    def _drop(self, slot: CallSlot) -> None:
+        if slot.call_id:
+            self._by_call.pop(slot.call_id, None)
+        self._slots.discard(slot)
+        slot.ended.set()
+        self._notify()
+
+    def stream_opened(self, call_id: str) -> None:
+        self._streams.add(call_id)
+
+    def stream_closed(self, call_id: str) -> None:
+        self._streams.discard(call_id)
+        self.release(call_id)
+        self._notify()
+
+    async def reclaim(self) -> None:
+        """Drop slots whose calls ended unseen (webhook handled elsewhere) or
+        that outlived the slot timeout."""
+        now = time.monotonic()
+        for slot in list(self._slots):
+            if now - slot.admitted_at > self.slot_timeout_s:
+                LOGGER.warning(
+                    "Reclaiming call slot for call %s after %.0fs", slot.call_id, now - slot.admitted_at
+                )
+                self._drop(slot)
+
+        held = list(self._by_call)
+        if not held:
+            return
+        try:
+            rows = await asyncio.to_thread(queries.get_calls, held)
+        except Exception:  # noqa: BLE001
+            LOGGER.warning("Call slot status check failed", exc_info=True)
+            return
+        for call_id in held:
+            row = rows.get(call_id)
+            if row is None or row.get("status") in TERMINAL_CALL_STATUSES:
+                self.release(call_id)
+
+    async def wait_ended(self, slots: Iterable[CallSlot]) -> None:
+        """Return once every slot has been released."""
+        pending = [s for s in slots if not s.ended.is_set()]
+        while pending:
+            await self._wait_for_change()
+            pending = [s for s in pending if not s.ended.is_set()]
+
+
+_dialer_instance: CampaignDialer | None = None
+
+
+def get_campaign_dialer() -> CampaignDialer:
+    global _dialer_instance
+
+    if _dialer_instance is None:
+        _dialer_instance = CampaignDialer(
+            max_live_calls=settings.campaign_max_live_calls,
+            max_live_calls_per_org=settings.campaign_max_live_calls_per_org,
+            calls_per_second=settings.twilio_calls_per_second,
+            stt_sessions=settings.elevenlabs_stt_max_sessions,
+            slot_timeout_s=settings.campaign_call_slot_timeout_s,
+            poll_s=settings.campaign_slot_poll_s,
+        )
+    return _dialer_instance
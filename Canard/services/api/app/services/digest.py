@@ -0,0 +1,260 @@
+# pyright: basic
+"""Results digests: one email per recipient per window instead of per call.
+
+With ``EMAIL_DIGEST_ENABLED``, each evaluated call stages a compact
+result row for the employee and, through ``boss_id``, for their
+manager. A ``send_digest`` job scheduled for the end of the window then
+renders one email per recipient listing their rows, with links to the
+stored audit PDFs instead of embedded transcripts, and queues it in the
+outbox.
+
+Rows live in the outbox's SQLite file until their digest is queued.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+
+from app.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DigestRole(str, Enum):
+    EMPLOYEE = "employee"
+    MANAGER = "manager"
+
+
+@dataclass
+class DigestItem:
+    recipient_email: str
+    recipient_name: str
+    role: str
+    call_id: str
+    employee_name: str = ""
+    campaign_name: str = ""
+    risk_score: int = 0
+    compliance: str = ""
+    audit_report_url: str = ""
+    window: int = 0
+    id: int | None = None
+
+
+def window_start(ts: float | None = None) -> int:
+    """Start (epoch seconds) of the digest window containing ``ts``."""
+    size = max(settings.email_digest_window_s, 1)
+    ts = time.time() if ts is None else ts
+    return int(ts // size * size)
+
+
+class SQLiteDigestStore:
+    """Result rows waiting for their recipient's digest."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists digest_items (
+                    id integer primary key autoincrement,
+                    window integer not null,
+                    recipient_email text not null,
+                    recipient_name text not null,
+                    role text not null,
+                    call_id text not null,
+                    employee_name text not null,
+                    campaign_name text not null,
+                    risk_score integer not null,
+                    compliance text not null,
+                    audit_report_url text not null,
+                    created_at real not null,
+                    unique (recipient_email, role, call_id)
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_digest_items_window "
+                "on digest_items (window, recipient_email)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, items: list[DigestItem]) -> None:
+        """Stage rows; a call already staged for a recipient is ignored."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                """
+                insert or ignore into digest_items (window, recipient_email,
+                    recipient_name, role, call_id, employee_name, campaign_name,
+                    risk_score, compliance, audit_report_url, created_at)
+                values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        item.window,
+                        item.recipient_email,
+                        item.recipient_name,
+                        item.role,
+                        item.call_id,
+                        item.employee_name,
+                        item.campaign_name,
+                        item.risk_score,
+                        item.compliance,
+                        item.audit_report_url,
+                        now,
+                    )
+                    for item in items
+                ],
+            )
+
+    def pending(self, up_to_window: int) -> list[DigestItem]:
+        """Rows from this window and any earlier one left behind."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                """
+                select * from digest_items where window <= ?
+                order by recipient_email, role, risk_score desc, id
+                """,
+                (up_to_window,),
+            ).fetchall()
+        return [
+            DigestItem(
+                id=row["id"],
+                window=row["window"],
+                recipient_email=row["recipient_email"],
+                recipient_name=row["recipient_name"],
+                role=row["role"],
+                call_id=row["call_id"],
+                employee_name=row["employee_name"],
+                campaign_name=row["campaign_name"],
+                risk_score=row["risk_score"],
+                compliance=row["compliance"],
+                audit_report_url=row["audit_report_url"],
+            )
+            for row in rows
+        ]
+
+    def delete(self, ids: list[int]) -> None:
+        with self._lock, self._connect() as conn:
+            conn.executemany("delete from digest_items where id = ?", [(i,) for i in ids])
+
+
+_store_instance: SQLiteDigestStore | None = None
+
+
+def get_digest_store() -> SQLiteDigestStore:
+    global _store_instance
+
+    if _store_instance is None:
+        _store_instance = SQLiteDigestStore(settings.email_outbox_path)
+    return _store_instance
+
+
+def stage_call_results(
+    *,
+    call_id: str,
+    employee: dict,
+    manager: dict | None,
+    campaign_name: str,
+    risk_score: int,
+    compliance: str,
+    audit_report_url: str,
+) -> int:
+    """Stage a call for the employee's and manager's digests.
+
+    Schedules the window's ``send_digest`` job (once per window) and
+    returns the number of rows staged.
+    """
+    from app.jobs.handlers import PRIORITY_AUDIT_REPORT
+    from app.jobs.queue import JobType, enqueue_job
+
+    window = window_start()
+    base = dict(
+        call_id=call_id,
+        employee_name=employee.get("full_name") or "",
+        campaign_name=campaign_name,
+        risk_score=risk_score,
+        compliance=compliance,
+        audit_report_url=audit_report_url,
+        window=window,
+    )
+    items: list[DigestItem] = []
+    if employee.get("email"):
+        items.append(
+            DigestItem(
+                recipient_email=employee["email"],
+                recipient_name=employee.get("full_name") or "",
+                role=DigestRole.EMPLOYEE.value,
+                **base,
+            )
+        )
+    if manager and manager.get("email"):
+        items.append(
+            DigestItem(
+                recipient_email=manager["email"],
+                recipient_name=manager.get("full_name") or "",
+                role=DigestRole.MANAGER.value,
+                **base,
+            )
+        )
+    if not items:
+        return 0
+
+    get_digest_store().add(items)
+    window_end = window + settings.email_digest_window_s
+    enqueue_job(
+        JobType.SEND_DIGEST,
+        {"window": window},
+        priority=PRIORITY_AUDIT_REPORT,
+        idempotency_key=f"digest:{window}",
+        delay_s=max(window_end - time.time(), 0.0),
+    )
+    return len(items)
+
+
+def send_digests(window: int) -> int:
+    """Queue one digest email per recipient and role; returns emails queued.
+
+    Safe to re-run: each email is keyed by window and recipient, and rows
+    are only removed once their email is in the outbox.
+    """
+    from app.services.email import queue_digest_email
+
+    items = get_digest_store().pending(window)
+    groups: dict[tuple[str, str], list[DigestItem]] = {}
+    for item in items:
+        groups.setdefault((item.recipient_email, item.role), []).append(item)
+
+    for (recipient_email, role), rows in groups.items():
+        queue_digest_email(
+            to_email=recipient_email,
+            recipient_name=rows[0].recipient_name,
+            role=role,
+            items=rows,
+            idempotency_key=f"digest:{window}:{role}:{recipient_email}",
+        )
+        get_digest_store().delete([row.id for row in rows if row.id is not None])
+
+    LOGGER.info(
+        "Queued %d digest emails for window %d (%d results)", len(groups), window, len(items)
+    )
+    return len(groups)
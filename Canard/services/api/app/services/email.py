@@ -1,13 +1,12 @@
 # pyright: basic, reportMissingImports=false
-"""Post-call test results email via Resend."""
+"""Post-call test results email, delivered through the outbox."""
 from __future__ import annotations
 
 import logging
 from html import escape
 
-import resend
-
-from app.config import settings
+from app.services.digest import DigestItem, DigestRole
+from app.services.outbox import enqueue_email
 
 LOGGER = logging.getLogger(__name__)
 
@@ -177,7 +176,7 @@ def build_results_email(
 </html>"""
 
 
-def send_test_results_email(
+def queue_test_results_email(
     to_email: str,
     employee_name: str,
     risk_score: int,
@@ -186,14 +185,12 @@ def send_test_results_email(
     flags: list[str],
     transcript: str,
     campaign_name: str = "",
-) -> str | None:
-    """Send post-call test results to an employee. Returns the email ID or None on failure."""
-    if not settings.resend_api_key:
-        LOGGER.warning("RESEND_API_KEY not set — skipping email to %s", to_email)
-        return None
-
-    resend.api_key = settings.resend_api_key
+    idempotency_key: str | None = None,
+) -> str:
+    """Render post-call test results and queue them for the employee.
 
+    Returns the outbox message id; delivery happens in the background.
+    """
     html = build_results_email(
         employee_name=employee_name,
         risk_score=risk_score,
@@ -203,19 +200,99 @@ def send_test_results_email(
         transcript=transcript,
         campaign_name=campaign_name,
     )
+    return enqueue_email(
+        to_email,
+        f"Your Security Awareness Test Results — Score: {risk_score}/100",
+        html,
+        kind="test_results",
+        idempotency_key=idempotency_key,
+    )
+
 
-    try:
-        result = resend.Emails.send(
-            {
-                "from": settings.resend_from_email,
-                "to": [to_email],
-                "subject": f"Your Security Awareness Test Results — Score: {risk_score}/100",
-                "html": html,
-            }
+def _build_digest_rows_html(items: list[DigestItem], show_employee: bool) -> str:
+    rows = []
+    for item in items:
+        label, color = _compliance_label(item.compliance)
+        who = escape(item.employee_name or "Unknown") if show_employee else ""
+        campaign = escape(item.campaign_name or "Vishing simulation")
+        report = (
+            f'<a href="{escape(item.audit_report_url, quote=True)}" '
+            f'style="color:#252a39;">Report</a>'
+            if item.audit_report_url
+            else ""
+        )
+        rows.append(
+            '<tr style="border-top:1px solid #e5e7eb;">'
+            + (f'<td style="padding:8px;">{who}</td>' if show_employee else "")
+            + f'<td style="padding:8px;">{campaign}</td>'
+            f'<td style="padding:8px;font-weight:600;color:{_risk_color(item.risk_score)};">'
+            f"{item.risk_score}</td>"
+            f'<td style="padding:8px;color:{color};">{label}</td>'
+            f'<td style="padding:8px;">{report}</td>'
+            "</tr>"
         )
-        email_id = result.get("id") if isinstance(result, dict) else getattr(result, "id", None)
-        LOGGER.info("Test results email sent to %s (id=%s)", to_email, email_id)
-        return email_id
-    except Exception:
-        LOGGER.exception("Failed to send test results email to %s", to_email)
-        return None
+    return "".join(rows)
+
+
+def build_digest_email(recipient_name: str, role: str, items: list[DigestItem]) -> str:
+    """Build a compact digest: one row per call, linking the audit PDFs."""
+    is_manager = role == DigestRole.MANAGER.value
+    avg_risk = round(sum(i.risk_score for i in items) / len(items)) if items else 0
+    intro = (
+        f"Results from {len(items)} recent vishing simulation call(s) with your team. "
+        f"Average risk score: <strong>{avg_risk}</strong>."
+        if is_manager
+        else f"Here are your results from {len(items)} recent vishing simulation call(s)."
+    )
+    header_cells = ("Campaign", "Risk", "Result", "")
+    if is_manager:
+        header_cells = ("Employee", *header_cells)
+    header = "".join(
+        f'<th align="left" style="padding:8px;font-weight:500;color:#717182;">{h}</th>'
+        for h in header_cells
+    )
+
+    return f"""\
+<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8" /><title>Security Test Results</title></head>
+<body style="margin:0;padding:24px;background-color:#f4f4f4;font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;">
+  <table role="presentation" width="560" cellspacing="0" cellpadding="0" style="margin:0 auto;background:#ffffff;border-radius:14px;border:1px solid rgba(37,42,57,0.1);">
+    <tr><td style="padding:24px 32px 8px;">
+      <h1 style="margin:0 0 8px;font-size:18px;font-weight:500;color:#252a39;">Security Awareness Test Results</h1>
+      <p style="margin:0;font-size:13px;color:#374151;line-height:1.6;">Hi {escape(recipient_name or "there")}, {intro}</p>
+    </td></tr>
+    <tr><td style="padding:8px 24px 24px;">
+      <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="font-size:12px;color:#374151;border-collapse:collapse;">
+        <tr>{header}</tr>
+        {_build_digest_rows_html(items, show_employee=is_manager)}
+      </table>
+    </td></tr>
+    <tr><td align="center" style="padding:16px 32px;border-top:1px solid rgba(37,42,57,0.08);font-size:11px;color:#717182;">
+      Canard Security &copy; 2026 &middot; Automated security awareness report
+    </td></tr>
+  </table>
+</body>
+</html>"""
+
+
+def queue_digest_email(
+    to_email: str,
+    recipient_name: str,
+    role: str,
+    items: list[DigestItem],
+    idempotency_key: str | None = None,
+) -> str:
+    """Render a digest and queue it. Returns the outbox message id."""
+    subject = (
+        f"Team Security Test Results — {len(items)} call(s)"
+        if role == DigestRole.MANAGER.value
+        else f"Your Security Awareness Test Results — {len(items)} call(s)"
+    )
+    return enqueue_email(
+        to_email,
+        subject,
+        build_digest_email(recipient_name, role, items),
+        kind=f"digest_{role}",
+        idempotency_key=idempotency_key,
+    )
@@ -3,15 +3,16 @@ from __future__ import annotations
 
 import json
 import logging
+from datetime import datetime, timezone
 from typing import Any
 
 from app.db import queries
 from app.integrations.mistral import chat_completion_json
 from app.services.audio_features import (
     AudioFeatures,
-    download_recording,
-    extract_audio_features,
+    extract_audio_features_async,
 )
+from app.services.recording_cache import fetch_recording
 
 # Map Mistral compliance values → analytics-compatible values
 COMPLIANCE_MAP = {
@@ -24,6 +25,10 @@ COMPLIANCE_MAP = {
 
 LOGGER = logging.getLogger(__name__)
 
+# Bump whenever EVALUATION_SYSTEM_PROMPT or build_evaluation_prompt changes
+# so cached completions from the old prompt are not reused.
+EVALUATION_PROMPT_VERSION = "eval-v1"
+
 
 # ---------------------------------------------------------------------------
 # Employee call history aggregation
@@ -187,17 +192,27 @@ def build_evaluation_prompt(
 async def evaluate_call(
     call_id: str,
     recording_transcript: str | None = None,
+    bypass_cache: bool = False,
+    audio_features: AudioFeatures | None = None,
+    raise_on_error: bool = False,
 ) -> dict[str, Any] | None:
     """Run full post-call evaluation for a completed call.
 
     1. Fetch call + script from DB
     2. Build transcript
-    3. Extract audio features (best-effort)
+    3. Extract audio features (best-effort), unless the media stream
+       already accumulated them live
     4. Gather employee call history
     5. Call Mistral with JSON mode
     6. Validate + persist results
 
-    Returns the evaluation result dict, or None on failure.
+    Identical prompts are answered from the completion cache unless
+    ``bypass_cache`` is set.
+
+    Returns the evaluation result dict, or None on failure. With
+    ``raise_on_error`` a failed Mistral call or results write raises
+    instead, so a queued job is retried; None then only means there was
+    nothing to evaluate (call not found, no transcript).
     """
     # ── 1. Fetch call + script ──
     call = queries.get_call(call_id)
@@ -217,13 +232,15 @@ async def evaluate_call(
         return None
 
     # ── 3. Audio features (best-effort) ──
-    audio_features: AudioFeatures | None = None
-    recording_url = call.get("recording_url")
-    if recording_url:
+    # The first-party stereo recording is usually still in the local cache
+    recording_url = call.get("dual_recording_url") or call.get("recording_url")
+    if audio_features is not None:
+        audio_features.add_transcript_features(transcript)
+    elif recording_url:
         try:
-            audio_bytes = await download_recording(recording_url)
-            audio_features = extract_audio_features(
-                audio_bytes, transcript=transcript
+            recording_path = await fetch_recording(recording_url)
+            audio_features = await extract_audio_features_async(
+                recording_path, transcript=transcript
             )
             LOGGER.info("Audio features extracted for call %s", call_id)
         except Exception:
@@ -258,9 +275,16 @@ async def evaluate_call(
     ]
 
     try:
-        result = await chat_completion_json(messages=messages, temperature=0.1)
+        result = await chat_completion_json(
+            messages=messages,
+            temperature=0.1,
+            prompt_version=EVALUATION_PROMPT_VERSION,
+            bypass_cache=bypass_cache,
+        )
     except Exception:
         LOGGER.exception("Mistral evaluation call failed for call %s", call_id)
+        if raise_on_error:
+            raise
         return None
 
     # ── 6. Validate and clamp ──
@@ -304,6 +328,8 @@ async def evaluate_call(
         "flags": flags,
         "ai_summary": ai_summary,
         "sentiment_analysis": sentiment_analysis,
+        "evaluation_version": EVALUATION_PROMPT_VERSION,
+        "evaluated_at": datetime.now(timezone.utc).isoformat(),
     }
 
     # Also save the transcript if we have one and the call doesn't already
@@ -316,6 +342,8 @@ async def evaluate_call(
         LOGGER.warning(
             "Failed to persist evaluation results for call %s", call_id, exc_info=True
         )
+        if raise_on_error:
+            raise
 
     # ── 8. Update employee risk_level ──
     if employee_id and risk_level_rec:
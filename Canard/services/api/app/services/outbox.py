@@ -0,0 +1,679 @@
+# pyright: basic, reportMissingImports=false
+"""Durable email outbox and its background sender.
+
+Callers render an email and :func:`enqueue_email` it; that is a local
+SQLite insert, so nothing on the request path waits on the provider.
+:class:`OutboxSender` claims due messages, groups them into provider
+batches (Resend's batch API takes up to 100 per request), and sends a
+bounded number of batches at a time under a request-rate limit. Failed
+sends are retried with the job queue's backoff until ``max_attempts``;
+messages the provider rejects outright are marked dead immediately.
+Leases are renewed while a batch is in flight, and only the sender
+holding a message's lease can settle it (as in the job queue), since
+the API and worker processes may both run a sender on one outbox.
+
+Sinks: ``resend`` (production), ``smtp`` (a local relay or test server)
+and ``file`` (writes ``.eml`` files, for development and tests; only
+when selected explicitly, since messages include call transcripts).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import smtplib
+import socket
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import make_msgid
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+
+from app.config import settings
+from app.jobs.queue import backoff_seconds
+from app.services.rate_limit import TokenBucket
+
+LOGGER = logging.getLogger(__name__)
+
+# Resend rejects batches larger than this
+RESEND_MAX_BATCH = 100
+
+
+class OutboxStatus(str, Enum):
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+@dataclass
+class OutboxMessage:
+    id: str
+    to_email: str
+    subject: str
+    html: str
+    from_email: str = ""
+    kind: str = ""
+    attempts: int = 0
+    max_attempts: int = 8
+    idempotency_key: str | None = None
+    status: str = OutboxStatus.QUEUED.value
+    run_at: float = 0.0
+    provider_id: str | None = None
+    last_error: str | None = None
+
+
+@dataclass
+class SendResult:
+    """Outcome for one message of a batch."""
+
+    provider_id: str | None = None
+    error: str | None = None
+    # The provider rejected the message itself; retrying won't help
+    permanent: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# ── Storage ──
+
+
+class SQLiteOutbox:
+    """Outbox table in a local SQLite file (same model as the job queue)."""
+
+    def __init__(self, path: str | Path, lease_s: float = 120.0):
+        self.path = Path(path)
+        self.lease_s = lease_s
+        self._lock = Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists emails (
+                    id text primary key,
+                    to_email text not null,
+                    from_email text not null,
+                    subject text not null,
+                    html text not null,
+                    kind text not null default '',
+                    status text not null,
+                    attempts integer not null default 0,
+                    max_attempts integer not null,
+                    idempotency_key text unique,
+                    run_at real not null,
+                    locked_by text,
+                    locked_until real,
+                    provider_id text,
+                    last_error text,
+                    created_at real not null,
+                    updated_at real not null,
+                    sent_at real
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_emails_due on emails (status, run_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_message(row: sqlite3.Row) -> OutboxMessage:
+        return OutboxMessage(
+            id=row["id"],
+            to_email=row["to_email"],
+            subject=row["subject"],
+            html=row["html"],
+            from_email=row["from_email"],
+            kind=row["kind"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            idempotency_key=row["idempotency_key"],
+            status=row["status"],
+            run_at=row["run_at"],
+            provider_id=row["provider_id"],
+            last_error=row["last_error"],
+        )
+
+    def enqueue(
+        self,
+        to_email: str,
+        subject: str,
+        html: str,
+        *,
+        from_email: str,
+        kind: str = "",
+        idempotency_key: str | None = None,
+        max_attempts: int | None = None,
+    ) -> str:
+        """Store a message and return its id; an existing id for a repeated key."""
+        now = time.time()
+        message_id = str(uuid.uuid4())
+        with self._lock, self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                if idempotency_key is not None:
+                    existing = conn.execute(
+                        "select id from emails where idempotency_key = ?",
+                        (idempotency_key,),
+                    ).fetchone()
+                    if existing is not None:
+                        conn.execute("commit")
+                        return existing["id"]
+                conn.execute(
+                    """
+                    insert into emails (id, to_email, from_email, subject, html, kind,
+                        status, attempts, max_attempts, idempotency_key, run_at,
+                        created_at, updated_at)
+                    values (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        message_id,
+                        to_email,
+                        from_email,
+                        subject,
+                        html,
+                        kind,
+                        OutboxStatus.QUEUED.value,
+                        max_attempts or settings.email_max_attempts,
+                        idempotency_key,
+                        now,
+                        now,
+                        now,
+                    ),
+                )
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+        return message_id
+
+    def claim(self, sender_id: str, limit: int) -> list[OutboxMessage]:
+        """Lease up to ``limit`` due messages, oldest first."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                rows = conn.execute(
+                    """
+                    select * from emails
+                    where (status = ? and run_at <= ?)
+                       or (status = ? and locked_until < ?)
+                    order by run_at asc
+                    limit ?
+                    """,
+                    (
+                        OutboxStatus.QUEUED.value,
+                        now,
+                        OutboxStatus.SENDING.value,
+                        now,
+                        limit,
+                    ),
+                ).fetchall()
+                messages: list[OutboxMessage] = []
+                for row in rows:
+                    if (
+                        row["status"] == OutboxStatus.SENDING.value
+                        and row["attempts"] >= row["max_attempts"]
+                    ):
+                        conn.execute(
+                            "update emails set status = ?, last_error = ?, "
+                            "updated_at = ? where id = ?",
+                            (OutboxStatus.DEAD.value, "lease expired", now, row["id"]),
+                        )
+                        continue
+                    conn.execute(
+                        """
+                        update emails set status = ?, attempts = attempts + 1,
+                            locked_by = ?, locked_until = ?, updated_at = ?
+                        where id = ?
+                        """,
+                        (
+                            OutboxStatus.SENDING.value,
+                            sender_id,
+                            now + self.lease_s,
+                            now,
+                            row["id"],
+                        ),
+                    )
+                    message = self._row_to_message(row)
+                    message.attempts += 1
+                    message.status = OutboxStatus.SENDING.value
+                    messages.append(message)
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+        return messages
+
+    def renew(self, message_ids: Sequence[str], sender_id: str) -> int:
+        """Extend the lease on messages still leased to ``sender_id``; returns
+        how many it still holds."""
+        now = time.time()
+        placeholders = ",".join("?" * len(message_ids))
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                f"""
+                update emails set locked_until = ?, updated_at = ?
+                where id in ({placeholders}) and status = ? and locked_by = ?
+                """,
+                (
+                    now + self.lease_s,
+                    now,
+                    *message_ids,
+                    OutboxStatus.SENDING.value,
+                    sender_id,
+                ),
+            )
+        return cursor.rowcount
+
+    def mark_sent(self, message_id: str, sender_id: str, provider_id: str | None) -> bool:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                """
+                update emails set status = ?, provider_id = ?, locked_by = null,
+                    locked_until = null, last_error = null, updated_at = ?, sent_at = ?
+                where id = ? and status = ? and locked_by = ?
+                """,
+                (
+                    OutboxStatus.SENT.value,
+                    provider_id,
+                    now,
+                    now,
+                    message_id,
+                    OutboxStatus.SENDING.value,
+                    sender_id,
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def fail(
+        self, message_id: str, sender_id: str, error: str, *, permanent: bool = False
+    ) -> bool:
+        """Record a failed attempt, scheduling a retry or marking it dead."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                row = conn.execute(
+                    "select attempts, max_attempts from emails "
+                    "where id = ? and status = ? and locked_by = ?",
+                    (message_id, OutboxStatus.SENDING.value, sender_id),
+                ).fetchone()
+                if row is None:
+                    conn.execute("commit")
+                    return False
+                if permanent or row["attempts"] >= row["max_attempts"]:
+                    status, run_at = OutboxStatus.DEAD.value, now
+                else:
+                    status = OutboxStatus.QUEUED.value
+                    run_at = now + backoff_seconds(row["attempts"])
+                conn.execute(
+                    """
+                    update emails set status = ?, run_at = ?, locked_by = null,
+                        locked_until = null, last_error = ?, updated_at = ?
+                    where id = ?
+                    """,
+                    (status, run_at, error[:2000], now, message_id),
+                )
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+        return True
+
+    def get(self, message_id: str) -> OutboxMessage | None:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("select * from emails where id = ?", (message_id,)).fetchone()
+        return self._row_to_message(row) if row is not None else None
+
+    def counts(self) -> dict[str, int]:
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "select status, count(*) as n from emails group by status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+_outbox_instance: SQLiteOutbox | None = None
+
+
+def get_outbox() -> SQLiteOutbox:
+    global _outbox_instance
+
+    if _outbox_instance is None:
+        _outbox_instance = SQLiteOutbox(settings.email_outbox_path)
+    return _outbox_instance
+
+
+def enqueue_email(
+    to_email: str,
+    subject: str,
+    html: str,
+    *,
+    kind: str = "",
+    idempotency_key: str | None = None,
+) -> str:
+    """Queue an email for the background sender. Returns the outbox id."""
+    message_id = get_outbox().enqueue(
+        to_email,
+        subject,
+        html,
+        from_email=settings.resend_from_email,
+        kind=kind,
+        idempotency_key=idempotency_key,
+    )
+    LOGGER.info("Queued %s email %s to %s", kind or "an", message_id, to_email)
+    return message_id
+
+
+# ── Sinks ──
+
+
+class EmailSink(ABC):
+    """Delivers a batch of messages. Runs in a worker thread."""
+
+    max_batch: int = 1
+
+    @abstractmethod
+    def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+        """Send ``messages``; one result per message, in order.
+
+        Raise for failures that affect the whole batch (network, auth,
+        rate limit); they are retried.
+        """
+
+
+class ResendSink(EmailSink):
+    max_batch = RESEND_MAX_BATCH
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    @staticmethod
+    def _batch_key(messages: Sequence[OutboxMessage]) -> str:
+        # Same messages → same key, so a retried batch isn't delivered twice
+        digest = hashlib.sha256("\n".join(m.id for m in messages).encode()).hexdigest()
+        return f"outbox-{digest[:48]}"
+
+    def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+        import resend
+
+        resend.api_key = self.api_key
+        response = resend.Batch.send(
+            [
+                {
+                    "from": m.from_email,
+                    "to": [m.to_email],
+                    "subject": m.subject,
+                    "html": m.html,
+                }
+                for m in messages
+            ],
+            # Permissive: invalid messages are reported, the rest still go out
+            {"idempotency_key": self._batch_key(messages), "batch_validation": "permissive"},
+        )
+        if not isinstance(response, dict):
+            response = {}
+        data = response.get("data") or []
+        errors = response.get("errors") or []
+        rejected = {int(e["index"]): str(e.get("message") or "rejected") for e in errors}
+
+        sent_ids = iter(item.get("id") for item in data)
+        results: list[SendResult] = []
+        for index in range(len(messages)):
+            if index in rejected:
+                results.append(SendResult(error=rejected[index], permanent=True))
+            else:
+                results.append(SendResult(provider_id=next(sent_ids, None)))
+        return results
+
+
+class SmtpSink(EmailSink):
+    """Sends over one SMTP connection per batch."""
+
+    max_batch = 50
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        starttls: bool = False,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+        results: list[SendResult] = []
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message in messages:
+                mime = _to_mime(message)
+                try:
+                    smtp.send_message(mime)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as exc:
+                    results.append(SendResult(error=str(exc), permanent=True))
+                except smtplib.SMTPResponseException as exc:
+                    results.append(
+                        SendResult(error=str(exc), permanent=500 <= exc.smtp_code < 600)
+                    )
+                else:
+                    results.append(SendResult(provider_id=mime["Message-ID"]))
+        return results
+
+
+class FileSink(EmailSink):
+    """Writes each message as an ``.eml`` file."""
+
+    max_batch = 100
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        results: list[SendResult] = []
+        for message in messages:
+            path = self.directory / f"{message.id}.eml"
+            path.write_bytes(bytes(_to_mime(message)))
+            results.append(SendResult(provider_id=str(path)))
+        return results
+
+
+class UnconfiguredSink(EmailSink):
+    """Stands in for a provider that has no credentials: every send fails
+    (and is retried), so messages are neither delivered nor written out."""
+
+    max_batch = RESEND_MAX_BATCH
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+        raise RuntimeError(self.reason)
+
+
+def _to_mime(message: OutboxMessage) -> EmailMessage:
+    mime = EmailMessage()
+    mime["From"] = message.from_email
+    mime["To"] = message.to_email
+    mime["Subject"] = message.subject
+    mime["Message-ID"] = make_msgid(idstring=message.id)
+    mime.set_content("This message requires an HTML-capable email client.")
+    mime.add_alternative(message.html, subtype="html")
+    return mime
+
+
+def get_email_sink() -> EmailSink:
+    backend = settings.email_backend
+    if backend == "resend":
+        if settings.resend_api_key:
+            return ResendSink(settings.resend_api_key)
+        # Emails carry call transcripts: never spill them to disk implicitly
+        LOGGER.warning("RESEND_API_KEY not set — queued emails will not be sent")
+        return UnconfiguredSink("RESEND_API_KEY is not set")
+    if backend == "smtp":
+        return SmtpSink(
+            settings.smtp_host,
+            settings.smtp_port,
+            settings.smtp_username,
+            settings.smtp_password,
+            settings.smtp_starttls,
+        )
+    if backend == "file":
+        return FileSink(settings.email_file_sink_path)
+    raise ValueError(f"Unsupported EMAIL_BACKEND: {backend}")
+
+
+# ── Sender ──
+
+
+class OutboxSender:
+    def __init__(
+        self,
+        outbox: SQLiteOutbox | None = None,
+        sink: EmailSink | None = None,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        rate_per_s: float | None = None,
+        poll_interval_s: float | None = None,
+    ):
+        self.outbox = outbox or get_outbox()
+        self.sink = sink or get_email_sink()
+        self.batch_size = max(1, min(batch_size or settings.email_batch_size, self.sink.max_batch))
+        self.concurrency = concurrency or settings.email_send_concurrency
+        self.poll_interval_s = (
+            poll_interval_s
+            if poll_interval_s is not None
+            else settings.email_poll_interval_s
+        )
+        # One token per provider request, not per message
+        self._requests = TokenBucket(rate_per_s or settings.email_rate_per_s)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self.sender_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def _keep_lease(self, batch: list[OutboxMessage]) -> None:
+        ids = [m.id for m in batch]
+        while True:
+            await asyncio.sleep(self.outbox.lease_s / 3)
+            try:
+                held = await asyncio.to_thread(self.outbox.renew, ids, self.sender_id)
+            except Exception:
+                LOGGER.warning("Lease renewal failed for an email batch", exc_info=True)
+                continue
+            if held < len(ids):
+                # The send can't be recalled; settling is refused for lost messages
+                LOGGER.warning("Lost the lease on %d of %d emails", len(ids) - held, len(ids))
+
+    async def _send_batch(self, batch: list[OutboxMessage]) -> None:
+        async with self._slots:
+            await self._requests.acquire()
+            heartbeat = asyncio.create_task(self._keep_lease(batch))
+            try:
+                results = await asyncio.to_thread(self.sink.send_batch, batch)
+            except Exception as exc:
+                LOGGER.warning(
+                    "Email batch of %d failed (attempt %d)",
+                    len(batch),
+                    batch[0].attempts,
+                    exc_info=True,
+                )
+                error = f"{type(exc).__name__}: {exc}"
+                for message in batch:
+                    await asyncio.to_thread(
+                        self.outbox.fail, message.id, self.sender_id, error
+                    )
+                return
+            finally:
+                heartbeat.cancel()
+
+        for message, result in zip(batch, results):
+            if result.ok:
+                await asyncio.to_thread(
+                    self.outbox.mark_sent, message.id, self.sender_id, result.provider_id
+                )
+                LOGGER.info(
+                    "Email %s sent to %s (id=%s)",
+                    message.id,
+                    message.to_email,
+                    result.provider_id,
+                )
+            else:
+                LOGGER.warning(
+                    "Email %s to %s rejected: %s", message.id, message.to_email, result.error
+                )
+                await asyncio.to_thread(
+                    self.outbox.fail,
+                    message.id,
+                    self.sender_id,
+                    result.error or "rejected",
+                    permanent=result.permanent,
+                )
+
+    async def run_once(self) -> int:
+        """Claim due messages and send them as concurrent batches."""
+        messages = await asyncio.to_thread(
+            self.outbox.claim, self.sender_id, self.batch_size * self.concurrency
+        )
+        batches = [
+            messages[i : i + self.batch_size]
+            for i in range(0, len(messages), self.batch_size)
+        ]
+        await asyncio.gather(*(self._send_batch(batch) for batch in batches))
+        return len(messages)
+
+    async def run(self) -> None:
+        LOGGER.info(
+            "Email sender %s started (%s, batch=%d, concurrency=%d)",
+            self.sender_id,
+            type(self.sink).__name__,
+            self.batch_size,
+            self.concurrency,
+        )
+        try:
+            while not self._stop.is_set():
+                try:
+                    sent = await self.run_once()
+                except Exception:
+                    LOGGER.warning("Email outbox claim failed", exc_info=True)
+                    sent = 0
+                if sent:
+                    continue
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            LOGGER.info("Email sender %s stopped", self.sender_id)
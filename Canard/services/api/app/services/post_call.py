@@ -0,0 +1,276 @@
+# pyright: basic
+"""Post-call processing run by the job worker.
+
+Unlike the streaming handlers, these functions raise on transient
+failures so the job queue can retry them.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+from app.config import settings as cfg
+from app.db import queries
+from app.services.digest import stage_call_results
+from app.services.email import queue_test_results_email
+from app.services.recording_cache import (
+    STREAM_CHUNK_BYTES,
+    BlobWriter,
+    fetch_recording,
+    get_recording_cache,
+    open_recording_stream,
+    recording_download_url,
+    recording_keys,
+    storage_key,
+    url_key,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def deliver_audit_report(call_id: str) -> None:
+    """Generate and upload the audit PDF, then queue the employee's results email
+    (or, in digest mode, stage the result for the employee's and manager's
+    digests).
+
+    The PDF is rendered in the process pool and uploaded in resumable
+    chunks, so neither blocks the event loop.
+
+    Missing call/employee/email data is not an error — there is nothing to
+    retry — so those cases log and return.
+    """
+    import asyncio
+
+    from app.services.audit_pdf import (
+        AuditReport,
+        render_audit_pdf_async,
+        upload_audit_pdf_async,
+    )
+
+    call = queries.get_call(call_id)
+    if not call:
+        LOGGER.warning("Audit email skipped — call %s not found in DB", call_id)
+        return
+
+    employee = queries.get_employee(call.get("employee_id", ""))
+    if not employee:
+        LOGGER.warning("Audit email skipped — employee not found for call %s", call_id)
+        return
+
+    campaign = queries.get_campaign(call["campaign_id"]) if call.get("campaign_id") else None
+    report = AuditReport.from_records(call, employee, campaign)
+
+    # ── Generate & upload audit PDF (best-effort, the email goes out regardless) ──
+    audit_report_url = call.get("audit_report_url") or ""
+    if not audit_report_url:
+        try:
+            pdf_bytes = await render_audit_pdf_async(report)
+            pdf_url = await upload_audit_pdf_async(call_id, pdf_bytes)
+            if pdf_url:
+                queries.update_call(call_id, {"audit_report_url": pdf_url})
+                audit_report_url = pdf_url
+        except Exception:
+            LOGGER.warning(
+                "Audit PDF generation/upload failed for call %s", call_id, exc_info=True
+            )
+
+    # ── Digest mode: stage for the employee's and manager's digests ──
+    if cfg.email_digest_enabled:
+        manager = queries.get_employee(employee["boss_id"]) if employee.get("boss_id") else None
+        staged = await asyncio.to_thread(
+            stage_call_results,
+            call_id=call_id,
+            employee=employee,
+            manager=manager,
+            campaign_name=report.campaign_name,
+            risk_score=report.risk_score,
+            compliance=report.compliance,
+            audit_report_url=audit_report_url,
+        )
+        LOGGER.info("Staged %d digest rows for call %s", staged, call_id)
+        return
+
+    # ── Queue email ──
+    # Checked only here: the manager's digest still gets the result
+    to_email = employee.get("email")
+    if not to_email:
+        LOGGER.warning("Audit email skipped — no email for employee (call %s)", call_id)
+        return
+
+    # Keyed by call so a retried job doesn't queue a second copy
+    email_id = await asyncio.to_thread(
+        queue_test_results_email,
+        to_email=to_email,
+        employee_name=report.employee_name,
+        risk_score=report.risk_score,
+        compliance=report.compliance,
+        ai_summary=report.ai_summary,
+        flags=report.flags,
+        transcript=call.get("transcript") or "",
+        campaign_name=report.campaign_name,
+        idempotency_key=f"results-email:{call_id}",
+    )
+    LOGGER.info("Audit email queued for call %s to %s (id=%s)", call_id, to_email, email_id)
+
+
+def _public_recording_url(storage_path: str) -> str:
+    return f"{cfg.supabase_url.rstrip('/')}/storage/v1/object/public/recordings/{storage_path}"
+
+
+async def transcribe_recording(download_url: str, recording_sid: str = "") -> str:
+    """Batch STT of a recording, streamed to ElevenLabs from the local cache."""
+    from app.integrations.elevenlabs import speech_to_text
+
+    path = await fetch_recording(download_url, recording_sid or None)
+    with open(path, "rb") as fh:
+        return await speech_to_text(fh, filename="recording.wav")
+
+
+async def store_recording(
+    call_id: str,
+    recording_sid: str,
+    download_url: str,
+    employee_id: str = "",
+    recording_duration: str = "",
+) -> str:
+    """Copy a finished Twilio recording into Supabase storage.
+
+    The Twilio download is streamed once: each chunk goes both into the
+    local recording cache and into a resumable (TUS) storage upload, so
+    memory stays bounded by one upload chunk however long the call was.
+    Once uploaded, the storage path and public URL are pointed at this
+    recording in the cache so STT, evaluation and voice cloning read the
+    local copy.
+
+    Returns the public URL written to ``calls.recording_url``.
+    """
+    import asyncio
+
+    import httpx
+
+    from app.integrations.supabase_storage import (
+        ResumableUpload,
+        upload_file_resumable,
+    )
+
+    if not recording_sid:
+        raise ValueError("RecordingSid missing from Twilio callback")
+
+    storage_path = (
+        f"{employee_id}/{employee_id}.wav"
+        if employee_id
+        else f"{call_id}/{recording_sid}.wav"
+    )
+    supabase_url = _public_recording_url(storage_path)
+    url = recording_download_url(download_url)
+    # Only the recording's own keys find a cached copy: the storage path is
+    # per employee and holds whichever of their calls was uploaded last
+    keys = recording_keys(url, recording_sid)
+
+    uploaded = False
+    async with httpx.AsyncClient(timeout=60.0) as storage_client:
+
+        async def tee(writer: BlobWriter) -> None:
+            nonlocal uploaded
+            async with open_recording_stream(url) as response:
+                length = response.headers.get("content-length")
+                upload: ResumableUpload | None = None
+                if length is not None:
+                    upload = ResumableUpload(
+                        storage_client,
+                        "recordings",
+                        storage_path,
+                        int(length),
+                        content_type="audio/wav",
+                    )
+                    await upload.create()
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                    writer.write(chunk)
+                    if upload is not None:
+                        await upload.write(chunk)
+                if upload is not None:
+                    await upload.finish()
+                    uploaded = True
+
+        recording_path = await get_recording_cache().fill(keys, tee)
+        # Already cached, or Twilio sent no Content-Length: upload from disk
+        if not uploaded:
+            await upload_file_resumable(
+                storage_client,
+                "recordings",
+                storage_path,
+                recording_path,
+                content_type="audio/wav",
+            )
+    # The storage object now holds this recording
+    await asyncio.to_thread(
+        get_recording_cache().add_aliases,
+        recording_path,
+        [storage_key("recordings", storage_path), url_key(supabase_url)],
+    )
+
+    call_update: dict[str, object] = {"recording_url": supabase_url}
+    if recording_duration:
+        try:
+            call_update["duration_seconds"] = int(recording_duration)
+        except ValueError:
+            LOGGER.warning(
+                "Invalid RecordingDuration in /recording callback: %s",
+                recording_duration,
+            )
+    queries.update_call(call_id, call_update)
+    return supabase_url
+
+
+# ── First-party dual-channel recording ──
+
+
+def dual_recording_key(call_id: str) -> str:
+    return f"dual:{call_id}"
+
+
+def _dual_recording_storage_path(call_id: str) -> str:
+    return f"{call_id}/dual.wav"
+
+
+def cache_dual_recording(call_id: str, path: Path) -> Path:
+    """Move a finished live recording into the recording cache.
+
+    The public URL it will be uploaded to is aliased up front, so anything
+    reading ``calls.dual_recording_url`` later gets the local copy.
+    """
+    public_url = _public_recording_url(_dual_recording_storage_path(call_id))
+    return get_recording_cache().put_file(
+        path, [dual_recording_key(call_id), url_key(public_url)], move=True
+    )
+
+
+async def store_dual_recording(call_id: str) -> str | None:
+    """Upload the cached dual-channel recording and record its URL.
+
+    Returns None if the file is no longer cached (evicted, or written on
+    a host that doesn't share the cache directory); there is nothing to
+    retry in that case.
+    """
+    import asyncio
+
+    import httpx
+
+    from app.integrations.supabase_storage import upload_file_resumable
+
+    path = await asyncio.to_thread(
+        get_recording_cache().get_path, dual_recording_key(call_id)
+    )
+    if path is None:
+        LOGGER.warning("Dual recording for call %s is not in the local cache", call_id)
+        return None
+
+    storage_path = _dual_recording_storage_path(call_id)
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        await upload_file_resumable(
+            client, "recordings", storage_path, path, content_type="audio/wav"
+        )
+    public_url = _public_recording_url(storage_path)
+    queries.update_call(call_id, {"dual_recording_url": public_url})
+    return public_url
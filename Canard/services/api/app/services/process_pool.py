@@ -0,0 +1,60 @@
+# pyright: basic
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, TypeVar
+
+from app.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    if _pool is None:
+        # spawn: forking a process with live event-loop threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.cpu_pool_workers or None,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def run_in_process(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-bound, picklable function off the event loop.
+
+    Uses a shared process pool; falls back to a worker thread when the
+    pool is disabled (``CPU_POOL_WORKERS=-1``) or has died.
+    """
+    global _pool
+
+    call = functools.partial(fn, *args, **kwargs)
+    if settings.cpu_pool_workers < 0:
+        return await asyncio.to_thread(call)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), call)
+    except BrokenProcessPool:
+        LOGGER.warning("Process pool broke, running %s in a thread", fn.__name__)
+        _pool = None
+        return await asyncio.to_thread(call)
+
+
+def shutdown_pool() -> None:
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,396 @@
+# pyright: basic
+"""Local, content-addressed cache of call recordings.
+
+Every post-call stage (batch STT, storage upload, evaluation, voice
+cloning) reads recordings through this cache, so each recording crosses
+the network once. Blobs are stored by SHA-256 of their content; any
+number of keys (Twilio RecordingSid, download URL, storage path) alias
+the same blob. Fills look up only keys that identify one recording;
+keys for locations that get overwritten (storage paths) are re-pointed
+when they are. The index lives in SQLite next to the blobs, so the API
+and worker processes can share one cache directory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+import httpx
+
+from app.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Evict down to this fraction of the byte budget so we don't evict on every write
+_EVICT_TARGET_RATIO = 0.9
+
+_TWILIO_RECORDING_SID = re.compile(r"/Recordings/(RE[0-9a-fA-F]{32})")
+
+_HASH_CHUNK = 1024 * 1024
+
+# Read size for streamed downloads
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def twilio_recording_key(recording_sid: str) -> str:
+    return f"twilio:{recording_sid}"
+
+
+def storage_key(bucket: str, path: str) -> str:
+    return f"storage:{bucket}/{path.lstrip('/')}"
+
+
+def url_key(url: str) -> str:
+    return f"url:{url.split('?', 1)[0]}"
+
+
+def recording_keys(url: str, recording_sid: str | None = None) -> list[str]:
+    """Cache keys for a recording URL, most specific first."""
+    keys: list[str] = []
+    sid = recording_sid
+    if not sid:
+        match = _TWILIO_RECORDING_SID.search(url)
+        sid = match.group(1) if match else None
+    if sid:
+        keys.append(twilio_recording_key(sid))
+    keys.append(url_key(url))
+    return keys
+
+
+class BlobWriter:
+    """Streams one blob into a temp file in the cache, hashing as it goes."""
+
+    def __init__(self, directory: Path):
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._tmp = Path(tmp)
+        self._fh = os.fdopen(fd, "wb")
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._fh.write(chunk)
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> tuple[str, Path]:
+        self._fh.close()
+        return self._hasher.hexdigest(), self._tmp
+
+    def discard(self) -> None:
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class RecordingCache:
+    """On-disk blob cache with a byte budget, LRU eviction and single-flight fills."""
+
+    def __init__(self, root: str | Path, max_bytes: int):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._inflight: dict[str, asyncio.Future[Path]] = {}
+        self._stats = {"hits": 0, "misses": 0, "joined": 0, "stores": 0, "evictions": 0}
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists blobs (
+                    digest text primary key,
+                    size integer not null,
+                    created_at real not null,
+                    accessed_at real not null
+                )
+                """
+            )
+            conn.execute(
+                """
+                create table if not exists aliases (
+                    key text primary key,
+                    digest text not null references blobs (digest) on delete cascade
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_blobs_accessed on blobs (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.root / "index.sqlite3", timeout=5.0)
+        conn.execute("pragma foreign_keys=on")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest
+
+    # ── Lookup ──
+
+    def get_path(self, *keys: str) -> Path | None:
+        """Path of the cached blob for the first known key, or None."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for key in keys:
+                row = conn.execute(
+                    "select digest from aliases where key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    continue
+                path = self._blob_path(row[0])
+                if not path.is_file():
+                    # Blob removed behind our back (manual cleanup, other host)
+                    conn.execute("delete from blobs where digest = ?", (row[0],))
+                    continue
+                conn.execute(
+                    "update blobs set accessed_at = ? where digest = ?", (now, row[0])
+                )
+                self._link(conn, row[0], keys)
+                self._stats["hits"] += 1
+                return path
+            self._stats["misses"] += 1
+            return None
+
+    # ── Store ──
+
+    def put_bytes(self, data: bytes, keys: Iterable[str]) -> Path:
+        writer = BlobWriter(self.blob_dir)
+        writer.write(data)
+        return self.commit(writer, keys)
+
+    def commit(self, writer: BlobWriter, keys: Iterable[str]) -> Path:
+        """Move a finished :class:`BlobWriter` into the cache under ``keys``."""
+        digest, tmp = writer.close()
+        path = self._blob_path(digest)
+        if path.is_file():
+            tmp.unlink(missing_ok=True)
+        else:
+            os.replace(tmp, path)
+        return self._register(digest, writer.size, keys)
+
+    def put_file(self, source: str | Path, keys: Iterable[str], move: bool = False) -> Path:
+        """Add an existing file, moving it into the cache when ``move`` is set."""
+        source = Path(source)
+        hasher = hashlib.sha256()
+        with open(source, "rb") as fh:
+            while chunk := fh.read(_HASH_CHUNK):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        path = self._blob_path(digest)
+        size = source.stat().st_size
+        if path.is_file():
+            if move:
+                source.unlink(missing_ok=True)
+        elif move:
+            os.replace(source, path)
+        else:
+            fd, tmp = tempfile.mkstemp(dir=self.blob_dir, suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, path)
+        return self._register(digest, size, keys)
+
+    def add_aliases(self, path: Path, keys: Iterable[str]) -> None:
+        """Make an already cached blob reachable under more keys."""
+        with self._lock, self._connect() as conn:
+            self._link(conn, path.name, keys)
+
+    def _register(self, digest: str, size: int, keys: Iterable[str]) -> Path:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """
+                insert into blobs (digest, size, created_at, accessed_at)
+                values (?, ?, ?, ?)
+                on conflict (digest) do update set accessed_at = excluded.accessed_at
+                """,
+                (digest, size, now, now),
+            )
+            self._link(conn, digest, keys)
+            self._stats["stores"] += 1
+            self._evict(conn, keep=digest)
+        return self._blob_path(digest)
+
+    @staticmethod
+    def _link(conn: sqlite3.Connection, digest: str, keys: Iterable[str]) -> None:
+        conn.executemany(
+            """
+            insert into aliases (key, digest) values (?, ?)
+            on conflict (key) do update set digest = excluded.digest
+            """,
+            [(key, digest) for key in keys],
+        )
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> None:
+        total = conn.execute("select coalesce(sum(size), 0) from blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        victims: list[str] = []
+        for digest, size in conn.execute(
+            "select digest, size from blobs order by accessed_at asc"
+        ):
+            if total <= target:
+                break
+            if digest == keep:
+                continue
+            victims.append(digest)
+            total -= size
+        conn.executemany("delete from blobs where digest = ?", [(d,) for d in victims])
+        for digest in victims:
+            # Readers holding an open handle/memmap keep their copy on POSIX
+            self._blob_path(digest).unlink(missing_ok=True)
+        self._stats["evictions"] += len(victims)
+
+    # ── Fill ──
+
+    async def fetch(
+        self, keys: list[str], loader: Callable[[], Awaitable[bytes]]
+    ) -> Path:
+        """Return the cached blob for ``keys``, calling ``loader`` on a miss."""
+
+        async def load() -> Path:
+            data = await loader()
+            return await asyncio.to_thread(self.put_bytes, data, keys)
+
+        return await self._single_flight(keys, load)
+
+    async def fill(
+        self, keys: list[str], producer: Callable[[BlobWriter], Awaitable[None]]
+    ) -> Path:
+        """Like :meth:`fetch`, but ``producer`` streams the blob into a writer
+        so it never has to be held in memory."""
+
+        async def load() -> Path:
+            writer = BlobWriter(self.blob_dir)
+            try:
+                await producer(writer)
+            except BaseException:
+                writer.discard()
+                raise
+            return await asyncio.to_thread(self.commit, writer, keys)
+
+        return await self._single_flight(keys, load)
+
+    async def _single_flight(
+        self, keys: list[str], load: Callable[[], Awaitable[Path]]
+    ) -> Path:
+        # Concurrent misses for the same primary key share one load
+        path = await asyncio.to_thread(self.get_path, *keys)
+        if path is not None:
+            return path
+
+        primary = keys[0]
+        pending = self._inflight.get(primary)
+        if pending is not None:
+            self._stats["joined"] += 1
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future[Path] = asyncio.get_running_loop().create_future()
+        self._inflight[primary] = future
+        try:
+            path = await load()
+            future.set_result(path)
+            return path
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Nobody may be waiting; don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(primary, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute(
+                "select count(*), coalesce(sum(size), 0) from blobs"
+            ).fetchone()
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": entries,
+                "bytes": total,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache_instance: RecordingCache | None = None
+
+
+def get_recording_cache() -> RecordingCache:
+    """Process-wide recording cache."""
+    global _cache_instance
+
+    if _cache_instance is None:
+        _cache_instance = RecordingCache(
+            settings.recording_cache_path,
+            max_bytes=settings.recording_cache_max_bytes,
+        )
+    return _cache_instance
+
+
+def recording_download_url(url: str) -> str:
+    """Append ``.wav`` to extensionless URLs so Twilio returns audio rather
+    than the recording's metadata."""
+    if not url.split("?", 1)[0].endswith((".wav", ".mp3")):
+        return f"{url}.wav"
+    return url
+
+
+@asynccontextmanager
+async def open_recording_stream(url: str) -> AsyncIterator[httpx.Response]:
+    """Streaming GET for a recording; the body is not read up front."""
+    # Twilio recordings require AccountSid:AuthToken basic auth
+    auth = None
+    if "twilio" in url.lower() and settings.twilio_account_sid:
+        auth = (settings.twilio_account_sid, settings.twilio_auth_token)
+
+    async with (
+        httpx.AsyncClient(timeout=60.0) as client,
+        client.stream("GET", url, auth=auth, follow_redirects=True) as response,
+    ):
+        response.raise_for_status()
+        yield response
+
+
+async def fetch_recording(
+    url: str,
+    recording_sid: str | None = None,
+    aliases: Iterable[str] = (),
+) -> Path:
+    """Local path of a recording, streaming it to disk on the first request.
+
+    ``aliases`` are pointed at the recording afterwards but never used to
+    look it up, so they may name mutable locations (a storage path).
+    """
+    url = recording_download_url(url)
+    keys = recording_keys(url, recording_sid)
+
+    async def download(writer: BlobWriter) -> None:
+        async with open_recording_stream(url) as response:
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                writer.write(chunk)
+
+    cache = get_recording_cache()
+    path = await cache.fill(keys, download)
+    if aliases:
+        await asyncio.to_thread(cache.add_aliases, path, aliases)
+    return path
@@ -0,0 +1,174 @@
+# pyright: basic
+"""Conditional-GET caching for the org-scoped dashboard/analytics routes.
+
+Each org has a data version that is bumped whenever a call, employee,
+campaign or caller is written through :mod:`app.db.queries`. A GET on a
+router using :class:`CachedRoute` is keyed by (org, path, query) and
+tagged with an ``ETag`` derived from that key and the org's version:
+
+* ``If-None-Match`` with the current tag → ``304`` without running the
+  route;
+* a cached body for the current tag → served as-is;
+* otherwise the route runs and its 200 body is cached.
+
+Writes made by other processes (e.g. a standalone job worker) are not
+seen by the listener. For an org loaded in the analytics store, the
+version therefore also includes the store's own version, taken after
+the store has caught up with those writes, so a new tag always means
+new data; otherwise it rolls over every ``RESPONSE_CACHE_TTL_S``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.config import settings
+from app.db import queries
+
+LOGGER = logging.getLogger(__name__)
+
+_VERSIONED_TABLES = {"calls", "employees", "campaigns", "callers"}
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    etag: str
+    body: bytes
+    media_type: str | None
+
+
+class ResponseCache:
+    """Per-org data versions plus an LRU of rendered GET responses."""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = max(ttl_s, 1.0)
+        self._boot = uuid.uuid4().hex[:8]
+        self._versions: dict[str, int] = {}
+        self._entries: OrderedDict[str, CachedBody] = OrderedDict()
+        self._lock = Lock()
+
+    # ── Versions ──
+
+    def bump(self, org_id: str | None = None) -> None:
+        """Invalidate one org's responses (or every org's when unknown)."""
+        with self._lock:
+            if org_id is None:
+                self._boot = uuid.uuid4().hex[:8]
+                self._versions.clear()
+            else:
+                self._versions[org_id] = self._versions.get(org_id, 0) + 1
+
+    def version(self, org_id: str, data_version: str | None = None) -> str:
+        """The org's version; ``data_version`` (the analytics store's)
+        replaces the time-based epoch when given."""
+        epoch = data_version or str(int(time.time() // self.ttl_s))
+        with self._lock:
+            return f"{self._boot}.{self._versions.get(org_id, 0)}.{epoch}"
+
+    def on_write(self, table: str, _op: str, row: dict) -> None:
+        """:func:`queries.register_write_listener` callback."""
+        if table in _VERSIONED_TABLES:
+            self.bump(row.get("org_id") or None)
+
+    # ── Entries ──
+
+    @staticmethod
+    def key(org_id: str, request: Request) -> str:
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{org_id}|{request.url.path}|{params}"
+
+    def etag(self, key: str, org_id: str, data_version: str | None = None) -> str:
+        version = self.version(org_id, data_version)
+        digest = hashlib.sha1(f"{key}|{version}".encode()).hexdigest()
+        return f'"{digest[:20]}"'
+
+    def get(self, key: str, etag: str) -> CachedBody | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.etag != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedBody) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache_instance: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache_instance
+
+    if _cache_instance is None:
+        _cache_instance = ResponseCache(
+            settings.response_cache_max_entries, settings.response_cache_ttl_s
+        )
+        queries.register_write_listener(_cache_instance.on_write)
+    return _cache_instance
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class CachedRoute(APIRoute):
+    """Route class adding ETag / 304 / response caching to org-scoped GETs.
+
+    The org comes from the authenticated user, falling back to the
+    ``org_id`` query parameter, matching how the routes resolve it.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET" or not settings.response_cache_enabled:
+                return await handler(request)
+
+            from app.auth.middleware import get_current_user_optional
+            from app.services.analytics_store import get_analytics_store
+
+            user = await get_current_user_optional(request)
+            org_id = user["org_id"] if user else request.query_params.get("org_id")
+            if not org_id:
+                return await handler(request)
+
+            cache = get_response_cache()
+            key = cache.key(org_id, request)
+            data_version = await get_analytics_store().version_async(org_id)
+            etag = cache.etag(key, org_id, data_version)
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+            entry = cache.get(key, etag)
+            if entry is None:
+                response = await handler(request)
+                if response.status_code != 200 or not hasattr(response, "body"):
+                    return response
+                entry = CachedBody(etag=etag, body=bytes(response.body), media_type=response.media_type)
+                cache.put(key, entry)
+            return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+        return cached_handler
@@ -4,7 +4,7 @@ ElevenLabs Instant Voice Cloning (IVC) service.
 
 Flow:
 1. Fetch the employee's WAV recording from Supabase storage bucket "recordings"
-   Path: {employee_id}/{employee_id}.wav
+   Path: {employee_id}/{employee_id}.wav (via the local recording cache)
 2. Use ElevenLabs SDK to create an IVC voice clone from the audio
 3. Store the voice_id on the employee record in the DB
 4. Store metadata JSON in Supabase storage bucket "deep-fakes"
@@ -14,6 +14,7 @@ Flow:
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from datetime import datetime, timezone
@@ -24,6 +25,7 @@ from elevenlabs.client import AsyncElevenLabs
 from app.config import settings
 from app.db import queries
 from app.db.client import get_supabase
+from app.services.recording_cache import get_recording_cache, storage_key
 
 LOGGER = logging.getLogger(__name__)
 
@@ -71,12 +73,20 @@ async def clone_employee_voice(employee_id: str) -> dict:
         "Starting voice clone for employee: %s (%s)", employee_name, employee_id
     )
 
-    # 2. Download WAV recording from Supabase storage
+    # 2. Download WAV recording from Supabase storage (usually already cached
+    #    locally by the post-call recording job)
     recording_path = f"{employee_id}/{employee_id}.wav"
+
+    async def _download() -> bytes:
+        return await asyncio.to_thread(
+            get_supabase().storage.from_("recordings").download, recording_path
+        )
+
     try:
-        audio_bytes: bytes = (
-            get_supabase().storage.from_("recordings").download(recording_path)
+        cached = await get_recording_cache().fetch(
+            [storage_key("recordings", recording_path)], _download
         )
+        audio_bytes = await asyncio.to_thread(cached.read_bytes)
         LOGGER.info(
             "Downloaded recording for employee %s: %d bytes",
             employee_id,
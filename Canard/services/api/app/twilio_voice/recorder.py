@@ -0,0 +1,151 @@
+# pyright: basic
+"""
+First-party, speaker-separated call recording built from the media stream.
+
+Twilio's own recording arrives minutes after hangup and mixes both
+parties. The media stream already carries every inbound frame and we
+generate every outbound frame, so the recorder writes a stereo PCM16 WAV
+(left = callee, right = agent) while the call runs:
+
+  - Inbound frames are the clock: Twilio sends them continuously (20 ms
+    each), silence included.
+  - Outbound audio is queued on an agent playback cursor. Twilio plays
+    what we send in order, starting when it arrives, so each chunk is
+    placed after anything still queued, or at "now" if playback was idle.
+
+Frames are written straight to disk through a small buffered writer;
+only agent audio that has been sent but not yet played is held in
+memory. The WAV sizes are patched in on close, and a file cut short by
+a crash is still readable (the data chunk runs to end of file).
+"""
+
+from __future__ import annotations
+
+import logging
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from app.config import settings
+from app.services.audio_features import decode_ulaw
+
+LOGGER = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000
+CHANNEL_CALLEE = 0
+CHANNEL_AGENT = 1
+
+_CHANNELS = 2
+_SAMPLE_WIDTH = 2
+_WRITE_BUFFER_BYTES = 64 * 1024
+# Sent-but-unplayed agent audio kept for alignment (µ-law, 1 byte/sample)
+_MAX_AGENT_BACKLOG_BYTES = 120 * SAMPLE_RATE
+
+
+def live_recording_path(call_id: str) -> Path:
+    """Where an in-progress recording is written (inside the recording
+    cache directory, so finishing it is a rename)."""
+    return Path(settings.recording_cache_path) / "live" / f"{call_id}.wav"
+
+
+def _wav_header(data_bytes: int) -> bytes:
+    byte_rate = SAMPLE_RATE * _CHANNELS * _SAMPLE_WIDTH
+    return (
+        b"RIFF"
+        + struct.pack("<I", 36 + data_bytes)
+        + b"WAVEfmt "
+        + struct.pack(
+            "<IHHIIHH",
+            16,
+            1,  # PCM
+            _CHANNELS,
+            SAMPLE_RATE,
+            byte_rate,
+            _CHANNELS * _SAMPLE_WIDTH,
+            _SAMPLE_WIDTH * 8,
+        )
+        + b"data"
+        + struct.pack("<I", data_bytes)
+    )
+
+
+class DualChannelRecorder:
+    """Streams a time-aligned two-channel WAV of one call to disk.
+
+    Accessed only from the event loop — no locking.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "wb", buffering=_WRITE_BUFFER_BYTES)
+        # Placeholder sizes of 0; readers treat that as "to end of file"
+        self._fh.write(_wav_header(0))
+        self.frames_written = 0
+        self._agent_pending = bytearray()
+        # Frame index at which _agent_pending[0] starts playing
+        self._agent_cursor = 0
+        self.closed = False
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames_written / SAMPLE_RATE
+
+    def add_inbound(self, payload: bytes) -> None:
+        """Write one inbound µ-law frame plus the agent audio playing under it."""
+        if self.closed or not payload:
+            return
+        callee = decode_ulaw(payload)
+        n = callee.size
+        stereo = np.zeros((n, _CHANNELS), dtype="<i2")
+        stereo[:, CHANNEL_CALLEE] = callee
+
+        if self._agent_pending:
+            start = max(self._agent_cursor - self.frames_written, 0)
+            if start < n:
+                take = min(n - start, len(self._agent_pending))
+                stereo[start : start + take, CHANNEL_AGENT] = decode_ulaw(
+                    bytes(self._agent_pending[:take])
+                )
+                del self._agent_pending[:take]
+                self._agent_cursor = self.frames_written + start + take
+
+        self._fh.write(stereo.tobytes())
+        self.frames_written += n
+
+    def add_outbound(self, payload: bytes) -> None:
+        """Queue µ-law audio just sent to Twilio for playback."""
+        if self.closed or not payload:
+            return
+        if not self._agent_pending:
+            # Playback was idle, so this starts now
+            self._agent_cursor = max(self._agent_cursor, self.frames_written)
+        if len(self._agent_pending) + len(payload) > _MAX_AGENT_BACKLOG_BYTES:
+            LOGGER.warning(
+                "Agent playback backlog over %ds for %s, dropping oldest audio",
+                _MAX_AGENT_BACKLOG_BYTES // SAMPLE_RATE,
+                self.path.name,
+            )
+            overflow = len(self._agent_pending) + len(payload) - _MAX_AGENT_BACKLOG_BYTES
+            del self._agent_pending[:overflow]
+            self._agent_cursor += overflow
+        self._agent_pending += payload
+
+    def close(self) -> Path:
+        """Finish the file; agent audio that never got to play is dropped."""
+        if self.closed:
+            return self.path
+        self.closed = True
+        self._agent_pending.clear()
+        data_bytes = self.frames_written * _CHANNELS * _SAMPLE_WIDTH
+        self._fh.seek(0)
+        self._fh.write(_wav_header(data_bytes))
+        self._fh.close()
+        return self.path
+
+    def discard(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._fh.close()
+        self.path.unlink(missing_ok=True)
@@ -9,9 +9,7 @@ import random
 import time
 import unicodedata
 from datetime import datetime, timezone
-from typing import Any, cast
 
-import httpx
 from fastapi import APIRouter, Form, Response, WebSocket, WebSocketDisconnect
 
 from app.agent import (
@@ -25,18 +23,24 @@ from app.agent import (
 from app.agent.memory import session_store
 from app.agent.prompts import STREAM_GREETING, build_greeting
 from app.config import settings as cfg
-from app.db.client import get_supabase
 from app.integrations.elevenlabs import (
     realtime_stt_session,
     sanitize_for_tts,
-    speech_to_text_from_url,
     text_to_speech,
     text_to_speech_streaming,
 )
+from app.jobs import JobType, enqueue_job
+from app.jobs.handlers import (
+    PRIORITY_EVALUATION,
+    PRIORITY_RECORDING,
+)
+from app.services.audio_features import AudioFeatures
+from app.services.dialer import TERMINAL_CALL_STATUSES, get_campaign_dialer
+from app.services.post_call import cache_dual_recording
 from app.streaming.event_bus import CallEvent, event_bus
-from app.services.email import send_test_results_email
 from app.validation.scorer import EmployeeProfile, score_disclosure
 from app.twilio_voice import twiml
+from app.twilio_voice.recorder import DualChannelRecorder, live_recording_path
 from app.twilio_voice.session import (
     AgentState,
     TurnRole,
@@ -105,6 +109,15 @@ async def generate_agent_reply(call_id: str, transcript: str) -> str:
         ]
         return _r.choice(_bridges)
 
+
+_AGENT_CALL_COLUMNS = (
+    "script_id,"
+    "script:scripts!script_id(*),"
+    "caller:callers!caller_id(*),"
+    "employee:employees!employee_id(*,organization:organizations!org_id(*))"
+)
+
+
 async def _init_agent_session(call_id: str) -> tuple[dict | None, dict | None]:
     """Fetch script/caller from DB and initialize the Mistral agent session.
 
@@ -122,22 +135,15 @@ async def _init_agent_session(call_id: str) -> tuple[dict | None, dict | None]:
     try:
         from app.db import queries
 
-        call_record = queries.get_call(call_id)
+        # Script, caller, employee and org come embedded with the call
+        call_record = queries.get_call(call_id, columns=_AGENT_CALL_COLUMNS)
         if call_record:
-            sid = call_record.get("script_id")
-            if sid:
-                script_id = sid
-                script = queries.get_script(sid)
-            cid = call_record.get("caller_id")
-            if cid:
-                caller = queries.get_caller(cid)
-            eid = call_record.get("employee_id")
-            if eid:
-                employee = queries.get_employee(eid)
+            script_id = call_record.get("script_id") or ""
+            script = queries.embedded(call_record, "script") or None
+            caller = queries.embedded(call_record, "caller") or None
+            employee = queries.embedded(call_record, "employee") or None
             if employee:
-                org_id = employee.get("org_id")
-                if org_id:
-                    org = queries.get_organization(org_id)
+                org = queries.embedded(employee, "organization") or None
                 boss_id = employee.get("boss_id")
                 if boss_id:
                     boss = queries.get_employee(boss_id)
@@ -335,9 +341,12 @@ async def twilio_status(
 
         # Clean up in-memory session
         remove_session(call_id)
+        get_campaign_dialer().release(call_id)
     else:
         # Non-terminal status update
         _update_call_safe(call_id, {"status": CallStatus})
+        if CallStatus in TERMINAL_CALL_STATUSES:
+            get_campaign_dialer().release(call_id)
 
     return Response(content="", status_code=200)
 
@@ -376,76 +385,27 @@ async def twilio_recording(
                 except ValueError:
                     pass
 
-        # ── Transcribe recording with ElevenLabs batch STT ──
+        # ── Batch STT + copy to storage run in the job worker ──
         if RecordingStatus == "completed" and RecordingUrl:
-            download_url = RecordingUrl.rstrip("/") + ".wav"
-            try:
-                # Brief delay to ensure recording is propagated
-                await asyncio.sleep(2)
-                recording_transcript = await speech_to_text_from_url(download_url)
-                LOGGER.info(
-                    "ElevenLabs STT transcribed recording for call %s (%d chars)",
-                    call["id"],
-                    len(recording_transcript),
-                )
-                if session:
-                    session.recording_transcript = recording_transcript
-            except Exception:
-                LOGGER.warning(
-                    "ElevenLabs STT failed for RecordingUrl=%s, skipping",
-                    RecordingUrl,
-                    exc_info=True,
-                )
-                if session:
-                    session.add_error(
-                        "stt",
-                        "recording_transcription_failed",
-                        f"RecordingUrl: {RecordingUrl}",
-                    )
-
             try:
-                if not RecordingSid:
-                    raise ValueError("RecordingSid missing from Twilio callback")
-
-                async with httpx.AsyncClient(
-                    auth=(cfg.twilio_account_sid, cfg.twilio_auth_token),
-                    timeout=30.0,
-                ) as client:
-                    recording_response = await client.get(download_url)
-                    recording_response.raise_for_status()
-
-                employee_id = call.get("employee_id") or ""
-                storage_path = (
-                    f"{employee_id}/{employee_id}.wav"
-                    if employee_id
-                    else f"{call['id']}/{RecordingSid}.wav"
-                )
-                upload_options: dict[str, str] = {
-                    "content-type": "audio/wav",
-                    "upsert": "true",
-                }
-                get_supabase().storage.from_("recordings").upload(
-                    storage_path,
-                    recording_response.content,
-                    cast(Any, upload_options),
+                await asyncio.to_thread(
+                    enqueue_job,
+                    JobType.PROCESS_RECORDING,
+                    {
+                        "call_id": call["id"],
+                        "recording_sid": RecordingSid,
+                        "download_url": RecordingUrl.rstrip("/") + ".wav",
+                        "employee_id": call.get("employee_id") or "",
+                        "recording_duration": RecordingDuration,
+                    },
+                    priority=PRIORITY_RECORDING,
+                    idempotency_key=f"recording:{RecordingSid or RecordingUrl}",
+                    # Give Twilio a moment to propagate the recording
+                    delay_s=2.0,
                 )
-
-                supabase_url = f"{cfg.supabase_url.rstrip('/')}/storage/v1/object/public/recordings/{storage_path}"
-                call_update: dict[str, object] = {
-                    "recording_url": supabase_url,
-                }
-                if RecordingDuration:
-                    try:
-                        call_update["duration_seconds"] = int(RecordingDuration)
-                    except ValueError:
-                        LOGGER.warning(
-                            "Invalid RecordingDuration in /recording callback: %s",
-                            RecordingDuration,
-                        )
-                _update_call_safe(call["id"], call_update)
             except Exception:
                 LOGGER.warning(
-                    "Recording persistence to Supabase failed for call_id=%s RecordingSid=%s",
+                    "Failed to enqueue recording processing for call_id=%s RecordingSid=%s",
                     call["id"],
                     RecordingSid,
                     exc_info=True,
@@ -540,6 +500,17 @@ async def twilio_stream(websocket: WebSocket) -> None:
         stream_sid=stream_sid,
         stream_started_at=datetime.now(timezone.utc).isoformat(),
     )
+    if cfg.dual_recording_enabled:
+        try:
+            session.recorder = DualChannelRecorder(live_recording_path(call_id))
+        except OSError:
+            LOGGER.warning(
+                "Dual-channel recorder unavailable for call_id=%s", call_id, exc_info=True
+            )
+
+    def _record_outbound(audio: bytes) -> None:
+        if session.recorder is not None:
+            session.recorder.add_outbound(audio)
 
     # ------------------------------------------------------------------
     # Phase 2.5 - Initialize Mistral agent session
@@ -620,6 +591,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                     }
                 )
             )
+            _record_outbound(greeting_audio)
             await websocket.send_text(
                 json.dumps(
                     {
@@ -681,6 +653,11 @@ async def twilio_stream(websocket: WebSocket) -> None:
                         # All three barge-in paths (raw audio, STT commit, process_accumulated)
                         # have been removed so the agent speaks its full sentence uninterrupted.
 
+                        session.live_audio.add_frame(
+                            decoded, agent_speaking=session.agent_is_speaking
+                        )
+                        if session.recorder is not None:
+                            session.recorder.add_inbound(decoded)
                         if session.agent_state == AgentState.LISTENING:
                             await audio_queue.put(decoded)
                         await event_bus.emit(
@@ -704,6 +681,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                 elif event == "mark":
                     mark_name = msg.get("mark", {}).get("name", "")
                     session.add_mark(mark_name)
+                    session.live_audio.mark_agent_finished()
                     LOGGER.debug("Twilio mark received: %s", mark_name)
 
                     async def _echo_guard(mn: str = mark_name) -> None:
@@ -830,6 +808,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                                 }
                             )
                         )
+                        _record_outbound(goodbye_audio)
                         await websocket.send_text(
                             json.dumps(
                                 {
@@ -912,6 +891,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                                 }
                             )
                         )
+                        _record_outbound(nudge_audio)
                         await websocket.send_text(
                             json.dumps(
                                 {
@@ -1082,6 +1062,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                                     }
                                 )
                             )
+                            _record_outbound(goodbye_audio)
                     except Exception:
                         LOGGER.warning(
                             "Failed to send goodbye TTS for call_id=%s", call_id
@@ -1180,6 +1161,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                                             }
                                         )
                                     )
+                                    _record_outbound(chunk)
                                     session.barge_in_cooldown_until = (
                                         time.monotonic() + 0.5
                                     )
@@ -1279,6 +1261,7 @@ async def twilio_stream(websocket: WebSocket) -> None:
                                     }
                                 )
                             )
+                            _record_outbound(audio_bytes)
                             session.barge_in_cooldown_until = time.monotonic() + 0.5
                             session.audio_bytes_sent_total += len(audio_bytes)
                         except Exception:
@@ -1367,6 +1350,8 @@ async def twilio_stream(websocket: WebSocket) -> None:
                 if not transcript.strip():
                     continue
 
+                session.live_audio.note_commit()
+
                 # Short transcript filter
                 if len(transcript.strip()) < 2:
                     last_speech_time[0] = time.monotonic()
@@ -1444,6 +1429,8 @@ async def twilio_stream(websocket: WebSocket) -> None:
                 debounce_task.cancel()
 
     # Run both coroutines concurrently
+    dialer = get_campaign_dialer()
+    dialer.stream_opened(call_id)
     receive_task = asyncio.create_task(_receive_twilio())
     agent_task = asyncio.create_task(_agent_loop())
     silence_task = asyncio.create_task(_silence_monitor())
@@ -1456,6 +1443,8 @@ async def twilio_stream(websocket: WebSocket) -> None:
         receive_task.cancel()
         agent_task.cancel()
         silence_task.cancel()
+        # Frees this call's STT session and campaign slot
+        dialer.stream_closed(call_id)
         try:
             await end_session(call_id)
         except Exception:
@@ -1496,15 +1485,23 @@ async def twilio_stream(websocket: WebSocket) -> None:
 
         _update_call_safe(call_id, call_update)
 
-        # Run evaluation AFTER transcript_json is persisted to avoid
+        # Queue evaluation AFTER transcript_json is persisted to avoid
         # race condition with /status webhook triggering evaluation
         # before the stream has written transcript data.
-        # Awaited directly (not create_task) because fire-and-forget tasks
-        # get cancelled when the websocket handler returns.
+        await _finish_dual_recording_safe(session)
+
         transcript_text = call_update.get("transcript")
-        await _run_evaluation_safe(
+        live_features: AudioFeatures | None = None
+        try:
+            live_features = session.live_audio.finish()
+        except Exception:
+            LOGGER.warning(
+                "Live audio features failed for call_id=%s", call_id, exc_info=True
+            )
+        await _enqueue_evaluation_safe(
             call_id,
             transcript_text if isinstance(transcript_text, str) else None,
+            live_features,
         )
 
         summary = session.to_summary_dict()
@@ -1516,118 +1513,70 @@ async def twilio_stream(websocket: WebSocket) -> None:
 
 
 # ---------------------------------------------------------------------------
-# Post-call evaluation (fire-and-forget background task)
+# Post-call evaluation (queued for the job worker)
 # ---------------------------------------------------------------------------
 
 
-async def _run_evaluation_safe(call_id: str, recording_transcript: str | None) -> None:
-    """Run post-call evaluation, catching all exceptions."""
-    try:
-        from app.services.evaluation import evaluate_call
+async def _enqueue_evaluation_safe(
+    call_id: str,
+    recording_transcript: str | None,
+    audio_features: AudioFeatures | None = None,
+) -> None:
+    """Queue post-call evaluation (→ audit PDF → email), catching all exceptions.
 
-        result = await evaluate_call(call_id, recording_transcript)
-        if result:
-            LOGGER.info(
-                "Post-call evaluation succeeded for call %s: risk_score=%s",
-                call_id,
-                result.get("risk_score"),
-            )
-            await _send_audit_email_safe(call_id, result)
-        else:
-            LOGGER.info("Post-call evaluation returned no result for call %s", call_id)
+    Live ``audio_features`` travel with the job so evaluation can skip the
+    recording download.
+    """
+    payload: dict[str, object] = {
+        "call_id": call_id,
+        "recording_transcript": recording_transcript,
+    }
+    if audio_features is not None:
+        payload["audio_features"] = audio_features.to_dict()
+    try:
+        await asyncio.to_thread(
+            enqueue_job,
+            JobType.EVALUATE_CALL,
+            payload,
+            priority=PRIORITY_EVALUATION,
+            idempotency_key=f"evaluate:{call_id}",
+        )
     except Exception:
         LOGGER.warning(
-            "Post-call evaluation failed for call %s", call_id, exc_info=True
+            "Failed to enqueue post-call evaluation for call %s", call_id, exc_info=True
         )
 
 
-async def _send_audit_email_safe(call_id: str, eval_result: dict) -> None:
-    """Send audit email after evaluation — best-effort, never raises."""
+async def _finish_dual_recording_safe(session) -> None:
+    """Close the live recorder, cache the file and queue its upload."""
+    recorder = session.recorder
+    if recorder is None:
+        return
+    call_id = session.call_id
     try:
-        from app.db import queries
-        from app.services.audit_pdf import generate_audit_pdf, upload_audit_pdf
-
-        call = queries.get_call(call_id)
-        if not call:
-            LOGGER.warning("Audit email skipped — call %s not found in DB", call_id)
-            return
-
-        employee = queries.get_employee(call.get("employee_id", ""))
-        if not employee:
-            LOGGER.warning("Audit email skipped — employee not found for call %s", call_id)
-            return
-
-        to_email = employee.get("email")
-        if not to_email:
-            LOGGER.warning("Audit email skipped — no email for employee (call %s)", call_id)
+        path = recorder.close()
+        if recorder.frames_written == 0:
+            recorder.discard()
             return
-
-        campaign = queries.get_campaign(call["campaign_id"]) if call.get("campaign_id") else None
-
-        flags = call.get("flags") or []
-        if isinstance(flags, str):
-            try:
-                flags = json.loads(flags)
-                if not isinstance(flags, list):
-                    flags = [flags]
-            except (json.JSONDecodeError, ValueError):
-                flags = [flags]
-
-        campaign_name = campaign.get("name", "") if campaign else ""
-        employee_name = employee.get("full_name", "")
-        risk_score = call.get("risk_score") or 0
-        compliance = call.get("employee_compliance") or ""
-        ai_summary = call.get("ai_summary") or ""
-        transcript = call.get("transcript") or ""
-
-        # Parse transcript_json from call record (may be stored as JSON string)
-        transcript_json_raw = call.get("transcript_json") or []
-        if isinstance(transcript_json_raw, str):
-            try:
-                transcript_json_raw = json.loads(transcript_json_raw)
-            except (json.JSONDecodeError, ValueError):
-                transcript_json_raw = []
-        transcript_json: list[dict] = transcript_json_raw if isinstance(transcript_json_raw, list) else []
-
-        # ── Generate & upload audit PDF ──
-        try:
-            pdf_bytes = generate_audit_pdf(
-                call_id=call_id,
-                call_date=call.get("created_at") or call.get("started_at") or "",
-                campaign_name=campaign_name,
-                employee_name=employee_name,
-                department=employee.get("department") or "",
-                job_title=employee.get("job_title") or "",
-                risk_score=risk_score,
-                compliance=compliance,
-                ai_summary=ai_summary,
-                flags=flags,
-                transcript_json=transcript_json,
-            )
-            pdf_url = upload_audit_pdf(call_id, pdf_bytes)
-            if pdf_url:
-                _update_call_safe(call_id, {"audit_report_url": pdf_url})
-        except Exception:
-            LOGGER.warning("Audit PDF generation/upload failed for call %s", call_id, exc_info=True)
-
-        # ── Send email ──
-        email_id = send_test_results_email(
-            to_email=to_email,
-            employee_name=employee_name,
-            risk_score=risk_score,
-            compliance=compliance,
-            ai_summary=ai_summary,
-            flags=flags,
-            transcript=transcript,
-            campaign_name=campaign_name,
+        await asyncio.to_thread(cache_dual_recording, call_id, path)
+        await asyncio.to_thread(
+            enqueue_job,
+            JobType.STORE_DUAL_RECORDING,
+            {"call_id": call_id},
+            priority=PRIORITY_RECORDING,
+            idempotency_key=f"dual-recording:{call_id}",
+        )
+        LOGGER.info(
+            "Dual-channel recording for call %s: %.1fs",
+            call_id,
+            recorder.duration_seconds,
         )
-
-        if email_id:
-            LOGGER.info("Audit email sent for call %s to %s (id=%s)", call_id, to_email, email_id)
-        else:
-            LOGGER.warning("Audit email returned no id for call %s", call_id)
     except Exception:
-        LOGGER.warning("Audit email failed for call %s", call_id, exc_info=True)
+        LOGGER.warning(
+            "Failed to finish dual-channel recording for call %s",
+            call_id,
+            exc_info=True,
+        )
 
 
 # ---------------------------------------------------------------------------
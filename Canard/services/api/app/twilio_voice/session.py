@@ -20,6 +20,8 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import Any
 
+from app.services.audio_features import LiveAudioFeatureAccumulator
+from app.twilio_voice.recorder import DualChannelRecorder
 
 def _utcnow() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -134,6 +136,12 @@ class CallSessionData:
     audio_chunks_received: int = 0
     audio_bytes_sent_total: int = 0
 
+    # ── Audio features (inbound channel, built live) ──
+    live_audio: LiveAudioFeatureAccumulator = field(
+        default_factory=LiveAudioFeatureAccumulator
+    )
+    recorder: DualChannelRecorder | None = None
+
     employee_profile: object | None = None
 
     # ── Barge-in state ──
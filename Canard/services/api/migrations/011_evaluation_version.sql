@@ -0,0 +1,9 @@
+-- 011_evaluation_version.sql
+-- Record which evaluation prompt produced a call's scores so bulk
+-- re-evaluation can target stale calls, and support keyset paging.
+
+alter table calls add column if not exists evaluation_version text;
+alter table calls add column if not exists evaluated_at timestamptz;
+
+create index if not exists idx_calls_created_at_id on calls(created_at, id);
+create index if not exists idx_calls_evaluation_version on calls(evaluation_version);
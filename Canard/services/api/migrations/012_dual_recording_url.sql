@@ -0,0 +1,5 @@
+-- 012_dual_recording_url.sql
+-- Speaker-separated (callee left, agent right) recording written by the
+-- API from the media stream, alongside Twilio's mixed recording.
+
+alter table calls add column if not exists dual_recording_url text;
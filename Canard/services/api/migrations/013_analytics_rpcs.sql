@@ -0,0 +1,178 @@
+-- 013_analytics_rpcs.sql
+-- Aggregate dashboard/analytics metrics in the database so the API gets
+-- back one row per bucket instead of every call (with transcripts).
+-- Used when ANALYTICS_SOURCE=sql.
+--
+-- Conventions shared by the functions below:
+--   * a call's day is coalesce(started_at, created_at) in UTC
+--   * department comes from the employee, '' / missing -> 'Other'
+--   * attack vector comes from the campaign, '' / missing -> 'Unknown'
+--   * flags are jsonb strings or {"type": ...} objects
+
+create index if not exists idx_calls_org_status_created
+    on calls(org_id, status, created_at);
+
+-- Normalise one element of calls.flags to its name
+create or replace function call_flag_name(flag jsonb)
+returns text language sql immutable as $$
+    select case jsonb_typeof(flag)
+        when 'string' then flag #>> '{}'
+        when 'object' then coalesce(flag ->> 'type', flag::text)
+        else flag::text
+    end;
+$$;
+
+-- Headline counters for /api/dashboard/stats
+create or replace function analytics_dashboard_stats(org_uuid uuid)
+returns table(
+    active_campaigns bigint,
+    total_campaigns bigint,
+    total_calls bigint,
+    completed_calls bigint,
+    tested_employees bigint,
+    total_employees bigint,
+    avg_risk numeric
+) language sql stable as $$
+    select
+        (select count(*) from campaigns
+         where org_id = org_uuid and status in ('in_progress', 'active')),
+        (select count(*) from campaigns where org_id = org_uuid),
+        (select count(*) from calls where org_id = org_uuid),
+        count(*),
+        count(distinct c.employee_id),
+        (select count(*) from employees where org_id = org_uuid),
+        avg(coalesce(c.risk_score, 0))
+    from calls c
+    where c.org_id = org_uuid and c.status = 'completed';
+$$;
+
+-- Per-day call volume and outcomes (all statuses) since a day
+create or replace function analytics_calls_by_day(org_uuid uuid, since date)
+returns table(
+    day date,
+    calls bigint,
+    passed bigint,
+    failed bigint,
+    completed_with_risk bigint,
+    avg_risk numeric
+) language sql stable as $$
+    select
+        (coalesce(c.started_at, c.created_at) at time zone 'UTC')::date as day,
+        count(*),
+        count(*) filter (where c.employee_compliance = 'passed'),
+        count(*) filter (where c.employee_compliance = 'failed'),
+        count(c.risk_score) filter (where c.status = 'completed'),
+        avg(c.risk_score) filter (where c.status = 'completed')
+    from calls c
+    where c.org_id = org_uuid
+      and coalesce(c.started_at, c.created_at) >= since::timestamp at time zone 'UTC'
+    group by 1
+    order by 1;
+$$;
+
+-- Completed calls per department, with the most recent call time
+create or replace function analytics_department_totals(org_uuid uuid)
+returns table(
+    department text,
+    total_calls bigint,
+    failed_calls bigint,
+    last_call_at timestamptz
+) language sql stable as $$
+    select
+        coalesce(nullif(e.department, ''), 'Other'),
+        count(*),
+        count(*) filter (where c.employee_compliance = 'failed'),
+        max(coalesce(c.started_at, c.created_at))
+    from calls c
+    left join employees e on e.id = c.employee_id
+    where c.org_id = org_uuid and c.status = 'completed'
+    group by 1
+    order by 4 desc nulls last;
+$$;
+
+-- Completed calls per (day, department) since a day
+create or replace function analytics_department_trends(org_uuid uuid, since date)
+returns table(
+    day date,
+    department text,
+    total_calls bigint,
+    failed_calls bigint
+) language sql stable as $$
+    select
+        (coalesce(c.started_at, c.created_at) at time zone 'UTC')::date,
+        coalesce(nullif(e.department, ''), 'Other'),
+        count(*),
+        count(*) filter (where c.employee_compliance = 'failed')
+    from calls c
+    left join employees e on e.id = c.employee_id
+    where c.org_id = org_uuid
+      and c.status = 'completed'
+      and coalesce(c.started_at, c.created_at) >= since::timestamp at time zone 'UTC'
+    group by 1, 2
+    order by 1, 2;
+$$;
+
+-- Completed calls per (attack vector, department)
+create or replace function analytics_attack_heatmap(org_uuid uuid)
+returns table(
+    attack_vector text,
+    department text,
+    total_calls bigint,
+    failed_calls bigint,
+    avg_risk numeric
+) language sql stable as $$
+    select
+        coalesce(nullif(cp.attack_vector, ''), 'Unknown'),
+        coalesce(nullif(e.department, ''), 'Other'),
+        count(*),
+        count(*) filter (where c.employee_compliance = 'failed'),
+        avg(coalesce(c.risk_score, 0))
+    from calls c
+    left join employees e on e.id = c.employee_id
+    left join campaigns cp on cp.id = c.campaign_id
+    where c.org_id = org_uuid and c.status = 'completed'
+    group by 1, 2;
+$$;
+
+-- How often each flag appears on completed calls (optionally one campaign)
+create or replace function analytics_flag_frequency(org_uuid uuid, campaign_uuid uuid default null)
+returns table(
+    flag text,
+    call_count bigint,
+    completed_calls bigint
+) language sql stable as $$
+    with completed as (
+        select c.flags
+        from calls c
+        where c.org_id = org_uuid
+          and c.status = 'completed'
+          and (campaign_uuid is null or c.campaign_id = campaign_uuid)
+    )
+    select
+        call_flag_name(f.value),
+        count(*),
+        (select count(*) from completed)
+    from completed, jsonb_array_elements(completed.flags) f
+    group by 1
+    order by 2 desc, 1;
+$$;
+
+-- Flag occurrences per (department, flag) on completed calls
+create or replace function analytics_dept_flag_pivot(org_uuid uuid)
+returns table(
+    department text,
+    flag text,
+    call_count bigint,
+    affected_employees bigint
+) language sql stable as $$
+    select
+        coalesce(nullif(e.department, ''), 'Other'),
+        call_flag_name(f.value),
+        count(*),
+        count(distinct c.employee_id)
+    from calls c
+    left join employees e on e.id = c.employee_id
+    cross join jsonb_array_elements(c.flags) f
+    where c.org_id = org_uuid and c.status = 'completed'
+    group by 1, 2;
+$$;
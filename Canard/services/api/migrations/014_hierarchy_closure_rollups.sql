@@ -0,0 +1,338 @@
+-- 014_hierarchy_closure_rollups.sql
+-- Materialised manager -> report closure plus per-employee risk rollups,
+-- so the hierarchy view is one indexed read instead of a recursive walk,
+-- an org-wide call scan and a Python roll-up per request.
+--
+-- employee_closure holds one row per (ancestor, descendant) pair,
+-- including each employee's own depth-0 row. Triggers on employees keep
+-- it in sync with boss_id: inserts, CSV import re-parenting and
+-- on-delete-set-null all go through them.
+--
+-- employee_risk_rollups holds, per employee, the completed calls they
+-- took (personal_*) and those taken by them and everyone below them
+-- (team_*). Triggers on calls apply each change as a delta: status
+-- reaching 'completed', an evaluation writing risk_score or
+-- employee_compliance, or a re-evaluation replacing them. Each delta
+-- touches the employee's row and one row per ancestor.
+
+create table if not exists employee_closure (
+    ancestor_id uuid not null references employees(id) on delete cascade,
+    descendant_id uuid not null references employees(id) on delete cascade,
+    org_id uuid not null references organizations(id),
+    depth int not null,
+    primary key (ancestor_id, descendant_id)
+);
+
+create index if not exists idx_employee_closure_descendant
+    on employee_closure(descendant_id, depth);
+
+create table if not exists employee_risk_rollups (
+    employee_id uuid primary key references employees(id) on delete cascade,
+    org_id uuid not null references organizations(id),
+    personal_total int not null default 0,
+    personal_failed int not null default 0,
+    personal_risk_sum bigint not null default 0,
+    team_total int not null default 0,
+    team_failed int not null default 0,
+    team_risk_sum bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+-- ── Closure maintenance ──
+
+create or replace function employee_closure_on_insert()
+returns trigger language plpgsql as $$
+begin
+    insert into employee_closure (ancestor_id, descendant_id, org_id, depth)
+    values (new.id, new.id, new.org_id, 0)
+    on conflict do nothing;
+
+    if new.boss_id is not null then
+        insert into employee_closure (ancestor_id, descendant_id, org_id, depth)
+        select c.ancestor_id, new.id, new.org_id, c.depth + 1
+        from employee_closure c
+        where c.descendant_id = new.boss_id
+        on conflict do nothing;
+    end if;
+
+    insert into employee_risk_rollups (employee_id, org_id)
+    values (new.id, new.org_id)
+    on conflict do nothing;
+    return new;
+end;
+$$;
+
+create or replace function employee_closure_check_cycle()
+returns trigger language plpgsql as $$
+begin
+    if new.boss_id is not null and exists (
+        select 1 from employee_closure
+        where ancestor_id = new.id and descendant_id = new.boss_id
+    ) then
+        raise exception 'boss_id % would create a reporting cycle for %', new.boss_id, new.id;
+    end if;
+    return new;
+end;
+$$;
+
+-- The row check above reads the closure, which the AFTER row triggers
+-- only update at the end of the statement, so one statement changing
+-- several boss_ids (A under B and B under A) passes it. This re-checks
+-- every changed row against employees.boss_id once the statement is
+-- done; any new cycle runs through at least one of them. Raising rolls
+-- the statement back, closure and rollup updates included.
+create or replace function employees_check_no_cycles()
+returns trigger language plpgsql as $$
+declare
+    starts uuid[];
+    looped uuid;
+begin
+    if tg_op = 'UPDATE' then
+        select array_agg(m.id) into starts
+        from changed m
+        join previous o on o.id = m.id
+        where m.boss_id is not null and m.boss_id is distinct from o.boss_id;
+    else
+        select array_agg(m.id) into starts from changed m where m.boss_id is not null;
+    end if;
+    if starts is null then
+        return null;
+    end if;
+
+    -- union, not union all: a walk entering a cycle it didn't start on
+    -- still terminates
+    with recursive chain(start_id, id) as (
+        select e.id, e.boss_id from employees e where e.id = any(starts)
+        union
+        select c.start_id, e.boss_id
+        from chain c
+        join employees e on e.id = c.id
+        where e.boss_id is not null and c.id <> c.start_id
+    )
+    select start_id into looped from chain where id = start_id limit 1;
+    if looped is not null then
+        raise exception 'employee % is in a reporting cycle', looped;
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function employee_closure_on_reparent()
+returns trigger language plpgsql as $$
+declare
+    moved employee_risk_rollups%rowtype;
+begin
+    select * into moved from employee_risk_rollups where employee_id = new.id;
+
+    -- Detach the subtree from its old ancestors
+    update employee_risk_rollups r
+    set team_total = r.team_total - moved.team_total,
+        team_failed = r.team_failed - moved.team_failed,
+        team_risk_sum = r.team_risk_sum - moved.team_risk_sum,
+        updated_at = now()
+    from employee_closure a
+    where a.descendant_id = new.id and a.depth > 0 and r.employee_id = a.ancestor_id;
+
+    delete from employee_closure c
+    using employee_closure a, employee_closure d
+    where a.descendant_id = new.id and a.depth > 0
+      and d.ancestor_id = new.id
+      and c.ancestor_id = a.ancestor_id and c.descendant_id = d.descendant_id;
+
+    -- Attach it under the new boss
+    if new.boss_id is not null then
+        insert into employee_closure (ancestor_id, descendant_id, org_id, depth)
+        select a.ancestor_id, d.descendant_id, new.org_id, a.depth + d.depth + 1
+        from employee_closure a, employee_closure d
+        where a.descendant_id = new.boss_id and d.ancestor_id = new.id;
+
+        update employee_risk_rollups r
+        set team_total = r.team_total + moved.team_total,
+            team_failed = r.team_failed + moved.team_failed,
+            team_risk_sum = r.team_risk_sum + moved.team_risk_sum,
+            updated_at = now()
+        from employee_closure a
+        where a.descendant_id = new.id and a.depth > 0 and r.employee_id = a.ancestor_id;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_employee_closure_insert on employees;
+create trigger trg_employee_closure_insert
+    after insert on employees
+    for each row execute function employee_closure_on_insert();
+
+drop trigger if exists trg_employee_closure_cycle on employees;
+create trigger trg_employee_closure_cycle
+    before update of boss_id on employees
+    for each row when (new.boss_id is distinct from old.boss_id)
+    execute function employee_closure_check_cycle();
+
+-- Transition tables can't be combined with a column list, so this fires
+-- on every update statement (the usage counters touch employees on each
+-- call write); the walk starts only from rows whose boss_id changed
+drop trigger if exists trg_employees_no_cycles_update on employees;
+create trigger trg_employees_no_cycles_update
+    after update on employees
+    referencing old table as previous new table as changed
+    for each statement execute function employees_check_no_cycles();
+
+drop trigger if exists trg_employees_no_cycles_insert on employees;
+create trigger trg_employees_no_cycles_insert
+    after insert on employees
+    referencing new table as changed
+    for each statement execute function employees_check_no_cycles();
+
+drop trigger if exists trg_employee_closure_reparent on employees;
+create trigger trg_employee_closure_reparent
+    after update of boss_id on employees
+    for each row when (new.boss_id is distinct from old.boss_id)
+    execute function employee_closure_on_reparent();
+
+-- ── Rollup maintenance ──
+
+-- Add a delta to an employee's personal counts and to the team counts
+-- of the employee and every ancestor
+create or replace function apply_risk_rollup(
+    emp uuid, d_total int, d_failed int, d_risk bigint
+) returns void language sql as $$
+    update employee_risk_rollups
+    set personal_total = personal_total + d_total,
+        personal_failed = personal_failed + d_failed,
+        personal_risk_sum = personal_risk_sum + d_risk
+    where employee_id = emp;
+
+    update employee_risk_rollups r
+    set team_total = r.team_total + d_total,
+        team_failed = r.team_failed + d_failed,
+        team_risk_sum = r.team_risk_sum + d_risk,
+        updated_at = now()
+    from employee_closure a
+    where a.descendant_id = emp and r.employee_id = a.ancestor_id;
+$$;
+
+create or replace function calls_risk_rollup()
+returns trigger language plpgsql as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.status = 'completed' then
+        perform apply_risk_rollup(
+            old.employee_id,
+            -1,
+            -(coalesce(old.employee_compliance, '') = 'failed')::int,
+            -coalesce(old.risk_score, 0)
+        );
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and new.status = 'completed' then
+        perform apply_risk_rollup(
+            new.employee_id,
+            1,
+            (coalesce(new.employee_compliance, '') = 'failed')::int,
+            coalesce(new.risk_score, 0)
+        );
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_calls_risk_rollup_insert on calls;
+create trigger trg_calls_risk_rollup_insert
+    after insert or delete on calls
+    for each row execute function calls_risk_rollup();
+
+drop trigger if exists trg_calls_risk_rollup_update on calls;
+create trigger trg_calls_risk_rollup_update
+    after update of status, employee_id, risk_score, employee_compliance on calls
+    for each row
+    when (
+        old.status is distinct from new.status
+        or old.employee_id is distinct from new.employee_id
+        or old.risk_score is distinct from new.risk_score
+        or old.employee_compliance is distinct from new.employee_compliance
+    )
+    execute function calls_risk_rollup();
+
+-- ── Backfill ──
+
+insert into employee_closure (ancestor_id, descendant_id, org_id, depth)
+with recursive tree as (
+    select e.id as ancestor_id, e.id as descendant_id, e.org_id, 0 as depth,
+           array[e.id] as path
+    from employees e
+  union all
+    select t.ancestor_id, e.id, e.org_id, t.depth + 1, t.path || e.id
+    from tree t
+    join employees e on e.boss_id = t.descendant_id
+    where not e.id = any(t.path)
+)
+select ancestor_id, descendant_id, org_id, min(depth)
+from tree
+group by ancestor_id, descendant_id, org_id
+on conflict do nothing;
+
+insert into employee_risk_rollups (employee_id, org_id)
+select id, org_id from employees
+on conflict do nothing;
+
+update employee_risk_rollups r
+set personal_total = p.total,
+    personal_failed = p.failed,
+    personal_risk_sum = p.risk_sum
+from (
+    select employee_id,
+           count(*) as total,
+           count(*) filter (where employee_compliance = 'failed') as failed,
+           sum(coalesce(risk_score, 0)) as risk_sum
+    from calls
+    where status = 'completed'
+    group by employee_id
+) p
+where r.employee_id = p.employee_id;
+
+update employee_risk_rollups r
+set team_total = t.total,
+    team_failed = t.failed,
+    team_risk_sum = t.risk_sum,
+    updated_at = now()
+from (
+    select c.ancestor_id,
+           sum(p.personal_total) as total,
+           sum(p.personal_failed) as failed,
+           sum(p.personal_risk_sum) as risk_sum
+    from employee_closure c
+    join employee_risk_rollups p on p.employee_id = c.descendant_id
+    group by c.ancestor_id
+) t
+where r.employee_id = t.ancestor_id;
+
+-- ── Read path ──
+
+-- A manager (depth 0) and everyone below them, with their rollups
+create or replace function get_team_rollups(manager_uuid uuid)
+returns table(
+    id uuid,
+    full_name text,
+    department text,
+    job_title text,
+    risk_level text,
+    boss_id uuid,
+    depth int,
+    personal_total int,
+    personal_failed int,
+    personal_risk_sum bigint,
+    team_total int,
+    team_failed int,
+    team_risk_sum bigint
+) language sql stable as $$
+    select e.id, e.full_name, e.department, e.job_title, e.risk_level, e.boss_id,
+           c.depth,
+           coalesce(r.personal_total, 0), coalesce(r.personal_failed, 0),
+           coalesce(r.personal_risk_sum, 0),
+           coalesce(r.team_total, 0), coalesce(r.team_failed, 0),
+           coalesce(r.team_risk_sum, 0)
+    from employee_closure c
+    join employees e on e.id = c.descendant_id
+    left join employee_risk_rollups r on r.employee_id = e.id
+    where c.ancestor_id = manager_uuid
+    order by c.depth;
+$$;
@@ -0,0 +1,141 @@
+-- 015_usage_counters.sql
+-- Denormalised call counters on employees and callers, so the list
+-- endpoints read one org's rows instead of aggregating every call.
+--
+-- A trigger on calls keeps them in step with each insert, delete and
+-- change of status, compliance, start time, employee or caller, so
+-- evaluate_call persisting a result updates them in the same
+-- transaction. Existing rows are filled by refresh_usage_counters(),
+-- run once through scripts/backfill_counters.py after this migration.
+
+alter table employees add column if not exists total_tests int not null default 0;
+alter table employees add column if not exists failed_tests int not null default 0;
+alter table employees add column if not exists last_test_at timestamptz;
+
+alter table callers add column if not exists total_calls int not null default 0;
+alter table callers add column if not exists completed_calls int not null default 0;
+alter table callers add column if not exists failed_calls int not null default 0;
+
+create index if not exists idx_employees_org_created on employees(org_id, created_at desc);
+create index if not exists idx_callers_org_created on callers(org_id, created_at desc);
+create index if not exists idx_calls_employee_completed
+    on calls(employee_id, started_at desc) where status = 'completed';
+create index if not exists idx_calls_caller_id on calls(caller_id);
+
+-- ── Counter maintenance ──
+
+create or replace function calls_usage_counters()
+returns trigger language plpgsql as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        if old.status = 'completed' then
+            update employees e
+            set total_tests = e.total_tests - 1,
+                failed_tests = e.failed_tests - (coalesce(old.employee_compliance, '') = 'failed')::int,
+                -- Only a removed latest test moves last_test_at back
+                last_test_at = case
+                    when old.started_at is null or old.started_at < e.last_test_at then e.last_test_at
+                    else (
+                        select max(c.started_at) from calls c
+                        where c.employee_id = old.employee_id and c.status = 'completed'
+                    )
+                end
+            where e.id = old.employee_id;
+        end if;
+        if old.caller_id is not null then
+            update callers
+            set total_calls = total_calls - 1,
+                completed_calls = completed_calls - (old.status = 'completed')::int,
+                failed_calls = failed_calls
+                    - (old.status = 'completed' and coalesce(old.employee_compliance, '') = 'failed')::int
+            where id = old.caller_id;
+        end if;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        if new.status = 'completed' then
+            update employees
+            set total_tests = total_tests + 1,
+                failed_tests = failed_tests + (coalesce(new.employee_compliance, '') = 'failed')::int,
+                last_test_at = greatest(last_test_at, new.started_at)
+            where id = new.employee_id;
+        end if;
+        if new.caller_id is not null then
+            update callers
+            set total_calls = total_calls + 1,
+                completed_calls = completed_calls + (new.status = 'completed')::int,
+                failed_calls = failed_calls
+                    + (new.status = 'completed' and coalesce(new.employee_compliance, '') = 'failed')::int
+            where id = new.caller_id;
+        end if;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_calls_usage_counters_insert on calls;
+create trigger trg_calls_usage_counters_insert
+    after insert or delete on calls
+    for each row execute function calls_usage_counters();
+
+drop trigger if exists trg_calls_usage_counters_update on calls;
+create trigger trg_calls_usage_counters_update
+    after update of status, employee_compliance, started_at, employee_id, caller_id on calls
+    for each row
+    when (
+        old.status is distinct from new.status
+        or old.employee_compliance is distinct from new.employee_compliance
+        or old.started_at is distinct from new.started_at
+        or old.employee_id is distinct from new.employee_id
+        or old.caller_id is distinct from new.caller_id
+    )
+    execute function calls_usage_counters();
+
+-- ── Backfill ──
+
+-- Recompute every counter of one org (or all orgs when null) from calls
+create or replace function refresh_usage_counters(org_uuid uuid default null)
+returns table(employees int, callers int) language plpgsql as $$
+declare
+    n_employees int;
+    n_callers int;
+begin
+    update employees e
+    set total_tests = coalesce(s.total, 0),
+        failed_tests = coalesce(s.failed, 0),
+        last_test_at = s.last_at
+    from employees x
+    left join (
+        select employee_id,
+               count(*) as total,
+               count(*) filter (where employee_compliance = 'failed') as failed,
+               max(started_at) as last_at
+        from calls
+        where status = 'completed' and (org_uuid is null or org_id = org_uuid)
+        group by employee_id
+    ) s on s.employee_id = x.id
+    where e.id = x.id and (org_uuid is null or x.org_id = org_uuid);
+    get diagnostics n_employees = row_count;
+
+    update callers r
+    set total_calls = coalesce(s.total, 0),
+        completed_calls = coalesce(s.completed, 0),
+        failed_calls = coalesce(s.failed, 0)
+    from callers x
+    left join (
+        select caller_id,
+               count(*) as total,
+               count(*) filter (where status = 'completed') as completed,
+               count(*) filter (
+                   where status = 'completed' and employee_compliance = 'failed'
+               ) as failed
+        from calls
+        where caller_id is not null and (org_uuid is null or org_id = org_uuid)
+        group by caller_id
+    ) s on s.caller_id = x.id
+    where r.id = x.id and (org_uuid is null or x.org_id = org_uuid);
+    get diagnostics n_callers = row_count;
+
+    return query select n_employees, n_callers;
+end;
+$$;
@@ -0,0 +1,60 @@
+-- 016_campaign_scheduler.sql
+-- State for the durable campaign scheduler (app/services/campaign_scheduler.py).
+--
+-- A campaign is driven by whichever scheduler instance holds its lease
+-- (lease_owner until lease_expires_at, renewed while it runs). When an
+-- instance dies its lease lapses and another one resumes the campaign
+-- from its campaign_assignments: 'pending' rows are still to dial,
+-- 'dialing' rows were being started when the instance stopped.
+--
+-- Calls are only placed inside the campaign's calling window, when one
+-- is set, evaluated in the employee's timezone (falling back to the
+-- campaign's).
+
+alter table campaigns add column if not exists lease_owner text;
+alter table campaigns add column if not exists lease_expires_at timestamptz;
+alter table campaigns add column if not exists timezone text not null default 'UTC';
+-- Null start/end or days: no restriction on that part of the window
+alter table campaigns add column if not exists calling_window_start time;
+alter table campaigns add column if not exists calling_window_end time;
+-- ISO weekdays (1 = Monday)
+alter table campaigns add column if not exists calling_days int[];
+
+alter table employees add column if not exists timezone text;
+
+create index if not exists idx_campaigns_schedulable
+    on campaigns(status, scheduled_at) where status in ('scheduled', 'running');
+create index if not exists idx_campaign_assignments_campaign_status
+    on campaign_assignments(campaign_id, status);
+create index if not exists idx_calls_assignment_id on calls(assignment_id);
+
+-- Campaigns due to run whose lease is free, lapsed or already ours
+create or replace function list_due_campaigns(owner text)
+returns setof campaigns language sql stable as $$
+    select *
+    from campaigns
+    where (status = 'running' or (status = 'scheduled' and scheduled_at <= now()))
+      and (lease_owner is null or lease_owner = owner or lease_expires_at < now())
+    order by scheduled_at nulls first, created_at;
+$$;
+
+-- Take or renew a campaign's lease; true when ``owner`` now holds it
+create or replace function acquire_campaign_lease(campaign_uuid uuid, owner text, lease_seconds int)
+returns boolean language sql as $$
+    with leased as (
+        update campaigns
+        set lease_owner = owner,
+            lease_expires_at = now() + make_interval(secs => lease_seconds)
+        where id = campaign_uuid
+          and (lease_owner is null or lease_owner = owner or lease_expires_at < now())
+        returning 1
+    )
+    select exists (select 1 from leased);
+$$;
+
+create or replace function release_campaign_lease(campaign_uuid uuid, owner text)
+returns void language sql as $$
+    update campaigns
+    set lease_owner = null, lease_expires_at = null
+    where id = campaign_uuid and lease_owner = owner;
+$$;
@@ -0,0 +1,20 @@
+-- 017_calls_updated_at.sql
+-- Keep calls.updated_at current so API processes can pick up calls
+-- written elsewhere (the standalone job worker evaluates every call)
+-- by polling for rows changed since their last look, instead of
+-- reloading the org.
+
+create or replace function touch_updated_at()
+returns trigger language plpgsql as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists calls_touch_updated_at on calls;
+create trigger calls_touch_updated_at
+    before update on calls
+    for each row execute function touch_updated_at();
+
+create index if not exists idx_calls_org_updated on calls(org_id, updated_at);
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Backfill the employee and caller call counters from existing calls.
+
+Run once after applying migrations/015_usage_counters.sql; from then on
+the calls trigger keeps the counters current. Safe to re-run: every
+counter is recomputed from the calls table, not incremented.
+
+Examples:
+    python scripts/backfill_counters.py
+    python scripts/backfill_counters.py --org <org-id>
+"""
+
+import argparse
+import os
+import sys
+
+# Add the api app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dotenv import load_dotenv
+
+# Load .env from repo root
+load_dotenv(os.path.join(os.path.dirname(__file__), "../../../.env"))
+
+from app.db import queries  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--org", help="Only this org id (default: every org)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    counts = queries.refresh_usage_counters(args.org)
+    print(
+        f"Refreshed {counts.get('employees', 0)} employees and "
+        f"{counts.get('callers', 0)} callers"
+    )
+    print("Done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark the vectorized audio feature extractor against the pydub path.
+
+Generates a synthetic call recording, checks both implementations return
+identical features and prints timings.
+
+    python scripts/benchmark_audio_features.py --minutes 10
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+from dataclasses import asdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.audio_features import (  # noqa: E402
+    extract_audio_features,
+    extract_audio_features_pydub,
+)
+
+
+def synthetic_call(minutes: float, sample_rate: int, seed: int = 7) -> bytes:
+    """Speech-like noise bursts separated by pauses of varying length."""
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * sample_rate)
+    signal = rng.normal(0, 30, size=n)
+    pos = 0
+    while pos < n:
+        burst = int(rng.uniform(0.3, 4.0) * sample_rate)
+        signal[pos : pos + burst] += rng.normal(0, 6000, size=min(burst, n - pos))
+        pos += burst + int(rng.uniform(0.2, 5.0) * sample_rate)
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.clip(signal, -32768, 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--sample-rate", type=int, default=8000)
+    args = parser.parse_args()
+
+    audio = synthetic_call(args.minutes, args.sample_rate)
+    print(f"Recording: {args.minutes:g} min @ {args.sample_rate} Hz ({len(audio) / 1e6:.1f} MB)")
+
+    fast, fast_s = timed(extract_audio_features, audio)
+    slow, slow_s = timed(extract_audio_features_pydub, audio)
+
+    identical = asdict(fast) == asdict(slow)
+    print(f"pydub:      {slow_s * 1000:9.1f} ms")
+    print(f"vectorized: {fast_s * 1000:9.1f} ms  ({slow_s / fast_s:.0f}x faster)")
+    print(f"Identical outputs: {identical}")
+    if not identical:
+        for key, value in asdict(fast).items():
+            if asdict(slow)[key] != value:
+                print(f"  {key}: vectorized={value!r} pydub={asdict(slow)[key]!r}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
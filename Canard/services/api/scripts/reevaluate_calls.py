@@ -1,9 +1,21 @@
 #!/usr/bin/env python3
-"""Re-evaluate completed calls that have transcripts but missing evaluation data."""
+"""Re-evaluate completed calls in bulk.
 
+By default only calls with a transcript but missing evaluation data are
+picked up. Progress is checkpointed to a state file, so an interrupted run
+resumes where it stopped when started again with the same filters.
+
+Examples:
+    python scripts/reevaluate_calls.py --dry-run
+    python scripts/reevaluate_calls.py --prompt-version eval-v1 --concurrency 8
+    python scripts/reevaluate_calls.py --org <org-id> --since 2026-01-01 --all
+"""
+
+import argparse
 import asyncio
 import os
 import sys
+from pathlib import Path
 
 # Add the api app to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -13,59 +25,91 @@ from dotenv import load_dotenv
 # Load .env from repo root
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../../.env"))
 
-from app.db.client import get_supabase
-from app.services.evaluation import evaluate_call
+from app.services.bulk_evaluation import (  # noqa: E402
+    BulkEvaluationFilters,
+    run_bulk_evaluation,
+)
+from app.services.evaluation import EVALUATION_PROMPT_VERSION  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--org", help="Only calls for this org id")
+    parser.add_argument("--campaign", help="Only calls for this campaign id")
+    parser.add_argument("--since", help="Only calls created at or after (ISO date)")
+    parser.add_argument("--until", help="Only calls created before (ISO date)")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument(
+        "--prompt-version",
+        nargs="?",
+        const=EVALUATION_PROMPT_VERSION,
+        help="Re-evaluate calls not scored with this prompt version "
+        f"(default when given without a value: {EVALUATION_PROMPT_VERSION})",
+    )
+    scope.add_argument(
+        "--all", action="store_true", help="Re-evaluate every matching call"
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=1.0,
+        help="Evaluation requests per second (match your Mistral quota)",
+    )
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument(
+        "--state-file",
+        default=".data/reevaluate_state.json",
+        help="Checkpoint file used to resume an interrupted run",
+    )
+    parser.add_argument("--restart", action="store_true", help="Ignore the state file")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the completion cache")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="List matching calls without evaluating"
+    )
+    return parser.parse_args()
 
 
 async def main():
-    sb = get_supabase()
-
-    # Fetch all completed calls
-    result = (
-        sb.table("calls")
-        .select("id,status,transcript,risk_score,employee_compliance")
-        .eq("status", "completed")
-        .limit(500)
-        .execute()
+    args = parse_args()
+    filters = BulkEvaluationFilters(
+        org_id=args.org,
+        campaign_id=args.campaign,
+        created_from=args.since,
+        created_to=args.until,
+        prompt_version=args.prompt_version,
+        missing_only=not args.all,
+    )
+
+    def report(call_id, result, error):
+        if args.dry_run:
+            print(f"would evaluate {call_id}")
+        elif result:
+            print(
+                f"{call_id[:8]} risk={result['risk_score']} "
+                f"compliance={result['employee_compliance']}"
+            )
+        elif error:
+            print(f"{call_id[:8]} ERROR: {error}")
+        else:
+            print(f"{call_id[:8]} SKIPPED (no result)")
+
+    state = await run_bulk_evaluation(
+        filters,
+        state_path=Path(args.state_file),
+        concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        page_size=args.page_size,
+        dry_run=args.dry_run,
+        bypass_cache=args.no_cache,
+        restart=args.restart,
+        on_result=report,
     )
 
-    all_calls = result.data or []
-
-    # Filter: has transcript (non-empty) AND missing risk_score or employee_compliance
-    to_evaluate = [
-        c
-        for c in all_calls
-        if c.get("transcript")
-        and len(c.get("transcript", "")) > 50
-        and (c.get("risk_score") is None or c.get("employee_compliance") is None)
-    ]
-
-    print(f"Total completed calls: {len(all_calls)}")
-    print(f"Calls to re-evaluate: {len(to_evaluate)}")
-
-    if not to_evaluate:
-        print("Nothing to evaluate.")
-        return
-
-    for i, call in enumerate(to_evaluate):
-        call_id = call["id"]
-        print(
-            f"[{i + 1}/{len(to_evaluate)}] Evaluating {call_id[:8]}...",
-            end=" ",
-            flush=True,
-        )
-        try:
-            result = await evaluate_call(call_id)
-            if result:
-                print(
-                    f"risk={result['risk_score']} compliance={result['employee_compliance']}"
-                )
-            else:
-                print("SKIPPED (no result)")
-        except Exception as e:
-            print(f"ERROR: {e}")
-
-    print("\nDone!")
+    print(f"\nScanned {state.scanned} calls, {state.selected} selected")
+    if not args.dry_run:
+        print(f"Succeeded: {state.succeeded}  Failed: {state.failed}")
+    print("Done!")
 
 
 if __name__ == "__main__":
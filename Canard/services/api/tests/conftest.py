@@ -1,4 +1,48 @@
 # pyright: reportMissingImports=false
+import os
+import tempfile
+import uuid
+
 import pytest
 
-_ = pytest
+# Keep test runs from reading or writing the on-disk completion cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+# ...and give each run an empty recording cache
+os.environ.setdefault("RECORDING_CACHE_PATH", tempfile.mkdtemp(prefix="canard-recordings-"))
+# ...and never deliver email: the outbox writes .eml files to a scratch dir
+_outbox_dir = tempfile.mkdtemp(prefix="canard-outbox-")
+os.environ.setdefault("EMAIL_BACKEND", "file")
+os.environ.setdefault("EMAIL_OUTBOX_PATH", os.path.join(_outbox_dir, "outbox.sqlite3"))
+os.environ.setdefault("EMAIL_FILE_SINK_PATH", os.path.join(_outbox_dir, "sent"))
+
+
+@pytest.fixture
+def pg():
+    """A connection to TEST_DATABASE_URL (a database with migrations/ applied)
+    whose transaction is rolled back after the test; skipped when unset."""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg = pytest.importorskip("psycopg")
+    conn = psycopg.connect(url)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def pg_org(conn) -> str:
+    """Insert a throwaway organization and return its id."""
+    slug = f"test-{uuid.uuid4().hex[:12]}"
+    return conn.execute(
+        "insert into organizations (name, slug) values (%s, %s) returning id", (slug, slug)
+    ).fetchone()[0]
+
+
+def pg_employee(conn, org_id: str, boss_id: str | None = None) -> str:
+    return conn.execute(
+        "insert into employees (org_id, full_name, email, phone, boss_id)"
+        " values (%s, 'Test Employee', 'test@example.com', '+15550000000', %s) returning id",
+        (org_id, boss_id),
+    ).fetchone()[0]
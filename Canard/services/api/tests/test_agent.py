@@ -1,6 +1,8 @@
 # pyright: reportMissingImports=false
 from __future__ import annotations
 
+import asyncio
+
 from app.agent.memory import session_store
 from app.agent.prompts import build_system_prompt
 
@@ -79,3 +81,92 @@ def test_get_context_usage_structure() -> None:
 
     # Clean up
     session_store.remove(call_id)
+
+
+def test_trim_messages_queues_evicted_turns_for_summary() -> None:
+    call_id = "test-summary-queue"
+    session_store.create(call_id=call_id, script_id="s", system_prompt="System")
+    for i in range(30):
+        role = "user" if i % 2 == 0 else "assistant"
+        session_store.add_message(call_id, role, f"message {i}")
+
+    session_store.trim_messages(call_id, keep=20)
+
+    session = session_store.get(call_id)
+    assert session is not None
+    assert len(session.messages) == 21
+    assert [m["content"] for m in session.pending_evicted] == [
+        f"message {i}" for i in range(10)
+    ]
+
+    session_store.remove(call_id)
+
+
+def test_llm_messages_include_running_summary() -> None:
+    call_id = "test-summary-merge"
+    session_store.create(call_id=call_id, script_id="s", system_prompt="System")
+    session_store.add_message(call_id, "user", "Hello")
+    session_store.set_summary(call_id, "Target is Dana from payroll.")
+
+    messages = session_store.get_llm_messages(call_id)
+    session = session_store.get(call_id)
+
+    assert "Target is Dana from payroll." in messages[0]["content"]
+    assert messages[0]["content"].startswith("System")
+    # The stored system prompt itself is left untouched
+    assert session is not None and session.messages[0]["content"] == "System"
+
+    session_store.remove(call_id)
+
+
+def test_summarize_evicted_updates_summary() -> None:
+    from unittest.mock import AsyncMock, patch
+
+    from app.agent.summary import summarize_evicted
+
+    call_id = "test-summary-run"
+    session = session_store.create(
+        call_id=call_id, script_id="s", system_prompt="System"
+    )
+    session.summary = "Caller introduced themselves as IT."
+    session.pending_evicted = [
+        {"role": "assistant", "content": "Can you confirm your employee ID?"},
+        {"role": "user", "content": "It's on my badge, hold on."},
+    ]
+
+    mock_chat = AsyncMock(return_value="Target agreed to read their badge ID.")
+    with patch("app.agent.summary.chat_completion", mock_chat):
+        result = asyncio.run(summarize_evicted(call_id))
+
+    assert result == "Target agreed to read their badge ID."
+    assert session.summary == "Target agreed to read their badge ID."
+    assert session.pending_evicted == []
+    prompt = mock_chat.call_args.args[0][1]["content"]
+    assert "Caller introduced themselves as IT." in prompt
+    assert "Target: It's on my badge, hold on." in prompt
+
+    session_store.remove(call_id)
+
+
+def test_summarize_evicted_restores_turns_on_failure() -> None:
+    from unittest.mock import AsyncMock, patch
+
+    from app.agent.summary import summarize_evicted
+
+    call_id = "test-summary-fail"
+    session = session_store.create(
+        call_id=call_id, script_id="s", system_prompt="System"
+    )
+    evicted = [{"role": "user", "content": "Who is this?"}]
+    session.pending_evicted = list(evicted)
+
+    with patch(
+        "app.agent.summary.chat_completion",
+        AsyncMock(side_effect=RuntimeError("boom")),
+    ):
+        asyncio.run(summarize_evicted(call_id))
+
+    assert session.summary == ""
+    assert session.pending_evicted == evicted
+
+    session_store.remove(call_id)
@@ -0,0 +1,69 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+from datetime import date
+
+from app.services.aggregation import GroupKey, aggregate
+from app.services.analytics_store import OrgAnalytics
+
+_EMPLOYEES = [
+    {"id": "e1", "department": "Finance"},
+    {"id": "e2", "department": "IT"},
+]
+_CAMPAIGNS = [
+    {"id": "c1", "attack_vector": "ceo"},
+    {"id": "c2", "attack_vector": ""},
+]
+
+
+def _facts():
+    org = OrgAnalytics("o1")
+    org.set_dimensions(_EMPLOYEES, _CAMPAIGNS, [])
+    calls = [
+        ("e1", "c1", "failed", 80, ["Gave MFA"], "2026-03-01"),
+        ("e1", "c2", "passed", 20, ["Asked Questions"], "2026-03-02"),
+        ("e2", "c1", "failed", 60, ["Gave MFA", "Urgency Accepted"], "2026-03-02"),
+        ("e2", None, "partial", None, [], "2026-03-05"),
+    ]
+    for i, (employee_id, campaign_id, compliance, risk, flags, day) in enumerate(calls):
+        org.upsert(
+            {
+                "id": f"call{i}",
+                "status": "completed",
+                "employee_id": employee_id,
+                "campaign_id": campaign_id,
+                "employee_compliance": compliance,
+                "risk_score": risk,
+                "flags": flags,
+                "started_at": f"{day}T10:00:00+00:00",
+                "duration_seconds": 30,
+            }
+        )
+    return org.snapshot()
+
+
+def test_single_key_metrics_and_flags() -> None:
+    by_emp = aggregate(_facts(), GroupKey.EMPLOYEE, flags=True)
+
+    e2 = by_emp.code("e2")
+    assert e2 is not None
+    assert [by_emp.label(g) for g in by_emp.groups()] == ["e1", "e2"]
+    assert (by_emp.count(e2), int(by_emp.failed[e2]), int(by_emp.partial[e2])) == (2, 1, 1)
+    assert by_emp.avg_risk(e2) == 30.0  # unscored call counts as 0
+    assert by_emp.avg_scored_risk(e2) == 60.0
+    assert by_emp.failure_rate(by_emp.code("e1")) == 50.0  # type: ignore[arg-type]
+    assert by_emp.flags(e2) == {"Gave MFA": 1, "Urgency Accepted": 1}
+    assert by_emp.code("nobody") is None
+
+
+def test_composite_keys_and_day_window() -> None:
+    facts = _facts()
+    heatmap = aggregate(
+        facts, (GroupKey.ATTACK_VECTOR, GroupKey.DEPARTMENT), campaigns=_CAMPAIGNS
+    )
+    cells = {heatmap.label(g): heatmap.count(g) for g in heatmap.groups()}
+    assert cells == {("ceo", "Finance"): 1, ("ceo", "IT"): 1, ("Unknown", "Finance"): 1, ("Unknown", "IT"): 1}
+
+    by_day = aggregate(facts, GroupKey.DAY, since=date(2026, 3, 2), days=3)
+    assert by_day.total.tolist() == [2, 0, 0]  # 03-01 and 03-05 fall outside
+    assert by_day.label(0) == date(2026, 3, 2)
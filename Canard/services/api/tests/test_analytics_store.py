@@ -0,0 +1,314 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.analytics_store import (
+    COMPLIANCE_FAILED,
+    AnalyticsStore,
+    group_count,
+    group_sum,
+)
+
+_EMPLOYEES = [
+    {"id": "e1", "department": "Finance"},
+    {"id": "e2", "department": ""},
+]
+
+
+def _call(i: int, **overrides) -> dict:
+    row = {
+        "id": f"call{i}",
+        "org_id": "o1",
+        "status": "completed",
+        "employee_id": "e1",
+        "campaign_id": "c1",
+        "caller_id": "k1",
+        "risk_score": 10 * i,
+        "employee_compliance": "failed",
+        "flags": ["Gave MFA"],
+        "started_at": f"2026-03-0{i}T10:00:00+00:00",
+        "created_at": f"2026-03-0{i}T09:59:00+00:00",
+        "duration_seconds": 60,
+    }
+    row.update(overrides)
+    return row
+
+
+def _load(store: AnalyticsStore, calls: list[dict]):
+    def list_calls_page(*, after=None, limit=100, **_):
+        rows = sorted(calls, key=lambda c: (c["created_at"], c["id"]))
+        if after:
+            rows = [c for c in rows if (c["created_at"], c["id"]) > after]
+        return rows[:limit]
+
+    with (
+        patch("app.db.queries.list_calls_page", side_effect=list_calls_page) as page,
+        patch("app.db.queries.list_employees", return_value=_EMPLOYEES),
+        patch("app.db.queries.list_campaigns", return_value=[]),
+        patch("app.db.queries.list_callers", return_value=[]),
+        patch("app.services.analytics_store._LOAD_PAGE", 2),
+    ):
+        org = store.org("o1")
+    return org, page
+
+
+def test_store_loads_calls_into_columns() -> None:
+    calls = [
+        _call(1),
+        _call(2, employee_id="e2", employee_compliance="passed", flags='["Asked Questions"]'),
+        _call(3, status="in_progress", risk_score=None, employee_compliance=None, flags=[]),
+    ]
+    org, page = _load(AnalyticsStore(ttl_s=300), calls)
+    facts = org.snapshot()
+
+    assert page.call_count == 2  # keyset pages of two
+    assert facts.call_ids == ["call1", "call2", "call3"]
+    assert facts.completed.tolist() == [True, True, False]
+    assert facts.has_risk.tolist() == [True, True, False]
+    assert [facts.departments[d] for d in facts.department] == ["Finance", "Other", "Finance"]
+    assert facts.flag_counts(np.flatnonzero(facts.completed)) == {
+        "Gave MFA": 1,
+        "Asked Questions": 1,
+    }
+    assert facts.day[0] == (np.datetime64("2026-03-01") - np.datetime64("1970-01-01")).astype(int)
+
+
+def test_store_applies_writes_from_listener() -> None:
+    store = AnalyticsStore(ttl_s=300)
+    org, _ = _load(store, [_call(1)])
+
+    store.on_write("calls", "insert", _call(2, flags=[f"Flag {i}" for i in range(70)]))
+    store.on_write("calls", "update", _call(1, employee_compliance="passed"))
+    store.on_write("calls", "insert", _call(3, org_id="other-org"))
+    facts = org.snapshot()
+
+    assert facts.call_ids == ["call1", "call2"]
+    assert (facts.compliance == COMPLIANCE_FAILED).tolist() == [False, True]
+    # Flag bitsets grow past one 64-bit word
+    assert facts.flags.shape[1] == 2
+    assert len(facts.row_flags(1)) == 70
+    assert facts.row_flags(0) == ["Gave MFA"]
+
+
+def test_store_applies_dimension_writes_without_reloading() -> None:
+    store = AnalyticsStore(ttl_s=300)
+    org, _ = _load(store, [_call(1), _call(2, employee_id="e2")])
+
+    with (
+        patch("app.db.queries.list_employees") as list_employees,
+        patch("app.db.queries.list_campaigns") as list_campaigns,
+        patch("app.db.queries.list_callers") as list_callers,
+    ):
+        store.on_write("employees", "update", {"id": "e2", "org_id": "o1", "department": "IT"})
+        store.on_write("employees", "insert", {"id": "e3", "org_id": "o1", "department": "HR"})
+        store.on_write("campaigns", "insert", {"id": "c1", "org_id": "o1", "name": "Q1"})
+        store.on_write("campaigns", "update", {"id": "c1", "org_id": "o1", "status": "running"})
+        store.on_write("callers", "insert", {"id": "k1", "org_id": "other-org"})
+        store.on_write("employees", "delete", {"id": "e1"})
+    facts = org.snapshot()
+
+    list_employees.assert_not_called()
+    list_campaigns.assert_not_called()
+    list_callers.assert_not_called()
+    assert [e["id"] for e in org.employees] == ["e3", "e2"]
+    assert org.campaigns == [{"id": "c1", "org_id": "o1", "name": "Q1", "status": "running"}]
+    assert org.callers == []
+    # Only the changed employees' calls move department
+    assert [facts.departments[d] for d in facts.department] == ["Other", "IT"]
+
+
+def test_store_replays_writes_made_during_a_load() -> None:
+    store = AnalyticsStore(ttl_s=300)
+
+    def list_calls_page(**_):
+        # Lands after the employees were read but before the load finishes
+        store.on_write("employees", "update", {"id": "e2", "org_id": "o1", "department": "IT"})
+        return [_call(1, employee_id="e2")]
+
+    with (
+        patch("app.db.queries.list_calls_page", side_effect=list_calls_page),
+        patch("app.db.queries.list_employees", return_value=_EMPLOYEES),
+        patch("app.db.queries.list_campaigns", return_value=[]),
+        patch("app.db.queries.list_callers", return_value=[]),
+    ):
+        org = asyncio.run(store.org_async("o1"))
+    facts = org.snapshot()
+
+    assert org.employees[1] == {"id": "e2", "department": "IT", "org_id": "o1"}
+    assert [facts.departments[d] for d in facts.department] == ["IT"]
+
+
+def test_store_polls_for_calls_written_by_other_processes() -> None:
+    store = AnalyticsStore(ttl_s=300)
+    org, _ = _load(store, [_call(1, employee_compliance=None, risk_score=None)])
+    updated_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+    evaluated = _call(1, risk_score=80, updated_at=updated_at.isoformat())
+
+    with (
+        patch("app.services.analytics_store.settings.analytics_sync_interval_s", 0),
+        patch("app.db.queries.list_calls_updated_since", return_value=[evaluated]) as changed,
+        patch("app.db.queries.list_calls_page") as page,
+    ):
+        assert store.org("o1") is org
+    facts = org.snapshot()
+
+    page.assert_not_called()
+    assert changed.call_args.args[0] == "o1"
+    assert (facts.compliance == COMPLIANCE_FAILED).tolist() == [True]
+    assert facts.risk.tolist() == [80]
+    assert org.synced_to == updated_at.timestamp()
+
+
+def test_store_reloads_when_too_many_calls_changed() -> None:
+    store = AnalyticsStore(ttl_s=300)
+    org, _ = _load(store, [_call(1)])
+
+    with (
+        patch("app.services.analytics_store.settings.analytics_sync_interval_s", 0),
+        patch("app.services.analytics_store._SYNC_PAGE", 2),
+        patch("app.db.queries.list_calls_updated_since", return_value=[_call(1), _call(2)]),
+    ):
+        reloaded, page = _load(store, [_call(1), _call(2), _call(3)])
+
+    assert reloaded is not org
+    assert page.called
+    assert reloaded.snapshot().size == 3
+
+
+def test_group_helpers_skip_missing_codes() -> None:
+    codes = np.array([0, 2, -1, 0])
+    matrix = np.array([[1, 0], [0, 1], [1, 1], [1, 1]], dtype=bool)
+
+    assert group_count(codes, 3).tolist() == [2, 0, 1]
+    assert group_count(codes, 3, np.array([5, 1, 9, 2])).tolist() == [7, 0, 1]
+    assert group_sum(codes, 3, matrix).tolist() == [[2, 1], [0, 0], [0, 1]]
+
+
+def test_sql_source_reads_aggregates_from_rpcs() -> None:
+    from app.routes.analytics import api_dept_flag_pivot, api_risk_trend
+
+    today = datetime.now(timezone.utc).date()
+    by_day = [
+        {"day": (today - timedelta(days=1)).isoformat(), "completed_with_risk": 2, "avg_risk": "45.5"},
+        {"day": today.isoformat(), "completed_with_risk": 0, "avg_risk": None},
+    ]
+    pivot = [
+        {"department": "IT", "flag": "Gave MFA", "call_count": 3, "affected_employees": 2},
+        {"department": "IT", "flag": "Asked Questions", "call_count": 1, "affected_employees": 1},
+    ]
+
+    with (
+        patch("app.routes.analytics.settings.analytics_source", "sql"),
+        patch("app.db.queries.get_calls_by_day", return_value=by_day) as calls_by_day,
+        patch("app.db.queries.get_department_totals", return_value=[{"department": "IT", "total_calls": 4}]),
+        patch("app.db.queries.get_dept_flag_pivot", return_value=pivot),
+        patch("app.services.analytics_store.AnalyticsStore.org") as store,
+    ):
+        trend = asyncio.run(api_risk_trend(None, org_id="o1", days=2))
+        negative = asyncio.run(api_dept_flag_pivot(None, org_id="o1", flag_type="negative"))
+
+    store.assert_not_called()
+    assert calls_by_day.call_args.args == ("o1", (today - timedelta(days=1)).isoformat())
+    assert [(p.avg_risk, p.call_count) for p in trend] == [(45.5, 2), (0, 0)]
+    assert [(c.flag, c.percentage, c.affected_employees) for c in negative.cells] == [("Gave MFA", 75.0, 2)]
+    assert negative.department_totals == {"IT": 4}
+
+
+def test_hierarchy_risk_reads_precomputed_rollups() -> None:
+    from app.routes.analytics import api_hierarchy_risk
+
+    def row(eid: str, boss: str | None, depth: int, personal: tuple, team: tuple) -> dict:
+        return {
+            "id": eid, "full_name": eid.upper(), "boss_id": boss, "depth": depth,
+            "personal_total": personal[0], "personal_failed": personal[1], "personal_risk_sum": personal[2],
+            "team_total": team[0], "team_failed": team[1], "team_risk_sum": team[2],
+        }
+
+    rows = [
+        row("m", None, 0, (2, 0, 40), (7, 3, 340)),
+        row("a", "m", 1, (1, 1, 90), (4, 3, 270)),
+        row("b", "m", 1, (1, 0, 30), (1, 0, 30)),
+        row("a1", "a", 2, (3, 2, 180), (3, 2, 180)),
+    ]
+    with (
+        patch("app.db.queries.get_team_rollups", return_value=rows) as rollups,
+        patch("app.services.analytics_store.AnalyticsStore.org") as store,
+    ):
+        result = asyncio.run(api_hierarchy_risk("m", None, org_id="o1"))
+
+    rollups.assert_called_once_with("m")
+    store.assert_not_called()
+    manager = result.manager
+    assert (manager.team_total_tests, manager.team_risk_score, manager.team_failure_rate) == (7, 48.6, 42.9)
+    assert [c.id for c in manager.children] == ["a", "b"]
+    assert manager.children[0].children[0].personal_risk_score == 60.0
+    assert result.total_downstream_employees == 3
+    assert result.highest_risk_path == ["m", "a", "a1"]
+    assert [n.id for n in result.risk_hotspots] == ["a", "a1", "b"]
+
+
+def test_hierarchy_risk_unknown_employee() -> None:
+    from fastapi import HTTPException
+
+    from app.routes.analytics import api_hierarchy_risk
+
+    with patch("app.db.queries.get_team_rollups", return_value=[]):
+        try:
+            asyncio.run(api_hierarchy_risk("nobody", None, org_id="o1"))
+        except HTTPException as exc:
+            assert exc.status_code == 404
+        else:
+            raise AssertionError("expected 404")
+
+
+def test_rollup_trigger_counts_calls_completed_before_evaluation(pg) -> None:
+    from tests.conftest import pg_employee, pg_org
+
+    org = pg_org(pg)
+    boss = pg_employee(pg, org)
+    emp = pg_employee(pg, org, boss_id=boss)
+    call = pg.execute(
+        "insert into calls (org_id, employee_id, status) values (%s, %s, 'in-progress') returning id",
+        (org, emp),
+    ).fetchone()[0]
+
+    def rollups() -> dict:
+        rows = pg.execute(
+            "select employee_id, personal_total, personal_failed, personal_risk_sum, team_total, team_failed"
+            " from employee_risk_rollups where employee_id in (%s, %s)",
+            (boss, emp),
+        ).fetchall()
+        return {r[0]: r[1:] for r in rows}
+
+    # Completion lands before evaluation, while employee_compliance is null
+    pg.execute("update calls set status = 'completed' where id = %s", (call,))
+    assert rollups() == {emp: (1, 0, 0, 1, 0), boss: (0, 0, 0, 1, 0)}
+
+    pg.execute("update calls set employee_compliance = 'failed', risk_score = 80 where id = %s", (call,))
+    assert rollups() == {emp: (1, 1, 80, 1, 1), boss: (0, 0, 0, 1, 1)}
+
+
+def test_one_statement_cannot_create_a_reporting_cycle(pg) -> None:
+    import psycopg
+    import pytest
+
+    from tests.conftest import pg_employee, pg_org
+
+    org = pg_org(pg)
+    a = pg_employee(pg, org)
+    b = pg_employee(pg, org)
+
+    with pytest.raises(psycopg.errors.RaiseException, match="reporting cycle"), pg.transaction():
+        pg.execute(
+            "update employees set boss_id = case id when %s then %s else %s end where id in (%s, %s)",
+            (a, b, a, a, b),
+        )
+
+    assert pg.execute(
+        "select count(*) from employee_closure where descendant_id in (%s, %s) and depth > 0", (a, b)
+    ).fetchone()[0] == 0
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import asyncio
 import io
-from unittest.mock import AsyncMock, patch
+from unittest.mock import patch
 
 from app.services.audio_features import (
     AudioFeatures,
@@ -146,20 +146,162 @@ def test_extract_features_response_latencies() -> None:
 
 
 def test_download_recording_uses_twilio_auth() -> None:
-    mock_response = AsyncMock()
-    mock_response.status_code = 200
-    mock_response.content = b"fake-audio-bytes"
-    mock_response.raise_for_status = lambda: None
+    import httpx
 
-    mock_client_instance = AsyncMock()
-    mock_client_instance.get = AsyncMock(return_value=mock_response)
-    mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client_instance)
-    mock_client_instance.__aexit__ = AsyncMock(return_value=None)
+    requests: list[httpx.Request] = []
 
-    with patch("app.services.audio_features.httpx.AsyncClient", return_value=mock_client_instance):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=b"fake-audio-bytes")
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    with (
+        patch("app.services.recording_cache.httpx.AsyncClient", client_factory),
+        patch("app.services.recording_cache.settings.twilio_account_sid", "AC1"),
+    ):
         result = asyncio.run(download_recording("https://api.twilio.com/recording/123"))
 
     assert result == b"fake-audio-bytes"
-    # Verify .wav was appended
-    call_args = mock_client_instance.get.call_args
-    assert call_args[0][0].endswith(".wav")
+    # Verify .wav was appended and Twilio basic auth sent
+    assert str(requests[0].url).endswith(".wav")
+    assert requests[0].headers["authorization"].startswith("Basic ")
+
+
+# ── Vectorized extractor vs. pydub reference ──
+
+
+def _synthetic_call_wav(
+    seconds: float,
+    sample_rate: int = 8000,
+    channels: int = 1,
+    sample_width: int = 2,
+    seed: int = 7,
+) -> bytes:
+    """Noise bursts separated by quiet gaps of varying length."""
+    import wave
+
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    signal = rng.normal(0, 30, size=(n, channels))
+    pos = 0
+    while pos < n:
+        burst = int(rng.uniform(0.3, 2.5) * sample_rate)
+        signal[pos : pos + burst] += rng.normal(0, 6000, size=(min(burst, n - pos), channels))
+        pos += burst + int(rng.uniform(0.2, 4.0) * sample_rate)
+
+    if sample_width == 1:
+        data = np.clip(signal / 256 + 128, 0, 255).astype(np.uint8)
+    else:
+        data = np.clip(signal, -32768, 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(data.tobytes())
+    return buf.getvalue()
+
+
+def test_vectorized_extractor_matches_pydub() -> None:
+    from dataclasses import asdict
+
+    from app.services.audio_features import extract_audio_features_pydub
+
+    cases = [
+        _synthetic_call_wav(30.0),
+        _synthetic_call_wav(12.345, sample_rate=44100, seed=3),
+        _synthetic_call_wav(9.0, channels=2, seed=11),
+        _synthetic_call_wav(8.0, sample_width=1, seed=5),
+    ]
+    for audio_bytes in cases:
+        fast = extract_audio_features(audio_bytes, transcript="um, so uh yes")
+        reference = extract_audio_features_pydub(audio_bytes, transcript="um, so uh yes")
+        assert asdict(fast) == asdict(reference)
+        assert fast.silence_segments
+
+
+def test_extract_from_path_uses_memmap(tmp_path) -> None:
+    audio_bytes = _synthetic_call_wav(5.0)
+    path = tmp_path / "call.wav"
+    path.write_bytes(audio_bytes)
+
+    assert extract_audio_features(path) == extract_audio_features(audio_bytes)
+
+
+# ── Live accumulator ──
+
+
+def _ulaw_frames(pcm, frame_samples: int = 160) -> list[bytes]:
+    """Encode PCM16 samples as 20 ms µ-law media payloads."""
+    import numpy as np
+
+    from app.services.audio_features import _ULAW_TO_PCM16
+
+    order = np.argsort(_ULAW_TO_PCM16)
+    table = _ULAW_TO_PCM16[order]
+    idx = np.clip(np.searchsorted(table, pcm), 1, 255)
+    nearest = np.where(pcm - table[idx - 1] < table[idx] - pcm, idx - 1, idx)
+    encoded = order[nearest].astype(np.uint8).tobytes()
+    return [
+        encoded[i : i + frame_samples] for i in range(0, len(encoded), frame_samples)
+    ]
+
+
+def test_live_accumulator_tracks_silence_loudness_and_latency() -> None:
+    import json
+
+    import numpy as np
+
+    from app.services.audio_features import LiveAudioFeatureAccumulator
+
+    rng = np.random.default_rng(1)
+    quiet = lambda ms: rng.normal(0, 30, size=ms * 8)  # noqa: E731
+    loud = lambda ms: rng.normal(0, 6000, size=ms * 8)  # noqa: E731
+
+    acc = LiveAudioFeatureAccumulator()
+    for frame in _ulaw_frames(quiet(1000)):  # agent greeting playing
+        acc.add_frame(frame, agent_speaking=True)
+    acc.mark_agent_finished()
+    for frame in _ulaw_frames(np.concatenate([quiet(480), loud(1500), quiet(2000)])):
+        acc.add_frame(frame)
+    acc.note_commit()  # already answered by the voiced onset
+
+    features = acc.finish("um, who is this?")
+
+    assert features.duration_seconds == 4.98
+    assert features.response_latencies_ms == [480.0]
+    assert features.silence_segments == [[2980, 4980]]
+    assert features.long_pauses_count == 0
+    assert features.loudness_mean_dbfs < 0
+    assert features.disfluency_count == 1
+
+    restored = AudioFeatures.from_dict(json.loads(json.dumps(features.to_dict())))
+    assert restored.response_latencies_ms == [480.0]
+    assert restored.silence_segments == [(2980, 4980)]
+
+
+def test_live_accumulator_falls_back_to_commit_for_quiet_callers() -> None:
+    import numpy as np
+
+    from app.services.audio_features import LiveAudioFeatureAccumulator
+
+    acc = LiveAudioFeatureAccumulator()
+    acc.mark_agent_finished()
+    for frame in _ulaw_frames(np.zeros(8 * 900)):
+        acc.add_frame(frame)
+    acc.note_commit()
+
+    # The agent speaks again (a nudge) before the callee answers: no latency
+    acc.mark_agent_finished()
+    acc.add_frame(_ulaw_frames(np.zeros(160))[0])
+    acc.add_frame(_ulaw_frames(np.zeros(160))[0], agent_speaking=True)
+    acc.add_frame(_ulaw_frames(np.zeros(160))[0])
+    acc.note_commit()
+
+    assert acc.finish().response_latencies_ms == [900.0]
@@ -0,0 +1,198 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from app.services.audit_pdf import (
+    AuditReport,
+    generate_audit_pdf,
+    render_audit_pdf,
+    render_audit_pdfs,
+)
+
+
+def _report(call_id: str = "call-1", turns: int = 3) -> AuditReport:
+    return AuditReport(
+        call_id=call_id,
+        call_date="2026-01-01",
+        campaign_name="Q1 — vishing",
+        employee_name="Dana",
+        risk_score=72,
+        compliance="failed",
+        ai_summary="Shared a password.",
+        flags=["shared_password"],
+        transcript_json=[
+            {"role": "agent" if i % 2 else "user", "text": f"turn {i} " * 40}
+            for i in range(turns)
+        ],
+    )
+
+
+def test_from_records_parses_stored_json() -> None:
+    call = {
+        "id": "call-1",
+        "created_at": "2026-01-01",
+        "risk_score": 10,
+        "flags": '["a", "b"]',
+        "transcript_json": '[{"role": "user", "text": "hi"}]',
+    }
+    report = AuditReport.from_records(call, {"full_name": "Dana"}, {"name": "Q1"})
+
+    assert report.flags == ["a", "b"]
+    assert report.transcript_json == [{"role": "user", "text": "hi"}]
+    assert (report.employee_name, report.campaign_name) == ("Dana", "Q1")
+
+
+def test_render_matches_keyword_api() -> None:
+    report = _report()
+    pdf = render_audit_pdf(report)
+
+    assert pdf.startswith(b"%PDF")
+    legacy = generate_audit_pdf(
+        call_id=report.call_id,
+        call_date=report.call_date,
+        campaign_name=report.campaign_name,
+        employee_name=report.employee_name,
+        department="",
+        job_title="",
+        risk_score=report.risk_score,
+        compliance=report.compliance,
+        ai_summary=report.ai_summary,
+        flags=report.flags,
+        transcript_json=report.transcript_json,
+    )
+    assert legacy.startswith(b"%PDF")
+
+
+def test_batch_keeps_order_and_isolates_failures() -> None:
+    reports = [_report("a"), AuditReport(call_id="bad", transcript_json=[None]), _report("c", 40)]  # type: ignore[list-item]
+
+    with patch("app.services.process_pool.settings.cpu_pool_workers", -1):
+        results = asyncio.run(render_audit_pdfs(reports, concurrency=2))
+
+    assert isinstance(results[0], bytes) and results[0].startswith(b"%PDF")
+    assert isinstance(results[1], AttributeError)
+    assert isinstance(results[2], bytes) and len(results[2]) > len(results[0])
+
+
+def test_deliver_audit_report_renders_off_loop_and_emails() -> None:
+    from app.services import post_call
+
+    call = {
+        "id": "call-1",
+        "employee_id": "e1",
+        "campaign_id": None,
+        "risk_score": 40,
+        "employee_compliance": "partial",
+        "transcript": "USER: hi",
+    }
+    render = AsyncMock(return_value=b"%PDF-1.4")
+    upload = AsyncMock(return_value="https://signed")
+
+    with (
+        patch("app.services.post_call.queries") as mock_queries,
+        patch("app.services.audit_pdf.render_audit_pdf_async", render),
+        patch("app.services.audit_pdf.upload_audit_pdf_async", upload),
+        patch("app.services.post_call.queue_test_results_email", return_value="em_1") as send,
+    ):
+        mock_queries.get_call.return_value = call
+        mock_queries.get_employee.return_value = {"email": "d@x.test", "full_name": "Dana"}
+        asyncio.run(post_call.deliver_audit_report("call-1"))
+
+    assert render.await_args.args[0].call_id == "call-1"
+    upload.assert_awaited_once_with("call-1", b"%PDF-1.4")
+    mock_queries.update_call.assert_called_once_with(
+        "call-1", {"audit_report_url": "https://signed"}
+    )
+    assert send.call_args.kwargs["to_email"] == "d@x.test"
+    assert send.call_args.kwargs["idempotency_key"] == "results-email:call-1"
+
+
+def test_digest_mode_stages_calls_of_employees_without_email() -> None:
+    from app.services import post_call
+
+    call = {"id": "call-1", "employee_id": "e1", "campaign_id": None, "audit_report_url": "u"}
+    employee = {"id": "e1", "email": "", "full_name": "Dana", "boss_id": "m1"}
+    manager = {"id": "m1", "email": "boss@x.test"}
+
+    with (
+        patch("app.services.post_call.cfg.email_digest_enabled", True),
+        patch("app.services.post_call.queries") as mock_queries,
+        patch("app.services.post_call.stage_call_results", return_value=1) as stage,
+        patch("app.services.post_call.queue_test_results_email") as send,
+    ):
+        mock_queries.get_call.return_value = call
+        mock_queries.get_employee.side_effect = lambda eid: {"e1": employee, "m1": manager}[eid]
+        asyncio.run(post_call.deliver_audit_report("call-1"))
+
+    assert stage.call_args.kwargs["manager"] == manager
+    send.assert_not_called()
+
+
+def test_campaign_bundle_streams_stored_and_rendered_reports() -> None:
+    import io
+    import zipfile
+
+    import httpx
+
+    from app.services import audit_bundle
+
+    calls = [
+        {
+            "id": f"call-{i}",
+            "created_at": f"2026-01-0{i}",
+            "employee_id": "e1",
+            "risk_score": 20 * i,
+            "employee_compliance": "failed" if i == 3 else "passed",
+            "audit_report_url": {1: "https://sb.test/ok.pdf", 2: "https://sb.test/gone.pdf"}.get(i),
+        }
+        for i in (1, 2, 3)
+    ]
+    pages = iter([calls[:2], calls[2:]])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/ok.pdf":
+            return httpx.Response(200, content=b"%PDF-stored")
+        return httpx.Response(404)
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    async def collect() -> bytes:
+        chunks = [
+            chunk
+            async for chunk in audit_bundle.stream_campaign_audit_bundle(
+                {"id": "camp-1", "org_id": "o1", "name": "Q1"}
+            )
+        ]
+        assert len(chunks) == 4  # one per report, then summary + directory
+        return b"".join(chunks)
+
+    with (
+        patch("app.services.audit_bundle._PAGE_SIZE", 2),
+        patch("app.services.audit_bundle.httpx.AsyncClient", client_factory),
+        patch("app.services.audit_bundle.queries") as mock_queries,
+        patch("app.services.process_pool.settings.cpu_pool_workers", -1),
+    ):
+        mock_queries.list_employees.return_value = [
+            {"id": "e1", "full_name": "Dana Lee", "department": "Finance"}
+        ]
+        mock_queries.list_calls_page.side_effect = lambda **_: next(pages)
+        archive = zipfile.ZipFile(io.BytesIO(asyncio.run(collect())))
+
+    assert archive.namelist() == [
+        "reports/dana-lee-call-1.pdf",
+        "reports/dana-lee-call-2.pdf",
+        "reports/dana-lee-call-3.pdf",
+        "summary.pdf",
+    ]
+    assert archive.read("reports/dana-lee-call-1.pdf") == b"%PDF-stored"
+    assert archive.read("reports/dana-lee-call-2.pdf").startswith(b"%PDF-1.")
+    assert archive.read("summary.pdf").startswith(b"%PDF")
+    assert mock_queries.list_calls_page.call_args_list[1].kwargs["after"] == (
+        "2026-01-02",
+        "call-2",
+    )
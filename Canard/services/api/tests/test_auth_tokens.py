@@ -0,0 +1,89 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import time
+from unittest.mock import patch
+
+import jwt
+from fastapi import HTTPException
+
+from app.auth.middleware import _verify_and_resolve
+from app.auth.tokens import TokenVerifier, UserCache
+
+_SECRET = "test-secret-with-at-least-32-bytes!!"
+_USER = {"id": "u1", "email": "ann@acme.test", "org_id": "o1", "role": "admin"}
+
+
+def _token(**overrides) -> str:
+    claims = {
+        "sub": "auth-1",
+        "email": "ann@acme.test",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 300,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, _SECRET, algorithm="HS256")
+
+
+def _patched(cache: UserCache):
+    verifier = TokenVerifier(_SECRET, "", "authenticated", jwks_ttl_s=600, leeway_s=0)
+    return (
+        patch("app.auth.middleware.get_token_verifier", return_value=verifier),
+        patch("app.auth.middleware.get_user_cache", return_value=cache),
+    )
+
+
+def test_local_verification_caches_user_until_written() -> None:
+    cache = UserCache(ttl_s=60, max_entries=8)
+    p_verifier, p_cache = _patched(cache)
+
+    with (
+        p_verifier,
+        p_cache,
+        patch("app.auth.middleware.get_supabase") as supabase,
+        patch("app.db.queries.get_user_by_email", return_value=_USER) as lookup,
+    ):
+        assert _verify_and_resolve(_token()) == _USER
+        assert _verify_and_resolve(_token()) == _USER
+        assert lookup.call_count == 1
+
+        cache.on_write("users", "update", {"id": "u1", "role": "manager"})
+        _verify_and_resolve(_token())
+        assert lookup.call_count == 2
+
+    supabase.assert_not_called()
+
+
+def test_rejects_bad_tokens() -> None:
+    p_verifier, p_cache = _patched(UserCache(ttl_s=60, max_entries=8))
+    bad = [
+        _token(exp=int(time.time()) - 60),
+        _token(aud="anon-other"),
+        jwt.encode({"sub": "auth-1", "exp": int(time.time()) + 300}, "x" * 32, algorithm="HS256"),
+        "not-a-jwt",
+    ]
+
+    with p_verifier, p_cache, patch("app.db.queries.get_user_by_email") as lookup:
+        for token in bad:
+            try:
+                _verify_and_resolve(token)
+            except HTTPException as exc:
+                assert exc.status_code == 401
+            else:
+                raise AssertionError(f"accepted {token!r}")
+
+    lookup.assert_not_called()
+
+
+def test_falls_back_to_gotrue_without_a_local_key() -> None:
+    verifier = TokenVerifier("", "https://x.supabase.co/auth/v1/.well-known/jwks.json", "authenticated", 600, 0)
+
+    with (
+        patch("app.auth.middleware.get_token_verifier", return_value=verifier),
+        patch("app.auth.middleware.get_supabase") as supabase,
+        patch("app.db.queries.get_user_by_email", return_value=_USER),
+    ):
+        supabase.return_value.auth.get_user.return_value.user.email = "ann@acme.test"
+        assert _verify_and_resolve(_token()) == _USER
+
+    supabase.return_value.auth.get_user.assert_called_once()
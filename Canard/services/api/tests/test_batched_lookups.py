@@ -0,0 +1,71 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from app.db import queries
+
+
+def _supabase(rows: list[dict], chunks: list[list[str]] | None = None) -> MagicMock:
+    supabase = MagicMock()
+
+    def select(_columns):
+        query = MagicMock()
+
+        def in_(_column, ids):
+            if chunks is not None:
+                chunks.append(list(ids))
+            query.execute.return_value.data = [r for r in rows if r["id"] in ids]
+            return query
+
+        query.in_.side_effect = in_
+        return query
+
+    supabase.table.return_value.select.side_effect = select
+    return supabase
+
+
+def test_get_many_chunks_and_keeps_order() -> None:
+    rows = [{"id": f"e{i}"} for i in range(5)]
+    chunks: list[list[str]] = []
+    supabase = _supabase(rows, chunks)
+
+    with patch("app.db.queries.get_supabase", return_value=supabase), patch("app.db.queries._IN_CHUNK_SIZE", 2):
+        found = queries.get_employees(["e4", "e1", "e4", "missing", "e0", ""])
+
+    assert list(found) == ["e4", "e1", "e0"]
+    assert chunks == [["e4", "e1"], ["missing", "e0"]]
+
+
+def test_identity_scope_dedupes_until_written_or_closed() -> None:
+    supabase = _supabase([{"id": "e1", "org_id": "o1"}, {"id": "e2", "org_id": "o1"}])
+
+    with patch("app.db.queries.get_supabase", return_value=supabase):
+        with queries.identity_scope():
+            assert queries.get_employee("e1") == {"id": "e1", "org_id": "o1"}
+            queries.get_employees(["e1", "e2"])  # only e2 is fetched
+            assert queries.get_employee("nobody") is None
+            assert queries.get_employee("nobody") is None
+            fetched_in_scope = supabase.table.return_value.select.call_count
+            queries._notify_write("employees", "update", {"id": "e1", "org_id": "o1"})
+            queries.get_employee("e1")
+        assert fetched_in_scope == 3
+        assert supabase.table.return_value.select.call_count == 4
+
+        supabase.table.return_value.select.side_effect = None
+        single = supabase.table.return_value.select.return_value.eq.return_value.limit.return_value
+        single.execute.return_value.data = [{"id": "e1"}]
+        assert queries.get_employee("e1") == {"id": "e1"}  # scope closed: plain lookup
+
+
+
+def test_identity_scope_forgets_deleted_script() -> None:
+    rows = [{"id": "s1", "org_id": "o1"}]
+    supabase = _supabase(rows)
+
+    with patch("app.db.queries.get_supabase", return_value=supabase):
+        with queries.identity_scope():
+            assert queries.get_script("s1") == {"id": "s1", "org_id": "o1"}
+            queries.delete_script("s1")
+            rows.clear()
+            assert queries.get_script("s1") is None
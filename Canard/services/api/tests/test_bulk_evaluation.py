@@ -0,0 +1,149 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+from app.services.bulk_evaluation import BulkEvaluationFilters, run_bulk_evaluation
+from app.services.rate_limit import TokenBucket
+
+_TRANSCRIPT = "Agent: Hi, this is IT support. User: Sure, what do you need from me?"
+
+
+def _calls(n: int, **overrides) -> list[dict]:
+    return [
+        {
+            "id": f"call-{i:03d}",
+            "created_at": f"2026-01-01T00:00:{i:02d}+00:00",
+            "transcript": _TRANSCRIPT,
+            "risk_score": None,
+            "employee_compliance": None,
+            "evaluation_version": None,
+            **overrides,
+        }
+        for i in range(n)
+    ]
+
+
+def _pager(rows: list[dict]):
+    def list_calls_page(*, after=None, limit=100, **_kwargs):
+        start = 0
+        if after is not None:
+            start = next(i for i, r in enumerate(rows) if r["id"] == after[1]) + 1
+        return rows[start : start + limit]
+
+    return list_calls_page
+
+
+def test_token_bucket_limits_rate() -> None:
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # First token is free, the other five take ~20 ms each
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_filters_select_by_prompt_version_and_missing() -> None:
+    scored = {"transcript": _TRANSCRIPT, "risk_score": 10, "employee_compliance": "passed"}
+
+    assert not BulkEvaluationFilters().selects(scored)
+    assert BulkEvaluationFilters().selects({**scored, "risk_score": None})
+    assert BulkEvaluationFilters(prompt_version="v2").selects(
+        {**scored, "evaluation_version": "v1"}
+    )
+    assert not BulkEvaluationFilters(prompt_version="v2").selects(
+        {**scored, "evaluation_version": "v2"}
+    )
+    assert not BulkEvaluationFilters(missing_only=False).selects(
+        {**scored, "transcript": "short"}
+    )
+
+
+def test_bulk_evaluation_pages_and_checkpoints(tmp_path) -> None:
+    rows = _calls(7)
+    state_path = tmp_path / "state.json"
+    evaluate = AsyncMock(return_value={"risk_score": 1, "employee_compliance": "passed"})
+
+    with (
+        patch("app.services.bulk_evaluation.queries.list_calls_page", _pager(rows)),
+        patch("app.services.bulk_evaluation.evaluate_call", evaluate),
+    ):
+        state = asyncio.run(
+            run_bulk_evaluation(
+                BulkEvaluationFilters(),
+                state_path=state_path,
+                page_size=3,
+                concurrency=2,
+                requests_per_second=1000,
+            )
+        )
+
+    assert evaluate.await_count == 7
+    assert state.succeeded == 7 and state.failed == 0
+    saved = json.loads(state_path.read_text())
+    assert saved["done"] is True
+    assert saved["cursor"] == [rows[-1]["created_at"], rows[-1]["id"]]
+
+
+def test_bulk_evaluation_resumes_from_checkpoint(tmp_path) -> None:
+    rows = _calls(6)
+    state_path = tmp_path / "state.json"
+    filters = BulkEvaluationFilters()
+    state_path.write_text(
+        json.dumps(
+            {
+                "filters_fingerprint": filters.fingerprint(),
+                "cursor": [rows[2]["created_at"], rows[2]["id"]],
+                "scanned": 3,
+                "selected": 3,
+                "succeeded": 3,
+            }
+        )
+    )
+    evaluate = AsyncMock(return_value=None)
+
+    with (
+        patch("app.services.bulk_evaluation.queries.list_calls_page", _pager(rows)),
+        patch("app.services.bulk_evaluation.evaluate_call", evaluate),
+    ):
+        state = asyncio.run(
+            run_bulk_evaluation(
+                filters, state_path=state_path, page_size=10, requests_per_second=1000
+            )
+        )
+
+    evaluated = sorted(c.args[0] for c in evaluate.await_args_list)
+    assert evaluated == ["call-003", "call-004", "call-005"]
+    assert state.failed == 3
+    assert sorted(state.failed_ids) == evaluated
+
+
+def test_bulk_evaluation_dry_run_writes_nothing(tmp_path) -> None:
+    rows = _calls(4)
+    state_path = tmp_path / "state.json"
+    evaluate = AsyncMock()
+    seen: list[str] = []
+
+    with (
+        patch("app.services.bulk_evaluation.queries.list_calls_page", _pager(rows)),
+        patch("app.services.bulk_evaluation.evaluate_call", evaluate),
+    ):
+        state = asyncio.run(
+            run_bulk_evaluation(
+                BulkEvaluationFilters(),
+                state_path=state_path,
+                dry_run=True,
+                on_result=lambda call_id, _r, _e: seen.append(call_id),
+            )
+        )
+
+    evaluate.assert_not_called()
+    assert state.selected == 4
+    assert seen == [r["id"] for r in rows]
+    assert not state_path.exists()
@@ -0,0 +1,157 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.campaign_scheduler import CallingWindow, CampaignScheduler
+from app.services.dialer import CampaignDialer
+
+
+def _dialer() -> CampaignDialer:
+    return CampaignDialer(
+        max_live_calls=3,
+        max_live_calls_per_org=3,
+        calls_per_second=1000,
+        stt_sessions=3,
+        slot_timeout_s=600,
+        poll_s=0.01,
+    )
+
+
+def test_calling_window_uses_employee_timezone() -> None:
+    window = CallingWindow.from_campaign(
+        {
+            "timezone": "America/New_York",
+            "calling_window_start": "09:00:00",
+            "calling_window_end": "17:00:00",
+            "calling_days": [1, 2, 3, 4, 5],
+        }
+    )
+    monday = datetime(2026, 10, 19, 14, 0, tzinfo=timezone.utc)  # 10:00 in New York
+
+    assert window.allows(monday)
+    assert not window.allows(monday, "Asia/Tokyo")  # 23:00 there
+    assert window.allows(monday, "Not/AZone")  # falls back to the campaign's
+    assert not window.allows(datetime(2026, 10, 24, 14, 0, tzinfo=timezone.utc))  # Saturday
+
+    overnight = CallingWindow.from_campaign(
+        {"calling_window_start": "22:00", "calling_window_end": "06:00", "calling_days": [1, 2, 3, 4, 5, 6, 7]}
+    )
+    assert overnight.allows(datetime(2026, 10, 19, 23, 0, tzinfo=timezone.utc))
+    assert overnight.allows(datetime(2026, 10, 20, 5, 0, tzinfo=timezone.utc))
+    assert not overnight.allows(datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc))
+
+
+def test_unset_calling_window_does_not_restrict() -> None:
+    saturday_night = datetime(2026, 10, 24, 3, 0, tzinfo=timezone.utc)
+
+    assert CallingWindow.from_campaign({}).allows(saturday_night)
+    assert not CallingWindow.from_campaign({"calling_days": [1, 2, 3, 4, 5]}).allows(saturday_night)
+    assert CallingWindow.from_campaign({"calling_window_start": "02:00"}).allows(saturday_night)
+
+
+def test_skips_campaigns_leased_elsewhere() -> None:
+    scheduler = CampaignScheduler(dialer=_dialer(), poll_interval_s=0.01, lease_s=60)
+
+    with (
+        patch("app.db.queries.list_due_campaigns", return_value=[{"id": "camp1", "org_id": "o1"}]),
+        patch("app.db.queries.acquire_campaign_lease", return_value=False) as acquire,
+    ):
+        started = asyncio.run(scheduler.run_once())
+
+    assert started == 0 and not scheduler._driving
+    assert acquire.call_args.args == ("camp1", scheduler.owner_id, 60)
+
+
+def test_resumes_interrupted_campaign_and_completes_it() -> None:
+    campaign = {
+        "id": "camp1",
+        "org_id": "o1",
+        "status": "scheduled",
+        "calling_window_start": "00:00",
+        "calling_window_end": "23:59:59.999999",
+        "calling_days": [1, 2, 3, 4, 5, 6, 7],
+    }
+    # a1 was dialled before the restart, a2 was not; a3 was never reached
+    assignments = {
+        aid: {"id": aid, "employee_id": f"e{aid[1]}", "script_id": "s1", "caller_id": "r1", "status": status}
+        for aid, status in (("a1", "dialing"), ("a2", "dialing"), ("a3", "pending"))
+    }
+
+    def list_assignments(_campaign_id: str, status: str | None = None) -> list[dict]:
+        return [dict(a) for a in assignments.values() if status is None or a["status"] == status]
+
+    async def start_call(employee_id: str, **_kwargs) -> dict:
+        return {"id": f"call-{employee_id}"}
+
+    dialer = _dialer()
+    scheduler = CampaignScheduler(dialer=dialer, poll_interval_s=0.01, lease_s=60)
+    release = MagicMock()
+
+    async def scenario() -> None:
+        assert await scheduler.run_once() == 1
+        driver = scheduler._driving["camp1"]
+        await asyncio.sleep(0.05)
+        assert campaign["status"] == "running" and dialer.live_calls == 2
+        assert not driver.done()
+
+        dialer.stream_closed("call-e2")
+        dialer.stream_closed("call-e3")
+        await asyncio.wait_for(driver, 1)
+
+    with (
+        patch("app.db.queries.list_due_campaigns", return_value=[dict(campaign)]),
+        patch("app.db.queries.acquire_campaign_lease", return_value=True),
+        patch("app.db.queries.release_campaign_lease", new=release),
+        patch("app.db.queries.get_campaign", side_effect=lambda _cid: dict(campaign)),
+        patch("app.db.queries.update_campaign", side_effect=lambda _cid, data: campaign.update(data)),
+        patch("app.db.queries.list_campaign_assignments", side_effect=list_assignments),
+        patch(
+            "app.db.queries.update_campaign_assignment",
+            side_effect=lambda aid, data: assignments[aid].update(data),
+        ),
+        patch(
+            "app.db.queries.get_calls_by_assignment",
+            side_effect=lambda ids: {"a1": {"id": "call-e1", "assignment_id": "a1", "status": "completed"}},
+        ),
+        patch("app.db.queries.get_employees", side_effect=lambda ids: {i: {"id": i} for i in ids}),
+        patch("app.db.queries.get_calls", side_effect=lambda ids: {i: {"status": "in-progress"} for i in ids}),
+        patch("app.services.calls.start_call", new=AsyncMock(side_effect=start_call)) as started,
+    ):
+        asyncio.run(scenario())
+
+    assert sorted(c.kwargs["employee_id"] for c in started.call_args_list) == ["e2", "e3"]
+    assert {a["status"] for a in assignments.values()} == {"completed"}
+    assert campaign["status"] == "completed"
+    release.assert_called_once_with("camp1", scheduler.owner_id)
+
+
+def test_driver_stops_before_an_unrenewed_lease_lapses() -> None:
+    scheduler = CampaignScheduler(dialer=_dialer(), poll_interval_s=0.01, lease_s=0.3)
+    release = MagicMock()
+
+    async def hang(_campaign) -> None:
+        await asyncio.sleep(10)
+
+    async def scenario() -> float:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await scheduler.run_once() == 1
+        driver = scheduler._driving["camp1"]
+        await asyncio.gather(driver, return_exceptions=True)
+        assert driver.cancelled()
+        return loop.time() - started
+
+    with (
+        patch("app.db.queries.list_due_campaigns", return_value=[{"id": "camp1", "org_id": "o1"}]),
+        # Leased once, then every renewal errors (database unreachable)
+        patch("app.db.queries.acquire_campaign_lease", side_effect=[True] + [RuntimeError("down")] * 5),
+        patch("app.db.queries.release_campaign_lease", new=release),
+        patch.object(scheduler, "_run_campaign", hang),
+    ):
+        elapsed = asyncio.run(scenario())
+
+    assert elapsed < 0.3
+    release.assert_called_once_with("camp1", scheduler.owner_id)
@@ -0,0 +1,61 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+from app.services.dialer import CampaignDialer
+
+
+def _dialer(**overrides) -> CampaignDialer:
+    options = dict(
+        max_live_calls=3,
+        max_live_calls_per_org=2,
+        calls_per_second=1000,
+        stt_sessions=3,
+        slot_timeout_s=600,
+        poll_s=0.01,
+    )
+    options.update(overrides)
+    return CampaignDialer(**options)
+
+
+def test_admission_limits_and_release() -> None:
+    async def scenario() -> None:
+        dialer = _dialer()
+        a1 = await dialer.admit("o1")
+        dialer.bind(a1, "call-a1")
+        await dialer.admit("o1")
+        await dialer.admit("o2")
+
+        # o1 is at its per-org limit and the process at its global one
+        waiter = asyncio.create_task(dialer.admit("o1"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        dialer.release("call-a1")
+        slot = await asyncio.wait_for(waiter, 1)
+        assert slot.org_id == "o1" and a1.ended.is_set()
+        assert dialer.live_calls == 3
+
+    with patch("app.db.queries.get_calls", return_value={"call-a1": {"status": "in-progress"}}):
+        asyncio.run(scenario())
+
+
+def test_ad_hoc_streams_count_against_stt_sessions() -> None:
+    async def scenario() -> None:
+        dialer = _dialer(max_live_calls=10, max_live_calls_per_org=10, stt_sessions=2)
+        dialer.stream_opened("ad-hoc-1")
+        slot = await dialer.admit("o1")
+        dialer.bind(slot, "c1")
+        dialer.stream_opened("c1")  # its own stream doesn't count twice
+        assert dialer.stt_sessions_in_use() == 2
+
+        waiter = asyncio.create_task(dialer.admit("o1"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        dialer.stream_closed("ad-hoc-1")
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(scenario())
+
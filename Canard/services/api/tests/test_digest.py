@@ -0,0 +1,51 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from app.services.digest import SQLiteDigestStore, send_digests, stage_call_results, window_start
+from app.services.outbox import SQLiteOutbox
+
+_MANAGER = {"id": "m1", "email": "boss@x.test", "full_name": "Morgan"}
+
+
+def _stage(call_id: str, name: str, risk: int) -> int:
+    return stage_call_results(
+        call_id=call_id,
+        employee={"id": call_id, "email": f"{name.lower()}@x.test", "full_name": name},
+        manager=_MANAGER,
+        campaign_name="Q1",
+        risk_score=risk,
+        compliance="failed" if risk >= 70 else "passed",
+        audit_report_url=f"https://sb.test/{call_id}.pdf",
+    )
+
+
+def test_digest_groups_results_per_recipient(tmp_path) -> None:
+    store = SQLiteDigestStore(tmp_path / "outbox.sqlite3")
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3")
+
+    with (
+        patch("app.services.digest._store_instance", store),
+        patch("app.services.outbox._outbox_instance", outbox),
+        patch("app.jobs.queue.enqueue_job") as enqueue_job,
+    ):
+        assert _stage("c1", "Dana", 80) == 2
+        assert _stage("c2", "Lee", 10) == 2
+        _stage("c1", "Dana", 80)  # retried job: already staged
+        window = window_start()
+        assert send_digests(window) == 3
+        assert send_digests(window) == 0
+
+    assert {call.kwargs["idempotency_key"] for call in enqueue_job.call_args_list} == {
+        f"digest:{window}"
+    }
+    assert outbox.counts() == {"queued": 3}
+    [manager_email] = [
+        m for m in outbox.claim("t", 10) if m.to_email == "boss@x.test"
+    ]
+    assert manager_email.subject == "Team Security Test Results — 2 call(s)"
+    assert "Average risk score: <strong>45</strong>" in manager_email.html
+    assert manager_email.html.index("Dana") < manager_email.html.index("Lee")
+    assert "https://sb.test/c2.pdf" in manager_email.html
+    assert store.pending(window) == []
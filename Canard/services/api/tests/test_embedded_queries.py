@@ -0,0 +1,54 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from app.db import queries
+
+
+def test_list_calls_embeds_names_in_one_request() -> None:
+    from app.routes.calls import api_list_calls
+
+    rows = [
+        {
+            "id": "call1",
+            "status": "completed",
+            "flags": ["Gave MFA"],
+            "employee": {"full_name": "Ann"},
+            "caller": {"persona_name": "CFO"},
+            "campaign": {"name": "Q1", "attack_vector": "ceo"},
+        },
+        {"id": "call2", "status": "pending", "employee": {"full_name": "Bob"}, "caller": None, "campaign": None},
+    ]
+    supabase = MagicMock()
+    query = supabase.table.return_value.select.return_value
+    query.eq.return_value = query
+    query.order.return_value = query
+    query.limit.return_value = query
+    query.execute.return_value.data = rows
+
+    with (
+        patch("app.db.queries.get_supabase", return_value=supabase),
+        patch("app.db.queries.list_employees") as list_employees,
+        patch("app.db.queries.list_callers") as list_callers,
+        patch("app.db.queries.list_campaigns") as list_campaigns,
+    ):
+        items = asyncio.run(api_list_calls(None, org_id="o1", campaign_id=None, employee_id=None, status=None, limit=50))
+
+    columns = supabase.table.return_value.select.call_args.args[0]
+    assert "employee:employees!employee_id(full_name)" in columns
+    assert "transcript_json" not in columns
+    assert query.execute.call_count == 1
+    for lookup in (list_employees, list_callers, list_campaigns):
+        lookup.assert_not_called()
+    assert [(i.employee_name, i.caller_name, i.campaign_name) for i in items] == [
+        ("Ann", "CFO", "Q1"),
+        ("Bob", "", ""),
+    ]
+
+
+def test_embedded_accepts_object_list_or_null() -> None:
+    assert queries.embedded({"campaign": [{"name": "Q1"}]}, "campaign") == {"name": "Q1"}
+    assert queries.embedded({"campaign": None}, "campaign") == {}
+    assert queries.embedded({}, "campaign") == {}
@@ -288,7 +288,7 @@ def test_evaluate_call_audio_failure_continues() -> None:
         mock_queries.update_call.return_value = {}
 
         with patch(
-            "app.services.evaluation.download_recording",
+            "app.services.evaluation.fetch_recording",
             new_callable=AsyncMock,
             side_effect=Exception("Network error"),
         ):
@@ -304,3 +304,42 @@ def test_evaluate_call_audio_failure_continues() -> None:
     # Should still succeed despite audio failure
     assert result is not None
     assert result["risk_score"] == 65
+
+
+def test_evaluate_call_uses_live_audio_features() -> None:
+    """Features accumulated during the call skip the recording download."""
+    call = {
+        "id": "call-1",
+        "script_id": None,
+        "employee_id": None,
+        "org_id": None,
+        "recording_url": "https://api.twilio.com/recording/123",
+        "transcript": None,
+    }
+    live = AudioFeatures(duration_seconds=42.0, response_latencies_ms=[800.0])
+
+    with patch("app.services.evaluation.queries") as mock_queries:
+        mock_queries.get_call.return_value = call
+        mock_queries.update_call.return_value = {}
+
+        with (
+            patch(
+                "app.services.evaluation.fetch_recording", new_callable=AsyncMock
+            ) as mock_download,
+            patch(
+                "app.services.evaluation.chat_completion_json",
+                new_callable=AsyncMock,
+                return_value=_mock_evaluation_response(),
+            ) as mock_llm,
+        ):
+            result = asyncio.run(
+                evaluate_call(
+                    "call-1", recording_transcript="User: um, hello", audio_features=live
+                )
+            )
+
+    assert result is not None
+    mock_download.assert_not_awaited()
+    assert live.disfluency_count == 1
+    prompt = mock_llm.call_args.kwargs["messages"][1]["content"]
+    assert "Duration: 42.0s" in prompt
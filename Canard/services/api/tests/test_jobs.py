@@ -0,0 +1,197 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from app.jobs.handlers import JOB_HANDLERS
+from app.jobs.queue import JobStatus, JobType, SQLiteJobBackend
+from app.jobs.worker import JobWorker
+
+
+def test_enqueue_is_idempotent(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3")
+
+    first = queue.enqueue("evaluate_call", {"call_id": "c1"}, idempotency_key="evaluate:c1")
+    second = queue.enqueue("evaluate_call", {"call_id": "c1"}, idempotency_key="evaluate:c1")
+
+    assert first == second
+    assert queue.counts() == {"queued": 1}
+
+
+def test_claim_orders_by_priority_and_skips_delayed(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3")
+    low = queue.enqueue("process_recording", {}, priority=0)
+    high = queue.enqueue("evaluate_call", {}, priority=20)
+    queue.enqueue("audit_report", {}, priority=50, delay_s=60)
+
+    claimed = queue.claim("w1", limit=5)
+
+    assert [job.id for job in claimed] == [high, low]
+    assert all(job.attempts == 1 for job in claimed)
+    assert queue.claim("w2", limit=5) == []
+
+
+def test_failed_job_retries_with_backoff_then_dies(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3")
+    job_id = queue.enqueue("evaluate_call", {}, max_attempts=2)
+
+    queue.claim("w1")
+    queue.fail(job_id, "w1", "boom")
+    job = queue.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.QUEUED.value
+    assert job.run_at > time.time()
+
+    with patch("app.jobs.queue.time.time", return_value=job.run_at + 1):
+        assert [j.id for j in queue.claim("w1")] == [job_id]
+        queue.fail(job_id, "w1", "boom again")
+
+    job = queue.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.DEAD.value
+    assert job.last_error == "boom again"
+
+
+def test_expired_lease_is_reclaimed(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3", lease_s=10)
+    job_id = queue.enqueue("evaluate_call", {})
+    queue.claim("dead-worker")
+
+    assert queue.claim("w2") == []
+    with patch("app.jobs.queue.time.time", return_value=time.time() + 11):
+        reclaimed = queue.claim("w2")
+    assert [j.id for j in reclaimed] == [job_id]
+    assert reclaimed[0].attempts == 2
+
+
+def test_worker_runs_evaluation_and_chains_audit_job(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3")
+    job_id = queue.enqueue(
+        JobType.EVALUATE_CALL, {"call_id": "c1", "recording_transcript": "hi"}
+    )
+    evaluate = AsyncMock(return_value={"risk_score": 40})
+    worker = JobWorker(queue=queue, concurrency=2, poll_interval_s=0.01)
+
+    async def run():
+        await worker.run_once()
+        await asyncio.gather(*worker._running)
+
+    with (
+        patch("app.services.evaluation.evaluate_call", evaluate),
+        patch("app.jobs.queue.get_job_queue", return_value=queue),
+    ):
+        asyncio.run(run())
+
+    evaluate.assert_awaited_once_with("c1", "hi", raise_on_error=True)
+    job = queue.get(job_id)
+    assert job is not None and job.status == JobStatus.SUCCEEDED.value
+    audit_jobs = queue.claim("w", limit=5)
+    assert [(j.type, j.payload) for j in audit_jobs] == [
+        ("audit_report", {"call_id": "c1"})
+    ]
+
+
+def test_failed_evaluation_is_retried(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3")
+    job_id = queue.enqueue(
+        JobType.EVALUATE_CALL, {"call_id": "c1", "recording_transcript": "hi"}
+    )
+    worker = JobWorker(queue=queue, poll_interval_s=0.01)
+
+    async def run():
+        await worker.run_once()
+        await asyncio.gather(*worker._running)
+
+    with (
+        patch("app.db.queries.get_call", return_value={"id": "c1"}),
+        patch(
+            "app.services.evaluation.chat_completion_json",
+            AsyncMock(side_effect=RuntimeError("mistral down")),
+        ),
+        patch("app.jobs.queue.get_job_queue", return_value=queue),
+    ):
+        asyncio.run(run())
+
+    job = queue.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.QUEUED.value
+    assert job.attempts == 1
+    assert job.run_at > time.time()
+    assert job.last_error == "RuntimeError: mistral down"
+    assert queue.counts() == {"queued": 1}  # no audit report queued
+
+
+def test_worker_records_handler_failure(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3")
+    job_id = queue.enqueue("flaky", {})
+    worker = JobWorker(queue=queue, poll_interval_s=0.01)
+
+    async def run():
+        await worker.run_once()
+        await asyncio.gather(*worker._running)
+
+    with patch.dict(JOB_HANDLERS, {"flaky": AsyncMock(side_effect=RuntimeError("nope"))}):
+        asyncio.run(run())
+
+    job = queue.get(job_id)
+    assert job is not None
+    assert job.status == JobStatus.QUEUED.value
+    assert job.last_error == "RuntimeError: nope"
+
+
+def test_stale_worker_cannot_settle_a_reclaimed_job(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3", lease_s=10)
+    job_id = queue.enqueue("evaluate_call", {})
+    queue.claim("slow-worker")
+    with patch("app.jobs.queue.time.time", return_value=time.time() + 11):
+        assert [j.id for j in queue.claim("w2")] == [job_id]
+
+    assert not queue.renew(job_id, "slow-worker")
+    assert not queue.complete(job_id, "slow-worker")
+    assert not queue.fail(job_id, "slow-worker", "late")
+    assert queue.get(job_id).status == JobStatus.RUNNING.value
+    assert queue.complete(job_id, "w2")
+    assert queue.get(job_id).status == JobStatus.SUCCEEDED.value
+
+
+def test_worker_renews_the_lease_of_a_long_job(tmp_path) -> None:
+    queue = SQLiteJobBackend(tmp_path / "jobs.sqlite3", lease_s=0.06)
+    job_id = queue.enqueue("slow", {})
+    worker = JobWorker(queue=queue, poll_interval_s=0.01)
+    stolen: list = []
+
+    async def slow(_job) -> None:
+        for _ in range(4):
+            await asyncio.sleep(0.05)
+            stolen.extend(queue.claim("other-worker"))
+
+    async def run():
+        await worker.run_once()
+        await asyncio.gather(*worker._running)
+
+    with patch.dict(JOB_HANDLERS, {"slow": slow}):
+        asyncio.run(run())
+
+    assert stolen == []
+    assert queue.get(job_id).status == JobStatus.SUCCEEDED.value
+
+
+def test_process_recording_persists_the_transcript() -> None:
+    from app.jobs.queue import Job
+
+    job = Job(
+        id="j1",
+        type=JobType.PROCESS_RECORDING.value,
+        payload={"call_id": "c1", "download_url": "https://api.twilio.com/r.wav"},
+    )
+    with (
+        patch("app.services.post_call.store_recording", AsyncMock()),
+        patch("app.services.post_call.transcribe_recording", AsyncMock(return_value="Hello?")),
+        patch("app.twilio_voice.session.get_session", return_value=None),
+        patch("app.db.queries.update_call") as update_call,
+    ):
+        asyncio.run(JOB_HANDLERS[JobType.PROCESS_RECORDING.value](job))
+
+    update_call.assert_called_once_with("c1", {"transcript": "Hello?"})
@@ -0,0 +1,89 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.integrations.llm_cache import CompletionCache, make_cache_key
+from app.integrations.mistral import chat_completion_json
+
+
+def _response(text: str) -> MagicMock:
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = text
+    return response
+
+
+def test_cache_key_depends_on_every_component() -> None:
+    messages = [{"role": "user", "content": "Evaluate"}]
+    params = {"temperature": 0.1}
+    base = make_cache_key("m", messages, params, "v1")
+
+    assert base == make_cache_key("m", [dict(messages[0])], dict(params), "v1")
+    assert base != make_cache_key("m2", messages, params, "v1")
+    assert base != make_cache_key("m", [{"role": "user", "content": "x"}], params, "v1")
+    assert base != make_cache_key("m", messages, {"temperature": 0.2}, "v1")
+    assert base != make_cache_key("m", messages, params, "v2")
+
+
+def test_cache_hit_miss_and_ttl(tmp_path) -> None:
+    cache = CompletionCache(tmp_path / "cache.sqlite3", ttl_s=60, max_bytes=10_000)
+
+    assert cache.get("k") is None
+    cache.set("k", '{"a": 1}')
+    assert cache.get("k") == '{"a": 1}'
+
+    with patch("app.integrations.llm_cache.time.time", return_value=time.time() + 120):
+        assert cache.get("k") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    cache = CompletionCache(tmp_path / "cache.sqlite3", ttl_s=0, max_bytes=250)
+
+    cache.set("a", "x" * 100)
+    time.sleep(0.01)
+    cache.set("b", "y" * 100)
+    time.sleep(0.01)
+    cache.get("a")  # a is now more recent than b
+    time.sleep(0.01)
+    cache.set("c", "z" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_chat_completion_json_served_from_cache(tmp_path) -> None:
+    cache = CompletionCache(tmp_path / "cache.sqlite3", ttl_s=60, max_bytes=10_000)
+    mock_client = MagicMock()
+    mock_client.chat.complete_async = AsyncMock(
+        return_value=_response(json.dumps({"risk_score": 12}))
+    )
+    messages = [{"role": "user", "content": "analyze"}]
+
+    with (
+        patch("app.integrations.mistral._get_client", return_value=mock_client),
+        patch("app.integrations.mistral.get_completion_cache", return_value=cache),
+    ):
+        first = asyncio.run(chat_completion_json(messages, prompt_version="v1"))
+        second = asyncio.run(chat_completion_json(messages, prompt_version="v1"))
+        assert mock_client.chat.complete_async.await_count == 1
+
+        bypassed = asyncio.run(
+            chat_completion_json(messages, prompt_version="v1", bypass_cache=True)
+        )
+        assert mock_client.chat.complete_async.await_count == 2
+
+        # No prompt version means the caller didn't opt in
+        asyncio.run(chat_completion_json(messages))
+        assert mock_client.chat.complete_async.await_count == 3
+
+    assert first == second == bypassed == {"risk_score": 12}
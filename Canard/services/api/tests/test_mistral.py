@@ -171,3 +171,142 @@ def test_retry_on_429() -> None:
     assert isinstance(result, str)
     assert result == "Retry succeeded!"
     assert call_count == 2
+
+
+def test_stream_hedge_wins_when_primary_stalls() -> None:
+    from app.integrations import mistral
+
+    calls = 0
+
+    async def stalled_stream():
+        await asyncio.sleep(10)
+        yield MagicMock()
+
+    async def stream_async(**kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return stalled_stream()
+        return _mock_stream(["Hedged", " reply"])
+
+    mock_client = MagicMock()
+    mock_client.chat.stream_async = stream_async
+    before = mistral.get_metrics()
+
+    async def collect():
+        return [
+            chunk
+            async for chunk in chat_completion_stream(
+                messages=[{"role": "user", "content": "Hi"}], model="hedge-test"
+            )
+        ]
+
+    with (
+        patch("app.integrations.mistral._get_client", return_value=mock_client),
+        patch.object(mistral.settings, "mistral_hedge_default_ms", 20),
+    ):
+        collected = asyncio.run(collect())
+
+    after = mistral.get_metrics()
+    assert collected == ["Hedged", " reply"]
+    assert calls == 2
+    assert after["hedges_fired"] == before["hedges_fired"] + 1
+    assert after["hedges_won"] == before["hedges_won"] + 1
+
+
+def test_circuit_breaker_opens_and_half_open_probe_recovers() -> None:
+    from app.integrations import mistral
+
+    breaker = mistral._CircuitBreaker(failure_threshold=2, reset_s=0.0)
+    assert breaker.allow()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    # reset_s elapsed: exactly one probe is let through
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_open_breaker_rejects_without_calling_provider() -> None:
+    from app.integrations import mistral
+
+    raw_response = httpx.Response(503)
+    sdk_error = SDKError(message="Unavailable", raw_response=raw_response, body="")
+    mock_client = MagicMock()
+    mock_client.chat.complete_async = AsyncMock(side_effect=sdk_error)
+
+    with (
+        patch("app.integrations.mistral._get_client", return_value=mock_client),
+        patch("asyncio.sleep", new_callable=AsyncMock),
+        patch.dict(mistral._breakers, {}, clear=True),
+        patch.object(mistral.settings, "mistral_breaker_failure_threshold", 3),
+    ):
+        try:
+            asyncio.run(chat_completion(messages=[{"role": "user", "content": "Hi"}]))
+        except SDKError:
+            pass
+        assert mistral._breakers[mistral.settings.mistral_model].state == "open"
+
+        mock_client.chat.complete_async.reset_mock()
+        try:
+            asyncio.run(chat_completion(messages=[{"role": "user", "content": "Hi"}]))
+            raise AssertionError("expected CircuitOpenError")
+        except mistral.CircuitOpenError:
+            pass
+        mock_client.chat.complete_async.assert_not_called()
+
+
+def test_cancelled_half_open_probe_frees_the_breaker() -> None:
+    from app.integrations import mistral
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def scenario() -> None:
+        breaker = mistral._breaker_for("probe-test")
+        breaker.state, breaker.opened_at = "open", 0.0
+        probe = asyncio.create_task(mistral._with_retry(hang, model="probe-test"))
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half_open" and not breaker.allow()
+
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        assert breaker.allow()
+
+    with patch.dict(mistral._breakers, {}, clear=True):
+        asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_orphan_primary_stream() -> None:
+    from app.integrations import mistral
+
+    primary_cancelled = asyncio.Event()
+
+    async def stream_async(**kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            primary_cancelled.set()
+            raise
+
+    mock_client = MagicMock()
+    mock_client.chat.stream_async = stream_async
+
+    async def scenario() -> None:
+        caller = asyncio.create_task(mistral._open_hedged_stream(mock_client, {}, "orphan-test"))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.wait_for(primary_cancelled.wait(), 1)
+
+    with (
+        patch.object(mistral.settings, "mistral_hedge_enabled", True),
+        patch.object(mistral.settings, "mistral_hedge_default_ms", 5000),
+        patch.dict(mistral._breakers, {}, clear=True),
+    ):
+        asyncio.run(scenario())
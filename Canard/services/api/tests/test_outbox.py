@@ -0,0 +1,176 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+import email
+from collections.abc import Sequence
+from unittest.mock import patch
+
+from app.services.outbox import (
+    EmailSink,
+    FileSink,
+    OutboxMessage,
+    OutboxSender,
+    OutboxStatus,
+    ResendSink,
+    SendResult,
+    SQLiteOutbox,
+)
+
+
+class _RecordingSink(EmailSink):
+    max_batch = 2
+
+    def __init__(self, fail: bool = False):
+        self.batches: list[list[str]] = []
+        self.fail = fail
+
+    def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+        self.batches.append([m.to_email for m in messages])
+        if self.fail:
+            raise ConnectionError("provider down")
+        return [
+            SendResult(error="bad address", permanent=True)
+            if m.to_email.startswith("bad")
+            else SendResult(provider_id=f"p-{m.to_email}")
+            for m in messages
+        ]
+
+
+def _enqueue(outbox: SQLiteOutbox, *recipients: str) -> list[str]:
+    return [
+        outbox.enqueue(to, "Results", "<p>hi</p>", from_email="canard@x.test")
+        for to in recipients
+    ]
+
+
+def test_enqueue_is_idempotent(tmp_path) -> None:
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3")
+    first = outbox.enqueue("a@x.test", "s", "h", from_email="f", idempotency_key="k")
+    second = outbox.enqueue("a@x.test", "s", "h", from_email="f", idempotency_key="k")
+
+    assert first == second
+    assert outbox.counts() == {"queued": 1}
+
+
+def test_sender_batches_and_marks_rejections_dead(tmp_path) -> None:
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3")
+    ids = _enqueue(outbox, "a@x.test", "bad@x.test", "c@x.test", "d@x.test", "e@x.test")
+    sink = _RecordingSink()
+    sender = OutboxSender(outbox, sink, batch_size=10, concurrency=2, rate_per_s=100)
+
+    assert asyncio.run(sender.run_once()) == 4  # two batches of the sink's max
+    assert asyncio.run(sender.run_once()) == 1
+
+    assert [len(batch) for batch in sink.batches] == [2, 2, 1]
+    assert outbox.counts() == {"sent": 4, "dead": 1}
+    assert outbox.get(ids[0]).provider_id == "p-a@x.test"  # type: ignore[union-attr]
+    assert outbox.get(ids[1]).last_error == "bad address"  # type: ignore[union-attr]
+
+
+def test_failed_batch_is_retried_later(tmp_path) -> None:
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3")
+    [message_id] = _enqueue(outbox, "a@x.test")
+    sender = OutboxSender(outbox, _RecordingSink(fail=True), rate_per_s=100)
+
+    asyncio.run(sender.run_once())
+
+    message = outbox.get(message_id)
+    assert message is not None
+    assert message.status == OutboxStatus.QUEUED.value
+    assert message.attempts == 1
+    assert message.last_error == "ConnectionError: provider down"
+    assert asyncio.run(sender.run_once()) == 0  # backing off
+
+
+def test_file_sink_writes_html_email(tmp_path) -> None:
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3")
+    [message_id] = _enqueue(outbox, "a@x.test")
+    sender = OutboxSender(outbox, FileSink(tmp_path / "sent"), rate_per_s=100)
+
+    asyncio.run(sender.run_once())
+
+    parsed = email.message_from_bytes((tmp_path / "sent" / f"{message_id}.eml").read_bytes())
+    assert parsed["To"] == "a@x.test"
+    assert "<p>hi</p>" in parsed.get_payload()[1].get_payload()
+    assert outbox.counts() == {"sent": 1}
+
+
+def test_resend_without_api_key_never_writes_files(tmp_path) -> None:
+    from app.services.outbox import UnconfiguredSink, get_email_sink
+
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3")
+    [message_id] = _enqueue(outbox, "a@x.test")
+    with (
+        patch("app.services.outbox.settings.email_backend", "resend"),
+        patch("app.services.outbox.settings.resend_api_key", ""),
+        patch("app.services.outbox.settings.email_file_sink_path", str(tmp_path / "sent")),
+    ):
+        sink = get_email_sink()
+        asyncio.run(OutboxSender(outbox, sink, rate_per_s=100).run_once())
+
+    assert isinstance(sink, UnconfiguredSink)
+    assert not (tmp_path / "sent").exists()
+    message = outbox.get(message_id)
+    assert message is not None and message.status == OutboxStatus.QUEUED.value
+    assert message.last_error == "RuntimeError: RESEND_API_KEY is not set"
+
+
+def test_resend_sink_maps_permissive_batch_errors() -> None:
+    messages = [
+        OutboxMessage(id=str(i), to_email=f"{i}@x.test", subject="s", html="h")
+        for i in range(3)
+    ]
+    response = {
+        "data": [{"id": "em_0"}, {"id": "em_2"}],
+        "errors": [{"index": 1, "message": "invalid `to`"}],
+    }
+
+    with patch("resend.Batch.send", return_value=response) as send:
+        results = ResendSink("re_key").send_batch(messages)
+
+    params, options = send.call_args.args
+    assert len(params) == 3 and options["batch_validation"] == "permissive"
+    assert options["idempotency_key"] == ResendSink._batch_key(messages)
+    assert [(r.provider_id, r.error, r.permanent) for r in results] == [
+        ("em_0", None, False),
+        (None, "invalid `to`", True),
+        ("em_2", None, False),
+    ]
+
+
+def test_stale_sender_cannot_settle_a_reclaimed_message(tmp_path) -> None:
+    import time
+
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3", lease_s=10)
+    [message_id] = _enqueue(outbox, "a@x.test")
+    outbox.claim("slow-sender", 10)
+    with patch("app.services.outbox.time.time", return_value=time.time() + 11):
+        assert [m.id for m in outbox.claim("s2", 10)] == [message_id]
+
+    assert outbox.renew([message_id], "slow-sender") == 0
+    assert not outbox.mark_sent(message_id, "slow-sender", "p-late")
+    assert not outbox.fail(message_id, "slow-sender", "late")
+    assert outbox.get(message_id).status == OutboxStatus.SENDING.value  # type: ignore[union-attr]
+    assert outbox.mark_sent(message_id, "s2", "p-1")
+    assert outbox.get(message_id).provider_id == "p-1"  # type: ignore[union-attr]
+
+
+def test_sender_renews_the_lease_of_a_slow_batch(tmp_path) -> None:
+    import time
+
+    outbox = SQLiteOutbox(tmp_path / "outbox.sqlite3", lease_s=0.06)
+    _enqueue(outbox, "a@x.test")
+    stolen: list[OutboxMessage] = []
+
+    class _SlowSink(_RecordingSink):
+        def send_batch(self, messages: Sequence[OutboxMessage]) -> list[SendResult]:
+            for _ in range(4):
+                time.sleep(0.05)
+                stolen.extend(outbox.claim("other-sender", 10))
+            return super().send_batch(messages)
+
+    asyncio.run(OutboxSender(outbox, _SlowSink(), rate_per_s=100).run_once())
+
+    assert stolen == []
+    assert outbox.counts() == {"sent": 1}
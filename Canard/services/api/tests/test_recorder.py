@@ -0,0 +1,64 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import wave
+
+import numpy as np
+
+from app.services.audio_features import decode_ulaw, extract_audio_features
+from app.twilio_voice.recorder import CHANNEL_AGENT, CHANNEL_CALLEE, DualChannelRecorder
+
+_SILENCE = b"\xff" * 160  # µ-law zero
+_TONE = bytes([0x10, 0x90]) * 80
+
+
+def _read_channels(path) -> np.ndarray:
+    with wave.open(str(path), "rb") as wav:
+        assert wav.getnchannels() == 2
+        assert wav.getframerate() == 8000
+        frames = wav.readframes(wav.getnframes())
+    return np.frombuffer(frames, dtype="<i2").reshape(-1, 2)
+
+
+def test_agent_audio_is_placed_on_the_playback_cursor(tmp_path) -> None:
+    recorder = DualChannelRecorder(tmp_path / "call.wav")
+    for _ in range(2):
+        recorder.add_inbound(_SILENCE)
+    recorder.add_outbound(_TONE * 2)  # plays from frame 320
+    recorder.add_outbound(_TONE)  # queued behind the first chunk
+    for _ in range(6):
+        recorder.add_inbound(_TONE)
+    path = recorder.close()
+
+    samples = _read_channels(path)
+    assert samples.shape == (8 * 160, 2)
+    agent = samples[:, CHANNEL_AGENT]
+    assert not agent[:320].any()
+    assert (agent[320:800] == np.tile(decode_ulaw(_TONE), 3)).all()
+    assert not agent[800:].any()
+    assert not samples[:320, CHANNEL_CALLEE].any()
+    assert samples[320:, CHANNEL_CALLEE].any()
+
+
+def test_outbound_after_idle_starts_at_the_current_frame(tmp_path) -> None:
+    recorder = DualChannelRecorder(tmp_path / "call.wav")
+    recorder.add_outbound(_TONE)
+    for _ in range(3):
+        recorder.add_inbound(_SILENCE)
+    recorder.add_outbound(_TONE)
+    recorder.add_inbound(_SILENCE)
+
+    agent = _read_channels(recorder.close())[:, CHANNEL_AGENT]
+    assert agent[:160].any() and not agent[160:480].any() and agent[480:].any()
+
+
+def test_unfinished_file_is_still_readable(tmp_path) -> None:
+    recorder = DualChannelRecorder(tmp_path / "call.wav")
+    for _ in range(100):
+        recorder.add_inbound(_TONE)
+    recorder._fh.flush()  # simulate a crash before close()
+
+    features = extract_audio_features(recorder.path)
+    assert features.duration_seconds == 2.0
+    recorder.discard()
+    assert not recorder.path.exists()
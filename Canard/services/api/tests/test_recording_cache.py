@@ -0,0 +1,180 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+
+from app.services.recording_cache import (
+    RecordingCache,
+    recording_keys,
+    storage_key,
+    twilio_recording_key,
+)
+
+_SID = "RE" + "a" * 32
+
+
+def test_recording_keys_prefer_twilio_sid() -> None:
+    url = f"https://api.twilio.com/2010-04-01/Accounts/AC1/Recordings/{_SID}.wav"
+    assert recording_keys(url) == [twilio_recording_key(_SID), f"url:{url}"]
+    assert recording_keys("https://x.test/a.wav?token=1") == ["url:https://x.test/a.wav"]
+
+
+def test_same_content_is_stored_once_under_many_keys(tmp_path) -> None:
+    cache = RecordingCache(tmp_path, max_bytes=1024)
+    first = cache.put_bytes(b"audio", ["twilio:RE1"])
+    second = cache.put_bytes(b"audio", [storage_key("recordings", "e/e.wav")])
+
+    assert first == second
+    assert cache.get_path("storage:recordings/e/e.wav") == first
+    assert cache.stats()["entries"] == 1
+
+
+def test_lookup_by_any_key_adds_the_others_as_aliases(tmp_path) -> None:
+    cache = RecordingCache(tmp_path, max_bytes=1024)
+    path = cache.put_bytes(b"audio", ["twilio:RE1"])
+
+    assert cache.get_path("url:https://x.test/a.wav", "twilio:RE1") == path
+    assert cache.get_path("url:https://x.test/a.wav") == path
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path) -> None:
+    cache = RecordingCache(tmp_path, max_bytes=250)
+    old = cache.put_bytes(b"a" * 100, ["a"])
+    cache.put_bytes(b"b" * 100, ["b"])
+    cache.get_path("a")  # touch: "b" is now least recently used
+    cache.put_bytes(b"c" * 100, ["c"])
+
+    assert cache.get_path("b") is None
+    assert cache.get_path("a") == old
+    assert cache.get_path("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_missing_blob_is_a_miss(tmp_path) -> None:
+    cache = RecordingCache(tmp_path, max_bytes=1024)
+    cache.put_bytes(b"audio", ["k"]).unlink()
+
+    assert cache.get_path("k") is None
+
+
+def test_concurrent_fetches_share_one_download(tmp_path) -> None:
+    cache = RecordingCache(tmp_path, max_bytes=1024)
+    calls = 0
+
+    async def loader() -> bytes:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return b"audio"
+
+    async def run():
+        return await asyncio.gather(*(cache.fetch(["k"], loader) for _ in range(5)))
+
+    paths = asyncio.run(run())
+    assert calls == 1
+    assert len(set(paths)) == 1
+    assert asyncio.run(cache.fetch(["k"], loader)) == paths[0]
+    assert calls == 1
+
+
+def test_store_recording_tees_download_into_cache_and_chunked_upload() -> None:
+    from unittest.mock import patch
+
+    import httpx
+
+    from app.services import post_call
+    from app.services.recording_cache import get_recording_cache
+
+    audio = bytes(range(256)) * 40  # 10 KB
+    uploaded = bytearray()
+    patches_seen = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal patches_seen
+        if request.url.host == "api.twilio.com":
+            return httpx.Response(
+                200, content=audio, headers={"content-length": str(len(audio))}
+            )
+        if request.method == "POST":
+            assert request.headers["upload-length"] == str(len(audio))
+            return httpx.Response(201, headers={"location": "https://sb.test/tus/1"})
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"upload-offset": str(len(uploaded))})
+        patches_seen += 1
+        if patches_seen == 2:  # first try of the second chunk fails
+            return httpx.Response(503)
+        assert int(request.headers["upload-offset"]) == len(uploaded)
+        uploaded.extend(request.content)
+        return httpx.Response(204, headers={"upload-offset": str(len(uploaded))})
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    with (
+        patch("httpx.AsyncClient", client_factory),
+        patch("app.integrations.supabase_storage.TUS_CHUNK_BYTES", 4096),
+        patch("app.integrations.supabase_storage.settings.supabase_url", "https://sb.test"),
+        patch("app.services.post_call.cfg.supabase_url", "https://sb.test"),
+        patch("app.services.post_call.queries") as mock_queries,
+    ):
+        url = asyncio.run(
+            post_call.store_recording(
+                "call-1", _SID, f"https://api.twilio.com/Recordings/{_SID}", employee_id="e1"
+            )
+        )
+
+    assert url == "https://sb.test/storage/v1/object/public/recordings/e1/e1.wav"
+    assert bytes(uploaded) == audio
+    mock_queries.update_call.assert_called_once_with("call-1", {"recording_url": url})
+    cached = get_recording_cache().get_path(storage_key("recordings", "e1/e1.wav"))
+    assert cached is not None and cached.read_bytes() == audio
+    assert get_recording_cache().get_path(twilio_recording_key(_SID)) == cached
+
+
+def test_store_recording_does_not_reuse_an_employees_previous_recording() -> None:
+    from unittest.mock import patch
+
+    import httpx
+
+    from app.services import post_call
+    from app.services.recording_cache import get_recording_cache
+
+    recordings = {"RE" + "b" * 32: b"first call" * 100, "RE" + "c" * 32: b"second call" * 100}
+    uploaded: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "api.twilio.com":
+            audio = recordings[request.url.path.rsplit("/", 1)[1].removesuffix(".wav")]
+            return httpx.Response(200, content=audio, headers={"content-length": str(len(audio))})
+        if request.method == "POST":
+            uploaded.append(b"")
+            return httpx.Response(201, headers={"location": "https://sb.test/tus/1"})
+        uploaded[-1] += request.content
+        return httpx.Response(204, headers={"upload-offset": str(len(uploaded[-1]))})
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    with (
+        patch("httpx.AsyncClient", client_factory),
+        patch("app.integrations.supabase_storage.settings.supabase_url", "https://sb.test"),
+        patch("app.services.post_call.cfg.supabase_url", "https://sb.test"),
+        patch("app.services.post_call.queries"),
+    ):
+        for i, sid in enumerate(recordings):
+            asyncio.run(
+                post_call.store_recording(
+                    f"call-{i}", sid, f"https://api.twilio.com/Recordings/{sid}", employee_id="e2"
+                )
+            )
+
+    first, second = recordings.values()
+    assert uploaded == [first, second]
+    cache = get_recording_cache()
+    assert cache.get_path(storage_key("recordings", "e2/e2.wav")).read_bytes() == second
+    assert cache.get_path(twilio_recording_key("RE" + "b" * 32)).read_bytes() == first
+    assert cache.get_path(twilio_recording_key("RE" + "c" * 32)).read_bytes() == second
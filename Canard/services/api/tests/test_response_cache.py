@@ -0,0 +1,93 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from fastapi import APIRouter, FastAPI, Query
+from fastapi.testclient import TestClient
+
+from app.services.response_cache import CachedRoute, ResponseCache
+
+
+def _client() -> tuple[TestClient, list[str]]:
+    calls: list[str] = []
+    router = APIRouter(route_class=CachedRoute)
+
+    @router.get("/metrics")
+    async def metrics(org_id: str | None = Query(None), days: int = 7) -> dict:
+        calls.append(f"{org_id}:{days}")
+        return {"org": org_id, "days": days, "n": len(calls)}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app), calls
+
+
+def test_conditional_get_and_cached_body() -> None:
+    cache = ResponseCache(max_entries=8, ttl_s=300)
+    client, calls = _client()
+
+    with patch("app.services.response_cache._cache_instance", cache):
+        first = client.get("/metrics", params={"org_id": "o1"})
+        etag = first.headers["ETag"]
+        not_modified = client.get("/metrics", params={"org_id": "o1"}, headers={"If-None-Match": etag})
+        cached = client.get("/metrics", params={"org_id": "o1"})
+        other_params = client.get("/metrics", params={"org_id": "o1", "days": 30})
+
+        cache.on_write("calls", "update", {"id": "c1", "org_id": "o1"})
+        after_write = client.get("/metrics", params={"org_id": "o1"}, headers={"If-None-Match": etag})
+
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "private, no-cache"
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert cached.json() == first.json()
+    assert other_params.headers["ETag"] != etag
+    assert after_write.status_code == 200 and after_write.headers["ETag"] != etag
+    assert after_write.json()["n"] == 3
+    assert calls == ["o1:7", "o1:30", "o1:7"]
+
+
+def test_versions_are_per_org_and_entries_bounded() -> None:
+    cache = ResponseCache(max_entries=1, ttl_s=300)
+    client, calls = _client()
+
+    with patch("app.services.response_cache._cache_instance", cache):
+        o2 = client.get("/metrics", params={"org_id": "o2"}).headers["ETag"]
+        client.get("/metrics", params={"org_id": "o1"})
+        cache.bump("o1")
+        assert client.get("/metrics", params={"org_id": "o2"}).headers["ETag"] == o2
+        assert client.get("/metrics").status_code == 200  # no org: not cached
+
+    # o2's body was evicted by o1's, so it was recomputed
+    assert calls == ["o2:7", "o1:7", "o2:7", "None:7"]
+
+
+def test_etag_follows_the_analytics_store_not_the_clock() -> None:
+    from app.services.analytics_store import AnalyticsStore
+
+    cache = ResponseCache(max_entries=8, ttl_s=60)
+    store = AnalyticsStore(ttl_s=300)
+    client, calls = _client()
+    call = {"id": "c1", "org_id": "o1", "status": "completed", "updated_at": "2026-03-01T10:00:00+00:00"}
+
+    with (
+        patch("app.services.response_cache._cache_instance", cache),
+        patch("app.services.analytics_store._store_instance", store),
+        patch("app.services.analytics_store.settings.analytics_sync_interval_s", 0),
+        patch("app.db.queries.list_calls_page", return_value=[call]),
+        patch("app.db.queries.list_employees", return_value=[]),
+        patch("app.db.queries.list_campaigns", return_value=[]),
+        patch("app.db.queries.list_callers", return_value=[]),
+        patch("app.db.queries.list_calls_updated_since", return_value=[call]) as changed,
+    ):
+        store.org("o1")
+        first = client.get("/metrics", params={"org_id": "o1"}).headers["ETag"]
+        # Past the epoch; the re-polled row is unchanged
+        with patch("app.services.response_cache.time.time", return_value=10**10):
+            same = client.get("/metrics", params={"org_id": "o1"}).headers["ETag"]
+        # Another process evaluated the call
+        changed.return_value = [{**call, "risk_score": 90, "updated_at": "2026-03-01T10:05:00+00:00"}]
+        evaluated = client.get("/metrics", params={"org_id": "o1"}).headers["ETag"]
+
+    assert same == first
+    assert evaluated != first
+    assert calls == ["o1:7", "o1:7"]
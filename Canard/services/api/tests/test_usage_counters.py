@@ -0,0 +1,74 @@
+# pyright: reportMissingImports=false
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+
+def test_list_routes_read_stored_counters() -> None:
+    from app.routes.callers import api_list_callers
+    from app.routes.employees import api_list_employees
+
+    employees = [
+        {"id": "e1", "full_name": "Ann", "total_tests": 3, "failed_tests": 1,
+         "last_test_at": "2026-03-05T10:00:00+00:00"},
+        {"id": "e2", "full_name": "Bob", "total_tests": None, "last_test_at": None},
+    ]
+    callers = [
+        {"id": "r1", "persona_name": "CFO", "total_calls": 5, "completed_calls": 3, "failed_calls": 2},
+        {"id": "r2", "persona_name": "IT"},
+    ]
+
+    with (
+        patch("app.db.queries.list_employees", return_value=employees) as list_employees,
+        patch("app.db.queries.list_callers", return_value=callers),
+        patch("app.db.queries.list_calls") as list_calls,
+        patch("app.db.queries.list_calls_page") as list_calls_page,
+    ):
+        emp_items = asyncio.run(api_list_employees(None, org_id="o1"))
+        caller_items = asyncio.run(api_list_callers(None, org_id="o1"))
+
+    list_employees.assert_called_once_with("o1", active_only=False)
+    list_calls.assert_not_called()
+    list_calls_page.assert_not_called()
+    assert [(e.total_tests, e.failed_tests, e.last_test_date) for e in emp_items] == [
+        (3, 1, "2026-03-05"),
+        (0, 0, ""),
+    ]
+    assert [(c.total_calls, c.avg_success_rate) for c in caller_items] == [(5, 67), (0, 0)]
+
+
+def test_trigger_counts_calls_completed_before_evaluation(pg) -> None:
+    from tests.conftest import pg_employee, pg_org
+
+    org = pg_org(pg)
+    emp = pg_employee(pg, org)
+    caller = pg.execute(
+        "insert into callers (org_id, persona_name) values (%s, 'Test Caller') returning id", (org,)
+    ).fetchone()[0]
+    call = pg.execute(
+        "insert into calls (org_id, employee_id, caller_id, status, started_at)"
+        " values (%s, %s, %s, 'in-progress', '2026-03-05T10:00:00+00:00') returning id",
+        (org, emp, caller),
+    ).fetchone()[0]
+
+    def counters() -> tuple:
+        employee = pg.execute(
+            "select total_tests, failed_tests, last_test_at is not null from employees where id = %s", (emp,)
+        ).fetchone()
+        calls = pg.execute(
+            "select total_calls, completed_calls, failed_calls from callers where id = %s", (caller,)
+        ).fetchone()
+        return tuple(employee), tuple(calls)
+
+    assert counters() == ((0, 0, False), (1, 0, 0))
+
+    # Completion lands before evaluation, while employee_compliance is null
+    pg.execute("update calls set status = 'completed' where id = %s", (call,))
+    assert counters() == ((1, 0, True), (1, 1, 0))
+
+    pg.execute("update calls set employee_compliance = 'failed' where id = %s", (call,))
+    assert counters() == ((1, 1, True), (1, 1, 1))
+
+    pg.execute("delete from calls where id = %s", (call,))
+    assert counters() == ((0, 0, False), (0, 0, 0))